@@ -0,0 +1,64 @@
+import pytest
+
+from edge_app.handlers import origin_request, viewer_request
+
+
+def build_event(method, querystring):
+    request = {
+        'method': method,
+        'querystring': querystring,
+        'headers': {},
+        'uri': '/uid/post/pid/image/1080p.jpg',
+    }
+    return {'Records': [{'cf': {'request': request}}]}
+
+
+@pytest.mark.parametrize('method', ['GET', 'HEAD'])
+def test_viewer_request_no_method_allows_reads(method):
+    request = viewer_request(build_event(method, 'Expires=1&Signature=sig&Key-Pair-Id=kpid'), None)
+    assert request['method'] == method
+    assert request['querystring'] == ''
+
+
+@pytest.mark.parametrize('method', ['PUT', 'POST', 'DELETE'])
+def test_viewer_request_no_method_denies_writes(method):
+    resp = viewer_request(build_event(method, 'Expires=1&Signature=sig&Key-Pair-Id=kpid'), None)
+    assert resp == {'status': 403}
+
+
+def test_viewer_request_canned_policy_allows_signed_method():
+    querystring = 'Method=PUT&Expires=1&Signature=sig&Key-Pair-Id=kpid'
+    request = viewer_request(build_event('PUT', querystring), None)
+    assert request['method'] == 'PUT'
+    assert request['querystring'] == ''
+
+    # only the method that was signed for
+    assert viewer_request(build_event('GET', querystring), None) == {'status': 403}
+
+
+@pytest.mark.parametrize('method', ['GET', 'HEAD'])
+def test_viewer_request_custom_policy_allows_reads(method):
+    request = viewer_request(build_event(method, 'Policy=policy&Signature=sig&Key-Pair-Id=kpid'), None)
+    assert request['method'] == method
+    assert request['querystring'] == ''
+
+
+@pytest.mark.parametrize(
+    'querystring',
+    [
+        'Policy=policy&Signature=sig&Key-Pair-Id=kpid',
+        'Policy=policy&Signature=sig&Key-Pair-Id=kpid&Method=PUT',
+        # a custom policy doesn't sign the querystring, so these can be appended by anyone
+        'Policy=policy&Signature=sig&Key-Pair-Id=kpid&Expires=1&Method=PUT',
+    ],
+)
+def test_viewer_request_custom_policy_denies_writes(querystring):
+    assert viewer_request(build_event('PUT', querystring), None) == {'status': 403}
+
+
+def test_origin_request_adds_acl_header_to_writes():
+    request = origin_request(build_event('PUT', ''), None)
+    assert request['headers']['x-amz-acl'] == [{'key': 'x-amz-acl', 'value': 'bucket-owner-full-control'}]
+
+    request = origin_request(build_event('GET', ''), None)
+    assert 'x-amz-acl' not in request['headers']
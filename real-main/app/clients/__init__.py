@@ -1,3 +1,11 @@
+"""
+Clients are imported on first use, so a lambda only pays to import the clients (and their
+dependencies) that it actually uses.
+"""
+import importlib
+
+# the names are resolved by __getattr__ below, which pylint doesn't follow
+# pylint: disable=undefined-all-variable
 __all__ = [
     'AmplitudeClient',
     'AppleClient',
@@ -16,21 +24,40 @@ __all__ = [
     'RealDatingClient',
     'S3Client',
     'SecretsManagerClient',
+    'SQSClient',
 ]
-from .amplitude import AmplitudeClient
-from .apple import AppleClient
-from .appstore import AppStoreClient
-from .appsync import AppSyncClient
-from .bad_words import BadWordsClient
-from .cloudfront import CloudFrontClient
-from .cognito import CognitoClient
-from .dynamo import DynamoClient
-from .elasticsearch import ElasticSearchClient
-from .facebook import FacebookClient
-from .google import GoogleClient
-from .mediaconvert import MediaConvertClient
-from .pinpoint import PinpointClient
-from .post_verification import PostVerificationClient
-from .real_dating import RealDatingClient
-from .s3 import S3Client
-from .secretsmanager import SecretsManagerClient
+# pylint: enable=undefined-all-variable
+
+# name -> module it's defined in, relative to this package
+_modules = {
+    'AmplitudeClient': '.amplitude',
+    'AppleClient': '.apple',
+    'AppStoreClient': '.appstore',
+    'AppSyncClient': '.appsync',
+    'BadWordsClient': '.bad_words',
+    'CloudFrontClient': '.cloudfront',
+    'CognitoClient': '.cognito',
+    'DynamoClient': '.dynamo',
+    'ElasticSearchClient': '.elasticsearch',
+    'FacebookClient': '.facebook',
+    'GoogleClient': '.google',
+    'MediaConvertClient': '.mediaconvert',
+    'PinpointClient': '.pinpoint',
+    'PostVerificationClient': '.post_verification',
+    'RealDatingClient': '.real_dating',
+    'S3Client': '.s3',
+    'SecretsManagerClient': '.secretsmanager',
+    'SQSClient': '.sqs',
+}
+
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f'module `{__name__}` has no attribute `{name}`')
+    value = getattr(importlib.import_module(_modules[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return __all__
@@ -1,7 +1,8 @@
 import json
 
 import jwt
-import requests
+
+from . import transport
 
 # https://developer.apple.com/documentation/sign_in_with_apple/
 # https://pyjwt.readthedocs.io/en/latest/usage.html
@@ -15,7 +16,7 @@ class AppleClient:
 
     def get_public_key(self, kid, alg):
         # would be good to cache this info but have to be careful not to cache it too long
-        payload = requests.get(self.public_key_url).json()
+        payload = transport.get_session().get(self.public_key_url).json()
         for key in payload['keys']:
             if key['kid'] == kid and key['alg'] == alg:
                 return jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
@@ -1,5 +1,5 @@
 # https://developer.apple.com/documentation/appstorereceipts
-import requests
+from . import transport
 
 
 class AppStoreClientException(Exception):
@@ -45,7 +45,7 @@ class AppStoreClient:
         For all other apple statuses, raise an exception.
         """
         receipt = req_body['receipt-data']
-        resp_body = requests.post(url, json=req_body).json()
+        resp_body = transport.get_session().post(url, json=req_body).json()
 
         # https://developer.apple.com/documentation/appstorereceipts/status
         status = resp_body.get('status')
@@ -1,14 +1,19 @@
+import collections
+import concurrent.futures
 import logging
 import os
 
-import boto3
-import gql.transport.requests
-import requests_aws4auth
+import requests
+
+from . import transport
 
 APPSYNC_GRAPHQL_URL = os.environ.get('APPSYNC_GRAPHQL_URL')
 
 logger = logging.getLogger()
 
+# the parts of a graphql response we use
+ExecutionResult = collections.namedtuple('ExecutionResult', ['data', 'errors'])
+
 
 class AppSyncClient:
 
@@ -18,12 +23,20 @@ class AppSyncClient:
         'Content-Type': 'application/json',
     }
 
+    # max number of mutations aliased into a single request by send_mutations()
+    mutations_per_request = 25
+
+    # max number of requests send_mutations() has in flight at once
+    max_concurrent_requests = 8
+
+    # seconds to wait for a response
+    timeout = 10
+
     def __init__(self, appsync_graphql_url=APPSYNC_GRAPHQL_URL):
         self.appsync_graphql_url = appsync_graphql_url
 
     def fire_notification(self, user_id, notification_type, **extra):
-        mutation = gql.gql(
-            f'''
+        mutation = f'''
             mutation TriggerNotification ($input: NotificationInput!) {{
                 triggerNotification (input: $input) {{
                     userId
@@ -32,7 +45,6 @@ class AppSyncClient:
                 }}
             }}
         '''
-        )
         input_obj = {
             'userId': user_id,
             'type': notification_type,
@@ -40,22 +52,92 @@ class AppSyncClient:
         }
         self.send(mutation, {'input': input_obj})
 
-    def send(self, query, variables):
-        aws_session = boto3.session.Session()
-        creds = aws_session.get_credentials().get_frozen_credentials()
-        auth = requests_aws4auth.AWS4Auth(
-            creds.access_key,
-            creds.secret_key,
-            aws_session.region_name,
-            self.service_name,
-            session_token=creds.token,
+    def fire_notifications(self, batch):
+        """
+        Fire many notifications. Each notification in `batch` is an input object as built by
+        fire_notification(), ie {'userId': ..., 'type': ..., **extra}.
+        Returns a list of (notification, error) tuples for the notifications that failed.
+        """
+        # each notification selects back the fields it was sent with, as fire_notification() does
+        return self.send_mutations(
+            'triggerNotification', 'NotificationInput', lambda input_obj: ' '.join(input_obj.keys()), batch
         )
-        transport = gql.transport.requests.RequestsHTTPTransport(
-            url=self.appsync_graphql_url,
-            use_json=True,
-            headers=self.headers,
-            auth=auth,
+
+    def send_mutations(self, field_name, input_type, selection_set, inputs):
+        """
+        Run the `field_name` mutation once for each of `inputs`.
+
+        Mutations are aliased together into requests of up to `mutations_per_request`, and those
+        requests are sent concurrently. The `selection_set` is either a string or a function that returns
+        the selection set for a given input object. A failure of one mutation does not stop the others.
+        Returns a list of (input_obj, error) tuples for the mutations that failed.
+        """
+        inputs = list(inputs)
+        chunk_size = self.mutations_per_request
+        chunks = [inputs[i : i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+        if len(chunks) <= 1:
+            return self.send_mutations_request(field_name, input_type, selection_set, inputs) if inputs else []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            futures = [
+                executor.submit(self.send_mutations_request, field_name, input_type, selection_set, chunk)
+                for chunk in chunks
+            ]
+            return [failure for future in futures for failure in future.result()]
+
+    def send_mutations_request(self, field_name, input_type, selection_set, inputs):
+        "Send one request with a `field_name` mutation aliased for each of `inputs`, return the failures"
+        get_selection_set = selection_set if callable(selection_set) else lambda input_obj: selection_set
+        variable_defs = ', '.join(f'$input{i}: {input_type}!' for i in range(len(inputs)))
+        fields = ' '.join(
+            f'm{i}: {field_name} (input: $input{i}) {{ {get_selection_set(input_obj)} }}'
+            for i, input_obj in enumerate(inputs)
         )
-        resp = transport.execute(query, variables)
+        mutation = f'mutation BatchTrigger ({variable_defs}) {{ {fields} }}'
+        variables = {f'input{i}': input_obj for i, input_obj in enumerate(inputs)}
+        try:
+            resp = self.execute(mutation, variables)
+        except Exception as err:
+            return [(input_obj, err) for input_obj in inputs]
+
+        # errors are matched to mutations by their alias, errors without one are counted against all mutations
+        errors_by_index = {}
+        for error in resp.errors or []:
+            path = error.get('path') if isinstance(error, dict) else None
+            alias = path[0] if path else None
+            if isinstance(alias, str) and alias.startswith('m') and alias[1:].isdigit():
+                errors_by_index.setdefault(int(alias[1:]), error)
+            else:
+                return [(input_obj, error) for input_obj in inputs]
+        return [(inputs[i], error) for i, error in sorted(errors_by_index.items())]
+
+    def send(self, query, variables):
+        resp = self.execute(query, variables)
         if resp.errors:
             raise Exception(f'Appsync resp error: `{resp.errors}` from query `{query}`, variables `{variables}`')
+
+    def execute(self, query, variables):
+        """
+        Send a graphql query, either a string or a parsed document, to appsync.
+        Strings are sent as-is, so documents need not be parsed and printed back out on each call.
+        """
+        if isinstance(query, str):
+            query_str = query
+        else:
+            import graphql
+
+            query_str = graphql.print_ast(query)
+        resp = transport.get_session().post(
+            self.appsync_graphql_url,
+            json={'query': query_str, 'variables': variables},
+            headers=self.headers,
+            auth=transport.get_aws_auth(self.service_name),
+            timeout=self.timeout,
+        )
+        try:
+            result = resp.json()
+        except ValueError:
+            result = None
+        if not isinstance(result, dict) or ('errors' not in result and 'data' not in result):
+            resp.raise_for_status()
+            raise requests.HTTPError('Appsync did not return a graphql result', response=resp)
+        return ExecutionResult(data=result.get('data'), errors=result.get('errors'))
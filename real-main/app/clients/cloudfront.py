@@ -1,14 +1,11 @@
 import base64
+import functools
 import json
 import os
 import urllib
 
-import botocore
+import botocore.signers
 import pendulum
-from cryptography.hazmat import backends
-from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
-from cryptography.hazmat.primitives.hashes import SHA1
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
 
 CLOUDFRONT_UPLOADS_DOMAIN = os.environ.get('CLOUDFRONT_UPLOADS_DOMAIN')
 
@@ -17,10 +14,19 @@ class CloudFrontClient:
 
     lifetime = pendulum.duration(hours=48)
 
+    # Expiry times are rounded up to the next multiple of this, so that signatures (and the urls they are
+    # part of) stay the same for a while and can be cached by us, by CDNs and by clients.
+    expires_at_granularity = pendulum.duration(hours=6)
+
+    # max number of signatures cached
+    signature_cache_size = 4096
+
     def __init__(self, key_pair_getter, domain=CLOUDFRONT_UPLOADS_DOMAIN):
         assert domain, "CloudFront domain is required"
         self.domain = domain
         self.key_pair_getter = key_pair_getter
+        self.get_signed_url = functools.lru_cache(maxsize=self.signature_cache_size)(self.sign_url)
+        self.get_signed_policy = functools.lru_cache(maxsize=self.signature_cache_size)(self.sign_policy)
 
     def get_key_pair(self):
         if not hasattr(self, '_key_pair'):
@@ -30,6 +36,9 @@ class CloudFrontClient:
     def get_private_key(self):
         "A PrivateKey object ready to use to .sign()"
         if not hasattr(self, '_private_key'):
+            from cryptography.hazmat import backends
+            from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
             private_key = self.get_key_pair()['privateKey']
 
             # the private key format requires newlines after the header and before the footer
@@ -43,32 +52,64 @@ class CloudFrontClient:
     def get_cloudfront_signer(self):
         if not hasattr(self, '_cfsigner'):
             key_id = self.get_key_pair()['keyId']
-            pk = self.get_private_key()
+            self._cfsigner = botocore.signers.CloudFrontSigner(key_id, self.sign)
+        return self._cfsigner
 
-            def sign(msg):
-                return pk.sign(msg, PKCS1v15(), SHA1())
+    def sign(self, msg):
+        from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+        from cryptography.hazmat.primitives.hashes import SHA1
 
-            self._cfsigner = botocore.signers.CloudFrontSigner(key_id, sign)
-        return self._cfsigner
+        return self.get_private_key().sign(msg, PKCS1v15(), SHA1())
 
     def generate_unsigned_url(self, path):
         return f'https://{self.domain}/{path}'
 
+    def get_expires_at(self, now=None):
+        "Return the expiry time for a signature made now, at least `lifetime` from now"
+        now = now or pendulum.now('utc')
+        granularity = int(self.expires_at_granularity.total_seconds())
+        timestamp = (now + self.lifetime).int_timestamp
+        return pendulum.from_timestamp(-(-timestamp // granularity) * granularity)
+
     def generate_presigned_url(self, path, methods, expires_at=None):
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront.html#examples
-        expires_at = expires_at or pendulum.now('utc') + self.lifetime
+        expires_at = expires_at or self.get_expires_at()
+        return self.get_signed_url(path, tuple(methods), expires_at)
+
+    def generate_presigned_readonly_url(self, path, expires_at=None):
+        """
+        Generate a read-only url for `path`. For jpegs, the signature covers all the jpegs in the same
+        directory, so all the sizes of an image share one signature. It never covers other files in
+        that directory, such as the native HEIC, which still carries the original's EXIF & GPS metadata.
+        """
+        expires_at = expires_at or self.get_expires_at()
+        directory, filename = path.rsplit('/', 1)
+        resource = f'{directory}/*.jpg' if filename.endswith('.jpg') else path
+        signed_policy = self.get_signed_policy(resource, expires_at)
+        qs = urllib.parse.urlencode(
+            [
+                ('Policy', signed_policy['CloudFront-Policy']),
+                ('Signature', signed_policy['CloudFront-Signature']),
+                ('Key-Pair-Id', signed_policy['CloudFront-Key-Pair-Id']),
+            ]
+        )
+        return f'https://{self.domain}/{path}?{qs}'
+
+    def generate_presigned_cookies(self, path, expires_at=None):
+        # https://gist.github.com/mjohnsullivan/31064b04707923f82484c54981e4749e
+        expires_at = expires_at or self.get_expires_at()
+        return {'ExpiresAt': expires_at.to_iso8601_string(), **self.get_signed_policy(path, expires_at)}
+
+    def sign_url(self, path, methods, expires_at):
         qs = urllib.parse.urlencode([('Method', m) for m in methods])
         url = f'https://{self.domain}/{path}?{qs}'
         return self.get_cloudfront_signer().generate_presigned_url(url, date_less_than=expires_at)
 
-    def generate_presigned_cookies(self, path, expires_at=None):
-        # https://gist.github.com/mjohnsullivan/31064b04707923f82484c54981e4749e
-        expires_at = expires_at or pendulum.now('utc') + self.lifetime
+    def sign_policy(self, path, expires_at):
         url = self.generate_unsigned_url(path)
         policy = self.generate_cookie_policy(url, expires_at)
-        signature = self.get_private_key().sign(policy, PKCS1v15(), SHA1())
+        signature = self.sign(policy)
         return {
-            'ExpiresAt': expires_at.to_iso8601_string(),
             'CloudFront-Policy': self._encode(policy),
             'CloudFront-Signature': self._encode(signature),
             'CloudFront-Key-Pair-Id': self.get_key_pair()['keyId'],
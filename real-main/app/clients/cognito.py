@@ -3,11 +3,7 @@ import logging
 import os
 from uuid import uuid4
 
-import boto3
-from cryptography.hazmat import backends
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives.hashes import SHA1
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from . import transport
 
 COGNITO_USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
 COGNITO_BACKEND_CLIENT_ID = os.environ.get('COGNITO_USER_POOL_BACKEND_CLIENT_ID')
@@ -27,11 +23,11 @@ class CognitoClient:
         assert client_id, "Cognito user pool client id is required"
         self.user_pool_id = user_pool_id
         self.client_id = client_id
-        self.user_pool_client = boto3.client('cognito-idp')
-        self.identity_pool_client = boto3.client('cognito-identity')
+        self.user_pool_client = transport.get_boto3_client('cognito-idp')
+        self.identity_pool_client = transport.get_boto3_client('cognito-identity')
         self.real_key_pair_getter = real_key_pair_getter
 
-        aws_region = boto3.Session().region_name
+        aws_region = transport.get_boto3_session().region_name
         self.userPoolLoginsKey = f'cognito-idp.{aws_region}.amazonaws.com/{user_pool_id}'
         self.googleLoginsKey = 'accounts.google.com'
         self.facebookLoginsKey = 'graph.facebook.com'
@@ -39,6 +35,9 @@ class CognitoClient:
 
     def get_private_key(self):
         if not hasattr(self, '_private_key'):
+            from cryptography.hazmat import backends
+            from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
             private_key = self.real_key_pair_getter()['privateKey']
 
             # the private key format requires newlines after the header and before the footer
@@ -87,6 +86,9 @@ class CognitoClient:
         return resp['AuthenticationResult']
 
     def set_user_password(self, user_id, encrypted_password):
+        from cryptography.hazmat.primitives.asymmetric import padding
+        from cryptography.hazmat.primitives.hashes import SHA1
+
         private_key = self.get_private_key()
         try:
             password = private_key.decrypt(
@@ -3,10 +3,17 @@ import json
 import logging
 import os
 import re
+import threading
+import time
 
-import boto3
+from . import transport
 
 DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+# times to retry the keys a batch get leaves unprocessed, and the seconds to wait before the first retry,
+# doubled for each retry after that
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_RETRY_DELAY = 0.05
 logger = logging.getLogger()
 
 
@@ -18,17 +25,23 @@ class DynamoClient:
         """
         assert table_name, "Table name is required"
         self.table_name = table_name
+        self.thread_local = threading.local()
 
-        boto3_resource = boto3.resource('dynamodb')
-        self.table = (
-            boto3_resource.create_table(TableName=table_name, **create_table_schema)
-            if create_table_schema
-            else boto3_resource.Table(table_name)
-        )
+        if create_table_schema:
+            self.thread_local.table = transport.get_boto3_resource('dynamodb').create_table(
+                TableName=table_name, **create_table_schema
+            )
 
-        self.boto3_client = boto3.client('dynamodb')
+        self.boto3_client = transport.get_boto3_client('dynamodb')
         self.exceptions = self.boto3_client.exceptions
 
+    @property
+    def table(self):
+        "The boto3 Table resource, one per thread as boto3 resources aren't safe to share between threads"
+        if not hasattr(self.thread_local, 'table'):
+            self.thread_local.table = transport.get_boto3_resource('dynamodb').Table(self.table_name)
+        return self.thread_local.table
+
     def add_item(self, query_kwargs):
         "Put an item and return what was putted"
         # ensure query fails if the item already exists
@@ -53,14 +66,27 @@ class DynamoClient:
         Both the input `typed_keys` and the return value should/will be in
         verbose format, with types.
         Order *not* maintained.
+        Keys that dynamo leaves unprocessed, such as when throttled, are retried with backoff.
         """
         assert len(typed_keys) <= 100, "Max 100 items per batch get request"
         if len(typed_keys) == 0:
             return []
-        kwargs = {'RequestItems': {self.table_name: {'Keys': typed_keys}}}
+        request_items = {self.table_name: {'Keys': typed_keys}}
         if projection_expression:
-            kwargs['RequestItems'][self.table_name]['ProjectionExpression'] = projection_expression
-        return self.boto3_client.batch_get_item(**kwargs)['Responses'][self.table_name]
+            request_items[self.table_name]['ProjectionExpression'] = projection_expression
+        items = []
+        for retry in range(BATCH_GET_MAX_RETRIES + 1):
+            if retry:
+                time.sleep(BATCH_GET_RETRY_DELAY * 2 ** (retry - 1))
+            resp = self.boto3_client.batch_get_item(RequestItems=request_items)
+            items.extend(resp['Responses'].get(self.table_name, []))
+            request_items = resp.get('UnprocessedKeys')
+            if not request_items:
+                return items
+        unprocessed_cnt = len(request_items[self.table_name]['Keys'])
+        raise Exception(
+            f'Batch get left {unprocessed_cnt} keys unprocessed after {BATCH_GET_MAX_RETRIES} retries'
+        )
 
     def update_item(self, query_kwargs, failure_warning=None):
         """
@@ -169,6 +195,19 @@ class DynamoClient:
             'nextToken': self.encode_pagination_token(last_key) if last_key else None,
         }
 
+    def scan(self, scan_kwargs, limit=None, next_token=None):
+        "Scan the table and return items & pagination token from the result"
+        if limit:
+            scan_kwargs['Limit'] = limit
+        if next_token:
+            scan_kwargs['ExclusiveStartKey'] = self.decode_pagination_token(next_token)
+        resp = self.table.scan(**scan_kwargs)
+        last_key = resp.get('LastEvaluatedKey')
+        return {
+            'items': resp['Items'],
+            'nextToken': self.encode_pagination_token(last_key) if last_key else None,
+        }
+
     def query_head(self, query_kwargs):
         "Query the table and return the first item or None. Does not play well with Filters"
         # Note that supporting a filter expression is possible, but requires a separate codepath
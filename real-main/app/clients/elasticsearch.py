@@ -1,10 +1,10 @@
+import base64
 import json
 import logging
 import os
+import time
 
-import boto3
-import requests
-import requests_aws4auth
+from . import transport
 
 logger = logging.getLogger()
 
@@ -15,115 +15,186 @@ class ElasticSearchClient:
 
     service = 'es'
     headers = {'Content-Type': 'application/json'}
+    bulk_headers = {'Content-Type': 'application/x-ndjson'}
+
+    # max size of the body of a single _bulk request, well under the smallest limit AWS ES domains impose
+    max_bulk_request_bytes = 5 * 1024 * 1024
+
+    # times to retry the actions of a _bulk request that fail with a retryable status, and the seconds to wait
+    # before the first retry, doubled for each retry after that
+    bulk_max_retries = 5
+    bulk_retry_delay = 0.1
 
     def __init__(self, domain=ELASTICSEARCH_DOMAIN):
         assert domain, '`domain` is required'
         self.domain = domain
+        # ndjson lines of actions queued up for the next _bulk request(s)
+        self.pending_bulk_actions = []
 
     @property
     def awsauth(self):
-        if not hasattr(self, '_awsauth'):
-            session = boto3.Session()
-            credentials = session.get_credentials().get_frozen_credentials()
-            self._awsauth = requests_aws4auth.AWS4Auth(
-                credentials.access_key,
-                credentials.secret_key,
-                session.region_name,
-                self.service,
-                session_token=credentials.token,
-            )
-        return self._awsauth
+        return transport.get_aws_auth(self.service)
 
-    def query_users(self, query):
-        "`query` should be dict-like structure that can be serialized to json"
-        url = f'https://{self.domain}/users/_search'
-        resp = requests.get(url, auth=self.awsauth, json={'query': query}, headers=self.headers)
-        if resp.status_code != 200:
-            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying users')
-        return resp.json()
-
-    def query_posts(self, query):
-        "`query` should be dict-like structure that can be serialized to json"
-        url = f'https://{self.domain}/posts/_search'
-        resp = requests.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
-        if resp.status_code != 200:
-            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying posts')
-        return resp.json()
+    @property
+    def session(self):
+        return transport.get_session()
 
     def query_keywords(self, query):
         "`query` should be dict-like structure that can be serialized to json"
         url = f'https://{self.domain}/keywords/_search'
-        resp = requests.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
+        resp = self.session.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
         if resp.status_code != 200:
             logging.warning(
                 f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying keywords'
             )
         return resp.json()
 
-    def build_user_url(self, user_id):
-        return f'https://{self.domain}/users/_doc/{user_id}'
+    def search(self, index, body):
+        "`body` should be dict-like structure that can be serialized to json"
+        url = f'https://{self.domain}/{index}/_search'
+        resp = self.session.post(url, auth=self.awsauth, json=body, headers=self.headers)
+        if resp.status_code != 200:
+            logging.warning(
+                f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying {index}'
+            )
+        return resp.json()
+
+    def encode_pagination_token(self, sort_values):
+        "From the sort values of the last hit of a page to a obfucated string"
+        return base64.b64encode(json.dumps(sort_values).encode('ascii')).decode('utf-8')
+
+    def decode_pagination_token(self, token):
+        "From a obfucated string to the sort values to search after"
+        return json.loads(base64.b64decode(token.encode('ascii')).decode('utf-8'))
+
+    def paginated_search(self, index, query, tiebreaker, limit, next_token=None):
+        """
+        Search `index` one page at a time, ordered by relevance with the `tiebreaker` field to keep the order
+        stable. Returns the hits of the page & a token for the next page, if there is one.
+
+        Pages after the first are found with search_after, so deep pages are as cheap as the first.
+        Tokens that are plain offsets, as handed out before, are still accepted.
+        """
+        body = {
+            # one extra hit to find out if there is a next page
+            'size': limit + 1,
+            'query': query,
+            'sort': [{'_score': 'desc'}, {tiebreaker: 'asc'}],
+        }
+        if next_token and str(next_token).isdigit():
+            body['from'] = int(next_token)
+        elif next_token:
+            body['search_after'] = self.decode_pagination_token(next_token)
+        hits = self.search(index, body)['hits']['hits']
+        return {
+            'hits': hits[:limit],
+            'nextToken': self.encode_pagination_token(hits[limit - 1]['sort']) if len(hits) > limit else None,
+        }
 
     def build_user_doc(self, user_id, username, full_name):
         doc = {'userId': user_id, 'username': username, 'fullName': full_name}
         return {k: v for k, v in doc.items() if v is not None}
 
-    def build_post_url(self, post_id):
-        return f'https://{self.domain}/posts/_doc/{post_id}'
-
     def build_post_doc(self, post_id, keywords):
         doc = {'postId': post_id, 'keywords': ' '.join(keywords)}
         return {k: v for k, v in doc.items() if v is not None}
 
-    def build_keyword_url(self, post_id, keyword):
-        return f'https://{self.domain}/keywords/_doc/{post_id}-{keyword}'
-
     def build_keyword_doc(self, keyword):
         doc = {'keyword': keyword}
         return {k: v for k, v in doc.items() if v is not None}
 
-    def put_user(self, user_id, username, full_name):
-        doc = self.build_user_doc(user_id, username, full_name)
-        url = self.build_user_url(user_id)
-        logging.info(f'ElasticSearch: Putting user to index at `{url}` ' + json.dumps(doc))
-        resp = requests.put(url, auth=self.awsauth, json=doc, headers=self.headers)
-        if resp.status_code // 100 != 2:
-            logging.warning(f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding user')
-
-    def delete_user(self, user_id):
-        url = self.build_user_url(user_id)
-        logging.info(f'ElasticSearch: Deleting user from index at `{url}`')
-        resp = requests.delete(url, auth=self.awsauth)
-        if resp.status_code != 200:
-            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting user')
-
-    def put_post(self, post_id, keywords):
-        doc = self.build_post_doc(post_id, keywords)
-        url = self.build_post_url(post_id)
-        logging.info(f'ElasticSearch: Putting post to index at `{url}` ' + json.dumps(doc))
-        resp = requests.put(url, auth=self.awsauth, json=doc, headers=self.headers)
-        if resp.status_code // 100 != 2:
-            logging.warning(f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding post')
-
-    def delete_post(self, post_id):
-        url = self.build_post_url(post_id)
-        logging.info(f'ElasticSearch: Deleting post from index at `{url}`')
-        resp = requests.delete(url, auth=self.awsauth)
-        if resp.status_code != 200:
-            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting post')
-
-    def put_keyword(self, post_id, keyword):
-        doc = self.build_keyword_doc(keyword)
-        url = self.build_keyword_url(post_id, keyword)
-        logging.info(f'ElasticSearch: Putting keyword to index at `{url}` ' + json.dumps(doc))
-        resp = requests.put(url, auth=self.awsauth, json=doc, headers=self.headers)
-        if resp.status_code // 100 != 2:
-            logging.warning(f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding keyword')
-
-    def delete_keyword(self, post_id, keyword):
-        url = self.build_keyword_url(post_id, keyword)
-        logging.info(f'ElasticSearch: Deleting keyword from index at `{url}`')
-        resp = requests.delete(url, auth=self.awsauth)
+    def build_bulk_action(self, action, index, doc_id, doc=None):
+        lines = [json.dumps({action: {'_index': index, '_id': doc_id}})]
+        if doc is not None:
+            lines.append(json.dumps(doc))
+        return ''.join(f'{line}\n' for line in lines)
+
+    def queue_bulk_action(self, action, index, doc_id, doc=None):
+        "Queue up an action to be sent in a _bulk request on the next flush"
+        self.pending_bulk_actions.append(self.build_bulk_action(action, index, doc_id, doc=doc))
+
+    def queue_put_user(self, user_id, username, full_name):
+        self.queue_bulk_action('index', 'users', user_id, self.build_user_doc(user_id, username, full_name))
+
+    def queue_delete_user(self, user_id):
+        self.queue_bulk_action('delete', 'users', user_id)
+
+    def queue_put_post(self, post_id, keywords):
+        self.queue_bulk_action('index', 'posts', post_id, self.build_post_doc(post_id, keywords))
+
+    def queue_delete_post(self, post_id):
+        self.queue_bulk_action('delete', 'posts', post_id)
+
+    def queue_put_keyword(self, post_id, keyword):
+        self.queue_bulk_action('index', 'keywords', f'{post_id}-{keyword}', self.build_keyword_doc(keyword))
+
+    def queue_delete_keyword(self, post_id, keyword):
+        self.queue_bulk_action('delete', 'keywords', f'{post_id}-{keyword}')
+
+    def flush(self):
+        """
+        Send all queued actions, in as few _bulk requests as the size limit allows.
+        Returns a list of (action, error) tuples for the actions that failed.
+        """
+        actions, self.pending_bulk_actions = self.pending_bulk_actions, []
+        failed = []
+        chunk, chunk_bytes = [], 0
+        for action in actions:
+            action_bytes = len(action.encode())
+            if chunk and chunk_bytes + action_bytes > self.max_bulk_request_bytes:
+                failed.extend(self.send_bulk(chunk))
+                chunk, chunk_bytes = [], 0
+            chunk.append(action)
+            chunk_bytes += action_bytes
+        if chunk:
+            failed.extend(self.send_bulk(chunk))
+        return failed
+
+    def send_bulk(self, actions):
+        """
+        Send one _bulk request, retrying the actions that fail with a retryable status (429 or 5XX).
+        Returns a list of (action, error) tuples for the actions that failed.
+        """
+        failed = []
+        for retry in range(self.bulk_max_retries + 1):
+            if retry:
+                time.sleep(self.bulk_retry_delay * 2 ** (retry - 1))
+            retryable = []
+            for action, status, error in self.post_bulk(actions):
+                (retryable if self.is_retryable(status) else failed).append((action, error))
+            actions = [action for action, _ in retryable]
+            if not actions:
+                return failed
+        logging.error(
+            f'ElasticSearch: Giving up on {len(retryable)} actions after {self.bulk_max_retries} retries'
+        )
+        return failed + retryable
+
+    @staticmethod
+    def is_retryable(status):
+        "Is an action that failed with `status` worth retrying? A status of None means no response was received"
+        return status is None or status == 429 or status // 100 == 5
+
+    def post_bulk(self, actions):
+        "Post one _bulk request. Returns a list of (action, status, error) tuples for the actions that failed."
+        url = f'https://{self.domain}/_bulk'
+        body = ''.join(actions)
+        logging.info(f'ElasticSearch: Sending {len(actions)} actions to `{url}`')
+        try:
+            resp = self.session.post(url, auth=self.awsauth, data=body.encode(), headers=self.bulk_headers)
+        except Exception as err:
+            logging.warning(f'ElasticSearch: Failed to send bulk request: {err}')
+            return [(action, None, err) for action in actions]
         if resp.status_code != 200:
-            logging.warning(
-                f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting keyword'
-            )
+            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when sending bulk')
+            return [(action, resp.status_code, resp.status_code) for action in actions]
+        failed = []
+        for action, item in zip(actions, resp.json()['items']):
+            ((action_name, result),) = item.items()
+            # deleting something that is already gone is not a failure
+            if result['status'] // 100 == 2 or (action_name == 'delete' and result['status'] == 404):
+                continue
+            error = result.get('error', result['status'])
+            logging.warning(f'ElasticSearch: Failed to {action_name} `{result.get("_id")}`: {error}')
+            failed.append((action, result['status'], error))
+        return failed
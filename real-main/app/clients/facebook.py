@@ -1,4 +1,4 @@
-import requests
+from . import transport
 
 
 class FacebookClient:
@@ -15,7 +15,7 @@ class FacebookClient:
             'fields': 'email',
             'access_token': access_token,
         }
-        resp = requests.get(url=url, params=params)
+        resp = transport.get_session().get(url=url, params=params)
         if resp.status_code != 200:
             raise ValueError(f'Facebook server response status code is non-200: `{resp.status_code}`')
         email = resp.json().get('email')
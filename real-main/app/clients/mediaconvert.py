@@ -1,6 +1,6 @@
 import os
 
-import boto3
+from . import transport
 
 AWS_ACCOUNT_ID = os.environ.get('AWS_ACCOUNT_ID')
 MEDIACONVERT_ROLE_ARN = os.environ.get('MEDIACONVERT_ROLE_ARN')
@@ -22,7 +22,7 @@ class MediaConvertClient:
         assert uploads_bucket, "S3 uploads bucket name is required"
         self.role_arn = role_arn
         self.uploads_bucket = uploads_bucket
-        aws_region = boto3.Session().region_name
+        aws_region = transport.get_boto3_session().region_name
         self.job_template_arn = (
             f'arn:aws:mediaconvert:{aws_region}:{aws_account_id}:jobTemplates/{self.job_template}'
         )
@@ -32,11 +32,11 @@ class MediaConvertClient:
     def boto_client(self):
         if not hasattr(self, '_boto_client'):
             self.endpoint = self.endpoint or self.get_endpoint()
-            self._boto_client = boto3.client('mediaconvert', endpoint_url=self.endpoint)
+            self._boto_client = transport.get_boto3_client('mediaconvert', endpoint_url=self.endpoint)
         return self._boto_client
 
     def get_endpoint(self):
-        resp = boto3.client('mediaconvert').describe_endpoints(MaxResults=1)
+        resp = transport.get_boto3_client('mediaconvert').describe_endpoints(MaxResults=1)
         try:
             return resp['Endpoints'][0]['Url']
         except Exception as err:
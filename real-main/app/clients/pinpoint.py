@@ -2,7 +2,7 @@ import logging
 import os
 import uuid
 
-import boto3
+from . import transport
 
 PINPOINT_APPLICATION_ID = os.environ.get('PINPOINT_APPLICATION_ID')
 
@@ -12,7 +12,7 @@ logger = logging.getLogger()
 class PinpointClient:
     def __init__(self, app_id=PINPOINT_APPLICATION_ID):
         self.app_id = app_id
-        self.client = boto3.client('pinpoint')
+        self.client = transport.get_boto3_client('pinpoint')
 
     def send_user_apns(self, user_id, url, title, body=None):
         "Returns a bool representing if the APNS was successfully sent"
@@ -1,9 +1,14 @@
-import requests
+from . import transport
+
+# seconds to wait to connect to, and then for a response from, the post verification service
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 15
 
 
 class PostVerificationClient:
-    def __init__(self, api_creds_getter):
+    def __init__(self, api_creds_getter, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
         self.api_creds_getter = api_creds_getter
+        self.timeout = timeout
 
     @property
     def api_creds(self):
@@ -26,8 +31,8 @@ class PostVerificationClient:
         if taken_in_real:
             data['metadata']['takenInReal'] = taken_in_real
 
-        # synchronous for now. Note this generally runs in an async env already: an s3-object-created handler
-        resp = requests.post(api_url, headers=headers, json=data)
+        # Note this generally runs in an async env already: an s3-object-created handler
+        resp = transport.get_session().post(api_url, headers=headers, json=data, timeout=self.timeout)
         if resp.status_code != 200:
             raise Exception(f'Post verification service error `{resp.status_code}` with body `{resp.text}`')
         try:
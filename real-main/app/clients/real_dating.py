@@ -2,10 +2,10 @@ import json
 import logging
 import os
 
-import boto3
-
 from app.utils import DecimalJsonEncoder
 
+from . import transport
+
 logger = logging.getLogger()
 
 PUT_USER_ARN = os.environ.get('REAL_DATING_PUT_USER_ARN')
@@ -24,7 +24,7 @@ class RealDatingClient:
         swiped_right_users_arn=SWIPED_RIGHT_USERS_ARN,
         get_user_matches_count_arn=GET_USER_MATCHES_COUNT_ARN,
     ):
-        self.boto3_client = boto3.client('lambda')
+        self.boto3_client = transport.get_boto3_client('lambda')
         self.put_user_arn = put_user_arn
         self.remove_user_arn = remove_user_arn
         self.match_status_arn = match_status_arn
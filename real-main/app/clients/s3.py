@@ -1,6 +1,7 @@
-import boto3
 import botocore
 
+from . import transport
+
 
 class S3Client:
     def __init__(self, bucket_name, create_bucket=False):
@@ -8,17 +9,16 @@ class S3Client:
         The create_bucket kwarg is intended for use with moto in the test suite.
         """
         assert bucket_name, "Bucket name is required"
-        self.boto_client = boto3.client('s3')
+        # all calls go through the client, as unlike the s3 resource it is safe to share between threads
+        self.boto_client = transport.get_boto3_client('s3')
         self.bucket_name = bucket_name
-        self.s3 = boto3.resource('s3')
-        self.bucket = self.s3.Bucket(bucket_name)
         self.exceptions = self.boto_client.exceptions
 
         if create_bucket:
-            self.s3.create_bucket(Bucket=bucket_name)
+            self.boto_client.create_bucket(Bucket=bucket_name)
 
     def get_object_data_stream(self, path):
-        return self.bucket.Object(path).get()['Body']
+        return self.boto_client.get_object(Bucket=self.bucket_name, Key=path)['Body']
 
     def get_object_checksum(self, path):
         resp = self.boto_client.head_object(Bucket=self.bucket_name, Key=path)
@@ -35,28 +35,32 @@ class S3Client:
         return [cp['Prefix'] for cp in resp.get('CommonPrefixes', [])]
 
     def delete_object(self, path):
-        self.bucket.Object(path).delete()
+        self.boto_client.delete_object(Bucket=self.bucket_name, Key=path)
 
     def delete_objects(self, paths):
         "Delete mutliple objects in one call to S3"
         kwargs = {'Delete': {'Objects': [{'Key': p} for p in paths]}}
-        self.bucket.delete_objects(**kwargs)
+        self.boto_client.delete_objects(Bucket=self.bucket_name, **kwargs)
 
     def delete_objects_with_prefix(self, path_prefix):
-        "Delete mutliple objects with the same prefix in one call to S3"
-        self.bucket.objects.filter(Prefix=path_prefix).delete()
+        "Delete mutliple objects with the same prefix in one call to S3 per page of up to 1000 of them"
+        paginator = self.boto_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=path_prefix):
+            if page.get('Contents'):
+                self.delete_objects([obj['Key'] for obj in page['Contents']])
 
     def copy_object(self, old_path, new_path):
-        new_obj = self.bucket.Object(new_path)
-        new_obj.copy({'Bucket': self.bucket.name, 'Key': old_path})
+        "Copy an object of up to 5GB, in one request"
+        copy_source = {'Bucket': self.bucket_name, 'Key': old_path}
+        self.boto_client.copy_object(Bucket=self.bucket_name, Key=new_path, CopySource=copy_source)
 
     def put_object(self, path, body, content_type):
-        self.bucket.put_object(Key=path, Body=body, ContentType=content_type)
+        self.boto_client.put_object(Bucket=self.bucket_name, Key=path, Body=body, ContentType=content_type)
 
     def exists(self, path):
         # https://stackoverflow.com/a/33843019
         try:
-            self.s3.Object(self.bucket_name, path).load()
+            self.boto_client.head_object(Bucket=self.bucket_name, Key=path)
         except botocore.exceptions.ClientError as err:
             if err.response['Error']['Code'] == "404":
                 return False
@@ -1,7 +1,8 @@
+import concurrent.futures
 import json
 import os
 
-import boto3
+from . import transport
 
 CLOUDFRONT_KEY_PAIR_NAME = os.environ.get('SECRETSMANAGER_CLOUDFRONT_KEY_PAIR_NAME')
 POST_VERIFICATION_API_CREDS_NAME = os.environ.get('SECRETSMANAGER_POST_VERIFICATION_API_CREDS_NAME')
@@ -11,6 +12,16 @@ REAL_KEY_PAIR_NAME = os.environ.get('SECRETSMANAGER_REAL_KEY_PAIR_NAME')
 
 
 class SecretsManagerClient:
+
+    # each secret's getter, and the attribute holding the name of the secret it fetches
+    getter_secret_names = {
+        'get_cloudfront_key_pair': 'cloudfront_key_pair_name',
+        'get_post_verification_api_creds': 'post_verification_api_creds_name',
+        'get_google_client_ids': 'google_client_ids_name',
+        'get_apple_appstore_params': 'apple_appstore_params_name',
+        'get_real_key_pair': 'real_key_pair_name',
+    }
+
     def __init__(
         self,
         cloudfront_key_pair_name=CLOUDFRONT_KEY_PAIR_NAME,
@@ -19,7 +30,7 @@ class SecretsManagerClient:
         apple_appstore_params_name=APPLE_APPSTORE_PARAMS_NAME,
         real_key_pair_name=REAL_KEY_PAIR_NAME,
     ):
-        self.boto_client = boto3.client('secretsmanager')
+        self.boto_client = transport.get_boto3_client('secretsmanager')
         self.exceptions = self.boto_client.exceptions
         self.cloudfront_key_pair_name = cloudfront_key_pair_name
         self.post_verification_api_creds_name = post_verification_api_creds_name
@@ -56,3 +67,21 @@ class SecretsManagerClient:
             resp = self.boto_client.get_secret_value(SecretId=self.real_key_pair_name)
             self._real_key_pair = json.loads(resp['SecretString'])
         return self._real_key_pair
+
+    def prefetch(self, getter_names=None):
+        """
+        Fetch and cache the secrets of the given getters concurrently, so they all cost one round trip.
+        Defaults to every secret that has a name configured. A secret that can't be fetched doesn't stop
+        the others. Returns a dict of getter name to the error it raised, for those that failed.
+        """
+        if getter_names is None:
+            getter_names = [
+                getter_name
+                for getter_name, name_attr in self.getter_secret_names.items()
+                if getattr(self, name_attr)
+            ]
+        if not getter_names:
+            return {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(getter_names)) as executor:
+            futures = {getter_name: executor.submit(getattr(self, getter_name)) for getter_name in getter_names}
+        return {getter_name: future.exception() for getter_name, future in futures.items() if future.exception()}
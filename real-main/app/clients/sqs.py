@@ -0,0 +1,41 @@
+import json
+import logging
+import os
+import uuid
+
+from app.utils import DecimalJsonEncoder
+
+from . import transport
+
+SQS_FAN_OUT_QUEUE_URL = os.environ.get('SQS_FAN_OUT_QUEUE_URL')
+
+logger = logging.getLogger()
+
+
+class SQSClient:
+    def __init__(self, queue_url=SQS_FAN_OUT_QUEUE_URL, create_queue_name=None):
+        """
+        The create_queue_name kwarg is intended for use with moto in the test suite.
+        Names ending in `.fifo` create FIFO queues.
+        """
+        self.boto3_client = transport.get_boto3_client('sqs')
+        if create_queue_name:
+            attributes = {'FifoQueue': 'true'} if create_queue_name.endswith('.fifo') else {}
+            resp = self.boto3_client.create_queue(QueueName=create_queue_name, Attributes=attributes)
+            queue_url = resp['QueueUrl']
+        assert queue_url, "Queue url is required"
+        self.queue_url = queue_url
+
+    def send_message(self, body, group_id=None, deduplication_id=None):
+        """
+        Send a json-serializable `body` as a message to the queue.
+        For FIFO queues, `group_id` is required: messages in the same group are delivered in order.
+        A message with the same `deduplication_id` as one sent in the last five minutes is dropped. If
+        not set, every message is distinct, even if its body is the same as that of a recent one.
+        """
+        kwargs = {}
+        if group_id:
+            kwargs = {'MessageGroupId': group_id, 'MessageDeduplicationId': deduplication_id or str(uuid.uuid4())}
+        self.boto3_client.send_message(
+            QueueUrl=self.queue_url, MessageBody=json.dumps(body, cls=DecimalJsonEncoder), **kwargs
+        )
@@ -0,0 +1,162 @@
+"""
+HTTP plumbing shared by the clients.
+
+All requests go through a single long-lived session so that connections (and their TLS handshakes) are
+reused across calls and across invocations of a warm lambda container. Requests to AWS services are
+signed with SigV4 signers that are cached per service and rebuilt only when the credentials change.
+
+Likewise boto3 clients come from a process-wide registry, so that each is built (and opens its connection
+pool) once per container rather than once per wrapper or model. boto3 resources aren't safe to share between
+threads, so they're instead kept once per thread.
+"""
+import logging
+import threading
+
+import boto3
+import botocore.config
+import requests
+import requests.adapters
+import requests_aws4auth
+
+logger = logging.getLogger()
+
+# max number of hosts that connection pools are kept for
+POOL_CONNECTIONS = 20
+
+# max number of connections kept alive to any one host. Should be at least the number of threads
+# that may be making requests to the same host at once.
+POOL_MAXSIZE = 10
+
+# max number of connections each boto3 client keeps alive, ie the number of threads that
+# can be making calls through it at once without waiting on the pool. botocore's default is 10.
+BOTO3_MAX_POOL_CONNECTIONS = 25
+
+
+class _Registry:
+    "The shared objects handed out by this module, held on one object so they can be replaced in place"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.session = None
+        self.aws_auths = {}
+        self.boto3_session = None
+        self.boto3_objects = {}
+        # the boto3 resources of each thread, in its `resources` attribute
+        self.boto3_thread_local = threading.local()
+
+
+_registry = _Registry()
+
+
+def get_session():
+    "Return the shared requests session"
+    if _registry.session is None:
+        with _registry.lock:
+            if _registry.session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _registry.session = session
+    return _registry.session
+
+
+def get_aws_auth(service):
+    "Return the shared SigV4 signer for requests to `service`"
+    if service not in _registry.aws_auths:
+        with _registry.lock:
+            if service not in _registry.aws_auths:
+                _registry.aws_auths[service] = RefreshableAWS4Auth(service)
+    return _registry.aws_auths[service]
+
+
+def get_boto3_session():
+    "Return the shared boto3 session"
+    if _registry.boto3_session is None:
+        with _registry.lock:
+            if _registry.boto3_session is None:
+                _registry.boto3_session = boto3.session.Session()
+    return _registry.boto3_session
+
+
+def get_boto3_client(
+    service, region_name=None, endpoint_url=None, max_pool_connections=BOTO3_MAX_POOL_CONNECTIONS
+):
+    "Return the shared boto3 client for `service`"
+    return _get_boto3_object('client', service, region_name, endpoint_url, max_pool_connections)
+
+
+def get_boto3_resource(
+    service, region_name=None, endpoint_url=None, max_pool_connections=BOTO3_MAX_POOL_CONNECTIONS
+):
+    """
+    Return the boto3 resource for `service` of the current thread. Its client is available as
+    `resource.meta.client`, and is likewise only to be used from the current thread.
+    """
+    return _get_boto3_object('resource', service, region_name, endpoint_url, max_pool_connections)
+
+
+def clear_boto3_registry():
+    "Forget all shared boto3 objects, so that they're rebuilt on next use"
+    with _registry.lock:
+        _registry.boto3_session = None
+        _registry.boto3_objects.clear()
+        _registry.boto3_thread_local = threading.local()
+
+
+def _get_boto3_object(kind, service, region_name, endpoint_url, max_pool_connections):
+    session = get_boto3_session()
+    region_name = region_name or session.region_name
+    key = (kind, service, region_name, endpoint_url, max_pool_connections)
+    if kind == 'client':
+        objects = _registry.boto3_objects
+    else:
+        thread_local = _registry.boto3_thread_local
+        if not hasattr(thread_local, 'resources'):
+            thread_local.resources = {}
+        objects = thread_local.resources
+    if key not in objects:
+        # building clients from one session isn't thread safe
+        with _registry.lock:
+            if key not in objects:
+                config = botocore.config.Config(max_pool_connections=max_pool_connections)
+                factory = session.client if kind == 'client' else session.resource
+                objects[key] = factory(service, region_name=region_name, endpoint_url=endpoint_url, config=config)
+    return objects[key]
+
+
+class RefreshableAWS4Auth(requests.auth.AuthBase):
+    """
+    Signs requests to an AWS service with SigV4.
+
+    The boto3 credentials are checked on each request, which is cheap unless they are due for refresh,
+    and the underlying signer (along with its signing key) is rebuilt only when they have changed.
+    """
+
+    def __init__(self, service, boto3_session=None):
+        self.service = service
+        self.boto3_session = boto3_session
+        self.lock = threading.Lock()
+        self.frozen_credentials = None
+        self.signer = None
+
+    def __call__(self, request):
+        return self.get_signer()(request)
+
+    def get_signer(self):
+        with self.lock:
+            if self.boto3_session is None:
+                self.boto3_session = get_boto3_session()
+            credentials = self.boto3_session.get_credentials().get_frozen_credentials()
+            if credentials != self.frozen_credentials:
+                self.signer = requests_aws4auth.AWS4Auth(
+                    credentials.access_key,
+                    credentials.secret_key,
+                    self.boto3_session.region_name,
+                    self.service,
+                    session_token=credentials.token,
+                )
+                self.frozen_credentials = credentials
+            return self.signer
@@ -2,25 +2,31 @@ import logging
 
 import pendulum
 
-from app import clients, models
+from app import clients as app_clients
+from app import models
 from app.logging import LogLevelContext, handler_logging
+from app.utils import LazyProxy
 
 from . import xray
 
 logger = logging.getLogger()
 xray.patch_all()
 
+# pylint: disable=unnecessary-lambda
 clients = {
-    'appsync': clients.AppSyncClient(),
-    'dynamo': clients.DynamoClient(),
-    'cognito': clients.CognitoClient(),
-    'pinpoint': clients.PinpointClient(),
+    'appsync': LazyProxy(lambda: app_clients.AppSyncClient()),
+    'dynamo': LazyProxy(lambda: app_clients.DynamoClient()),
+    'cognito': LazyProxy(lambda: app_clients.CognitoClient()),
+    'pinpoint': LazyProxy(lambda: app_clients.PinpointClient()),
 }
+# pylint: enable=unnecessary-lambda
 
 managers = {}
-chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
-chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
-user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+chat_manager = LazyProxy(lambda: managers.get('chat') or models.ChatManager(clients, managers=managers))
+chat_message_manager = LazyProxy(
+    lambda: managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
+)
+user_manager = LazyProxy(lambda: managers.get('user') or models.UserManager(clients, managers=managers))
 
 
 @handler_logging(event_to_extras=lambda event: {'event': event})
@@ -3,7 +3,8 @@ import os
 
 import pendulum
 
-from app import clients, models
+from app import clients as app_clients
+from app import models
 from app.mixins.flag.enums import FlagStatus
 from app.mixins.flag.exceptions import FlagException
 from app.mixins.view.enums import ViewType
@@ -24,9 +25,9 @@ from app.models.post.enums import PostStatus, PostType
 from app.models.post.exceptions import PostException
 from app.models.user.enums import UserStatus
 from app.models.user.exceptions import UserException
-from app.utils import image_size
+from app.utils import LazyProxy, image_size
 
-from .. import xray
+from .. import warm_up, xray
 from . import routes
 from .exceptions import ClientException
 from .validation import (
@@ -39,43 +40,73 @@ from .validation import (
     validate_match_location_radius,
 )
 
+DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 S3_PLACEHOLDER_PHOTOS_BUCKET = os.environ.get('S3_PLACEHOLDER_PHOTOS_BUCKET')
 
 logger = logging.getLogger()
 xray.patch_all()
 
-secrets_manager_client = clients.SecretsManagerClient()
+# pylint: disable=unnecessary-lambda
+secrets_manager_client = LazyProxy(lambda: app_clients.SecretsManagerClient())
 clients = {
-    'apple': clients.AppleClient(),
-    'appstore': clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params),
-    'appsync': clients.AppSyncClient(),
-    'cloudfront': clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair),
-    'cognito': clients.CognitoClient(real_key_pair_getter=secrets_manager_client.get_real_key_pair),
-    'dynamo': clients.DynamoClient(),
-    'elasticsearch': clients.ElasticSearchClient(),
-    'facebook': clients.FacebookClient(),
-    'google': clients.GoogleClient(secrets_manager_client.get_google_client_ids),
-    'pinpoint': clients.PinpointClient(),
-    'post_verification': clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
-    's3_placeholder_photos': clients.S3Client(S3_PLACEHOLDER_PHOTOS_BUCKET),
+    'apple': LazyProxy(lambda: app_clients.AppleClient()),
+    'appstore': LazyProxy(lambda: app_clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params)),
+    'appsync': LazyProxy(lambda: app_clients.AppSyncClient()),
+    'cloudfront': LazyProxy(lambda: app_clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair)),
+    'cognito': LazyProxy(
+        lambda: app_clients.CognitoClient(real_key_pair_getter=secrets_manager_client.get_real_key_pair)
+    ),
+    'dynamo': LazyProxy(lambda: app_clients.DynamoClient()),
+    'dynamo_feed': LazyProxy(lambda: app_clients.DynamoClient(table_name=DYNAMO_FEED_TABLE)),
+    'elasticsearch': LazyProxy(lambda: app_clients.ElasticSearchClient()),
+    'facebook': LazyProxy(lambda: app_clients.FacebookClient()),
+    'google': LazyProxy(lambda: app_clients.GoogleClient(secrets_manager_client.get_google_client_ids)),
+    'pinpoint': LazyProxy(lambda: app_clients.PinpointClient()),
+    'post_verification': LazyProxy(
+        lambda: app_clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds)
+    ),
+    'real_dating': LazyProxy(lambda: app_clients.RealDatingClient()),
+    's3_uploads': LazyProxy(lambda: app_clients.S3Client(S3_UPLOADS_BUCKET)),
+    's3_placeholder_photos': LazyProxy(lambda: app_clients.S3Client(S3_PLACEHOLDER_PHOTOS_BUCKET)),
+    'sqs_fan_out': LazyProxy(lambda: app_clients.SQSClient()),
 }
+# pylint: enable=unnecessary-lambda
+
+# fetch secrets and build signing keys during container init, rather than on the first request
+warm_up.warm_up(
+    secrets_manager_client,
+    [
+        'get_apple_appstore_params',
+        'get_cloudfront_key_pair',
+        'get_google_client_ids',
+        'get_post_verification_api_creds',
+        'get_real_key_pair',
+    ],
+    clients={'cloudfront': clients['cloudfront'], 'cognito': clients['cognito']},
+)
 
 # shared hash table of all managers, enables inter-manager communication
 managers = {}
-appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
-album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
-block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
-card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
-chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
-chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
-comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
-follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
-like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
-screen_manager = managers.get('screen') or models.ScreenManager(clients, managers=managers)
-user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+appstore_manager = LazyProxy(
+    lambda: managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
+)
+album_manager = LazyProxy(lambda: managers.get('album') or models.AlbumManager(clients, managers=managers))
+block_manager = LazyProxy(lambda: managers.get('block') or models.BlockManager(clients, managers=managers))
+card_manager = LazyProxy(lambda: managers.get('card') or models.CardManager(clients, managers=managers))
+chat_manager = LazyProxy(lambda: managers.get('chat') or models.ChatManager(clients, managers=managers))
+chat_message_manager = LazyProxy(
+    lambda: managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
+)
+comment_manager = LazyProxy(lambda: managers.get('comment') or models.CommentManager(clients, managers=managers))
+feed_manager = LazyProxy(lambda: managers.get('feed') or models.FeedManager(clients, managers=managers))
+follower_manager = LazyProxy(
+    lambda: managers.get('follower') or models.FollowerManager(clients, managers=managers)
+)
+like_manager = LazyProxy(lambda: managers.get('like') or models.LikeManager(clients, managers=managers))
+post_manager = LazyProxy(lambda: managers.get('post') or models.PostManager(clients, managers=managers))
+screen_manager = LazyProxy(lambda: managers.get('screen') or models.ScreenManager(clients, managers=managers))
+user_manager = LazyProxy(lambda: managers.get('user') or models.UserManager(clients, managers=managers))
 
 
 def validate_caller(*args, allowed_statuses=None):
@@ -566,6 +597,36 @@ def user_photo(caller_user_id, arguments, source=None, **kwargs):
     }
 
 
+@routes.register('User.feed')
+def user_feed(caller_user_id, arguments, source=None, **kwargs):
+    # feed is private to the user themselves
+    if caller_user_id != source['userId']:
+        return None
+
+    limit = arguments.get('limit')
+    limit = 20 if limit is None else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit cannot be less than 1 or greater than 100')
+    next_token = arguments.get('nextToken')
+
+    return feed_manager.get_feed(caller_user_id, limit=limit, next_token=next_token)
+
+
+@routes.register('User.feedEntries')
+def user_feed_entries(caller_user_id, arguments, source=None, **kwargs):
+    # feed is private to the user themselves
+    if caller_user_id != source['userId']:
+        return None
+
+    limit = arguments.get('limit')
+    limit = 20 if limit is None else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit cannot be less than 1 or greater than 100')
+    next_token = arguments.get('nextToken')
+
+    return feed_manager.get_feed_entries(caller_user_id, limit=limit, next_token=next_token)
+
+
 @routes.register('Mutation.followUser')
 @validate_caller
 @update_last_client
@@ -1525,6 +1586,23 @@ def find_contacts(caller_user, arguments, **kwargs):
     ]
 
 
+@routes.register('Query.searchUsers')
+@validate_caller
+def search_users(caller_user, arguments, **kwargs):
+    search_token = arguments['searchToken'].strip()
+    limit = arguments.get('limit')
+    # -1 asks for as many as are allowed
+    limit = 20 if limit is None else 100 if limit == -1 else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit must be between 1 and 100, or -1 for as many as are allowed')
+    next_token = arguments.get('nextToken')
+
+    if not search_token:
+        raise ClientException('Empty queries are not allowed')
+
+    return user_manager.search_users(search_token, limit, next_token)
+
+
 @routes.register('Query.findPosts')
 @validate_caller
 @update_last_client
@@ -3,11 +3,14 @@ import os
 
 import pendulum
 
-from app import clients, models
+from app import clients as app_clients
+from app import models
 from app.logging import LogLevelContext, handler_logging
+from app.utils import LazyProxy
 
 from . import xray
 
+DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 USER_NOTIFICATIONS_ENABLED = os.environ.get('USER_NOTIFICATIONS_ENABLED')
 USER_NOTIFICATIONS_ONLY_USERNAMES = os.environ.get('USER_NOTIFICATIONS_ONLY_USERNAMES')
@@ -15,24 +18,34 @@ USER_NOTIFICATIONS_ONLY_USERNAMES = os.environ.get('USER_NOTIFICATIONS_ONLY_USER
 logger = logging.getLogger()
 xray.patch_all()
 
-secrets_manager_client = clients.SecretsManagerClient()
+# pylint: disable=unnecessary-lambda
+secrets_manager_client = LazyProxy(lambda: app_clients.SecretsManagerClient())
 clients = {
-    'appstore': clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params),
-    'dynamo': clients.DynamoClient(),
-    'cognito': clients.CognitoClient(),
-    'pinpoint': clients.PinpointClient(),
-    'real_dating': clients.RealDatingClient(),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
+    'appstore': LazyProxy(lambda: app_clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params)),
+    'dynamo': LazyProxy(lambda: app_clients.DynamoClient()),
+    'dynamo_feed': LazyProxy(lambda: app_clients.DynamoClient(table_name=DYNAMO_FEED_TABLE)),
+    'cognito': LazyProxy(lambda: app_clients.CognitoClient()),
+    'elasticsearch': LazyProxy(lambda: app_clients.ElasticSearchClient()),
+    'pinpoint': LazyProxy(lambda: app_clients.PinpointClient()),
+    'real_dating': LazyProxy(lambda: app_clients.RealDatingClient()),
+    's3_uploads': LazyProxy(lambda: app_clients.S3Client(S3_UPLOADS_BUCKET)),
+    'sqs_fan_out': LazyProxy(lambda: app_clients.SQSClient()),
 }
+# pylint: enable=unnecessary-lambda
 
 managers = {}
-appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
-album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
-card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
-user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
-comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
-chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
+appstore_manager = LazyProxy(
+    lambda: managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
+)
+album_manager = LazyProxy(lambda: managers.get('album') or models.AlbumManager(clients, managers=managers))
+card_manager = LazyProxy(lambda: managers.get('card') or models.CardManager(clients, managers=managers))
+feed_manager = LazyProxy(lambda: managers.get('feed') or models.FeedManager(clients, managers=managers))
+post_manager = LazyProxy(lambda: managers.get('post') or models.PostManager(clients, managers=managers))
+user_manager = LazyProxy(lambda: managers.get('user') or models.UserManager(clients, managers=managers))
+comment_manager = LazyProxy(lambda: managers.get('comment') or models.CommentManager(clients, managers=managers))
+chat_message_manager = LazyProxy(
+    lambda: managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
+)
 
 
 @handler_logging
@@ -55,6 +68,12 @@ def deflate_trending_posts(event, context):
         logger.info(f'Trending posts removed: {deleted_cnt} out of {total_cnt}')
 
 
+@handler_logging
+def trim_feeds(event, context):
+    # the feeds are trimmed by the fan-out worker, one page of users at a time
+    feed_manager.trim_feeds()
+
+
 @handler_logging
 def update_appstore_subscriptions(event, context):
     cnt = appstore_manager.update_subscriptions()
@@ -76,6 +95,13 @@ def garbage_collect_albums(event, context):
         logger.info(f'Albums garbage collected: {cnt}')
 
 
+@handler_logging
+def update_album_art(event, context):
+    cnt = album_manager.update_scheduled_art(context=context)
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Album art updated: {cnt}')
+
+
 @handler_logging
 def delete_recently_expired_posts(event, context):
     now = pendulum.now('utc')
@@ -125,6 +151,13 @@ def detect_bad_words(event, context):
         logger.info('Detect bad words in comments & chat messages')
 
 
+@handler_logging
+def export_keyword_snapshot(event, context):
+    cnt = post_manager.export_keyword_snapshot()
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Exported keyword snapshot: {cnt} keywords')
+
+
 @handler_logging
 def send_dating_matches_notification(event, context):
     cnt = user_manager.send_dating_matches_notification()
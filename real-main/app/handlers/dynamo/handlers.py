@@ -3,11 +3,13 @@ import os
 
 from boto3.dynamodb.types import TypeDeserializer
 
-from app import clients, models
+from app import clients as app_clients
+from app import models
 from app.handlers import xray
 from app.logging import LogLevelContext, handler_logging
 from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserStatus, UserSubscriptionLevel
+from app.utils import LazyProxy
 
 from .dispatch import DynamoDispatch
 
@@ -17,18 +19,21 @@ S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 logger = logging.getLogger()
 xray.patch_all()
 
-secrets_manager_client = clients.SecretsManagerClient()
+# pylint: disable=unnecessary-lambda
+secrets_manager_client = LazyProxy(lambda: app_clients.SecretsManagerClient())
 clients = {
-    'appstore': clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params),
-    'appsync': clients.AppSyncClient(),
-    'cognito': clients.CognitoClient(),
-    'dynamo': clients.DynamoClient(),
-    'dynamo_feed': clients.DynamoClient(table_name=DYNAMO_FEED_TABLE),
-    'elasticsearch': clients.ElasticSearchClient(),
-    'pinpoint': clients.PinpointClient(),
-    'real_dating': clients.RealDatingClient(),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
+    'appstore': LazyProxy(lambda: app_clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params)),
+    'appsync': LazyProxy(lambda: app_clients.AppSyncClient()),
+    'cognito': LazyProxy(lambda: app_clients.CognitoClient()),
+    'dynamo': LazyProxy(lambda: app_clients.DynamoClient()),
+    'dynamo_feed': LazyProxy(lambda: app_clients.DynamoClient(table_name=DYNAMO_FEED_TABLE)),
+    'elasticsearch': LazyProxy(lambda: app_clients.ElasticSearchClient()),
+    'pinpoint': LazyProxy(lambda: app_clients.PinpointClient()),
+    'real_dating': LazyProxy(lambda: app_clients.RealDatingClient()),
+    's3_uploads': LazyProxy(lambda: app_clients.S3Client(S3_UPLOADS_BUCKET)),
+    'sqs_fan_out': LazyProxy(lambda: app_clients.SQSClient()),
 }
+# pylint: enable=unnecessary-lambda
 
 managers = {}
 album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
@@ -57,7 +62,7 @@ register(
     'album',
     '-',
     ['INSERT', 'MODIFY'],
-    album_manager.on_album_posts_last_updated_at_change_update_art_if_needed,
+    album_manager.on_album_posts_last_updated_at_change_schedule_art_update,
     {'postsLastUpdatedAt': None},
 )
 register('album', '-', ['REMOVE'], album_manager.on_album_delete_delete_album_art)
@@ -157,6 +162,7 @@ register(
     feed_manager.on_post_status_change_sync_feed,
     {'postStatus': None},
 )
+register('post', '-', ['MODIFY'], feed_manager.on_post_text_change_sync_feed_summaries, {'text': None})
 register(
     'post',
     '-',
@@ -180,6 +186,13 @@ register(
 register('post', '-', ['INSERT', 'MODIFY'], post_manager.sync_elasticsearch, {'keywords': None})
 register('post', 'flag', ['INSERT'], post_manager.on_flag_add)
 register('post', 'flag', ['REMOVE'], post_manager.on_flag_delete)
+register(
+    'post',
+    'image',
+    ['INSERT', 'MODIFY'],
+    feed_manager.on_post_image_change_sync_feed_summaries,
+    {'height': None, 'width': None, 'colors': None},
+)
 register('post', 'like', ['INSERT'], post_manager.on_like_add)
 register('post', 'like', ['REMOVE'], post_manager.on_like_delete)
 register(
@@ -270,6 +283,13 @@ register(
     user_manager.on_user_date_of_birth_change_update_age,
     {'dateOfBirth': None},
 )
+register(
+    'user',
+    'profile',
+    ['MODIFY'],
+    feed_manager.on_user_change_sync_feed_summaries,
+    {'username': None, 'photoPostId': None},
+)
 register('user', 'profile', ['INSERT', 'MODIFY'], user_manager.on_user_change_update_dating)
 register(
     'user',
@@ -375,3 +395,11 @@ def process_records(event, context):
                 func(item_id, **item_kwargs)
             except Exception as err:
                 logger.exception(str(err))
+
+    # notifications triggered while processing the batch are sent together. Those held back as the
+    # user was just sent one are left for the flush after a later batch, rather than holding up the shard
+    card_manager.flush_notifications()
+    feed_manager.flush_feed_changed_notifications()
+    # as are the search index updates. Those that still fail once retried are left out of the index
+    if failed := clients['elasticsearch'].flush():
+        logger.error(f'Failed to apply {len(failed)} search index updates')
@@ -0,0 +1,33 @@
+import json
+import logging
+import os
+
+from app import clients as app_clients
+from app import models
+from app.logging import handler_logging
+from app.utils import LazyProxy
+
+from . import xray
+
+DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
+
+logger = logging.getLogger()
+xray.patch_all()
+
+# pylint: disable=unnecessary-lambda
+clients = {
+    'appsync': LazyProxy(lambda: app_clients.AppSyncClient()),
+    'dynamo': LazyProxy(lambda: app_clients.DynamoClient()),
+    'dynamo_feed': LazyProxy(lambda: app_clients.DynamoClient(table_name=DYNAMO_FEED_TABLE)),
+    'sqs_fan_out': LazyProxy(lambda: app_clients.SQSClient()),
+}
+# pylint: enable=unnecessary-lambda
+
+managers = {}
+fan_out_manager = LazyProxy(lambda: managers.get('fan_out') or models.FanOutManager(clients, managers=managers))
+
+
+@handler_logging
+def process_jobs(event, context):
+    for record in event['Records']:
+        fan_out_manager.on_job(json.loads(record['body']))
@@ -2,30 +2,44 @@ import logging
 import os
 import urllib
 
-from app import clients, models
+from app import clients as app_clients
+from app import models
 from app.logging import LogLevelContext, handler_logging
 from app.models.post.enums import PostStatus, PostType
 from app.models.post.exceptions import PostException
+from app.utils import LazyProxy
 
-from . import xray
+from . import warm_up, xray
 
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 
 logger = logging.getLogger()
 xray.patch_all()
 
-secrets_manager_client = clients.SecretsManagerClient()
+# pylint: disable=unnecessary-lambda
+secrets_manager_client = LazyProxy(lambda: app_clients.SecretsManagerClient())
 clients = {
-    'appsync': clients.AppSyncClient(),
-    'cloudfront': clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair),
-    'dynamo': clients.DynamoClient(),
-    'mediaconvert': clients.MediaConvertClient(),
-    'post_verification': clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
+    'appsync': LazyProxy(lambda: app_clients.AppSyncClient()),
+    'cloudfront': LazyProxy(lambda: app_clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair)),
+    'dynamo': LazyProxy(lambda: app_clients.DynamoClient()),
+    'mediaconvert': LazyProxy(lambda: app_clients.MediaConvertClient()),
+    'post_verification': LazyProxy(
+        lambda: app_clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds)
+    ),
+    's3_uploads': LazyProxy(lambda: app_clients.S3Client(S3_UPLOADS_BUCKET)),
+    'sqs_fan_out': LazyProxy(lambda: app_clients.SQSClient()),
 }
+# pylint: enable=unnecessary-lambda
+
+# fetch secrets and build signing keys during container init, rather than on the first request
+warm_up.warm_up(
+    secrets_manager_client,
+    ['get_cloudfront_key_pair', 'get_post_verification_api_creds'],
+    clients={'cloudfront': clients['cloudfront']},
+)
 
 managers = {}
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+post_manager = LazyProxy(lambda: managers.get('post') or models.PostManager(clients, managers=managers))
 
 
 def event_to_extras(event):
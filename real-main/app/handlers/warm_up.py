@@ -0,0 +1,55 @@
+"""
+Work done while a lambda container initializes, so it isn't done on the critical path of the first request
+the container serves. Provisioned-concurrency containers in particular then start fully hot.
+"""
+import logging
+import os
+import time
+
+logger = logging.getLogger()
+
+# set by the lambda runtime, absent when running tests or scripts
+IN_LAMBDA = bool(os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+# most recent warm-up's timings, in ms, by step
+timings = {}
+
+
+def warm_up(secrets_manager_client, secret_getter_names, clients=None, force=False):
+    """
+    Fetch the secrets of `secret_getter_names` concurrently, then build the cloudfront signer and
+    the cognito private key if those clients are present. A step that fails is logged and left to
+    be retried lazily on first use, it never fails the container's initialization.
+
+    Only runs inside lambda, unless `force` is set.
+    """
+    if not (IN_LAMBDA or force):
+        return None
+    clients = clients or {}
+    timings.clear()
+    start = time.perf_counter()
+
+    def timed(step, func):
+        step_start = time.perf_counter()
+        try:
+            func()
+        except Exception as err:
+            logger.warning(f'Warm-up step `{step}` failed: {err}')
+        timings[step] = round((time.perf_counter() - step_start) * 1000, 1)
+
+    def fetch_secrets():
+        for getter_name, err in secrets_manager_client.prefetch(secret_getter_names).items():
+            logger.warning(f'Warm-up unable to fetch secret with `{getter_name}`: {err}')
+
+    timed('secrets', fetch_secrets)
+    # the lambdas keep a failure to build the client inside timed(), where it's caught
+    # pylint: disable=unnecessary-lambda
+    if 'cloudfront' in clients:
+        timed('cloudfront_private_key', lambda: clients['cloudfront'].get_private_key())
+        timed('cloudfront_signer', lambda: clients['cloudfront'].get_cloudfront_signer())
+    if 'cognito' in clients:
+        timed('cognito_private_key', lambda: clients['cognito'].get_private_key())
+    # pylint: enable=unnecessary-lambda
+    timings['total'] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f'Warm-up done: {timings}')
+    return timings
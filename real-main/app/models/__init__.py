@@ -1,3 +1,11 @@
+"""
+Managers are imported on first use, so a lambda only pays to import the models (and their
+dependencies) that it actually uses.
+"""
+import importlib
+
+# the names are resolved by __getattr__ below, which pylint doesn't follow
+# pylint: disable=undefined-all-variable
 __all__ = [
     'AlbumManager',
     'AppStoreManager',
@@ -6,6 +14,7 @@ __all__ = [
     'ChatManager',
     'ChatMessageManager',
     'CommentManager',
+    'FanOutManager',
     'FeedManager',
     'FollowerManager',
     'LikeManager',
@@ -13,17 +22,34 @@ __all__ = [
     'ScreenManager',
     'UserManager',
 ]
+# pylint: enable=undefined-all-variable
+
+# name -> module it's defined in, relative to this package
+_modules = {
+    'AlbumManager': '.album.manager',
+    'AppStoreManager': '.appstore.manager',
+    'BlockManager': '.block.manager',
+    'CardManager': '.card.manager',
+    'ChatManager': '.chat.manager',
+    'ChatMessageManager': '.chat_message.manager',
+    'CommentManager': '.comment.manager',
+    'FanOutManager': '.fan_out.manager',
+    'FeedManager': '.feed.manager',
+    'FollowerManager': '.follower.manager',
+    'LikeManager': '.like.manager',
+    'PostManager': '.post.manager',
+    'ScreenManager': '.screen.manager',
+    'UserManager': '.user.manager',
+}
+
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f'module `{__name__}` has no attribute `{name}`')
+    value = getattr(importlib.import_module(_modules[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
-from .album.manager import AlbumManager
-from .appstore.manager import AppStoreManager
-from .block.manager import BlockManager
-from .card.manager import CardManager
-from .chat.manager import ChatManager
-from .chat_message.manager import ChatMessageManager
-from .comment.manager import CommentManager
-from .feed.manager import FeedManager
-from .follower.manager import FollowerManager
-from .like.manager import LikeManager
-from .post.manager import PostManager
-from .screen.manager import ScreenManager
-from .user.manager import UserManager
+def __dir__():
+    return __all__
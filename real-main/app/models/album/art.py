@@ -2,6 +2,15 @@ import math
 
 import PIL.Image
 
+# size of the zoomed grid, that of a 4k thumbnail
+OUTPUT_WIDTH, OUTPUT_HEIGHT = 3840, 2160
+
+
+def get_cell_size(image_count):
+    "The (width, height) of each cell of a zoomed grid of `image_count` images"
+    stride = int(math.sqrt(image_count))
+    return OUTPUT_WIDTH // stride, OUTPUT_HEIGHT // stride
+
 
 def generate_basic_grid(pil_images):
     """
@@ -40,9 +49,8 @@ def generate_zoomed_grid(pil_images):
     """
     assert len(pil_images) in (4, 9, 16), f'Unexpected number of inputs: `{len(pil_images)}`'
 
-    output_width, output_height = 3840, 2160
     stride = int(math.sqrt(len(pil_images)))
-    cell_width, cell_height = output_width // stride, output_height // stride
+    cell_width, cell_height = get_cell_size(len(pil_images))
 
     # collect and resize (zoom in or out as needed so each image fills its cell)
     images = []
@@ -71,7 +79,7 @@ def generate_zoomed_grid(pil_images):
 
     # paste those thumbs together as a grid
     # Min size will be 4k since max_width and max_height come from 1080p thumbs
-    target_image = PIL.Image.new('RGB', (output_width, output_height))
+    target_image = PIL.Image.new('RGB', (OUTPUT_WIDTH, OUTPUT_HEIGHT))
     for row in range(0, stride):
         for column in range(0, stride):
             image = images[row * stride + column]
@@ -110,6 +110,55 @@ class AlbumDynamo:
             query_kwargs, failure_warning=f'Failed to clear deleteAt GSI for album `{album_id}`'
         )
 
+    def set_art_update_at(self, album_id, update_at):
+        "Schedule an update of the album's art. Best effort, logs WARNING on failure"
+        query_kwargs = {
+            'Key': self.pk(album_id),
+            'UpdateExpression': 'SET gsiK2PartitionKey = :pk, gsiK2SortKey = :sk REMOVE artUpdateFailureCount',
+            'ExpressionAttributeValues': {':pk': 'albumArt', ':sk': update_at.to_iso8601_string()},
+        }
+        return self.client.update_item(
+            query_kwargs, failure_warning=f'Failed to set art update GSI for album `{album_id}`'
+        )
+
+    def clear_art_update_at(self, album_id, update_at_str):
+        """
+        Clear the scheduled update of the album's art, as long as it is still for `update_at_str`: if it
+        has been rescheduled since, the album's posts changed again and it's left for the next update.
+        Returns the new item, or None if not cleared.
+        """
+        query_kwargs = {
+            'Key': self.pk(album_id),
+            'UpdateExpression': 'REMOVE gsiK2PartitionKey, gsiK2SortKey, artUpdateFailureCount',
+            'ConditionExpression': 'gsiK2SortKey = :sk',
+            'ExpressionAttributeValues': {':sk': update_at_str},
+        }
+        try:
+            return self.client.update_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return None
+
+    def reschedule_art_update_after_failure(self, album_id, update_at_str, retry_at):
+        """
+        Move the scheduled update of the album's art to `retry_at` and count the failure, as long as it is still
+        for `update_at_str`: if it has been rescheduled since, that's left as is.
+        Returns the new item, or None if not rescheduled.
+        """
+        query_kwargs = {
+            'Key': self.pk(album_id),
+            'UpdateExpression': 'SET gsiK2SortKey = :retry_at ADD artUpdateFailureCount :one',
+            'ConditionExpression': 'gsiK2SortKey = :sk',
+            'ExpressionAttributeValues': {
+                ':sk': update_at_str,
+                ':retry_at': retry_at.to_iso8601_string(),
+                ':one': 1,
+            },
+        }
+        try:
+            return self.client.update_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return None
+
     def delete_album(self, album_id):
         if item_deleted := self.client.delete_item(self.pk(album_id)):
             return item_deleted
@@ -169,3 +218,13 @@ class AlbumDynamo:
             'ProjectionExpression': 'partitionKey, sortKey',
         }
         return self.client.generate_all_query(query_kwargs)
+
+    def generate_art_update_keys(self, cutoff_at):
+        "Generate the keys, and gsiK2SortKey, of albums with an update of their art scheduled before `cutoff_at`"
+        query_kwargs = {
+            'KeyConditionExpression': 'gsiK2PartitionKey = :pk AND gsiK2SortKey < :sk_max',
+            'IndexName': 'GSI-K2',
+            'ExpressionAttributeValues': {':pk': 'albumArt', ':sk_max': cutoff_at.to_iso8601_string()},
+            'ProjectionExpression': 'partitionKey, sortKey, gsiK2SortKey',
+        }
+        return self.client.generate_all_query(query_kwargs)
@@ -13,6 +13,15 @@ logger = logging.getLogger()
 class AlbumManager:
 
     zero_post_lifetime = pendulum.duration(hours=24)
+    # how long an album's posts must go unchanged before its art is updated, so a burst of changes
+    # (say, adding ten posts one after another) leads to one update rather than ten
+    art_update_delay = pendulum.duration(seconds=30)
+    # a failed update of an album's art is retried after this, doubling with each failure, until it has been
+    # attempted this many times
+    art_update_retry_delay = pendulum.duration(minutes=1)
+    art_update_max_attempts = 5
+    # scheduled updates of art stop being started once the lambda has less than this left to run
+    art_update_time_margin_ms = 10 * 1000
 
     def __init__(self, clients, managers=None):
         managers = managers or {}
@@ -44,6 +53,46 @@ class AlbumManager:
         album_item = self.dynamo.add_album(album_id, caller_user_id, name, description, created_at=now)
         return self.init_album(album_item)
 
+    def update_scheduled_art(self, now=None, context=None):
+        """
+        Update the art of albums whose scheduled update is due, return how many.
+        If the lambda `context` is passed, stops before the lambda runs out of time.
+        """
+        now = now or pendulum.now('utc')
+        cnt = 0
+        for key in self.dynamo.generate_art_update_keys(now):
+            if context and context.get_remaining_time_in_millis() < self.art_update_time_margin_ms:
+                # the rest are still scheduled, so are picked up by the next run
+                logger.warning('Ran low on time to update album art, leaving the rest for the next run')
+                break
+            album_id = key['partitionKey'].split('/')[1]
+            album_item = self.dynamo.get_album(album_id, strongly_consistent=True)
+            if not album_item:
+                continue
+            try:
+                # albums whose art hash hasn't changed are skipped without touching S3
+                self.init_album(album_item).update_art_if_needed()
+            except Exception as err:
+                self.retry_or_drop_art_update(album_item, key['gsiK2SortKey'], err, now)
+                continue
+            self.dynamo.clear_art_update_at(album_id, key['gsiK2SortKey'])
+            cnt += 1
+        return cnt
+
+    def retry_or_drop_art_update(self, album_item, update_at_str, err, now):
+        "Reschedule the failed update of the album's art with backoff, or drop it if it has failed too often"
+        album_id = album_item['albumId']
+        attempts = int(album_item.get('artUpdateFailureCount', 0)) + 1
+        if attempts >= self.art_update_max_attempts:
+            logger.exception(
+                f'Failed to update art for album `{album_id}`, giving up after {attempts} attempts: {err}'
+            )
+            self.dynamo.clear_art_update_at(album_id, update_at_str)
+            return
+        logger.exception(f'Failed to update art for album `{album_id}`: {err}')
+        retry_at = now + self.art_update_retry_delay * 2 ** (attempts - 1)
+        self.dynamo.reschedule_art_update_after_failure(album_id, update_at_str, retry_at)
+
     def on_user_delete_delete_all_by_user(self, user_id, old_item):
         for album_item in self.dynamo.generate_by_user(user_id):
             self.init_album(album_item).delete()
@@ -65,9 +114,9 @@ class AlbumManager:
         if new_count > 0 and 'gsiK1PartitionKey' in new_item:
             self.dynamo.clear_delete_at(album_id)
 
-    def on_album_posts_last_updated_at_change_update_art_if_needed(self, album_id, new_item, old_item=None):
-        album = self.init_album(new_item)
-        album.update_art_if_needed()
+    def on_album_posts_last_updated_at_change_schedule_art_update(self, album_id, new_item, old_item=None):
+        # any update already scheduled is pushed back
+        self.dynamo.set_art_update_at(album_id, pendulum.now('utc') + self.art_update_delay)
 
     def on_post_album_change_update_counts_and_timestamps(self, post_id, new_item=None, old_item=None):
         new_album_id = (new_item or {}).get('albumId')
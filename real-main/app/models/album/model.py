@@ -1,14 +1,13 @@
+import concurrent.futures
 import hashlib
 import io
 import itertools
 import logging
 import os
 
-import PIL.Image
+from app.models.post.renditions import fit_within
+from app.utils import UploadPool, image_size
 
-from app.utils import image_size
-
-from . import art
 from .exceptions import AlbumException
 
 logger = logging.getLogger()
@@ -80,7 +79,7 @@ class Album:
     def get_art_image_url(self, size):
         art_image_path = self.get_art_image_path(size)
         if art_image_path:
-            return self.cloudfront_client.generate_presigned_url(art_image_path, ['GET', 'HEAD'])
+            return self.cloudfront_client.generate_presigned_readonly_url(art_image_path)
         return f'https://{self.frontend_resources_domain}/default-album-art/{size.filename}'
 
     def get_art_image_path_prefix(self):
@@ -120,21 +119,25 @@ class Album:
         if new_art_hash == old_art_hash:
             return self  # no changes
 
-        posts = [self.post_manager.get_post(post_id) for post_id in post_ids]
+        posts = self.post_manager.get_posts(post_ids)
         if len(posts) == 0:
             new_native_image = None
         elif len(posts) == 1:
             new_native_image = posts[0].k4_jpeg_cache.readonly_image
         else:
-            images = [post.p1080_jpeg_cache.readonly_image for post in posts]
+            from . import art
+
+            # 1080p is the smallest thumbnail that covers a cell of the grid (480p is smaller than the 960x540
+            # cells of a 4x4 grid), and it's decoded at reduced scale when it's at least twice the cell size
+            cell_size = art.get_cell_size(len(posts))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(posts)) as executor:
+                images = list(
+                    executor.map(lambda post: post.p1080_jpeg_cache.get_image(max_dimensions=cell_size), posts)
+                )
             new_native_image = art.generate_zoomed_grid(images)
 
         if new_native_image:
-            # convert to jpeg
-            buf_out = io.BytesIO()
-            new_native_image.save(buf_out, format='JPEG', quality=100)
-            buf_out.seek(0)
-            self.save_art_images(new_art_hash, buf_out)
+            self.save_art_images(new_art_hash, new_native_image)
 
         self.item = self.dynamo.set_album_art_hash(self.id, new_art_hash)
 
@@ -144,23 +147,20 @@ class Album:
         return self
 
     def delete_art_images(self, art_hash):
-        # remove the images from s3
-        for size in image_size.JPEGS:
-            path = self.get_art_image_path(size, art_hash=art_hash)
-            self.s3_uploads_client.delete_object(path)
-
-    def save_art_images(self, art_hash, native_image_buf):
-        # save the native size to S3
-        path = self.get_art_image_path(image_size.NATIVE, art_hash=art_hash)
-        self.s3_uploads_client.put_object(path, native_image_buf.read(), self.jpeg_content_type)
-
-        # generate and save thumbnails
-        native_image_buf.seek(0)
-        image = PIL.Image.open(native_image_buf)
-        for size in image_size.THUMBNAILS:  # ordered by decreasing size
-            image.thumbnail(size.max_dimensions, resample=PIL.Image.LANCZOS)
-            in_mem_file = io.BytesIO()
-            image.save(in_mem_file, format='JPEG', quality=100, icc_profile=image.info.get('icc_profile'))
-            in_mem_file.seek(0)
-            path = self.get_art_image_path(size, art_hash=art_hash)
-            self.s3_uploads_client.put_object(path, in_mem_file.read(), self.jpeg_content_type)
+        # remove the images from s3, all in one request
+        paths = [self.get_art_image_path(size, art_hash=art_hash) for size in image_size.JPEGS]
+        self.s3_uploads_client.delete_objects(paths)
+
+    def save_art_images(self, art_hash, image):
+        "Save the image, and thumbnails of it, as the art. The image is not modified."
+        # each thumbnail is generated and encoded while the larger sizes are being uploaded
+        with UploadPool(max_workers=len(image_size.JPEGS)) as upload_pool:
+            for size in image_size.JPEGS:  # ordered by decreasing size
+                if size.max_dimensions:
+                    image = fit_within(image, size.max_dimensions)
+                in_mem_file = io.BytesIO()
+                image.save(in_mem_file, format='JPEG', quality=100, icc_profile=image.info.get('icc_profile'))
+                path = self.get_art_image_path(size, art_hash=art_hash)
+                upload_pool.submit(
+                    self.s3_uploads_client.put_object, path, in_mem_file.getvalue(), self.jpeg_content_type
+                )
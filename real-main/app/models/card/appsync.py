@@ -1,32 +1,49 @@
 import logging
 
-import gql
-
 logger = logging.getLogger()
 
 
 class CardAppSync:
+
+    card_selection_set = '''
+        userId
+        type
+        card {
+            cardId
+            title
+            subTitle
+            action
+        }
+    '''
+
+    trigger_mutation = f'''
+        mutation TriggerCardNotification ($input: CardNotificationInput!) {{
+            triggerCardNotification (input: $input) {{
+                {card_selection_set}
+            }}
+        }}
+    '''
+
     def __init__(self, appsync_client):
         self.client = appsync_client
 
     def trigger_notification(self, notification_type, user_id, card_id, title, action, sub_title=None):
-        mutation = gql.gql(
-            '''
-            mutation TriggerCardNotification ($input: CardNotificationInput!) {
-                triggerCardNotification (input: $input) {
-                    userId
-                    type
-                    card {
-                        cardId
-                        title
-                        subTitle
-                        action
-                    }
-                }
-            }
-        '''
+        input_obj = self.get_input(notification_type, user_id, card_id, title, action, sub_title=sub_title)
+        self.client.send(self.trigger_mutation, {'input': input_obj})
+
+    def trigger_notifications(self, inputs):
+        "Trigger many notifications, each from an input object as built by get_input(), logging any that fail"
+        failures = self.client.send_mutations(
+            'triggerCardNotification', 'CardNotificationInput', self.card_selection_set, inputs
         )
-        input_obj = {
+        for input_obj, err in failures:
+            notification_type, card_id, user_id = input_obj['type'], input_obj['cardId'], input_obj['userId']
+            logger.warning(
+                f'Unable to send `{notification_type}` notification of `{card_id}` to `{user_id}`: {err}'
+            )
+
+    def get_input(self, notification_type, user_id, card_id, title, action, sub_title=None):
+        return {
             'userId': user_id,
             'type': notification_type,
             'cardId': card_id,
@@ -34,4 +51,3 @@ class CardAppSync:
             'subTitle': sub_title,
             'action': action,
         }
-        self.client.send(mutation, {'input': input_obj})
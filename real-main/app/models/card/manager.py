@@ -31,6 +31,9 @@ class CardManager:
         if 'pinpoint' in clients:
             self.pinpoint_client = clients['pinpoint']
 
+        # inputs of card notifications waiting to be sent on the next flush
+        self.pending_notification_inputs = []
+
     def get_card(self, card_id, strongly_consistent=False):
         item = self.dynamo.get_card(card_id, strongly_consistent=strongly_consistent)
         return self.init_card(item) if item else None
@@ -104,14 +107,25 @@ class CardManager:
             card.clear_notify_user_at()
         return total_count, success_count
 
+    def queue_notification(self, card, notification_type):
+        "Queue up a notification about the card, to be sent on the next flush"
+        self.pending_notification_inputs.append(card.get_notification_input(notification_type))
+
+    def flush_notifications(self):
+        "Send queued card notifications together, return how many were sent"
+        inputs, self.pending_notification_inputs = self.pending_notification_inputs, []
+        if inputs:
+            self.appsync.trigger_notifications(inputs)
+        return len(inputs)
+
     def on_card_add(self, card_id, new_item):
-        self.init_card(new_item).trigger_notification(CardNotificationType.ADDED)
+        self.queue_notification(self.init_card(new_item), CardNotificationType.ADDED)
 
     def on_card_edit(self, card_id, new_item, old_item):
-        self.init_card(new_item).trigger_notification(CardNotificationType.EDITED)
+        self.queue_notification(self.init_card(new_item), CardNotificationType.EDITED)
 
     def on_card_delete(self, card_id, old_item):
-        self.init_card(old_item).trigger_notification(CardNotificationType.DELETED)
+        self.queue_notification(self.init_card(old_item), CardNotificationType.DELETED)
 
     def on_post_delete_delete_cards(self, post_id, old_item):
         self.delete_by_post(post_id)
@@ -72,6 +72,17 @@ class Card:
             sub_title=self.sub_title,
         )
 
+    def get_notification_input(self, notification_type):
+        "Return the input for a notification of `notification_type` about this card, for batch sending"
+        return self.appsync.get_input(
+            notification_type,
+            self.user_id,
+            self.id,
+            self.title,
+            self.action,
+            sub_title=self.sub_title,
+        )
+
     def notify_user(self):
         "Returns bool indicating if notification was successfully sent to user"
         # just APNS for now
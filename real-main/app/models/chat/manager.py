@@ -5,7 +5,6 @@ import logging
 import pendulum
 
 from app import models
-from app.clients import RealDatingClient
 from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
 from app.mixins.view.manager import ViewManagerMixin
@@ -34,7 +33,8 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.clients = clients
-        self.real_dating_client = RealDatingClient()
+        if 'real_dating' in clients:
+            self.real_dating_client = clients['real_dating']
         if 'dynamo' in clients:
             self.dynamo = ChatDynamo(clients['dynamo'])
             self.member_dynamo = ChatMemberDynamo(clients['dynamo'])
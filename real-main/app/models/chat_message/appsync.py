@@ -1,49 +1,68 @@
 import logging
 
-import gql
-
 logger = logging.getLogger()
 
 
 class ChatMessageAppSync:
-    def __init__(self, appsync_client):
-        self.client = appsync_client
 
-    def trigger_notification(self, notification_type, user_id, message):
-        mutation = gql.gql(
-            '''
-            mutation TriggerChatMessageNotification ($input: ChatMessageNotificationInput!) {
-                triggerChatMessageNotification (input: $input) {
+    message_selection_set = '''
+        userId
+        type
+        message {
+            messageId
+            chat {
+                chatId
+            }
+            authorUserId
+            author {
+                userId
+                username
+                photo {
+                    url64p
+                }
+            }
+            text
+            textTaggedUsers {
+                tag
+                user {
                     userId
-                    type
-                    message {
-                        messageId
-                        chat {
-                            chatId
-                        }
-                        authorUserId
-                        author {
-                            userId
-                            username
-                            photo {
-                                url64p
-                            }
-                        }
-                        text
-                        textTaggedUsers {
-                            tag
-                            user {
-                                userId
-                            }
-                        }
-                        createdAt
-                        lastEditedAt
-                    }
                 }
             }
-        '''
+            createdAt
+            lastEditedAt
+        }
+    '''
+
+    trigger_mutation = f'''
+        mutation TriggerChatMessageNotification ($input: ChatMessageNotificationInput!) {{
+            triggerChatMessageNotification (input: $input) {{
+                {message_selection_set}
+            }}
+        }}
+    '''
+
+    def __init__(self, appsync_client):
+        self.client = appsync_client
+
+    def trigger_notification(self, notification_type, user_id, message):
+        self.client.send(self.trigger_mutation, {'input': self.get_input(notification_type, user_id, message)})
+
+    def trigger_notifications(self, notification_type, user_ids, message):
+        "Trigger a notification to each of `user_ids`, logging any that fail"
+        failures = self.client.send_mutations(
+            'triggerChatMessageNotification',
+            'ChatMessageNotificationInput',
+            self.message_selection_set,
+            [self.get_input(notification_type, user_id, message) for user_id in user_ids],
         )
-        input_obj = {
+        for input_obj, err in failures:
+            user_id = input_obj['userId']
+            logger.warning(
+                f'Unable to send `{notification_type}` notification of `{message.id}` to `{user_id}`: {err}'
+            )
+
+    def get_input(self, notification_type, user_id, message):
+        return {
             'userId': user_id,
             'messageId': message.id,
             'chatId': message.chat_id,
@@ -55,4 +74,3 @@ class ChatMessageAppSync:
             'createdAt': message.item['createdAt'],
             'lastEditedAt': message.item.get('lastEditedAt'),
         }
-        self.client.send(mutation, {'input': input_obj})
@@ -1,3 +1,4 @@
+import itertools
 import json
 import logging
 
@@ -92,18 +93,12 @@ class ChatMessage(FlagModelMixin):
         dynamo may not have converged yet.
         """
         user_ids = user_ids or []
-        already_notified_user_ids = set([self.user_id])  # don't notify the msg author
-
-        for user_id in user_ids:
-            if user_id in already_notified_user_ids:
-                continue
-            self.appsync.trigger_notification(notification_type, user_id, self)
-            already_notified_user_ids.add(user_id)
-
-        for user_id in self.chat_manager.member_dynamo.generate_user_ids_by_chat(self.chat_id):
-            if user_id in already_notified_user_ids:
-                continue
-            self.appsync.trigger_notification(notification_type, user_id, self)
+        member_user_ids = self.chat_manager.member_dynamo.generate_user_ids_by_chat(self.chat_id)
+        # dedupe, keeping order, and don't notify the msg author
+        notify_user_ids = dict.fromkeys(itertools.chain(user_ids, member_user_ids))
+        notify_user_ids.pop(self.user_id, None)
+        if notify_user_ids:
+            self.appsync.trigger_notifications(notification_type, list(notify_user_ids), self)
 
     def get_author_encoded(self, user_id):
         """
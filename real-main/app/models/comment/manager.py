@@ -4,7 +4,7 @@ import logging
 import pendulum
 
 from app import models
-from app.clients import BadWordsClient, RealDatingClient
+from app.clients import BadWordsClient
 from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
 from app.models.follower.enums import FollowStatus
@@ -31,7 +31,8 @@ class CommentManager(FlagManagerMixin, ManagerBase):
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
-        self.real_dating_client = RealDatingClient()
+        if 'real_dating' in clients:
+            self.real_dating_client = clients['real_dating']
         # self.bad_words_client = BadWordsClient()
         if 'dynamo' in clients:
             self.dynamo = CommentDynamo(clients['dynamo'])
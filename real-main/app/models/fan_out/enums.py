@@ -0,0 +1,18 @@
+class FanOutJobType:
+    FEED_ADD_POST = 'FEED_ADD_POST'
+    FEED_DELETE_POST = 'FEED_DELETE_POST'
+    FEED_UPDATE_POST = 'FEED_UPDATE_POST'
+    FEED_UPDATE_USER_POSTS = 'FEED_UPDATE_USER_POSTS'
+    FEED_TRIM = 'FEED_TRIM'
+    FIRST_STORY_SET = 'FIRST_STORY_SET'
+    FIRST_STORY_DELETE = 'FIRST_STORY_DELETE'
+
+    _ALL = (
+        FEED_ADD_POST,
+        FEED_DELETE_POST,
+        FEED_UPDATE_POST,
+        FEED_UPDATE_USER_POSTS,
+        FEED_TRIM,
+        FIRST_STORY_SET,
+        FIRST_STORY_DELETE,
+    )
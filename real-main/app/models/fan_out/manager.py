@@ -0,0 +1,188 @@
+import logging
+import uuid
+
+from app import models
+from app.logging import LogLevelContext
+from app.models.follower.enums import FollowStatus
+from app.models.post.enums import PostStatus
+
+from .enums import FanOutJobType
+
+logger = logging.getLogger()
+
+
+class FanOutManager:
+    """
+    Writes that fan out to many users, such as all of a user's followers or all feeds, are run as jobs,
+    one page of users at a time.
+
+    A job is a small json-serializable dict: its type, the arguments it needs and a cursor into the
+    list it is working through. If a queue is available, the fan-out worker splits the job up front:
+    it reads through the list, queueing up each page of it, with its items, as a job of its own. The
+    pages are then processed independently and in parallel. The writes are idempotent, so a page that
+    fails is simply retried without holding up the others. If no queue is available, all pages of the
+    job are processed inline.
+
+    The queue is FIFO. A job about a user's posts is split in that user's message group, so jobs are
+    split in the order they were started. Each page then goes in a message group of its own, keyed by
+    the user and the page number. A page is queued up behind the same page of any job started before it,
+    and the lists are read in the same order each time, so for any one follower a newer job still has the
+    last word.
+    """
+
+    # max number of followers (or feed items, or items scanned for users) processed per page of a job
+    page_size = 500
+
+    # max number of pages a job is split into per invocation of the worker. The rest of the job is queued
+    # up to be split by the next one, so no one invocation has to read through the whole of a long list
+    split_page_count = 50
+
+    def __init__(self, clients, managers=None):
+        managers = managers or {}
+        managers['fan_out'] = self
+        self.feed_manager = managers.get('feed') or models.FeedManager(clients, managers=managers)
+        self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
+        self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+
+        self.clients = clients
+        if 'sqs_fan_out' in clients:
+            self.sqs_client = clients['sqs_fan_out']
+
+        # job type -> (function to get a page of the job, function to process that page)
+        self.job_handlers = {
+            FanOutJobType.FEED_ADD_POST: (self.get_follower_user_ids_page, self.add_post_to_feeds),
+            FanOutJobType.FEED_DELETE_POST: (self.get_feed_keys_page, self.delete_post_from_feeds),
+            FanOutJobType.FEED_UPDATE_POST: (self.get_feed_keys_page, self.update_post_in_feeds),
+            FanOutJobType.FEED_UPDATE_USER_POSTS: (self.get_post_ids_page, self.update_posts_in_feeds),
+            FanOutJobType.FEED_TRIM: (self.get_user_ids_page, self.trim_feeds),
+            FanOutJobType.FIRST_STORY_SET: (self.get_follower_user_ids_page, self.set_first_stories),
+            FanOutJobType.FIRST_STORY_DELETE: (self.get_follower_user_ids_page, self.delete_first_stories),
+        }
+
+    def enqueue(self, job_type, **kwargs):
+        "Start a fan-out job of `job_type` with arguments `kwargs`"
+        assert job_type in FanOutJobType._ALL, f'Unrecognized fan out job type `{job_type}`'
+        job = {'jobType': job_type, 'args': kwargs, 'cursor': None, 'pageNumber': 0}
+        if hasattr(self, 'sqs_client'):
+            self.send_job({**job, 'jobId': str(uuid.uuid4())})
+        else:
+            self.split_job(job, self.process_page_job)
+
+    def send_job(self, job):
+        """
+        Send `job` to the queue. A job to be split goes in the message group of the user whose posts it is
+        about, a page of a job in a group of that user and its page number.
+        """
+        group_id = job['args'].get('postedByUserId') or job['jobType']
+        deduplication_id = f'{job["jobId"]}/{job["pageNumber"]}'
+        if 'items' in job:
+            group_id, deduplication_id = f'{group_id}/{job["pageNumber"]}', f'{deduplication_id}/items'
+        # a job split again after a failure queues up the same pages, which the queue drops as duplicates
+        self.sqs_client.send_message(job, group_id=group_id, deduplication_id=deduplication_id)
+
+    def on_job(self, job):
+        "Process a page of a job received from the queue, or split up a job into its pages"
+        if 'items' in job:
+            self.process_page_job(job)
+            self.feed_manager.flush_feed_changed_notifications()
+        else:
+            next_job = self.split_job(job, self.send_job, max_page_count=self.split_page_count)
+            if next_job:
+                self.send_job(next_job)
+
+    def split_job(self, job, on_page_job, max_page_count=None):
+        """
+        Read through the pages of `job` from its cursor, calling `on_page_job` with a job for each, with its
+        items. Stops after `max_page_count` pages, if set, returning the job to split the rest of it.
+        """
+        get_page = self.job_handlers[job['jobType']][0]
+        cursor, page_number = job['cursor'], job['pageNumber']
+        while True:
+            items, cursor = get_page(job['args'], cursor)
+            # the first page is processed even if empty, as it may have work of its own
+            if items or page_number == 0:
+                page_job = {k: v for k, v in job.items() if k != 'cursor'}
+                on_page_job({**page_job, 'pageNumber': page_number, 'items': items})
+            page_number += 1
+            if not cursor:
+                return None
+            if max_page_count and page_number - job['pageNumber'] >= max_page_count:
+                return {**job, 'cursor': cursor, 'pageNumber': page_number}
+
+    def process_page_job(self, job):
+        process_page = self.job_handlers[job['jobType']][1]
+        process_page(job['args'], job['items'], is_first_page=job['pageNumber'] == 0)
+
+    def get_follower_user_ids_page(self, args, cursor):
+        follow_status = FollowStatus.FOLLOWING if args.get('followingOnly') else None
+        paginated = self.follower_manager.dynamo.query_follower_items(
+            args['postedByUserId'], follow_status=follow_status, limit=self.page_size, next_token=cursor
+        )
+        return [item['followerUserId'] for item in paginated['items']], paginated['nextToken']
+
+    def get_feed_keys_page(self, args, cursor):
+        paginated = self.feed_manager.dynamo.query_keys_by_post(
+            args['postId'], limit=self.page_size, next_token=cursor
+        )
+        return paginated['items'], paginated['nextToken']
+
+    def get_post_ids_page(self, args, cursor):
+        paginated = self.post_manager.dynamo.query_posts_by_user(
+            args['postedByUserId'],
+            completed=True,
+            # the keys of the index, as the pagination token is built from them
+            projection_expression='partitionKey, sortKey, gsiA2PartitionKey, gsiA2SortKey, postId',
+            limit=self.page_size,
+            next_token=cursor,
+        )
+        return [item['postId'] for item in paginated['items']], paginated['nextToken']
+
+    def get_user_ids_page(self, args, cursor):
+        paginated = self.feed_manager.user_manager.dynamo.scan_user_ids(limit=self.page_size, next_token=cursor)
+        return paginated['items'], paginated['nextToken']
+
+    def add_post_to_feeds(self, args, user_ids, is_first_page=False):
+        # the post may have been removed since the job was started, in which case the job is abandoned
+        post_item = self.post_manager.dynamo.get_post(args['postId'], strongly_consistent=True)
+        if not post_item or post_item['postStatus'] != PostStatus.COMPLETED:
+            return
+        # the poster's own feed goes along with the first page of their followers
+        if is_first_page:
+            user_ids = [args['postedByUserId'], *user_ids]
+        summary = self.feed_manager.get_post_summary(post_item) if self.feed_manager.denormalize_items else None
+        for user_id in self.feed_manager.dynamo.add_post_to_feeds(user_ids, post_item, summary=summary):
+            self.feed_manager.notify_feed_changed(user_id)
+
+    def delete_post_from_feeds(self, args, keys, is_first_page=False):
+        # the post may have been restored since the job was started, in which case the job is abandoned
+        post_item = self.post_manager.dynamo.get_post(args['postId'], strongly_consistent=True)
+        if post_item and post_item['postStatus'] == PostStatus.COMPLETED:
+            return
+        self.feed_manager.dynamo.delete_keys(keys)
+        for key in keys:
+            self.feed_manager.notify_feed_changed(key['feedUserId'])
+
+    def update_post_in_feeds(self, args, keys, is_first_page=False):
+        # the summary is built from the post as it is now, so a page processed late is never stale
+        post_item = self.post_manager.dynamo.get_post(args['postId'], strongly_consistent=True)
+        if not post_item or post_item['postStatus'] != PostStatus.COMPLETED:
+            return
+        self.feed_manager.dynamo.set_summary(keys, self.feed_manager.get_post_summary(post_item))
+        for key in keys:
+            self.feed_manager.notify_feed_changed(key['feedUserId'])
+
+    def update_posts_in_feeds(self, args, post_ids, is_first_page=False):
+        # each post's feed items are paged through by a job of its own
+        for post_id in post_ids:
+            self.enqueue(FanOutJobType.FEED_UPDATE_POST, postId=post_id, postedByUserId=args['postedByUserId'])
+
+    def trim_feeds(self, args, user_ids, is_first_page=False):
+        deleted_cnt = sum(self.feed_manager.trim_feed(user_id) for user_id in user_ids)
+        with LogLevelContext(logger, logging.INFO):
+            logger.info(f'Feeds trimmed: {deleted_cnt} items removed from {len(user_ids)} feeds')
+
+    def set_first_stories(self, args, user_ids, is_first_page=False):
+        self.follower_manager.first_story_dynamo.set_all(user_ids, args)
+
+    def delete_first_stories(self, args, user_ids, is_first_page=False):
+        self.follower_manager.first_story_dynamo.delete_all(user_ids, args['postedByUserId'])
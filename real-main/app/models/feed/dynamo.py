@@ -1,31 +1,77 @@
+import itertools
 import logging
 
 logger = logging.getLogger()
 
 
 class FeedDynamo:
+
+    # the attributes of a post item that are copied into feed items
+    post_projection_expression = 'postId, postedByUserId, postedAt'
+
+    # the attributes of a denormalized post summary that may be stored on feed items
+    summary_attributes = (
+        'postType',
+        'textPreview',
+        'imageHeight',
+        'imageWidth',
+        'imageColors',
+        'postedByUsername',
+        'postedByPhotoPostId',
+    )
+
     def __init__(self, dynamo_feed_client):
         self.feed_client = dynamo_feed_client
 
-    def item(self, feed_user_id, post_item):
-        return {
+    def item(self, feed_user_id, post_item, summary=None):
+        item = {
             'postId': post_item['postId'],
             'postedByUserId': post_item['postedByUserId'],
             'postedAt': post_item['postedAt'],
             'feedUserId': feed_user_id,
         }
+        if summary:
+            item.update({k: v for k, v in summary.items() if k in self.summary_attributes and v is not None})
+        return item
 
-    def add_posts_to_feed(self, feed_user_id, post_item_generator):
-        item_generator = (self.item(feed_user_id, post_item) for post_item in post_item_generator)
+    def add_posts_to_feed(self, feed_user_id, post_item_generator, summarize=None):
+        "Add the posts to the feed. If provided, `summarize(post_item)` gives the summary to store with each."
+        item_generator = (
+            self.item(feed_user_id, post_item, summary=summarize(post_item) if summarize else None)
+            for post_item in post_item_generator
+        )
         self.feed_client.batch_put_items(item_generator)
 
-    def add_post_to_feeds(self, feed_user_id_generator, post_item):
+    def add_post_to_feeds(self, feed_user_id_generator, post_item, summary=None):
         "Add the post to all the feeds of the generated user_ids, return a list of those user_ids"
         feed_user_ids = list(feed_user_id_generator)
-        item_generator = (self.item(feed_user_id, post_item) for feed_user_id in feed_user_ids)
+        item_generator = (self.item(feed_user_id, post_item, summary=summary) for feed_user_id in feed_user_ids)
         self.feed_client.batch_put_items(item_generator)
         return feed_user_ids
 
+    def set_summary(self, keys, summary):
+        """
+        Set the denormalized post summary on the feed items with the given keys.
+        Attributes of the summary that are None are removed. Keys of items that no longer exist are skipped.
+        """
+        set_attrs = {k: v for k, v in summary.items() if k in self.summary_attributes and v is not None}
+        remove_attrs = [k for k in self.summary_attributes if k not in set_attrs]
+        update_exp = 'SET ' + ', '.join(f'#{k} = :{k}' for k in set_attrs) if set_attrs else ''
+        if remove_attrs:
+            update_exp += ' REMOVE ' + ', '.join(f'#{k}' for k in remove_attrs)
+        query_kwargs = {
+            'UpdateExpression': update_exp.strip(),
+            'ExpressionAttributeNames': {f'#{k}': k for k in self.summary_attributes},
+            'ConditionExpression': 'attribute_exists(postId)',
+        }
+        if set_attrs:
+            query_kwargs['ExpressionAttributeValues'] = {f':{k}': v for k, v in set_attrs.items()}
+        for key in keys:
+            try:
+                self.feed_client.table.update_item(Key=key, **query_kwargs)
+            except self.feed_client.exceptions.ConditionalCheckFailedException:
+                pass
+
     def delete_by_post_owner(self, feed_user_id, post_user_id):
         "Delete all feed items by `posted_by_user_id` from the feed of `feed_user_id`"
         key_generator = self.generate_keys_by_posted_by_user(feed_user_id, post_user_id)
@@ -38,6 +84,36 @@ class FeedDynamo:
         self.feed_client.batch_delete(k for k in keys)
         return feed_user_ids
 
+    def has_more_items_than(self, feed_user_id, item_count):
+        "Does the feed have more than `item_count` items? Counts no further than one past `item_count`."
+        query_kwargs = {
+            'KeyConditionExpression': 'feedUserId = :fuid',
+            'ExpressionAttributeValues': {':fuid': feed_user_id},
+            'IndexName': 'GSI-A1',
+            'Select': 'COUNT',
+            'Limit': item_count + 1,
+        }
+        count, last_key = 0, False
+        # the count of a single query is also cut short by dynamo's 1MB page size
+        while last_key is not None and count <= item_count:
+            start_kwargs = {'ExclusiveStartKey': last_key} if last_key else {}
+            resp = self.feed_client.table.query(**query_kwargs, **start_kwargs)
+            count += resp['Count']
+            last_key = resp.get('LastEvaluatedKey')
+        return count > item_count
+
+    def trim(self, feed_user_id, max_item_count):
+        "Delete all but the `max_item_count` most recent items from the feed, return count of items deleted"
+        query_kwargs = {
+            'KeyConditionExpression': 'feedUserId = :fuid',
+            'ExpressionAttributeValues': {':fuid': feed_user_id},
+            'IndexName': 'GSI-A1',
+            'ScanIndexForward': False,
+            'ProjectionExpression': 'postId, feedUserId',
+        }
+        key_generator = itertools.islice(self.feed_client.generate_all_query(query_kwargs), max_item_count, None)
+        return self.feed_client.batch_delete(key_generator)
+
     def generate_items(self, feed_user_id):
         query_kwargs = {
             'KeyConditionExpression': 'feedUserId = :fuid',
@@ -46,6 +122,24 @@ class FeedDynamo:
         }
         return self.feed_client.generate_all_query(query_kwargs)
 
+    def generate_recent_items(self, feed_user_id, posted_at_or_before=None, page_size=None):
+        """
+        Generate the feed's items newest first, optionally only those posted at or before `posted_at_or_before`.
+        Items that share a postedAt are generated in no particular order.
+        """
+        query_kwargs = {
+            'KeyConditionExpression': 'feedUserId = :fuid',
+            'ExpressionAttributeValues': {':fuid': feed_user_id},
+            'IndexName': 'GSI-A1',
+            'ScanIndexForward': False,
+        }
+        if posted_at_or_before:
+            query_kwargs['KeyConditionExpression'] += ' AND postedAt <= :pa'
+            query_kwargs['ExpressionAttributeValues'][':pa'] = posted_at_or_before
+        if page_size:
+            query_kwargs['Limit'] = page_size
+        return self.feed_client.generate_all_query(query_kwargs)
+
     def generate_keys_by_post(self, post_id):
         query_kwargs = {
             'KeyConditionExpression': 'postId = :pid',
@@ -54,6 +148,19 @@ class FeedDynamo:
         }
         return self.feed_client.generate_all_query(query_kwargs)
 
+    def query_keys_by_post(self, post_id, limit=None, next_token=None):
+        "Return a page of keys of feed items of `post_id`, along with a pagination token"
+        query_kwargs = {
+            'KeyConditionExpression': 'postId = :pid',
+            'ExpressionAttributeValues': {':pid': post_id},
+            'ProjectionExpression': 'postId, feedUserId',
+        }
+        return self.feed_client.query(query_kwargs, limit=limit, next_token=next_token)
+
+    def delete_keys(self, keys):
+        "Delete the feed items with the given keys"
+        self.feed_client.batch_delete(iter(keys))
+
     def generate_keys_by_posted_by_user(self, feed_user_id, posted_by_user_id):
         query_kwargs = {
             'KeyConditionExpression': 'feedUserId = :fuid AND postedByUserId = :pbuid',
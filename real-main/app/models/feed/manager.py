@@ -1,22 +1,58 @@
 import itertools
 import logging
+import os
 
 from app import models
+from app.models.fan_out.enums import FanOutJobType
 from app.models.follower.enums import FollowStatus
-from app.models.post.enums import PostStatus
-from app.utils import GqlNotificationType
+from app.models.post.enums import PostStatus, PostType
+from app.utils import GqlNotificationType, NotificationCoalescer, TTLCache, image_size
 
 from .dynamo import FeedDynamo
 
+FEED_DENORMALIZE_ITEMS = os.environ.get('FEED_DENORMALIZE_ITEMS')
+
 logger = logging.getLogger()
 
 
 class FeedManager:
+
+    # posts by users with more followers than this are not fanned out to their followers' feeds,
+    # rather they are merged into those feeds when the feeds are read
+    fan_out_max_follower_count = 10000
+
+    # how many of each such user's most recent posts are cached to merge into the first page of feeds on read.
+    # Later pages query their posts from the page's cursor
+    fan_in_post_count = 100
+
+    # how long, in seconds, results used for merging posts in on read are cached per container. These caches
+    # live in the containers that read feeds, out of reach of the dynamo stream handlers that see the changes,
+    # so they are never invalidated: a feed may be this stale in what it merges in
+    fan_in_cache_ttl = 60
+
+    # how many of a user's most recent posts are copied into a feed when it starts following that user
+    backfill_post_count = 100
+
+    # feeds are trimmed down to this many of their most recent items
+    max_item_count = 1000
+
+    # a user is sent a USER_FEED_CHANGED notification at most once per this many seconds
+    feed_changed_min_interval = 5
+
+    # store a summary of the post (type, text preview, image dimensions & colors, author's username & photo)
+    # on each feed item, so that a page of feed entries can be rendered from the feed query alone
+    denormalize_items = bool(FEED_DENORMALIZE_ITEMS)
+
+    # how many characters of a post's text are copied into the summary stored on feed items
+    text_preview_length = 280
+
     def __init__(self, clients, managers=None):
         managers = managers or {}
         managers['feed'] = self
+        self.fan_out_manager = managers.get('fan_out') or models.FanOutManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.clients = clients
         if 'appsync' in clients:
@@ -24,15 +60,259 @@ class FeedManager:
         if 'dynamo_feed' in clients:
             self.dynamo = FeedDynamo(clients['dynamo_feed'])
 
+        # feed_user_id -> list of followed user ids whose posts are not fanned out
+        self.fan_in_user_ids_cache = TTLCache(self.fan_in_cache_ttl, maxsize=10000)
+        # posted_by_user_id -> list of feed-item-like dicts of their most recent completed posts
+        self.fan_in_posts_cache = TTLCache(self.fan_in_cache_ttl, maxsize=1000)
+
+        self.feed_changed_notifications = NotificationCoalescer(
+            self.send_notifications, self.feed_changed_min_interval
+        )
+
+    def notify_feed_changed(self, user_id):
+        "Queue up a USER_FEED_CHANGED notification, to be sent on the next flush"
+        self.feed_changed_notifications.add(user_id, GqlNotificationType.USER_FEED_CHANGED)
+
+    def flush_feed_changed_notifications(self):
+        """
+        Send queued USER_FEED_CHANGED notifications, return how many were sent.
+        Those held back as the user was sent one recently are left queued for a later flush.
+        """
+        return self.feed_changed_notifications.flush()
+
+    def send_notifications(self, notifications):
+        batch = [{'userId': user_id, 'type': notification_type} for user_id, notification_type in notifications]
+        for notification, err in self.appsync_client.fire_notifications(batch):
+            user_id, notification_type = notification['userId'], notification['type']
+            logger.warning(f'Unable to send `{notification_type}` notification to user `{user_id}`: {err}')
+
+    def is_fanned_out(self, user_id):
+        "Are posts by this user written to their followers' feeds?"
+        user_item = self.user_manager.dynamo.get_user(user_id) or {}
+        return user_item.get('followerCount', 0) <= self.fan_out_max_follower_count
+
+    def get_post_summary(self, post_item, user_item=None, image_item=None):
+        "Return the summary of the post that is stored on denormalized feed items"
+        post_id, posted_by_user_id = post_item['postId'], post_item['postedByUserId']
+        if user_item is None:
+            user_item = self.user_manager.dynamo.get_user(posted_by_user_id) or {}
+        if image_item is None:
+            image_item = {}
+            if post_item['postType'] != PostType.TEXT_ONLY:
+                image_item = self.post_manager.image_dynamo.get(post_id) or {}
+        text = post_item.get('text')
+        return {
+            'postType': post_item['postType'],
+            'textPreview': text[: self.text_preview_length] if text else None,
+            'imageHeight': image_item.get('height'),
+            'imageWidth': image_item.get('width'),
+            'imageColors': image_item.get('colors'),
+            'postedByUsername': user_item.get('username'),
+            'postedByPhotoPostId': user_item.get('photoPostId'),
+        }
+
+    def generate_recent_posts(self, posted_by_user_id, limit=None, posted_at_or_before=None, page_size=None):
+        "Generate up to `limit` of the user's most recent completed posts, optionally from a point in time back"
+        post_item_generator = self.post_manager.dynamo.generate_posts_by_user(
+            posted_by_user_id,
+            completed=True,
+            newest_first=True,
+            # the full post item is needed to build its summary
+            projection_expression=None if self.denormalize_items else self.dynamo.post_projection_expression,
+            posted_at_or_before=posted_at_or_before,
+            page_size=page_size,
+        )
+        return itertools.islice(post_item_generator, limit)
+
+    def get_summarizer(self, posted_by_user_id):
+        "Return a function that summarizes posts by `posted_by_user_id`, or None if items are not denormalized"
+        if not self.denormalize_items:
+            return None
+        user_item = self.user_manager.dynamo.get_user(posted_by_user_id) or {}
+        return lambda post_item: self.get_post_summary(post_item, user_item=user_item)
+
     def add_users_posts_to_feed(self, feed_user_id, posted_by_user_id):
-        post_item_generator = self.post_manager.dynamo.generate_posts_by_user(posted_by_user_id, completed=True)
-        self.dynamo.add_posts_to_feed(feed_user_id, post_item_generator)
+        "Add the most recent posts of `posted_by_user_id` to the feed of `feed_user_id`, and trim that feed"
+        self.dynamo.add_posts_to_feed(
+            feed_user_id,
+            self.generate_recent_posts(posted_by_user_id, self.backfill_post_count),
+            summarize=self.get_summarizer(posted_by_user_id),
+        )
+        self.trim_feed(feed_user_id)
+
+    def trim_feed(self, feed_user_id):
+        "Trim the feed down to its most recent items, if it has grown past that. Returns count of items deleted."
+        if not self.dynamo.has_more_items_than(feed_user_id, self.max_item_count):
+            return 0
+        return self.dynamo.trim(feed_user_id, self.max_item_count)
+
+    def trim_feeds(self):
+        "Start a job that trims all feeds, one page of users at a time"
+        self.fan_out_manager.enqueue(FanOutJobType.FEED_TRIM)
 
-    def add_post_to_followers_feeds(self, followed_user_id, post_item):
-        user_id_gen = itertools.chain(
-            [followed_user_id], self.follower_manager.generate_follower_user_ids(followed_user_id)
+    def get_fan_in_user_ids(self, feed_user_id):
+        "Return the ids of users followed by `feed_user_id` whose posts are merged into their feed on read"
+
+        def getter():
+            followed_user_ids = list(
+                self.follower_manager.generate_followed_user_ids(
+                    feed_user_id, follow_status=FollowStatus.FOLLOWING
+                )
+            )
+            follower_counts = self.user_manager.dynamo.batch_get_follower_counts(followed_user_ids)
+            return [uid for uid, count in follower_counts.items() if count > self.fan_out_max_follower_count]
+
+        return self.fan_in_user_ids_cache.get_or_set(feed_user_id, getter)
+
+    def get_fan_in_posts(self, posted_by_user_id):
+        "Return the most recent completed posts by `posted_by_user_id`, in feed item format"
+        count = self.fan_in_post_count
+        return self.fan_in_posts_cache.get_or_set(
+            posted_by_user_id,
+            lambda: list(itertools.islice(self.generate_fan_in_posts(posted_by_user_id, page_size=count), count)),
+        )
+
+    def generate_fan_in_posts(self, posted_by_user_id, posted_at_or_before=None, page_size=None):
+        "Generate the completed posts by `posted_by_user_id` newest first, in feed item format"
+        summarize = self.get_summarizer(posted_by_user_id)
+        post_item_generator = self.generate_recent_posts(
+            posted_by_user_id, posted_at_or_before=posted_at_or_before, page_size=page_size
+        )
+        return (
+            self.dynamo.item(None, post_item, summary=summarize(post_item) if summarize else None)
+            for post_item in post_item_generator
         )
-        return self.dynamo.add_post_to_feeds(user_id_gen, post_item)
+
+    def get_feed(self, feed_user_id, limit=20, next_token=None):
+        """
+        Return a page of the user's feed, newest first, in the form {'items': [post_id, ...], 'nextToken': ...}.
+        Merges the materialized feed with the recent posts of followed users whose posts are not fanned out.
+        """
+        paginated = self.get_feed_items(feed_user_id, limit=limit, next_token=next_token)
+        paginated['items'] = [item['postId'] for item in paginated['items']]
+        return paginated
+
+    def get_feed_entries(self, feed_user_id, limit=20, next_token=None):
+        "Return a page of the user's feed, as in `get_feed()`, but with each item serialized as a feed entry"
+        paginated = self.get_feed_items(feed_user_id, limit=limit, next_token=next_token)
+        paginated['items'] = [self.serialize_feed_entry(item) for item in self.summarize(paginated['items'])]
+        return paginated
+
+    def summarize(self, feed_items):
+        """
+        Return the feed items with a post summary on each. Items that were written without one are
+        summarized from their source posts, images and authors, which are read in one batch of each.
+        """
+        post_ids = [item['postId'] for item in feed_items if 'postType' not in item]
+        if not post_ids:
+            return feed_items
+        post_items = {item['postId']: item for item in self.post_manager.dynamo.batch_get_posts(post_ids)}
+        user_items = {
+            item['userId']: item
+            for item in self.user_manager.dynamo.batch_get_users(
+                post_item['postedByUserId'] for post_item in post_items.values()
+            )
+        }
+        image_items = self.post_manager.image_dynamo.batch_get(
+            post_id for post_id, post_item in post_items.items() if post_item['postType'] != PostType.TEXT_ONLY
+        )
+        summarized_items = []
+        for feed_item in feed_items:
+            post_item = post_items.get(feed_item['postId']) if 'postType' not in feed_item else None
+            if post_item:
+                summary = self.get_post_summary(
+                    post_item,
+                    user_item=user_items.get(post_item['postedByUserId'], {}),
+                    image_item=image_items.get(post_item['postId'], {}),
+                )
+                feed_item = self.dynamo.item(feed_item['feedUserId'], feed_item, summary=summary)
+            summarized_items.append(feed_item)
+        return summarized_items
+
+    def serialize_feed_entry(self, feed_item):
+        "Serialize a feed item for rendering, using the post summary stored on it"
+        entry = {
+            k: feed_item.get(k)
+            for k in ('postId', 'postedAt', 'postedByUserId', 'postType', 'textPreview', 'postedByUsername')
+        }
+        entry['image'] = None
+        if feed_item.get('postType') not in (None, PostType.TEXT_ONLY):
+            post = self.post_manager.init_post(feed_item)
+            entry['image'] = {
+                'url': post.get_image_readonly_url(image_size.NATIVE),
+                'url64p': post.get_image_readonly_url(image_size.P64),
+                'url480p': post.get_image_readonly_url(image_size.P480),
+                'url1080p': post.get_image_readonly_url(image_size.P1080),
+                'url4k': post.get_image_readonly_url(image_size.K4),
+                'height': feed_item.get('imageHeight'),
+                'width': feed_item.get('imageWidth'),
+                'colors': feed_item.get('imageColors'),
+            }
+        entry['postedByPhoto'] = None
+        if photo_post_id := feed_item.get('postedByPhotoPostId'):
+            user = self.user_manager.init_user(
+                {'userId': feed_item['postedByUserId'], 'photoPostId': photo_post_id}
+            )
+            entry['postedByPhoto'] = {
+                'url': user.get_photo_url(image_size.NATIVE),
+                'url64p': user.get_photo_url(image_size.P64),
+                'url480p': user.get_photo_url(image_size.P480),
+                'url1080p': user.get_photo_url(image_size.P1080),
+                'url4k': user.get_photo_url(image_size.K4),
+            }
+        return entry
+
+    @staticmethod
+    def page_after_cursor(feed_items, limit, cursor=None):
+        """
+        Return up to `limit` of the feed items, which must be generated newest first, that come after `cursor`
+        in (postedAt, postId) descending order, in that order. Items that share a postedAt may be generated
+        in any order, so all of those sharing the postedAt of the last item are read before the page is cut.
+        """
+        page = []
+        for item in feed_items:
+            if cursor and (item['postedAt'], item['postId']) >= cursor:
+                continue
+            if len(page) >= limit and item['postedAt'] != page[-1]['postedAt']:
+                break
+            page.append(item)
+        return sorted(page, key=lambda item: (item['postedAt'], item['postId']), reverse=True)[:limit]
+
+    def get_feed_items(self, feed_user_id, limit=20, next_token=None):
+        "Return a page of the user's feed, newest first, in the form {'items': [feed_item, ...], 'nextToken': ...}"
+        client = self.dynamo.feed_client
+        cursor = None
+        if next_token:
+            token = client.decode_pagination_token(next_token)
+            # tokens without a postId skip everything at their postedAt, as they did before postId was added
+            cursor = (token['postedAt'], token.get('postId', ''))
+        posted_at_or_before = cursor[0] if cursor else None
+
+        # one past the limit is usually enough to know the last postedAt of a page isn't shared
+        feed_items = self.page_after_cursor(
+            self.dynamo.generate_recent_items(feed_user_id, posted_at_or_before, page_size=limit + 1),
+            limit,
+            cursor,
+        )
+        for user_id in self.get_fan_in_user_ids(feed_user_id):
+            if cursor is None and limit < self.fan_in_post_count:
+                posts = self.get_fan_in_posts(user_id)
+            else:
+                posts = self.generate_fan_in_posts(user_id, posted_at_or_before, page_size=limit + 1)
+            feed_items.extend(self.page_after_cursor(posts, limit, cursor))
+
+        feed_items_by_post_id = {item['postId']: item for item in feed_items}
+        feed_items = sorted(
+            feed_items_by_post_id.values(), key=lambda item: (item['postedAt'], item['postId']), reverse=True
+        )[:limit]
+
+        paginated = {'items': feed_items, 'nextToken': None}
+        if len(feed_items) == limit:
+            last_item = feed_items[-1]
+            paginated['nextToken'] = client.encode_pagination_token(
+                {'postedAt': last_item['postedAt'], 'postId': last_item['postId']}
+            )
+        return paginated
 
     def on_user_follow_status_change_sync_feed(self, followed_user_id, new_item=None, old_item=None):
         follower_user_id = (new_item or old_item)['followerUserId']
@@ -41,14 +321,43 @@ class FeedManager:
             self.add_users_posts_to_feed(follower_user_id, followed_user_id)
         else:
             self.dynamo.delete_by_post_owner(follower_user_id, followed_user_id)
-        self.appsync_client.fire_notification(follower_user_id, GqlNotificationType.USER_FEED_CHANGED)
+        self.notify_feed_changed(follower_user_id)
 
     def on_post_status_change_sync_feed(self, post_id, new_item=None, old_item=None):
         posted_by_user_id = (new_item or old_item)['postedByUserId']
         new_status = (new_item or {}).get('postStatus')
         if new_status == PostStatus.COMPLETED:
-            feed_user_ids = self.add_post_to_followers_feeds(posted_by_user_id, new_item)
-        else:
-            feed_user_ids = self.dynamo.delete_by_post(post_id)
-        for user_id in feed_user_ids:
-            self.appsync_client.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED)
+            if self.is_fanned_out(posted_by_user_id):
+                self.fan_out_manager.enqueue(
+                    FanOutJobType.FEED_ADD_POST, postId=post_id, postedByUserId=posted_by_user_id
+                )
+            else:
+                # followers pick the post up when they next read their feed
+                summary = self.get_post_summary(new_item) if self.denormalize_items else None
+                self.dynamo.add_post_to_feeds([posted_by_user_id], new_item, summary=summary)
+                self.notify_feed_changed(posted_by_user_id)
+        elif (old_item or {}).get('postStatus') == PostStatus.COMPLETED:
+            # only a post that was completed can be in feeds
+            self.fan_out_manager.enqueue(
+                FanOutJobType.FEED_DELETE_POST, postId=post_id, postedByUserId=posted_by_user_id
+            )
+
+    def on_post_text_change_sync_feed_summaries(self, post_id, new_item, old_item=None):
+        if self.denormalize_items:
+            self.sync_feed_summaries(new_item)
+
+    def on_post_image_change_sync_feed_summaries(self, post_id, new_item, old_item=None):
+        if self.denormalize_items:
+            self.sync_feed_summaries(self.post_manager.dynamo.get_post(post_id))
+
+    def on_user_change_sync_feed_summaries(self, user_id, new_item, old_item=None):
+        if self.denormalize_items:
+            self.fan_out_manager.enqueue(FanOutJobType.FEED_UPDATE_USER_POSTS, postedByUserId=user_id)
+
+    def sync_feed_summaries(self, post_item):
+        "Rewrite the summaries stored on the feed items of the post, if it is in feeds"
+        if not post_item or post_item['postStatus'] != PostStatus.COMPLETED:
+            return
+        self.fan_out_manager.enqueue(
+            FanOutJobType.FEED_UPDATE_POST, postId=post_item['postId'], postedByUserId=post_item['postedByUserId']
+        )
@@ -85,3 +85,15 @@ class FollowerDynamo:
         if keys_only:
             query_kwargs['ProjectionExpression'] = 'partitionKey, sortKey'
         return self.client.generate_all_query(query_kwargs)
+
+    def query_follower_items(self, user_id, follow_status=None, limit=None, next_token=None):
+        "Return a page of items that represent a follower of the given user, along with a pagination token"
+        key_conditions = [Key('gsiA2PartitionKey').eq(f'followed/{user_id}')]
+        if follow_status is not None:
+            key_conditions.append(Key('gsiA2SortKey').begins_with(follow_status + '/'))
+        query_kwargs = {
+            'KeyConditionExpression': functools.reduce(lambda a, b: a & b, key_conditions),
+            'IndexName': 'GSI-A2',
+            'ProjectionExpression': 'followerUserId',
+        }
+        return self.client.query(query_kwargs, limit=limit, next_token=next_token)
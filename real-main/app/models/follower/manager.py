@@ -2,6 +2,7 @@ import logging
 from itertools import chain
 
 from app import models
+from app.models.fan_out.enums import FanOutJobType
 from app.models.user.enums import UserPrivacyStatus, UserStatus
 from app.utils import GqlNotificationType
 
@@ -19,6 +20,7 @@ class FollowerManager:
         managers = managers or {}
         managers['follower'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
+        self.fan_out_manager = managers.get('fan_out') or models.FanOutManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
 
         self.clients = clients
@@ -117,23 +119,33 @@ class FollowerManager:
             None,
         )
 
-        follower_uids_generator = self.generate_follower_user_ids(user_id, follow_status=FollowStatus.FOLLOWING)
         if ffs_prev and not ffs_now:
             # a story was deleted, and there are no more stories to take its place as ffs
-            self.first_story_dynamo.delete_all(follower_uids_generator, user_id)
+            self.fan_out_manager.enqueue(
+                FanOutJobType.FIRST_STORY_DELETE, postId=post_id, postedByUserId=user_id, followingOnly=True
+            )
 
         if not ffs_prev and ffs_now:
             # there was no ffs, but a story was added and can now be ffs
-            self.first_story_dynamo.set_all(follower_uids_generator, ffs_now)
+            self.enqueue_set_first_story(ffs_now)
 
         if ffs_prev and ffs_now:
             if ffs_prev != ffs_now:
                 # the ffs has changed: either different post, or same post but that post changed
-                self.first_story_dynamo.set_all(follower_uids_generator, ffs_now)
+                self.enqueue_set_first_story(ffs_now)
 
         if not ffs_prev and not ffs_now:
             raise AssertionError('Should be unreachable condition')
 
+    def enqueue_set_first_story(self, story):
+        self.fan_out_manager.enqueue(
+            FanOutJobType.FIRST_STORY_SET,
+            postId=story['postId'],
+            postedByUserId=story['postedByUserId'],
+            expiresAt=story['expiresAt'],
+            followingOnly=True,
+        )
+
     def on_first_story_post_id_change_fire_gql_notifications(self, user_id, new_item=None, old_item=None):
         followed_user_id, follower_user_id = self.first_story_dynamo.parse_key(new_item or old_item)
         kwargs = {'followedUserId': followed_user_id}
@@ -1,12 +1,12 @@
+import hashlib
 import imghdr
 import io
 
-import PIL.Image
-import PIL.ImageOps
-import pyheif
-
 from .exceptions import PostException
 
+# exif tag holding the orientation, values above 4 mean the image is stored rotated by 90 degrees
+EXIF_ORIENTATION = 0x0112
+
 
 class CachedImage:
     def __init__(self, post_id, image_size=None, s3_client=None, s3_path=None, source=None, content_type=None):
@@ -24,6 +24,9 @@ class CachedImage:
         self._data = None
         self._image = None
 
+        # md5 hex digest of the data in S3, as of the last refresh or flush
+        self._checksum = None
+
         # Possible values and meanings:
         #   - True: what's in the cache is known to match the source
         #   - False: what's in the cache is thought to be different than the source
@@ -42,7 +45,75 @@ class CachedImage:
             self._fill_image_from_data()
         return self._image
 
+    @property
+    def checksum(self):
+        """
+        The md5 hex digest of the data as last read from or written to S3, the same as the etag of
+        an object S3 received in one part. None if the cache isn't in sync with S3.
+        """
+        return self._checksum if self.is_synced else None
+
+    @property
+    def size(self):
+        "The (width, height) of the image, read from the header of jpeg data rather than decoding it all"
+        if not self._image and not self._data:
+            self.refresh()
+        if self._image or self.content_type != 'image/jpeg':
+            return self.readonly_image.size
+        image = self._open_jpeg()
+        width, height = image.size
+        return (height, width) if image.getexif().get(EXIF_ORIENTATION, 1) > 4 else (width, height)
+
+    def get_image(self, max_dimensions=None):
+        """
+        An image that is at least big enough to be shrunk to fit within `max_dimensions`, decoding
+        jpeg data at a reduced scale when it is at least twice as big (draft mode). Unlike the full-size
+        image, an image decoded at reduced scale isn't cached. Either way, don't mutate what's returned.
+        """
+        if not self._image and not self._data:
+            self.refresh()
+        if self._image or not max_dimensions or self.content_type != 'image/jpeg':
+            return self.readonly_image
+        return self._decode_jpeg(max_dimensions=max_dimensions)
+
+    def _open_jpeg(self):
+        "Open jpeg data lazily: only the header is read until the image is loaded"
+        import PIL.Image
+
+        fh = io.BytesIO(self._data)
+        file_type = imghdr.what(fh)
+        if file_type is None:
+            raise PostException(f'Unable to recognize file type of uploaded file for post `{self.post_id}`')
+        if file_type != 'jpeg' and file_type != 'png':
+            raise PostException(f'File of type `{file_type}` for uploaded jpeg image post `{self.post_id}`')
+        try:
+            return PIL.Image.open(fh)
+        except Exception as err:
+            raise PostException(f'Unable to decode jpeg data for post `{self.post_id}`: {err}') from err
+
+    def _decode_jpeg(self, max_dimensions=None):
+        import PIL.ImageOps
+
+        image = self._open_jpeg()
+        try:
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+            if max_dimensions:
+                # the draft is of the image as stored, before it's rotated upright
+                width, height = max_dimensions
+                image.draft(None, (height, width) if orientation > 4 else (width, height))
+            # exif_transpose() copies the image even if there's nothing to transpose
+            if orientation != 1:
+                image = PIL.ImageOps.exif_transpose(image)
+            image.load()
+        except Exception as err:
+            raise PostException(f'Unable to decode jpeg data for post `{self.post_id}`: {err}') from err
+        return image
+
     def _fill_image_from_data(self):
+        # the imaging libraries are slow to import, and only needed by lambdas that process images
+        import PIL.Image
+        import pyheif
+
         fh = io.BytesIO(self._data)
         if self.content_type == 'image/heic':
             try:
@@ -53,21 +124,14 @@ class CachedImage:
                 heif_file.mode, heif_file.size, heif_file.data, 'raw', heif_file.mode, heif_file.stride
             )
         elif self.content_type == 'image/jpeg':
-            file_type = imghdr.what(fh)
-            if file_type is None:
-                raise PostException(f'Unable to recognize file type of uploaded file for post `{self.post_id}`')
-            if file_type != 'jpeg' and file_type != 'png':
-                raise PostException(f'File of type `{file_type}` for uploaded jpeg image post `{self.post_id}`')
-            try:
-                self._image = PIL.ImageOps.exif_transpose(PIL.Image.open(fh))
-            except Exception as err:
-                raise PostException(f'Unable to decode jpeg data for post `{self.post_id}`: {err}') from err
+            self._image = self._decode_jpeg()
         else:
             raise PostException(f'Unrecognized content-type `{self.content_type}`')
 
-    def set_image(self, image):
+    def set_image(self, image, copy=True):
+        "Pass copy=False to hand over an image that won't be mutated elsewhere, saving a copy"
         self._data = None
-        self._image = image.copy()
+        self._image = image.copy() if copy else image
         self.is_synced = False
         return self
 
@@ -89,6 +153,7 @@ class CachedImage:
         if self.source:
             self._data = None
             self._image = self.source()
+            self._checksum = None
         else:
             try:
                 fh = self.s3_client.get_object_data_stream(self.s3_path)
@@ -96,6 +161,7 @@ class CachedImage:
                 raise PostException(f'{self.s3_path} image data not found for post `{self.post_id}`') from err
             self._data = fh.read()
             self._image = None
+            self._checksum = hashlib.md5(self._data).hexdigest()
         self.is_synced = True
         return self
 
@@ -121,7 +187,12 @@ class CachedImage:
         self.is_synced = False
         return self
 
-    def flush(self, include_deletes=False):
+    def flush(self, include_deletes=False, upload_pool=None):
+        """
+        Write the cache back to S3, noting the checksum of the data written. If an UploadPool is passed,
+        the image is encoded here but the upload is left to the pool, and any failure to upload is raised
+        when the pool is joined.
+        """
         assert self.s3_path, 'Can only flush cached images backed by S3'
         if self.is_synced is None:
             raise Exception('Nothing to flush back')
@@ -130,6 +201,7 @@ class CachedImage:
                 if not include_deletes:
                     raise Exception('Refusing to flush back empty cache without `include_deletes` kwarg')
                 self.s3_client.delete_object(self.s3_path)
+                self._checksum = None
             else:
                 if self._data:
                     fh = io.BytesIO(self._data)
@@ -147,11 +219,18 @@ class CachedImage:
                         }.items()
                         if v is not None
                     }
+                    # convert() copies the image, even if it's already RGB
+                    image = self._image if self._image.mode == 'RGB' else self._image.convert('RGB')
                     try:
-                        self._image.convert('RGB').save(fh, **kwargs)
+                        image.save(fh, **kwargs)
                     except Exception as err:
                         raise PostException(f'Unable to save pil image for post `{self.post_id}`: {err}') from err
                     fh.seek(0)
-                self.s3_client.put_object(self.s3_path, fh, self.content_type)
+                with fh.getbuffer() as buf:
+                    self._checksum = hashlib.md5(buf).hexdigest()
+                if upload_pool:
+                    upload_pool.submit(self.s3_client.put_object, self.s3_path, fh, self.content_type)
+                else:
+                    self.s3_client.put_object(self.s3_path, fh, self.content_type)
             self.is_synced = True
         return self
@@ -4,6 +4,7 @@ import logging
 
 import pendulum
 from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer
 
 from app.models.post.enums import PostStatus
 
@@ -11,6 +12,8 @@ from .. import enums
 
 logger = logging.getLogger()
 
+deserialize = TypeDeserializer().deserialize
+
 
 class PostDynamo:
     def __init__(self, dynamo_client):
@@ -22,9 +25,25 @@ class PostDynamo:
             'sortKey': '-',
         }
 
+    def typed_pk(self, post_id):
+        return {
+            'partitionKey': {'S': f'post/{post_id}'},
+            'sortKey': {'S': '-'},
+        }
+
     def get_post(self, post_id, strongly_consistent=False):
         return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent)
 
+    def batch_get_posts(self, post_ids):
+        "Return the items of the posts that exist, in no particular order"
+        # dynamo can't handle duplicates
+        typed_keys = [self.typed_pk(post_id) for post_id in set(post_ids)]
+        post_items = []
+        for i in range(0, len(typed_keys), 100):
+            for typed_item in self.client.batch_get_items(typed_keys[i : i + 100]):
+                post_items.append({k: deserialize(v) for k, v in typed_item.items()})
+        return post_items
+
     def delete_post(self, post_id):
         return self.client.delete_item(self.pk(post_id))
 
@@ -40,16 +59,56 @@ class PostDynamo:
             query_kwargs['FilterExpression'] = Attr('postId').ne(exclude_post_id)
         return next(self.client.generate_all_query(query_kwargs), None)
 
-    def generate_posts_by_user(self, user_id, completed=None):
+    def generate_posts_by_user(
+        self,
+        user_id,
+        completed=None,
+        newest_first=False,
+        projection_expression=None,
+        posted_at_or_before=None,
+        page_size=None,
+    ):
+        """
+        Completed posts are generated in postedAt order, set `newest_first` to reverse that order.
+        With `completed`, `posted_at_or_before` restricts to those posted at or before that point in time.
+        """
+        query_kwargs = self.posts_by_user_query_kwargs(
+            user_id, completed, newest_first, projection_expression, posted_at_or_before=posted_at_or_before
+        )
+        if page_size:
+            query_kwargs['Limit'] = page_size
+        return self.client.generate_all_query(query_kwargs)
+
+    def query_posts_by_user(
+        self, user_id, completed=None, projection_expression=None, limit=None, next_token=None
+    ):
+        "Return a page of the posts of `generate_posts_by_user()`, in the form {'items': [...], 'nextToken': ...}"
+        query_kwargs = self.posts_by_user_query_kwargs(user_id, completed, False, projection_expression)
+        return self.client.query(query_kwargs, limit=limit, next_token=next_token)
+
+    def posts_by_user_query_kwargs(
+        self, user_id, completed, newest_first, projection_expression, posted_at_or_before=None
+    ):
+        assert completed is True or not posted_at_or_before, 'Only completed posts can be restricted by postedAt'
+        key_exp = Key('gsiA2PartitionKey').eq(f'post/{user_id}')
+        if completed is True:
+            # the sort key is '{postStatus}/{postedAt}', so no need for a filter expression
+            prefix = f'{PostStatus.COMPLETED}/'
+            if posted_at_or_before:
+                key_exp &= Key('gsiA2SortKey').between(prefix, prefix + posted_at_or_before)
+            else:
+                key_exp &= Key('gsiA2SortKey').begins_with(prefix)
         query_kwargs = {
-            'KeyConditionExpression': Key('gsiA2PartitionKey').eq(f'post/{user_id}'),
+            'KeyConditionExpression': key_exp,
             'IndexName': 'GSI-A2',
         }
-        if completed is not None:
-            filter_exp = Attr('postStatus')
-            filter_exp = filter_exp.eq if completed else filter_exp.ne
-            query_kwargs['FilterExpression'] = filter_exp(PostStatus.COMPLETED)
-        return self.client.generate_all_query(query_kwargs)
+        if completed is False:
+            query_kwargs['FilterExpression'] = Attr('postStatus').ne(PostStatus.COMPLETED)
+        if newest_first:
+            query_kwargs['ScanIndexForward'] = False
+        if projection_expression:
+            query_kwargs['ProjectionExpression'] = projection_expression
+        return query_kwargs
 
     def generate_expired_post_pks_by_day(self, date, cut_off_time=None):
         key_conditions = [Key('gsiK1PartitionKey').eq(f'post/{date}')]
@@ -1,7 +1,11 @@
 import logging
 
+from boto3.dynamodb.types import TypeDeserializer
+
 logger = logging.getLogger()
 
+deserialize = TypeDeserializer().deserialize
+
 
 class PostImageDynamo:
 
@@ -13,9 +17,23 @@ class PostImageDynamo:
     def pk(self, post_id):
         return {'partitionKey': f'post/{post_id}', 'sortKey': 'image'}
 
+    def typed_pk(self, post_id):
+        return {'partitionKey': {'S': f'post/{post_id}'}, 'sortKey': {'S': 'image'}}
+
     def get(self, post_id, strongly_consistent=False):
         return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent)
 
+    def batch_get(self, post_ids):
+        "Return a dict mapping post_id to the image item, for the posts that have one"
+        # dynamo can't handle duplicates
+        typed_keys = [self.typed_pk(post_id) for post_id in set(post_ids)]
+        image_items = {}
+        for i in range(0, len(typed_keys), 100):
+            for typed_item in self.client.batch_get_items(typed_keys[i : i + 100]):
+                image_item = {k: deserialize(v) for k, v in typed_item.items()}
+                image_items[image_item['partitionKey'].split('/')[1]] = image_item
+        return image_items
+
     def delete(self, post_id):
         return self.client.delete_item(self.pk(post_id))
 
@@ -0,0 +1,52 @@
+import bisect
+import heapq
+import itertools
+
+
+class KeywordIndex:
+    """
+    An in-memory index of keywords for prefix (autocomplete) searches, ranked by popularity.
+
+    Keywords are held in one array sorted by their lowercased form, so the keywords matching a prefix
+    are a contiguous slice found by bisection. The most popular matches of the shortest prefixes, which
+    have the longest slices, are worked out ahead of time.
+    """
+
+    # prefixes up to this length have their top matches precomputed
+    precomputed_prefix_length = 2
+
+    # number of matches precomputed for each of those prefixes
+    precomputed_limit = 20
+
+    def __init__(self, keyword_counts, version=None):
+        "`keyword_counts` should be an iterable of (keyword, count) pairs"
+        entries = sorted((keyword.lower(), keyword, count) for keyword, count in keyword_counts)
+        self.version = version
+        self.keys = [key for key, _, _ in entries]
+        self.keywords = [keyword for _, keyword, _ in entries]
+        self.counts = [count for _, _, count in entries]
+        self.top_matches = {}
+        for length in range(1, self.precomputed_prefix_length + 1):
+            prefix_keys = [key[:length] for key in self.keys]
+            for prefix, group in itertools.groupby(range(len(self.keys)), key=prefix_keys.__getitem__):
+                self.top_matches[prefix] = self.rank(group, self.precomputed_limit)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rank(self, indexes, limit):
+        "The keywords at `indexes`, most popular first"
+        top = heapq.nsmallest(limit, indexes, key=lambda i: (-self.counts[i], self.keys[i]))
+        return [self.keywords[i] for i in top]
+
+    def search(self, prefix, limit=20):
+        "Return up to `limit` distinct keywords starting with `prefix`, most popular first"
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if len(prefix) <= self.precomputed_prefix_length and limit <= self.precomputed_limit:
+            return self.top_matches.get(prefix, [])[:limit]
+        start = bisect.bisect_left(self.keys, prefix)
+        # every key starting with the prefix sorts before the prefix followed by the highest code point
+        end = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo=start)
+        return self.rank(range(start, end), limit)
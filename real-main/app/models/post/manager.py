@@ -1,5 +1,6 @@
 import collections
 import itertools
+import json
 import logging
 
 import pendulum
@@ -17,6 +18,7 @@ from .appsync import PostAppSync
 from .dynamo import PostDynamo, PostImageDynamo, PostOriginalMetadataDynamo
 from .enums import PostStatus, PostType
 from .exceptions import PostException
+from .keyword_index import KeywordIndex
 from .model import Post
 
 logger = logging.getLogger()
@@ -26,6 +28,12 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
 
     item_type = 'post'
 
+    # where the snapshot of keywords used for keyword autocomplete is kept in the uploads bucket
+    keyword_snapshot_path = 'keywords/snapshot.json'
+
+    # min number of seconds between checks for a newer keyword snapshot
+    keyword_snapshot_check_interval = 300
+
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
         managers = managers or {}
@@ -47,6 +55,10 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             self.image_dynamo = PostImageDynamo(clients['dynamo'])
             self.original_metadata_dynamo = PostOriginalMetadataDynamo(clients['dynamo'])
 
+        # loaded lazily from the keyword snapshot, and kept for the life of the container
+        self.keyword_index = None
+        self.keyword_index_checked_at = None
+
     def get_model(self, item_id, strongly_consistent=False):
         return self.get_post(item_id, strongly_consistent=strongly_consistent)
 
@@ -54,6 +66,11 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         post_item = self.dynamo.get_post(post_id, strongly_consistent=strongly_consistent)
         return self.init_post(post_item) if post_item else None
 
+    def get_posts(self, post_ids):
+        "Return the posts in the order of `post_ids`, fetched in batches. Posts that do not exist are left out."
+        post_items = {item['postId']: item for item in self.dynamo.batch_get_posts(post_ids)}
+        return [self.init_post(post_items[post_id]) for post_id in post_ids if post_id in post_items]
+
     def init_post(self, post_item):
         kwargs = {
             'post_appsync': getattr(self, 'appsync', None),
@@ -251,46 +268,39 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             post_item = self.dynamo.client.get_item(post_pk)
             self.init_post(post_item).delete()
 
-    def find_posts(self, keywords, limit, next_token):
+    def find_posts(self, keywords, limit, next_token=None):
         query = {
-            'from': next_token,
-            'size': limit,
-            'query': {
-                'bool': {
-                    'should': [
-                        {'match_bool_prefix': {'keywords': {'query': keywords, 'boost': 2}}},
-                        {'match': {'keywords': {'query': keywords, 'boost': 2}}},
-                    ],
-                }
-            },
+            'bool': {
+                'should': [
+                    {'match_bool_prefix': {'keywords': {'query': keywords, 'boost': 2}}},
+                    {'match': {'keywords': {'query': keywords, 'boost': 2}}},
+                ],
+            }
         }
-        search_result = self.elasticsearch_client.query_posts(query)
+        paginated = self.elasticsearch_client.paginated_search(
+            'posts', query, 'postId.keyword', limit, next_token
+        )
         post_id_to_trending_score = {}
-        sorted_post_ids = []
 
-        for hit in search_result['hits']['hits']:
+        for hit in paginated['hits']:
             source = hit.get('_source')
             if source is not None:
                 post_id = source['postId']
                 trending_score = self.get_post(source['postId']).trending_score
                 post_id_to_trending_score[post_id] = trending_score
 
-        if post_id_to_trending_score:
-            # sort post ids by trending weight
-            sorted_post_ids = sorted(post_id_to_trending_score, key=post_id_to_trending_score.get, reverse=True)
-
-            available_total = search_result['hits']['total']['value']
-            next_covers_to = len(search_result['hits']['hits']) + int(next_token)
-
-            if available_total > next_covers_to:
-                next_token = next_covers_to
-
+        # sort post ids by trending weight
+        sorted_post_ids = sorted(post_id_to_trending_score, key=post_id_to_trending_score.get, reverse=True)
         return {
-            'nextToken': str(next_token),
+            'nextToken': paginated['nextToken'],
             'items': sorted_post_ids,
         }
 
-    def search_keywords(self, keyword):
+    def search_keywords(self, keyword, now=None):
+        keyword_index = self.get_keyword_index(now=now)
+        if keyword_index is not None:
+            return keyword_index.search(keyword, limit=20)
+
         query = {
             'size': 20,
             'query': {
@@ -312,6 +322,43 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
 
         return list(set(keywords))
 
+    def get_keyword_index(self, now=None):
+        "Return the keyword index, loading the latest snapshot if there is a newer one. None if unavailable."
+        now = now or pendulum.now('utc')
+        checked_at = self.keyword_index_checked_at
+        if checked_at and (now - checked_at).total_seconds() < self.keyword_snapshot_check_interval:
+            return self.keyword_index
+        self.keyword_index_checked_at = now
+
+        s3_client = self.clients.get('s3_uploads')
+        if not s3_client:
+            return self.keyword_index
+        try:
+            version = s3_client.get_object_checksum(self.keyword_snapshot_path)
+            if self.keyword_index is None or self.keyword_index.version != version:
+                data = json.load(s3_client.get_object_data_stream(self.keyword_snapshot_path))
+                self.keyword_index = KeywordIndex(data['keywords'], version=version)
+        except Exception as err:
+            logger.warning(f'Unable to load keyword snapshot: {err}')
+        return self.keyword_index
+
+    def export_keyword_snapshot(self):
+        "Export all keywords, with the number of posts using each, to the snapshot. Returns keyword count."
+        keyword_counts = []
+        composite = {'size': 1000, 'sources': [{'keyword': {'terms': {'field': 'keyword.keyword'}}}]}
+        while True:
+            result = self.elasticsearch_client.search(
+                'keywords', {'size': 0, 'aggs': {'keywords': {'composite': composite}}}
+            )
+            agg = result['aggregations']['keywords']
+            keyword_counts.extend((bucket['key']['keyword'], bucket['doc_count']) for bucket in agg['buckets'])
+            if not agg['buckets'] or 'after_key' not in agg:
+                break
+            composite['after'] = agg['after_key']
+        body = json.dumps({'keywords': keyword_counts}).encode()
+        self.clients['s3_uploads'].put_object(self.keyword_snapshot_path, body, 'application/json')
+        return len(keyword_counts)
+
     def on_user_delete_delete_all_by_user(self, user_id, old_item):
         for post_item in self.dynamo.generate_posts_by_user(user_id):
             self.init_post(post_item).delete()
@@ -466,19 +513,18 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
                 post.user.trending_increment_score(**trending_kwargs)
 
     def on_post_delete(self, post_id, old_item):
-        self.elasticsearch_client.delete_post(post_id)
-        # remove old keywords
-        keywords = old_item.get('keywords', [])
-        for k in keywords:
-            self.elasticsearch_client.delete_keyword(post_id, k)
+        self.elasticsearch_client.queue_delete_post(post_id)
+        for keyword in old_item.get('keywords') or []:
+            self.elasticsearch_client.queue_delete_keyword(post_id, keyword)
 
     def sync_elasticsearch(self, post_id, new_item, old_item=None):
-        self.elasticsearch_client.put_post(post_id, new_item['keywords'])
-        # remove old keywords
-        if old_item is not None and old_item['keywords'] is not None:
-            for k in old_item['keywords']:
-                self.elasticsearch_client.delete_keyword(post_id, k)
-        # add new keywords
-        keywords = new_item.get('keywords', [])
-        for k in keywords:
-            self.elasticsearch_client.put_keyword(post_id, k)
+        new_keywords = new_item.get('keywords') or []
+        old_keywords = (old_item or {}).get('keywords') or []
+        self.elasticsearch_client.queue_put_post(post_id, new_keywords)
+        # keywords the post had both before and after are left alone
+        for keyword in old_keywords:
+            if keyword not in new_keywords:
+                self.elasticsearch_client.queue_delete_keyword(post_id, keyword)
+        for keyword in new_keywords:
+            if keyword not in old_keywords:
+                self.elasticsearch_client.queue_put_keyword(post_id, keyword)
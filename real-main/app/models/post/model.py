@@ -2,9 +2,7 @@ import base64
 import io
 import logging
 
-import colorthief
 import pendulum
-import PIL.Image
 
 from app.mixins.flag.model import FlagModelMixin
 from app.mixins.trending.model import TrendingModelMixin
@@ -13,12 +11,13 @@ from app.mixins.view.model import ViewModelMixin
 from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserPrivacyStatus, UserSubscriptionLevel
 from app.models.user.exceptions import UserException
-from app.utils import image_size
+from app.utils import UploadPool, UploadPoolError, image_size
+from app.utils.stage_timer import StageTimer
 
+from . import palette, renditions
 from .cached_image import CachedImage
 from .enums import PostNotificationType, PostStatus, PostType
 from .exceptions import PostException
-from .text_image import generate_text_image
 
 logger = logging.getLogger()
 
@@ -28,10 +27,8 @@ VIDEO_HLS_PREFIX = 'video-hls/video'
 VIDEO_POSTER_PREFIX = 'video-poster/poster'
 IMAGE_DIR = 'image'
 
-
-class ColorThiefFromImage(colorthief.ColorThief):
-    def __init__(self, image):
-        self.image = image
+# rendered images of the text of text-only posts, shared by all posts with the same text
+TEXT_IMAGE_DIR = 'text-image'
 
 
 class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
@@ -102,11 +99,9 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         # lazy caches
         if self.type == PostType.TEXT_ONLY:
             text = self.item['text']
-            self.k4_jpeg_cache = CachedImage(
-                self.id, source=lambda: generate_text_image(text, image_size.K4.max_dimensions)
-            )
+            self.k4_jpeg_cache = CachedImage(self.id, source=lambda: self.get_text_image(text, image_size.K4))
             self.p1080_jpeg_cache = CachedImage(
-                self.id, source=lambda: generate_text_image(text, image_size.P1080.max_dimensions)
+                self.id, source=lambda: self.get_text_image(text, image_size.P1080)
             )
         elif s3_uploads_client:
             self.native_heic_cache = CachedImage(
@@ -236,7 +231,7 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
 
     def get_image_readonly_url(self, size):
         path = self.get_image_path(size)
-        return self.cloudfront_client.generate_presigned_url(path, ['GET', 'HEAD'])
+        return self.cloudfront_client.generate_presigned_readonly_url(path)
 
     def get_image_writeonly_url(self):
         assert self.type == PostType.IMAGE
@@ -249,16 +244,72 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         resp['postedBy'] = self.user_manager.get_user(self.user_id).serialize(caller_user_id)
         return resp
 
+    def generate_text_image(self, text, size):
+        # imported here to keep PIL out of lambdas that never render text
+        from .text_image import generate_text_image
+
+        return generate_text_image(text, size.max_dimensions)
+
+    def get_text_image(self, text, size):
+        """
+        The image of `text` at `size`, read from S3 if it's been rendered before, else rendered and saved there.
+        If it can't be read from S3 for any other reason, it's rendered without being saved.
+        """
+        import PIL.Image
+
+        from .text_image import get_text_image_key
+
+        s3_client = getattr(self, 's3_uploads_client', None)
+        if not s3_client:
+            return self.generate_text_image(text, size)
+
+        path = f'{TEXT_IMAGE_DIR}/{get_text_image_key(text)}/{size.filename}'
+        try:
+            fh = s3_client.get_object_data_stream(path)
+            image = PIL.Image.open(io.BytesIO(fh.read()))
+            image.load()
+            return image
+        except s3_client.exceptions.NoSuchKey:
+            pass
+        except Exception as err:
+            logger.warning(f'Unable to read text image of post `{self.id}` from `{path}`: {err}')
+            return self.generate_text_image(text, size)
+
+        image = self.generate_text_image(text, size)
+        buf = io.BytesIO()
+        image.save(buf, format='JPEG', quality=100)
+        try:
+            s3_client.put_object(path, buf.getvalue(), size.content_type)
+        except Exception as err:
+            logger.warning(f'Unable to save text image of post `{self.id}` to `{path}`: {err}')
+        return image
+
     def build_image_thumbnails(self):
-        image = self.native_jpeg_cache.readonly_image.copy()
-        # ordered by decreasing size
-        for cache in (self.k4_jpeg_cache, self.p1080_jpeg_cache, self.p480_jpeg_cache, self.p64_jpeg_cache):
-            try:
-                image.thumbnail(cache.image_size.max_dimensions, resample=PIL.Image.LANCZOS)
-            except Exception as err:
-                raise PostException(f'Unable to thumbnail image as jpeg for post `{self.id}`: {err}') from err
-            cache.set_image(image)
-            cache.flush()
+        """
+        Build and upload the thumbnails, each resized from the one before it.
+
+        The native image is decoded at a reduced scale only if it is at least twice the size of 4K, as jpeg
+        draft mode can't reduce by less than that. Phone photos (12 and 24 megapixels) aren't, so they are
+        decoded at full size. That decode is let go of as soon as the 4K thumbnail has been built from it.
+        """
+        # no reference to the native image is kept here, so once the generator has moved on from it, it's freed
+        thumbnails = renditions.build_renditions(
+            self.native_jpeg_cache.get_image(max_dimensions=image_size.K4.max_dimensions),
+            image_size.THUMBNAILS,
+            post_id=self.id,
+        )
+        caches = {
+            image_size.K4: self.k4_jpeg_cache,
+            image_size.P1080: self.p1080_jpeg_cache,
+            image_size.P480: self.p480_jpeg_cache,
+            image_size.P64: self.p64_jpeg_cache,
+        }
+        # each thumbnail is resized and encoded while the one before it is being uploaded
+        with UploadPool(max_workers=len(caches)) as upload_pool:
+            for size, thumbnail in thumbnails:
+                # the renditions are never mutated, so the caches can share them
+                caches[size].set_image(thumbnail, copy=False)
+                caches[size].flush(upload_pool=upload_pool)
 
     def process_image_upload(self, image_data=None, now=None):
         assert self.type == PostType.IMAGE, 'Can only process_image_upload() for IMAGE posts'
@@ -270,34 +321,106 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
 
         # mark ourselves as processing
         self.item = self.dynamo.set_post_status(self.item, PostStatus.PROCESSING)
+        timer = StageTimer()
 
-        # set up a cached image with the raw data (four different ways to receive the data now)
-        source_cached_image = (
-            self.native_heic_cache if self.image_item.get('imageFormat') == 'HEIC' else self.native_jpeg_cache
-        )
-        if image_data:
-            source_cached_image.set_data(io.BytesIO(base64.b64decode(image_data)))
-
-        if crop := self.image_item.get('crop'):
-            source_cached_image.crop(crop)
-
-        if source_cached_image != self.native_jpeg_cache:
-            self.native_jpeg_cache.set_image(source_cached_image.readonly_image)  # set_image makes a copy
-
-        if self.native_jpeg_cache.is_synced is False:
-            self.native_jpeg_cache.flush()
-
-        if self.native_heic_cache.is_synced is False:
-            # the HEIC image was edited (cropped) but we can't save that as HEIC, so we just delete it
-            self.native_heic_cache.clear()
-            self.native_heic_cache.flush(include_deletes=True)
+        with timer.stage('native'):
+            # set up a cached image with the raw data (four different ways to receive the data now)
+            source_cached_image = (
+                self.native_heic_cache if self.image_item.get('imageFormat') == 'HEIC' else self.native_jpeg_cache
+            )
+            if image_data:
+                source_cached_image.set_data(io.BytesIO(base64.b64decode(image_data)))
+
+            if crop := self.image_item.get('crop'):
+                source_cached_image.crop(crop)
+
+            if source_cached_image != self.native_jpeg_cache:
+                # the HEIC cache never mutates its image, so no need to copy it
+                self.native_jpeg_cache.set_image(source_cached_image.readonly_image, copy=False)
+
+            if self.native_jpeg_cache.is_synced is False:
+                self.native_jpeg_cache.flush()
+
+            if self.native_heic_cache.is_synced is False:
+                # the HEIC image was edited (cropped) but we can't save that as HEIC, so we just delete it
+                self.native_heic_cache.clear()
+                self.native_heic_cache.flush(include_deletes=True)
+
+        with timer.stage('dimensions'):
+            # only the jpeg header is read here. The thumbnails and colors stages each decode the native image
+            # themselves: colors at a small draft scale, so the second decode is cheap compared to holding one
+            # full size decode for both
+            self.set_height_and_width()
+
+        # these only need the native image data, so run concurrently. Their results are then saved to dynamo one
+        # at a time, so the updates of the post's item don't race each other
+        stages = {
+            'thumbnails': self.build_image_thumbnails,
+            'colors': self.get_colors,
+            'verification': self.get_is_verified,
+        }
+        results = {}
+        with timer.stage('duplicate'):
+            # a repost of an image we've already processed can reuse the results, rather than decode it again
+            if (original := self.get_duplicate_original()) and self.copy_image_thumbnails(original):
+                del stages['thumbnails']
+                if (colors := original.image_item.get('colors')) is not None:
+                    results['colors'] = [(color['r'], color['g'], color['b']) for color in colors]
+                    del stages['colors']
+                if (is_verified := self.get_is_verified_of_duplicate(original)) is not None:
+                    results['verification'] = is_verified
+                    del stages['verification']
+        if stages:
+            results.update(timer.run_concurrently(stages))
+        with timer.stage('save'):
+            if results['colors'] is not None:
+                self.set_colors(colors=results['colors'])
+            self.set_is_verified(is_verified=results['verification'])
+            # the native image was read from or written to s3 above, so its checksum is already known
+            self.set_checksum()
+
+        with timer.stage('complete'):
+            self.complete(now=now)
+        logger.info(f'Processed image of post `{self.id}` in {timer.elapsed_ms}ms: {timer.summary()}')
+
+    def get_duplicate_original(self):
+        """
+        The COMPLETED image post with the same native image as ours that was posted first, if there is one.
+        The checksum of the native image must already be known, see get_checksum().
+        """
+        post_id = self.dynamo.get_first_with_checksum(self.get_checksum())
+        if not post_id or post_id == self.id:
+            return None
+        post = self.post_manager.get_post(post_id)
+        if not post or post.type != PostType.IMAGE or post.status != PostStatus.COMPLETED:
+            return None
+        return post
+
+    def copy_image_thumbnails(self, original):
+        "Copy the thumbnails of `original`, server-side in S3. Upon failure, log a WARNING and return False"
+        try:
+            with UploadPool(max_workers=len(image_size.THUMBNAILS)) as upload_pool:
+                for size in image_size.THUMBNAILS:
+                    upload_pool.submit(
+                        self.s3_uploads_client.copy_object,
+                        original.get_image_path(size),
+                        self.get_image_path(size),
+                    )
+        except UploadPoolError as err:
+            logger.warning(f'Unable to copy thumbnails of post `{original.id}` to post `{self.id}`: {err}')
+            return False
+        return True
 
-        self.build_image_thumbnails()
-        self.set_height_and_width()
-        self.set_colors()
-        self.set_is_verified()
-        self.set_checksum()
-        self.complete(now=now)
+    def get_is_verified_of_duplicate(self, original):
+        """
+        The verification result of `original`, if it can stand for ours: the service is told about the
+        image's formats and where it was taken, so those must match too. Else None.
+        """
+        attributes = ('imageFormat', 'originalFormat', 'takenInReal')
+        if any(self.image_item.get(attr) != original.image_item.get(attr) for attr in attributes):
+            return None
+        # the result is hidden behind a visible value of True if the poster chose to hide it
+        return original.item.get('isVerifiedHiddenValue', original.item.get('isVerified'))
 
     def start_processing_video_upload(self):
         assert self.type == PostType.VIDEO, 'Can only process_video_upload() for VIDEO posts'
@@ -342,8 +465,8 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         # Determine the original_post_id, if this post isn't original
         original_post_id = None
         if self.type == PostType.IMAGE:
-            # need strongly consistent because checksum may have been just set
-            checksum = self.refresh_item(strongly_consistent=True).item['checksum']
+            # set_checksum() leaves the checksum in our item, else strongly consistent as it may have just been set
+            checksum = self.item.get('checksum') or self.refresh_item(strongly_consistent=True).item['checksum']
             post_id = self.dynamo.get_first_with_checksum(checksum)
             if post_id and post_id != self.id:
                 original_post_id = post_id
@@ -487,34 +610,56 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return self
 
     def set_height_and_width(self):
-        width, height = self.native_jpeg_cache.readonly_image.size
+        width, height = self.native_jpeg_cache.size
         self._image_item = self.image_dynamo.set_height_and_width(self.id, height, width)
         return self
 
-    def set_colors(self):
+    def get_colors(self):
+        "Extract the palette of the image. Upon failure, log a WARNING and return None"
         try:
-            colors = ColorThiefFromImage(self.native_jpeg_cache.readonly_image).get_palette(color_count=5)
+            # a palette doesn't need every pixel, so the image may be decoded at a reduced scale
+            image = self.native_jpeg_cache.get_image(max_dimensions=palette.DECODE_DIMENSIONS)
+            return palette.get_palette(image, color_count=5)
         except Exception as err:
-            logger.warning(f'ColorTheif failed to get palette with error `{err}` for post `{self.id}`')
-        else:
+            logger.warning(f'Unable to get palette with error `{err}` for post `{self.id}`')
+            return None
+
+    def set_colors(self, colors=None):
+        "Save the palette of the image, extracting it unless `colors` is passed"
+        if colors is None:
+            colors = self.get_colors()
+        if colors is not None:
             self._image_item = self.image_dynamo.set_colors(self.id, colors)
         return self
 
-    def set_checksum(self):
+    def get_checksum(self):
+        "The checksum of the native image, from its cache if in sync with s3, else from s3"
+        if self.type != PostType.TEXT_ONLY and (checksum := self.native_jpeg_cache.checksum):
+            return checksum
         path = self.get_image_path(image_size.NATIVE)
-        checksum = self.s3_uploads_client.get_object_checksum(path)
+        return self.s3_uploads_client.get_object_checksum(path)
+
+    def set_checksum(self, checksum=None):
+        "Save the checksum of the native image, unless `checksum` is passed"
+        if checksum is None:
+            checksum = self.get_checksum()
         self.item = self.dynamo.set_checksum(self.id, self.item['postedAt'], checksum)
         return self
 
-    def set_is_verified(self):
-        path = self.get_image_path(image_size.NATIVE)
-        image_url = self.cloudfront_client.generate_presigned_url(path, ['GET', 'HEAD'])
-        is_verified = self.post_verification_client.verify_image(
+    def get_is_verified(self):
+        "Ask the post verification service if the image is verified"
+        image_url = self.get_image_readonly_url(image_size.NATIVE)
+        return self.post_verification_client.verify_image(
             image_url,
             image_format=self.image_item.get('imageFormat'),
             original_format=self.image_item.get('originalFormat'),
             taken_in_real=self.image_item.get('takenInReal'),
         )
+
+    def set_is_verified(self, is_verified=None):
+        "Save if the image is verified, asking the post verification service unless `is_verified` is passed"
+        if is_verified is None:
+            is_verified = self.get_is_verified()
         hidden = self.item.get('verificationHidden', False)
         self.item = self.dynamo.set_is_verified(self.id, is_verified, hidden=hidden)
         return self
@@ -0,0 +1,63 @@
+"""
+Extraction of an image's dominant colors, its palette.
+
+Like ColorThief, this clusters the colors of a sample of the image's pixels by median cut, ignoring white
+and transparent pixels. Unlike ColorThief, which does that in pure Python, the sampling, filtering and
+clustering are all done by Pillow's C code, and the sample is of a small version of the image.
+"""
+import itertools
+
+from app.utils import image_size
+
+from .renditions import fit_size
+
+# pixels are sampled from the image shrunk to fit within this. Median cut slows quickly with more pixels
+SAMPLE_DIMENSIONS = (100, 100)
+
+# the image need only be decoded at a scale big enough to sample from, see CachedImage.get_image()
+DECODE_DIMENSIONS = image_size.P480.max_dimensions
+
+
+def sample_pixels(image):
+    """
+    Raw RGB bytes of pixels sampled from the image: those of the image shrunk to fit within
+    SAMPLE_DIMENSIONS, skipping those that are mostly transparent or near white.
+    """
+    import PIL.Image
+    import PIL.ImageChops
+
+    # nearest neighbour picks out actual pixels, rather than blending them into colors not in the image
+    size = fit_size(image.size, SAMPLE_DIMENSIONS)
+    sample = (image.resize(size, resample=PIL.Image.NEAREST) if size else image).convert('RGBA')
+    red, green, blue, alpha = sample.split()
+
+    # masks are 255 where the condition holds, else 0
+    red_white, green_white, blue_white = (
+        band.point(lambda v: 255 if v > 250 else 0) for band in (red, green, blue)
+    )
+    white = PIL.ImageChops.multiply(PIL.ImageChops.multiply(red_white, green_white), blue_white)
+    opaque = alpha.point(lambda v: 255 if v >= 125 else 0)
+    keep = PIL.ImageChops.subtract(opaque, white).tobytes()
+
+    rgb = PIL.Image.merge('RGB', (red, green, blue)).tobytes()
+    pixels = zip(rgb[0::3], rgb[1::3], rgb[2::3])
+    return bytes(itertools.chain.from_iterable(itertools.compress(pixels, keep)))
+
+
+def get_palette(image, color_count=5):
+    """
+    Return up to `color_count` of the image's dominant colors as (r, g, b) tuples, most common first.
+    Raises ValueError if the image is all white or transparent.
+    """
+    import PIL.Image
+
+    pixels = sample_pixels(image)
+    if not pixels:
+        raise ValueError('Image has no pixels that are neither white nor transparent')
+    sample = PIL.Image.frombytes('RGB', (len(pixels) // 3, 1), pixels)
+    quantized = sample.quantize(colors=color_count, method=PIL.Image.MEDIANCUT)
+    palette = quantized.getpalette()
+    return [
+        tuple(palette[index * 3 : index * 3 + 3])
+        for count, index in sorted(quantized.getcolors(), key=lambda color: color[0], reverse=True)
+    ]
@@ -0,0 +1,56 @@
+"""
+Downscaled renditions (thumbnails) of a post's image.
+
+Each rendition is resized from the next larger one rather than from the full-size image, so every
+resize after the first works on an image that is already close to its target size.
+"""
+import math
+
+from .exceptions import PostException
+
+
+def fit_size(size, max_dimensions):
+    """
+    The size, preserving aspect ratio, of an image of `size` shrunk to fit within `max_dimensions`,
+    or None if it fits already. Matches the size PIL.Image.thumbnail() would produce.
+    """
+    width, height = size
+    max_width, max_height = max_dimensions
+    if max_width >= width and max_height >= height:
+        return None
+
+    def round_aspect(number, key):
+        return max(min(math.floor(number), math.ceil(number), key=key), 1)
+
+    aspect = width / height
+    if max_width / max_height >= aspect:
+        return round_aspect(max_height * aspect, key=lambda n: abs(aspect - n / max_height)), max_height
+    return max_width, round_aspect(max_width / aspect, key=lambda n: 0 if n == 0 else abs(aspect - max_width / n))
+
+
+def fit_within(image, max_dimensions):
+    """
+    Return a new image shrunk to fit within `max_dimensions`, or the image itself if it fits
+    already. The image passed in is not modified.
+    """
+    import PIL.Image
+
+    size = fit_size(image.size, max_dimensions)
+    if size is None:
+        return image
+    # same resampling as PIL.Image.thumbnail()
+    return image.resize(size, resample=PIL.Image.LANCZOS, reducing_gap=2.0)
+
+
+def build_renditions(image, image_sizes, post_id=None):
+    """
+    Yield (image_size, image) for each of `image_sizes`, which must be ordered by decreasing size.
+    An image yielded may be the same object as the one passed in, or as the previous one yielded,
+    if that already fits, so none should be modified.
+    """
+    for size in image_sizes:
+        try:
+            image = fit_within(image, size.max_dimensions)
+        except Exception as err:
+            raise PostException(f'Unable to thumbnail image as jpeg for post `{post_id}`: {err}') from err
+        yield size, image
@@ -1,3 +1,8 @@
+import bisect
+import functools
+import hashlib
+import io
+import itertools
 import logging
 import os.path
 
@@ -8,6 +13,36 @@ import PIL.ImageFont
 font_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'fonts', 'OpenSans-Regular.ttf')
 logger = logging.getLogger()
 
+# bump to stop using text images rendered before a change to how they're rendered
+TEXT_IMAGE_VERSION = 1
+
+
+def get_text_image_key(text):
+    "A key for the rendered images of `text`, that changes when the rendering does"
+    return f'v{TEXT_IMAGE_VERSION}/' + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def get_font_data():
+    with open(font_path, 'rb') as fh:
+        return fh.read()
+
+
+@functools.lru_cache(maxsize=64)
+def get_font(font_size):
+    return PIL.ImageFont.truetype(io.BytesIO(get_font_data()), size=font_size)
+
+
+@functools.lru_cache(maxsize=1)
+def get_measuring_draw():
+    "Text is measured the same whatever it's drawn on, so measuring needs no more than one pixel"
+    return PIL.ImageDraw.Draw(PIL.Image.new('RGB', (1, 1)))
+
+
+@functools.lru_cache(maxsize=8192)
+def get_text_size(text, font_size):
+    return get_measuring_draw().textsize(text, font=get_font(font_size))
+
 
 def generate_text_image(text, dimensions, font_size=None):
     "Generate an image with text nicely wrapped and centered"
@@ -15,32 +50,24 @@ def generate_text_image(text, dimensions, font_size=None):
 
     image_width, image_height = dimensions
     image_aspect_ratio = image_width / image_height
-    img = PIL.Image.new('RGB', dimensions)
-
     font_size = font_size or image_height // 10
 
-    with open(font_path, 'rb') as fh:
-        font = PIL.ImageFont.truetype(fh, size=font_size)
-
-    # we want our text to match, more or less, the aspect ratio of the overall image
-    draw = PIL.ImageDraw.Draw(img)
-
     # determine how big horizontal and vertical spaces are
-    size_1 = draw.textsize('Z Z', font=font)
-    size_2 = draw.textsize('Z\nZ', font=font)
+    size_1 = get_text_size('Z Z', font_size)
+    size_2 = get_text_size('Z\nZ', font_size)
     token_spacing = size_1[0] - 2 * size_2[0]
     line_height = size_1[1]
     line_spacing = size_2[1] - 2 * size_1[1]
 
     # tokenize then wrap the text so it looks good
+    # we want our text to match, more or less, the aspect ratio of the overall image
     raw_tokens = text.split()
-    token_widths = [draw.textsize(raw_token, font=font)[0] for raw_token in raw_tokens]
+    token_widths = [get_text_size(raw_token, font_size)[0] for raw_token in raw_tokens]
     text, text_width, text_height = rectangle_wrap(
         raw_tokens, token_widths, token_spacing, line_spacing, line_height, image_aspect_ratio
     )
 
     logger.debug(f'Computed text size: ({text_width}, {text_height})')
-    logger.debug(f'Actual text size:   {draw.textsize(text, font=font)}')
 
     # if it's too big to fit in the image, shrink the font size and re-run the algo
     max_text_width = image_width * 0.9
@@ -49,49 +76,28 @@ def generate_text_image(text, dimensions, font_size=None):
         return generate_text_image(text, dimensions, font_size=font_size)
 
     # write out the text in center of the image
+    img = PIL.Image.new('RGB', dimensions)
+    draw = PIL.ImageDraw.Draw(img)
     xy = ((image_width - text_width) / 2, (image_height - text_height) / 2 - line_spacing / 2)
-    draw.text(xy, text, align='center', fill=(255, 255, 255), font=font)
+    draw.text(xy, text, align='center', fill=(255, 255, 255), font=get_font(font_size))
     return img
 
 
-class Token:
-    "A word in a variable-width font"
-
-    def __init__(self, token, token_width):
-        self._token = token
-        self._token_width = token_width
-
-    def __str__(self):
-        return self._token
-
-    def __len__(self):
-        return self._token_width
-
-
-class Line:
-    "A line of text in a variable-width font"
-
-    def __init__(self, tokens, token_spacing):
-        self._tokens = tokens
-        self._token_spacing = token_spacing
-
-    @property
-    def first_token(self):
-        return self._tokens[0] if self._tokens else None
-
-    def pop_first_token(self):
-        return self._tokens.pop(0)
-
-    def append_token(self, token):
-        self._tokens.append(token)
-
-    def __str__(self):
-        return ' '.join(str(t) for t in self._tokens)
-
-    def __len__(self):
-        if not self._tokens:
-            return 0
-        return sum(len(t) for t in self._tokens) + (len(self._tokens) - 1) * self._token_spacing
+def wrap_to_width(offsets, token_spacing, max_width):
+    """
+    Greedily wrap tokens into lines no wider than `max_width`, except that a token wider than that gets a
+    line of its own. `offsets` are the prefix sums of the token widths plus a following space, so the
+    tokens [start, end) are offsets[end] - offsets[start] - token_spacing wide.
+    Returns the lines as a list of (start, end) token indexes.
+    """
+    lines, start, token_cnt = [], 0, len(offsets) - 1
+    while start < token_cnt:
+        # the furthest end that keeps the line within max_width
+        end = bisect.bisect_right(offsets, offsets[start] + max_width + token_spacing, lo=start + 1) - 1
+        end = max(end, start + 1)
+        lines.append((start, end))
+        start = end
+    return lines
 
 
 def rectangle_wrap(raw_tokens, token_widths, token_spacing, line_spacing, line_height, desired_aspect_ratio):
@@ -101,47 +107,33 @@ def rectangle_wrap(raw_tokens, token_widths, token_spacing, line_spacing, line_h
 
     Note that python standard library textwrap module assumes a monospace font, where as this
     utility is designed to work with variable width font.
+
+    The block is the text wrapped to the narrowest width that gives it at least the desired aspect
+    ratio, found by binary search: the wider the text is wrapped, the wider its aspect ratio.
     """
-    tokens = [Token(*args) for args in zip(raw_tokens, token_widths)]
-
-    # start all tokens in separate lines, we will iteratively move tokens up lines
-    lines = [Line([token], token_spacing) for token in tokens]
-    text_width = max(len(line) for line in lines)
-    text_height = len(lines) * line_height + (len(lines) - 1) * line_spacing
-
-    # iteratively flow tokens up the paragraph until we have just passed our desired aspect ratio
-    while (line_cnt := len(lines)) > 1 and text_width / text_height < desired_aspect_ratio:
-
-        # operate until we have shrunk our line cnt
-        while len(lines) == line_cnt:
-
-            # determine what our next text_width needs to be to change the token distribution
-            this_line, next_line = lines[0], lines[1]
-            min_new_text_width = len(this_line) + token_spacing + len(next_line.first_token)
-            line_num_to_grow = 0
-            for i, this_line in enumerate(lines[1:-1]):
-                next_line = lines[i + 2]
-                this_new_text_width = len(this_line) + token_spacing + len(next_line.first_token)
-                if this_new_text_width < min_new_text_width:
-                    min_new_text_width = this_new_text_width
-                    line_num_to_grow = i
-
-            # flow tokens up for subsequent lines
-            line_num = line_num_to_grow
-            while line_num < len(lines) - 1:
-                this_line, next_line = lines[line_num], lines[line_num + 1]
-                if len(next_line) == 0:
-                    lines.pop(line_num + 1)
-                    break
-                new_line_width = len(this_line) + token_spacing + len(next_line.first_token)
-                if new_line_width <= min_new_text_width:
-                    this_line.append_token(next_line.pop_first_token())
-                    continue
-                line_num += 1
-
-        # re-compute our overall size
-        text_width = max(len(line) for line in lines)
+    offsets = [0] + list(itertools.accumulate(width + token_spacing for width in token_widths))
+
+    def layout(lines):
+        text_width = max(offsets[end] - offsets[start] - token_spacing for start, end in lines)
         text_height = len(lines) * line_height + (len(lines) - 1) * line_spacing
+        return lines, text_width, text_height
+
+    def is_wide_enough(lines, text_width, text_height):
+        return text_width / text_height >= desired_aspect_ratio
+
+    # start with all tokens in separate lines, that may be wide enough already
+    narrowest = layout([(i, i + 1) for i in range(len(token_widths))])
+    if not is_wide_enough(*narrowest):
+        # all on one line is as wide as it gets
+        min_width, max_width = max(token_widths), offsets[-1] - token_spacing
+        while min_width < max_width:
+            mid_width = (min_width + max_width) // 2
+            if is_wide_enough(*layout(wrap_to_width(offsets, token_spacing, mid_width))):
+                max_width = mid_width
+            else:
+                min_width = mid_width + 1
+        narrowest = layout(wrap_to_width(offsets, token_spacing, min_width))
 
     # serialize to our rectangle of text
-    return ('\n'.join(str(line) for line in lines), text_width, text_height)
+    lines, text_width, text_height = narrowest
+    return ('\n'.join(' '.join(raw_tokens[start:end]) for start, end in lines), text_width, text_height)
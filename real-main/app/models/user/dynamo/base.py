@@ -4,12 +4,15 @@ from decimal import BasicContext
 
 import pendulum
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
 
 from ..enums import UserDatingStatus, UserPrivacyStatus, UserStatus, UserSubscriptionLevel
 from ..exceptions import UserAlreadyExists, UserAlreadyGrantedSubscription
 
 logger = logging.getLogger()
 
+deserialize = TypeDeserializer().deserialize
+
 
 class UserDynamo:
     def __init__(self, dynamo_client):
@@ -21,12 +24,39 @@ class UserDynamo:
             'sortKey': 'profile',
         }
 
+    def typed_pk(self, user_id):
+        return {
+            'partitionKey': {'S': f'user/{user_id}'},
+            'sortKey': {'S': 'profile'},
+        }
+
     def parse_pk(self, pk):
         return pk['partitionKey'].split('/')[1]
 
     def get_user(self, user_id, strongly_consistent=False):
         return self.client.get_item(self.pk(user_id), ConsistentRead=strongly_consistent)
 
+    def batch_get_users(self, user_ids):
+        "Return the items of the users that exist, in no particular order"
+        # dynamo can't handle duplicates
+        typed_keys = [self.typed_pk(user_id) for user_id in set(user_ids)]
+        user_items = []
+        for i in range(0, len(typed_keys), 100):
+            for typed_item in self.client.batch_get_items(typed_keys[i : i + 100]):
+                user_items.append({k: deserialize(v) for k, v in typed_item.items()})
+        return user_items
+
+    def batch_get_follower_counts(self, user_ids):
+        "Return a dict mapping user_id to followerCount. Users that do not exist are left out."
+        # dynamo can't handle duplicates
+        typed_keys = [self.typed_pk(user_id) for user_id in set(user_ids)]
+        follower_counts = {}
+        for i in range(0, len(typed_keys), 100):
+            items = self.client.batch_get_items(typed_keys[i : i + 100], 'userId, followerCount')
+            for item in items:
+                follower_counts[item['userId']['S']] = int(item.get('followerCount', {}).get('N', 0))
+        return follower_counts
+
     def get_user_by_username(self, username):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'username/{username}'),
@@ -382,6 +412,29 @@ class UserDynamo:
             query_kwargs['ExpressionAttributeValues'][':mea'] = max_expires_at.to_iso8601_string()
         return (key['partitionKey'].split('/')[1] for key in self.client.generate_all_query(query_kwargs))
 
+    def generate_user_ids(self):
+        scan_kwargs = {
+            'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND sortKey = :sk',
+            'ExpressionAttributeValues': {':pk_prefix': 'user/', ':sk': 'profile'},
+            'ProjectionExpression': 'partitionKey',
+        }
+        return (key['partitionKey'].split('/')[1] for key in self.client.generate_all_scan(scan_kwargs))
+
+    def scan_user_ids(self, limit=None, next_token=None):
+        """
+        Return a page of the scan for user ids, in the form {'items': [user_id, ...], 'nextToken': ...}.
+        As `limit` caps the items scanned rather than the users found, a page may hold fewer users, or none.
+        """
+        scan_kwargs = {
+            'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND sortKey = :sk',
+            'ExpressionAttributeValues': {':pk_prefix': 'user/', ':sk': 'profile'},
+            # the full key, as the pagination token is built from it
+            'ProjectionExpression': 'partitionKey, sortKey',
+        }
+        paginated = self.client.scan(scan_kwargs, limit=limit, next_token=next_token)
+        paginated['items'] = [key['partitionKey'].split('/')[1] for key in paginated['items']]
+        return paginated
+
     def generate_dating_enabled_user_ids(self):
         scan_kwargs = {
             'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND sortKey = :sk_prefix AND datingStatus = :status',
@@ -7,15 +7,15 @@ from functools import partialmethod
 
 import pendulum
 
+from app import clients as app_clients
 from app import models
-from app.clients import AmplitudeClient
 from app.mixins.base import ManagerBase
 from app.mixins.trending.manager import TrendingManagerMixin
 from app.models.appstore.enums import AppStoreSubscriptionStatus
 from app.models.card.templates import ContactJoinedCardTemplate, UserNewDatingMatchesTemplate
 from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus
-from app.utils import GqlNotificationType
+from app.utils import GqlNotificationType, LazyProxy
 
 from .dynamo import UserContactAttributeDynamo, UserDynamo
 from .enums import UserDatingStatus, UserStatus, UserSubscriptionLevel
@@ -71,7 +71,8 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             self.email_dynamo = UserContactAttributeDynamo(clients['dynamo'], 'userEmail')
             self.phone_number_dynamo = UserContactAttributeDynamo(clients['dynamo'], 'userPhoneNumber')
         self.placeholder_photos_directory = placeholder_photos_directory
-        self.amplitude_client = AmplitudeClient()
+        # pylint: disable-next=unnecessary-lambda
+        self.amplitude_client = LazyProxy(lambda: app_clients.AmplitudeClient())
 
     @property
     def real_user_id(self):
@@ -308,6 +309,25 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             userChatsWithUnviewedMessagesCount=int(new_item.get('chatsWithUnviewedMessagesCount', 0)),
         )
 
+    def search_users(self, search_token, limit, next_token=None):
+        query = {
+            'bool': {
+                'should': [
+                    {'match_bool_prefix': {'username': {'query': search_token, 'boost': 2}}},
+                    {'match_bool_prefix': {'fullName': search_token}},
+                    {'match': {'username': {'query': search_token, 'boost': 2}}},
+                    {'match': {'fullName': search_token}},
+                ]
+            }
+        }
+        paginated = self.elasticsearch_client.paginated_search(
+            'users', query, 'userId.keyword', limit, next_token
+        )
+        return {
+            'nextToken': paginated['nextToken'],
+            'items': [hit['_source']['userId'] for hit in paginated['hits']],
+        }
+
     def on_comment_add(self, comment_id, new_item):
         self.dynamo.increment_comment_count(new_item['userId'])
 
@@ -331,7 +351,7 @@ class UserManager(TrendingManagerMixin, ManagerBase):
     def on_user_delete(self, user_id, old_item):
         "Delete various user-related objects/items"
         self.dynamo.add_user_deleted(user_id)
-        self.elasticsearch_client.delete_user(user_id)
+        self.elasticsearch_client.queue_delete_user(user_id)
         self.pinpoint_client.delete_user_endpoints(user_id)
         self.real_dating_client.remove_user(user_id, fail_soft=True)
 
@@ -355,7 +375,7 @@ class UserManager(TrendingManagerMixin, ManagerBase):
     )
 
     def sync_elasticsearch(self, user_id, new_item, old_item=None):
-        self.elasticsearch_client.put_user(user_id, new_item['username'], new_item.get('fullName'))
+        self.elasticsearch_client.queue_put_user(user_id, new_item['username'], new_item.get('fullName'))
 
     def sync_pinpoint_attribute(self, dynamo_name, pinpoint_name, user_id, new_item, old_item=None):
         value = new_item.get(dynamo_name)
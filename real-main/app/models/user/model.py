@@ -6,7 +6,6 @@ import botocore
 import pendulum
 import stringcase
 
-from app.clients import RealDatingClient
 from app.clients.cognito import InvalidEncryption
 from app.mixins.trending.model import TrendingModelMixin
 from app.models.post.enums import PostStatus, PostType
@@ -40,7 +39,7 @@ CONTACT_ATTRIBUTE_NAMES = {
 
 class User(TrendingModelMixin):
 
-    client_names = ['cloudfront', 'cognito', 'elasticsearch', 'dynamo', 'pinpoint', 's3_uploads']
+    client_names = ['cloudfront', 'cognito', 'elasticsearch', 'dynamo', 'pinpoint', 'real_dating', 's3_uploads']
     item_type = 'user'
     subscription_bonus_duration = pendulum.duration(months=1)
 
@@ -94,7 +93,6 @@ class User(TrendingModelMixin):
         self.id = user_item['userId']
         self.placeholder_photos_directory = placeholder_photos_directory
         self.frontend_resources_domain = frontend_resources_domain
-        self.real_dating_client = RealDatingClient()
 
     @property
     def username(self):
@@ -134,7 +132,7 @@ class User(TrendingModelMixin):
     def get_photo_url(self, size):
         photo_path = self.get_photo_path(size)
         if photo_path:
-            return self.cloudfront_client.generate_presigned_url(photo_path, ['GET', 'HEAD'])
+            return self.cloudfront_client.generate_presigned_readonly_url(photo_path)
         placeholder_path = self.get_placeholder_photo_path(size)
         if placeholder_path and self.frontend_resources_domain:
             return f'https://{self.frontend_resources_domain}/{placeholder_path}'
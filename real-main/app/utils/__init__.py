@@ -1,6 +1,15 @@
 __all__ = [
     'DecimalJsonEncoder',
     'GqlNotificationType',
+    'LazyProxy',
+    'NotificationCoalescer',
+    'TTLCache',
+    'UploadPool',
+    'UploadPoolError',
 ]
 from .decimal_json_encoder import DecimalJsonEncoder
 from .gql_notification_type import GqlNotificationType
+from .lazy_proxy import LazyProxy
+from .notification_coalescer import NotificationCoalescer
+from .ttl_cache import TTLCache
+from .upload_pool import UploadPool, UploadPoolError
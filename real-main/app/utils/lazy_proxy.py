@@ -0,0 +1,44 @@
+import threading
+
+
+class LazyProxy:
+    """
+    Stands in for an object that is only created, by calling `factory`, the first time one of
+    its attributes is accessed. Used to keep clients and managers that a lambda invocation never
+    touches from adding to its cold start.
+
+    Pass `lambda: package.SomeClass()` rather than `package.SomeClass` as the factory when the class
+    is looked up from a package that imports its modules on first use, so the import is deferred too.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_lock', threading.Lock())
+        object.__setattr__(self, '_target', None)
+
+    @property
+    def lazy_target(self):
+        "The proxied object, created if it hasn't been yet"
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    object.__setattr__(self, '_target', self._factory())
+        return self._target
+
+    @property
+    def is_lazy_target_created(self):
+        return self._target is not None
+
+    def __getattr__(self, name):
+        return getattr(self.lazy_target, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.lazy_target, name, value)
+
+    def __delattr__(self, name):
+        delattr(self.lazy_target, name)
+
+    def __repr__(self):
+        if self._target is None:
+            return f'<LazyProxy for {self._factory!r}>'
+        return repr(self._target)
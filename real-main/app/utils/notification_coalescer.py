@@ -0,0 +1,33 @@
+import time
+
+from .ttl_cache import TTLCache
+
+
+class NotificationCoalescer:
+    """
+    Collects notifications so they can be sent together, at most once per `min_interval` seconds each.
+
+    Duplicate notifications are dropped. A notification that was already sent less than `min_interval`
+    seconds ago is held back, rather than dropped, and sent by the first flush after that interval has
+    passed. Flushes never wait for held-back notifications, so those are only sent if this container
+    flushes again. Call `flush()` to send the notifications that are due, as a list of
+    (user_id, notification_type) tuples in the order they were first added, to `send_batch`.
+    """
+
+    def __init__(self, send_batch, min_interval, maxsize=100000, timer=time.monotonic):
+        self.send_batch = send_batch
+        self.pending = {}  # used as an ordered set
+        self.recently_sent = TTLCache(min_interval, maxsize=maxsize, timer=timer)
+
+    def add(self, user_id, notification_type):
+        self.pending[(user_id, notification_type)] = None
+
+    def flush(self):
+        "Send the pending notifications that are due, return how many were sent. The others are kept pending."
+        notifications = [n for n in self.pending if self.recently_sent.get(n) is None]
+        for notification in notifications:
+            del self.pending[notification]
+            self.recently_sent.set(notification, True)
+        if notifications:
+            self.send_batch(notifications)
+        return len(notifications)
@@ -0,0 +1,87 @@
+import concurrent.futures
+import contextlib
+import time
+
+try:
+    import resource
+except ImportError:  # not on windows
+    resource = None
+
+# the page size /proc/self/statm counts in, on the linux boxes lambda runs on
+PAGE_SIZE = 4096
+
+
+def get_rss_mb():
+    "Resident memory of this process now, in MB, or None if that can't be read on this platform"
+    try:
+        with open('/proc/self/statm', encoding='utf-8') as fh:
+            return round(int(fh.read().split()[1]) * PAGE_SIZE / (1024 * 1024), 1)
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def get_peak_rss_mb():
+    "High-water mark of this process's resident memory, in MB, or None if that can't be read on this platform"
+    if resource is None:
+        return None
+    # linux reports in KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageTimer:
+    """
+    Records the wall time and memory use of each stage of a multi-stage process, such as processing
+    an uploaded image.
+
+    The peak RSS is the high-water mark of the whole process (and so of the lambda container, across
+    invocations), as of the end of the stage. The RSS is that in use at the end of the stage.
+
+    Stages may overlap, see run_concurrently(), in which case their times add up to more than the
+    elapsed time.
+    """
+
+    def __init__(self, timer=time.perf_counter):
+        self.timer = timer
+        self.stages = {}
+        self.started_at = timer()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = self.timer()
+        try:
+            yield
+        finally:
+            self.stages[name] = {
+                'ms': round((self.timer() - start) * 1000, 1),
+                'rssMb': get_rss_mb(),
+                'peakRssMb': get_peak_rss_mb(),
+            }
+
+    def run_concurrently(self, stages):
+        """
+        Run each of `stages`, a dict of stage name to function, as a stage in its own thread. Returns a dict
+        of stage name to what its function returned, once they have all finished. If any failed, the error of
+        the first of them, in the order given, is raised instead.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(stages)) as executor:
+            futures = {name: executor.submit(self._run_stage, name, func) for name, func in stages.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _run_stage(self, name, func):
+        with self.stage(name):
+            return func()
+
+    @property
+    def total_ms(self):
+        return round(sum(stage['ms'] for stage in self.stages.values()), 1)
+
+    @property
+    def elapsed_ms(self):
+        return round((self.timer() - self.started_at) * 1000, 1)
+
+    def summary(self):
+        "The stages on one line, for logging"
+        return ', '.join(
+            f'{name}: {stage["ms"]}ms rss {stage["rssMb"]}MB peak {stage["peakRssMb"]}MB'
+            for name, stage in self.stages.items()
+        )
@@ -0,0 +1,59 @@
+import collections
+import threading
+import time
+
+
+class TTLCache:
+    """
+    A small in-memory, per-container cache.
+
+    Entries expire `ttl` seconds after they were set. If `maxsize` is set, the least
+    recently used entries are evicted once the cache grows beyond that size.
+    """
+
+    def __init__(self, ttl, maxsize=None, timer=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.timer = timer
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= self.timer():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.timer() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def get_or_set(self, key, value_getter):
+        "Return the cached value for `key`, calling `value_getter()` to fill the cache on a miss"
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.set(key, value_getter())
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
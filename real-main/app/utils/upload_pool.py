@@ -0,0 +1,56 @@
+import concurrent.futures
+
+
+class UploadPoolError(Exception):
+    "One or more of the uploads of an UploadPool failed. The errors, in order of submission, are in `errors`"
+
+    def __init__(self, errors, upload_count):
+        self.errors = errors
+        super().__init__(f'{len(errors)} of {upload_count} uploads failed, first error: {errors[0]}')
+
+
+class UploadPool:
+    """
+    Runs uploads (or other blocking IO) on a small thread pool, so the caller can carry on with CPU-bound
+    work, such as encoding the next image, while they are in flight.
+
+    Use as a context manager: leaving the block waits for every upload to finish. A failed upload doesn't
+    stop the others, and once they're all done an UploadPoolError collecting the failures is raised. If the
+    block is left by an exception of its own, the uploads are still waited on but that exception wins.
+
+    Functions submitted are called on other threads, so they must only use thread-safe objects
+    (boto3 clients are, boto3 resources are not).
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.futures = []
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.join()
+        else:
+            self.futures = []
+            self._shutdown()
+
+    def submit(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        self.futures.append(self._executor.submit(func, *args, **kwargs))
+
+    def join(self):
+        "Wait for all uploads submitted so far, raise UploadPoolError if any failed"
+        futures, self.futures = self.futures, []
+        self._shutdown()
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            raise UploadPoolError(errors, len(futures))
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
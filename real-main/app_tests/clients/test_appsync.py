@@ -0,0 +1,88 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from app.clients import AppSyncClient
+
+
+@pytest.fixture
+def appsync_client():
+    yield AppSyncClient(appsync_graphql_url='https://appsync-url/graphql')
+
+
+def test_fire_notifications_empty(appsync_client):
+    with mock.patch.object(appsync_client, 'execute') as execute_mock:
+        assert appsync_client.fire_notifications([]) == []
+    assert execute_mock.mock_calls == []
+
+
+def test_fire_notifications_aliases_mutations_into_one_request(appsync_client):
+    batch = [{'userId': 'uid1', 'type': 'ntype'}, {'userId': 'uid2', 'type': 'ntype', 'postId': 'pid'}]
+    with mock.patch.object(appsync_client, 'execute', return_value=mock.Mock(errors=None)) as execute_mock:
+        assert appsync_client.fire_notifications(batch) == []
+    assert len(execute_mock.mock_calls) == 1
+    mutation, variables = execute_mock.call_args.args
+    assert variables == {'input0': batch[0], 'input1': batch[1]}
+    mutation_str = ' '.join(mutation.split())
+    assert 'm0: triggerNotification (input: $input0)' in mutation_str
+    assert 'm1: triggerNotification (input: $input1)' in mutation_str
+    assert 'postId' in mutation_str
+
+
+def test_fire_notifications_chunks_requests(appsync_client):
+    appsync_client.mutations_per_request = 2
+    batch = [{'userId': f'uid{i}', 'type': 'ntype'} for i in range(5)]
+    with mock.patch.object(appsync_client, 'execute', return_value=mock.Mock(errors=None)) as execute_mock:
+        assert appsync_client.fire_notifications(batch) == []
+    sent = sorted(input_obj['userId'] for c in execute_mock.call_args_list for input_obj in c.args[1].values())
+    assert len(execute_mock.mock_calls) == 3
+    assert sent == [f'uid{i}' for i in range(5)]
+
+
+def test_fire_notifications_reports_per_item_failures(appsync_client):
+    batch = [{'userId': f'uid{i}', 'type': 'ntype'} for i in range(3)]
+    errors = [{'message': 'err1', 'path': ['m1']}]
+    with mock.patch.object(appsync_client, 'execute', return_value=mock.Mock(errors=errors)):
+        assert appsync_client.fire_notifications(batch) == [(batch[1], errors[0])]
+
+    # an error that can't be tied to a mutation fails them all
+    errors = [{'message': 'bad request'}]
+    with mock.patch.object(appsync_client, 'execute', return_value=mock.Mock(errors=errors)):
+        assert appsync_client.fire_notifications(batch) == [(input_obj, errors[0]) for input_obj in batch]
+
+    # as does an exception sending the request, which only fails the mutations of that request
+    appsync_client.mutations_per_request = 2
+    err = Exception('timeout')
+
+    def execute(mutation, variables):
+        if variables['input0']['userId'] == 'uid2':
+            raise err
+        return mock.Mock(errors=None)
+
+    with mock.patch.object(appsync_client, 'execute', side_effect=execute):
+        assert appsync_client.fire_notifications(batch) == [(batch[2], err)]
+
+
+def test_execute(appsync_client, requests_mock):
+    requests_mock.post('https://appsync-url/graphql', json={'data': {'m0': {'userId': 'uid'}}, 'errors': None})
+    resp = appsync_client.execute('mutation { m0: triggerNotification }', {'input0': {'userId': 'uid'}})
+    assert resp.data == {'m0': {'userId': 'uid'}}
+    assert resp.errors is None
+    assert requests_mock.request_history[0].json() == {
+        'query': 'mutation { m0: triggerNotification }',
+        'variables': {'input0': {'userId': 'uid'}},
+    }
+    assert requests_mock.request_history[0].headers['Authorization'].startswith('AWS4-HMAC-SHA256')
+
+    # errors are passed back
+    requests_mock.post('https://appsync-url/graphql', json={'data': None, 'errors': [{'message': 'nope'}]})
+    resp = appsync_client.execute('mutation { m0: triggerNotification }', {})
+    assert resp.errors == [{'message': 'nope'}]
+    with pytest.raises(Exception, match='nope'):
+        appsync_client.send('mutation { m0: triggerNotification }', {})
+
+    # non-graphql responses raise
+    requests_mock.post('https://appsync-url/graphql', status_code=502, text='Bad Gateway')
+    with pytest.raises(requests.HTTPError):
+        appsync_client.execute('mutation { m0: triggerNotification }', {})
@@ -1,4 +1,9 @@
+import base64
+import json
 import urllib
+from unittest import mock
+
+import pendulum
 
 from app.clients import CloudFrontClient
 
@@ -64,3 +69,82 @@ def test_generate_presigned_url():
     parsed_qs = urllib.parse.parse_qs(parsed.query)
     assert set(parsed_qs.keys()) == set(['Method', 'Expires', 'Key-Pair-Id', 'Signature'])
     assert set(parsed_qs['Method']) == set(methods)
+
+
+def decode_policy(encoded):
+    return json.loads(base64.b64decode(encoded.replace('-', '+').replace('_', '=').replace('~', '/')))
+
+
+def test_get_expires_at():
+    client = CloudFrontClient(get_key_pair, domain='cf.net')
+    now = pendulum.datetime(2020, 6, 1, 7, 30)
+    assert client.get_expires_at(now=now) == pendulum.datetime(2020, 6, 3, 12)
+    assert client.get_expires_at(now=now.add(hours=4, minutes=29)) == pendulum.datetime(2020, 6, 3, 12)
+    assert client.get_expires_at(now=now.add(hours=4, minutes=31)) == pendulum.datetime(2020, 6, 3, 18)
+    # on a boundary
+    assert client.get_expires_at(now=pendulum.datetime(2020, 6, 1, 6)) == pendulum.datetime(2020, 6, 3, 6)
+    assert client.get_expires_at() >= pendulum.now('utc') + client.lifetime
+
+
+def test_generate_presigned_url_is_cached():
+    client = CloudFrontClient(get_key_pair, domain='cf.net')
+    with mock.patch.object(client, 'get_private_key', wraps=client.get_private_key) as get_private_key_mock:
+        url = client.generate_presigned_url('uid/mid', ['GET', 'HEAD'])
+        assert client.generate_presigned_url('uid/mid', ['GET', 'HEAD']) == url
+        assert len(get_private_key_mock.mock_calls) == 1
+
+    # different methods, path or expiry are signed separately
+    assert client.generate_presigned_url('uid/mid', ['PUT']) != url
+    assert client.generate_presigned_url('uid/mid2', ['GET', 'HEAD']) != url
+    expires_at = client.get_expires_at() + client.expires_at_granularity
+    assert client.generate_presigned_url('uid/mid', ['GET', 'HEAD'], expires_at=expires_at) != url
+
+
+def test_generate_presigned_readonly_url():
+    domain = 'cf.net'
+    client = CloudFrontClient(get_key_pair, domain=domain)
+    expires_at = pendulum.datetime(2020, 6, 3, 12)
+    url1 = client.generate_presigned_readonly_url('uid/post/pid/image/480p.jpg', expires_at=expires_at)
+    url2 = client.generate_presigned_readonly_url('uid/post/pid/image/native.jpg', expires_at=expires_at)
+
+    parsed1, parsed2 = urllib.parse.urlparse(url1), urllib.parse.urlparse(url2)
+    assert parsed1.netloc == domain
+    assert parsed1.path == '/uid/post/pid/image/480p.jpg'
+    assert parsed2.path == '/uid/post/pid/image/native.jpg'
+
+    # both sizes share the one wildcard signature over the jpegs in the directory
+    qs1, qs2 = urllib.parse.parse_qs(parsed1.query), urllib.parse.parse_qs(parsed2.query)
+    assert set(qs1.keys()) == {'Policy', 'Signature', 'Key-Pair-Id'}
+    assert qs1 == qs2
+    assert decode_policy(qs1['Policy'][0]) == {
+        'Statement': [
+            {
+                'Resource': f'https://{domain}/uid/post/pid/image/*.jpg',
+                'Condition': {'DateLessThan': {'AWS:EpochTime': expires_at.int_timestamp}},
+            }
+        ]
+    }
+
+    # a different directory gets its own signature
+    url3 = client.generate_presigned_readonly_url('uid/post/pid2/image/480p.jpg', expires_at=expires_at)
+    assert urllib.parse.parse_qs(urllib.parse.urlparse(url3).query)['Signature'] != qs1['Signature']
+
+    # other files get a signature for just themselves
+    url4 = client.generate_presigned_readonly_url('uid/post/pid/image/native.heic', expires_at=expires_at)
+    qs4 = urllib.parse.parse_qs(urllib.parse.urlparse(url4).query)
+    assert decode_policy(qs4['Policy'][0])['Statement'][0]['Resource'] == (
+        f'https://{domain}/uid/post/pid/image/native.heic'
+    )
+
+
+def test_generate_presigned_cookies():
+    domain = 'cf.net'
+    client = CloudFrontClient(get_key_pair, domain=domain)
+    expires_at = pendulum.datetime(2020, 6, 3, 12)
+    cookies = client.generate_presigned_cookies('uid/post/pid/video-hls/video*', expires_at=expires_at)
+    assert cookies['ExpiresAt'] == expires_at.to_iso8601_string()
+    assert cookies['CloudFront-Key-Pair-Id'] == testing_only_key_pair['keyId']
+    assert decode_policy(cookies['CloudFront-Policy'])['Statement'][0]['Resource'] == (
+        f'https://{domain}/uid/post/pid/video-hls/video*'
+    )
+    assert client.generate_presigned_cookies('uid/post/pid/video-hls/video*', expires_at=expires_at) == cookies
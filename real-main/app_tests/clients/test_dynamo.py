@@ -0,0 +1,60 @@
+from unittest import mock
+
+import pytest
+
+from app.clients import dynamo
+
+
+def typed_key(pk):
+    return {'partitionKey': {'S': pk}, 'sortKey': {'S': '-'}}
+
+
+@pytest.fixture
+def items(dynamo_client):
+    for pk in ('pk1', 'pk2', 'pk3'):
+        dynamo_client.add_item({'Item': {'partitionKey': pk, 'sortKey': '-', 'a': pk}})
+    yield [{'partitionKey': {'S': pk}, 'sortKey': {'S': '-'}, 'a': {'S': pk}} for pk in ('pk1', 'pk2', 'pk3')]
+
+
+def test_batch_get_items(dynamo_client, items):
+    assert dynamo_client.batch_get_items([]) == []
+    resp = dynamo_client.batch_get_items([typed_key('pk1'), typed_key('pk3'), typed_key('pk-dne')])
+    assert sorted(resp, key=lambda item: item['a']['S']) == [items[0], items[2]]
+
+    resp = dynamo_client.batch_get_items([typed_key('pk2')], projection_expression='a')
+    assert resp == [{'a': {'S': 'pk2'}}]
+
+
+def test_batch_get_items_retries_unprocessed_keys(dynamo_client, items):
+    batch_get_item = dynamo_client.boto3_client.batch_get_item
+
+    def leave_last_key_unprocessed(RequestItems):
+        keys = RequestItems[dynamo_client.table_name]['Keys']
+        resp = batch_get_item(RequestItems={dynamo_client.table_name: {'Keys': keys[:1]}})
+        if len(keys) > 1:
+            resp['UnprocessedKeys'] = {dynamo_client.table_name: {'Keys': keys[1:]}}
+        return resp
+
+    keys = [typed_key('pk1'), typed_key('pk2'), typed_key('pk3')]
+    with mock.patch.object(
+        dynamo_client.boto3_client, 'batch_get_item', side_effect=leave_last_key_unprocessed
+    ) as batch_get_item_mock, mock.patch.object(dynamo.time, 'sleep') as sleep_mock:
+        resp = dynamo_client.batch_get_items(keys)
+    assert sorted(resp, key=lambda item: item['a']['S']) == items
+    assert batch_get_item_mock.call_count == 3
+    assert sleep_mock.mock_calls == [
+        mock.call(dynamo.BATCH_GET_RETRY_DELAY),
+        mock.call(dynamo.BATCH_GET_RETRY_DELAY * 2),
+    ]
+
+
+def test_batch_get_items_raises_if_keys_stay_unprocessed(dynamo_client, items):
+    def leave_all_keys_unprocessed(RequestItems):
+        return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+
+    with mock.patch.object(
+        dynamo_client.boto3_client, 'batch_get_item', side_effect=leave_all_keys_unprocessed
+    ) as batch_get_item_mock, mock.patch.object(dynamo.time, 'sleep'):
+        with pytest.raises(Exception, match='left 2 keys unprocessed after 5 retries'):
+            dynamo_client.batch_get_items([typed_key('pk1'), typed_key('pk2')])
+    assert batch_get_item_mock.call_count == dynamo.BATCH_GET_MAX_RETRIES + 1
@@ -1,4 +1,7 @@
+import json
+
 import pytest
+import requests
 import requests_mock
 
 from app.clients import ElasticSearchClient
@@ -12,11 +15,6 @@ def elasticsearch_client():
     yield ElasticSearchClient(domain='real.es.amazonaws.com')
 
 
-def test_build_user_url(elasticsearch_client):
-    user_id = 'my-user-id'
-    assert elasticsearch_client.build_user_url(user_id) == 'https://real.es.amazonaws.com/users/_doc/my-user-id'
-
-
 def test_build_user_document_minimal(elasticsearch_client):
     user_id = 'us-east-1:088d2841-7089-4136-88a0-8aa3e5ae9ce1'
     username = 'TESTER-gotSOMEcaseotxxie'
@@ -35,53 +33,181 @@ def test_build_user_document_minimal(elasticsearch_client):
     }
 
 
-def test_put_user_minimal(elasticsearch_client, monkeypatch):
+def test_flush_nothing_queued(elasticsearch_client):
+    with requests_mock.mock() as m:
+        assert elasticsearch_client.flush() == []
+    assert len(m.request_history) == 0
+
+
+def test_flush_sends_queued_actions_in_one_bulk_request(elasticsearch_client, monkeypatch):
     monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
     monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
 
-    user_id = 'us-east-1:088d2841-7089-4136-88a0-8aa3e5ae9ce1'
-    username = 'TESTER-gotSOMEcaseotxxie'
-    doc = elasticsearch_client.build_user_doc(user_id, username, None)
-    url = elasticsearch_client.build_user_url(user_id)
+    elasticsearch_client.queue_put_user('uid', 'spock', None)
+    elasticsearch_client.queue_put_post('pid', ['k1', 'k2'])
+    elasticsearch_client.queue_put_keyword('pid', 'k1')
+    elasticsearch_client.queue_delete_keyword('pid', 'k0')
+    elasticsearch_client.queue_delete_post('pid2')
+    elasticsearch_client.queue_delete_user('uid2')
 
+    items = [{'index': {'status': 201}}] * 3 + [{'delete': {'status': 200}}] * 3
     with requests_mock.mock() as m:
-        m.put(url, None)
-        elasticsearch_client.put_user(user_id, username, None)
+        m.post('https://real.es.amazonaws.com/_bulk', json={'errors': False, 'items': items})
+        assert elasticsearch_client.flush() == []
 
     assert len(m.request_history) == 1
-    assert m.request_history[0].method == 'PUT'
-    assert m.request_history[0].json() == doc
+    assert m.request_history[0].headers['Content-Type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in m.request_history[0].text.splitlines()]
+    assert lines == [
+        {'index': {'_index': 'users', '_id': 'uid'}},
+        {'userId': 'uid', 'username': 'spock'},
+        {'index': {'_index': 'posts', '_id': 'pid'}},
+        {'postId': 'pid', 'keywords': 'k1 k2'},
+        {'index': {'_index': 'keywords', '_id': 'pid-k1'}},
+        {'keyword': 'k1'},
+        {'delete': {'_index': 'keywords', '_id': 'pid-k0'}},
+        {'delete': {'_index': 'posts', '_id': 'pid2'}},
+        {'delete': {'_index': 'users', '_id': 'uid2'}},
+    ]
+
+    # the queue was cleared
+    with requests_mock.mock() as m:
+        assert elasticsearch_client.flush() == []
+    assert len(m.request_history) == 0
 
 
-def test_put_user_maximal(elasticsearch_client, monkeypatch):
+def test_flush_bounds_request_size(elasticsearch_client, monkeypatch):
     monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
     monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
 
-    user_id = 'us-east-1:088d2841-7089-4136-88a0-8aa3e5ae9ce1'
-    username = 'something-else'
-    full_name = 'Mr. Smith'
-    doc = elasticsearch_client.build_user_doc(user_id, username, full_name)
-    url = elasticsearch_client.build_user_url(user_id)
+    elasticsearch_client.queue_delete_post('pid1')
+    action_bytes = len(elasticsearch_client.pending_bulk_actions[0])
+    elasticsearch_client.max_bulk_request_bytes = action_bytes * 2
+    elasticsearch_client.queue_delete_post('pid2')
+    elasticsearch_client.queue_delete_post('pid3')
 
     with requests_mock.mock() as m:
-        m.put(url, None)
-        elasticsearch_client.put_user(user_id, username, full_name)
+        m.post(
+            'https://real.es.amazonaws.com/_bulk',
+            [
+                {'json': {'items': [{'delete': {'status': 200}}] * 2}},
+                {'json': {'items': [{'delete': {'status': 200}}]}},
+            ],
+        )
+        assert elasticsearch_client.flush() == []
 
-    assert len(m.request_history) == 1
-    assert m.request_history[0].method == 'PUT'
-    assert m.request_history[0].json() == doc
+    assert len(m.request_history) == 2
+    assert len(m.request_history[0].text.splitlines()) == 2
+    assert len(m.request_history[1].text.splitlines()) == 1
 
 
-def test_delete_user(elasticsearch_client, monkeypatch):
+def test_flush_reports_failures(elasticsearch_client, monkeypatch, caplog):
     monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
     monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
 
-    user_id = 'us-east-1:088d2841-7089-4136-88a0-8aa3e5ae9ce1'
-    url = elasticsearch_client.build_user_url(user_id)
+    elasticsearch_client.queue_put_post('pid1', ['k1'])
+    elasticsearch_client.queue_delete_post('pid2')
+    elasticsearch_client.queue_delete_post('pid3')
+    actions = list(elasticsearch_client.pending_bulk_actions)
+
+    # deletes of docs that are already gone are not failures
+    error = {'type': 'mapper_parsing_exception', 'reason': 'failed to parse'}
+    items = [
+        {'index': {'_id': 'pid1', 'status': 400, 'error': error}},
+        {'delete': {'_id': 'pid2', 'status': 404}},
+        {'delete': {'_id': 'pid3', 'status': 200}},
+    ]
+    with requests_mock.mock() as m:
+        m.post('https://real.es.amazonaws.com/_bulk', json={'errors': True, 'items': items})
+        assert elasticsearch_client.flush() == [(actions[0], error)]
+    assert len(caplog.records) == 1
+    assert 'pid1' in caplog.records[0].msg
+
+    # a failed request fails all its actions, once they've been retried
+    elasticsearch_client.bulk_retry_delay = 0
+    elasticsearch_client.pending_bulk_actions = list(actions)
+    caplog.clear()
+    with requests_mock.mock() as m:
+        m.post('https://real.es.amazonaws.com/_bulk', status_code=500)
+        assert elasticsearch_client.flush() == [(action, 500) for action in actions]
+    assert len(m.request_history) == elasticsearch_client.bulk_max_retries + 1
+    assert 'Giving up on 3 actions after 5 retries' in caplog.records[-1].msg
+
+
+def test_flush_retries_retryable_failures(elasticsearch_client, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    elasticsearch_client.bulk_retry_delay = 0
+
+    elasticsearch_client.queue_put_post('pid1', ['k1'])
+    elasticsearch_client.queue_put_post('pid2', ['k2'])
+    elasticsearch_client.queue_put_post('pid3', ['k3'])
+    actions = list(elasticsearch_client.pending_bulk_actions)
+
+    # one is throttled, one hits a server error, one isn't worth retrying
+    error = {'type': 'mapper_parsing_exception', 'reason': 'failed to parse'}
+    items = [
+        {'index': {'_id': 'pid1', 'status': 429, 'error': {'type': 'es_rejected_execution_exception'}}},
+        {'index': {'_id': 'pid2', 'status': 503}},
+        {'index': {'_id': 'pid3', 'status': 400, 'error': error}},
+    ]
+    with requests_mock.mock() as m:
+        m.post(
+            'https://real.es.amazonaws.com/_bulk',
+            [
+                {'json': {'errors': True, 'items': items}},
+                {'exc': requests.exceptions.ConnectionError},
+                {'json': {'errors': True, 'items': [{'index': {'status': 201}}, {'index': {'status': 502}}]}},
+                {'json': {'errors': False, 'items': [{'index': {'status': 201}}]}},
+            ],
+        )
+        assert elasticsearch_client.flush() == [(actions[2], error)]
+
+    # only the retryable actions were sent again
+    assert [len(req.text.splitlines()) for req in m.request_history] == [6, 4, 4, 2]
+    assert m.request_history[3].text == actions[1]
+
+
+def test_pagination_token_round_trip(elasticsearch_client):
+    sort_values = [1.2345, 'pid']
+    token = elasticsearch_client.encode_pagination_token(sort_values)
+    assert isinstance(token, str)
+    assert elasticsearch_client.decode_pagination_token(token) == sort_values
+
+
+def test_paginated_search(elasticsearch_client, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    url = 'https://real.es.amazonaws.com/posts/_search'
+    query = {'match': {'keywords': 'bird'}}
+    hits = [{'_source': {'postId': f'pid{i}'}, 'sort': [1.0, f'pid{i}']} for i in range(3)]
 
+    # first page, there is a next page
     with requests_mock.mock() as m:
-        m.delete(url, None)
-        elasticsearch_client.delete_user(user_id)
+        m.post(url, json={'hits': {'hits': hits}})
+        paginated = elasticsearch_client.paginated_search('posts', query, 'postId.keyword', 2)
+    assert paginated['hits'] == hits[:2]
+    assert elasticsearch_client.decode_pagination_token(paginated['nextToken']) == [1.0, 'pid1']
+    assert m.request_history[0].json() == {
+        'size': 3,
+        'query': query,
+        'sort': [{'_score': 'desc'}, {'postId.keyword': 'asc'}],
+    }
 
-    assert len(m.request_history) == 1
-    assert m.request_history[0].method == 'DELETE'
+    # next page picks up after the last hit, and there is no page after it
+    with requests_mock.mock() as m:
+        m.post(url, json={'hits': {'hits': hits[2:]}})
+        paginated = elasticsearch_client.paginated_search(
+            'posts', query, 'postId.keyword', 2, paginated['nextToken']
+        )
+    assert paginated == {'hits': hits[2:], 'nextToken': None}
+    assert m.request_history[0].json()['search_after'] == [1.0, 'pid1']
+    assert 'from' not in m.request_history[0].json()
+
+    # offset tokens are still accepted
+    with requests_mock.mock() as m:
+        m.post(url, json={'hits': {'hits': hits[2:]}})
+        paginated = elasticsearch_client.paginated_search('posts', query, 'postId.keyword', 2, '2')
+    assert paginated == {'hits': hits[2:], 'nextToken': None}
+    assert m.request_history[0].json()['from'] == 2
+    assert 'search_after' not in m.request_history[0].json()
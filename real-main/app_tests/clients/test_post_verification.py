@@ -1,6 +1,8 @@
 import pytest
+import requests
 
 from app.clients import PostVerificationClient
+from app.clients.post_verification import CONNECT_TIMEOUT, READ_TIMEOUT
 
 
 @pytest.fixture
@@ -65,3 +67,10 @@ def test_verify_image_handle_bad_resp_fmt(post_verification_client, requests_moc
     # do the call
     with pytest.raises(Exception, match='Unable to parse response'):
         post_verification_client.verify_image('https://image-url')
+
+
+def test_verify_image_timeout(post_verification_client, requests_mock):
+    requests_mock.post('https://url-root/verify/image', exc=requests.exceptions.ConnectTimeout)
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        post_verification_client.verify_image('https://image-url')
+    assert requests_mock.request_history[0].timeout == (CONNECT_TIMEOUT, READ_TIMEOUT)
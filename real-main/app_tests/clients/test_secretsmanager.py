@@ -113,3 +113,25 @@ def test_retrieve_apple_appstore_params(client):
     # test caching: remove the secret from the backend store, check again
     client.boto_client.delete_secret(SecretId=apple_appstore_params_name)
     assert client.get_apple_appstore_params() == value
+
+
+def test_prefetch(client):
+    google_value = {'ios': 'ios-client-id'}
+    appstore_value = {'bundleId': 'the-bundle-id'}
+    client.boto_client.create_secret(Name=google_client_ids_name, SecretString=json.dumps(google_value))
+    client.boto_client.create_secret(Name=apple_appstore_params_name, SecretString=json.dumps(appstore_value))
+
+    # the secrets that don't exist fail, without stopping the others
+    errors = client.prefetch()
+    assert set(errors) == {'get_cloudfront_key_pair', 'get_post_verification_api_creds'}
+    assert all(isinstance(err, client.exceptions.ResourceNotFoundException) for err in errors.values())
+
+    # those that were fetched are cached
+    client.boto_client.delete_secret(SecretId=google_client_ids_name)
+    client.boto_client.delete_secret(SecretId=apple_appstore_params_name)
+    assert client.get_google_client_ids() == google_value
+    assert client.get_apple_appstore_params() == appstore_value
+
+    # can limit which secrets are fetched
+    assert client.prefetch(['get_google_client_ids']) == {}
+    assert client.prefetch([]) == {}
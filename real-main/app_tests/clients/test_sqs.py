@@ -0,0 +1,46 @@
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+import moto
+import pytest
+
+from app.clients import SQSClient
+
+
+@pytest.fixture
+def sqs_client():
+    with moto.mock_sqs():
+        yield SQSClient(create_queue_name='test-queue')
+
+
+def test_queue_url_required():
+    with moto.mock_sqs():
+        with pytest.raises(AssertionError, match='Queue url is required'):
+            SQSClient(queue_url=None)
+
+
+def test_send_message(sqs_client):
+    sqs_client.send_message({'a': 'b', 'c': Decimal(2)})
+    resp = sqs_client.boto3_client.receive_message(QueueUrl=sqs_client.queue_url)
+    assert [json.loads(message['Body']) for message in resp['Messages']] == [{'a': 'b', 'c': 2}]
+
+
+def test_send_message_fifo():
+    with moto.mock_sqs():
+        sqs_client = SQSClient(create_queue_name='test-queue.fifo')
+        sqs_client.send_message({'a': 'b'}, group_id='g1')
+        sqs_client.send_message({'a': 'b'}, group_id='g1')
+        resp = sqs_client.boto3_client.receive_message(
+            QueueUrl=sqs_client.queue_url, MaxNumberOfMessages=10, AttributeNames=['MessageGroupId']
+        )
+    # messages with the same body are not deduplicated
+    assert [json.loads(message['Body']) for message in resp['Messages']] == [{'a': 'b'}, {'a': 'b'}]
+    assert [message['Attributes']['MessageGroupId'] for message in resp['Messages']] == ['g1', 'g1']
+
+
+def test_send_message_fifo_deduplication_id(sqs_client):
+    with patch.object(sqs_client.boto3_client, 'send_message') as send_message_mock:
+        sqs_client.send_message({'a': 'b'}, group_id='g1', deduplication_id='d1')
+    assert send_message_mock.call_args.kwargs['MessageGroupId'] == 'g1'
+    assert send_message_mock.call_args.kwargs['MessageDeduplicationId'] == 'd1'
@@ -0,0 +1,76 @@
+import concurrent.futures
+from unittest import mock
+
+from botocore.credentials import ReadOnlyCredentials
+
+from app.clients import DynamoClient, RealDatingClient, S3Client, transport
+
+
+def test_get_session_is_shared():
+    session = transport.get_session()
+    assert transport.get_session() is session
+    adapter = session.get_adapter('https://any-host.com')
+    assert adapter._pool_maxsize == transport.POOL_MAXSIZE
+
+
+def test_get_aws_auth_is_cached_per_service():
+    auth = transport.get_aws_auth('es')
+    assert transport.get_aws_auth('es') is auth
+    assert transport.get_aws_auth('appsync') is not auth
+
+
+def test_signer_rebuilt_only_when_credentials_change():
+    credentials = ReadOnlyCredentials('access-key', 'secret-key', None)
+    boto3_session = mock.Mock(region_name='us-east-1')
+    boto3_session.get_credentials.return_value.get_frozen_credentials.side_effect = lambda: credentials
+    auth = transport.RefreshableAWS4Auth('es', boto3_session=boto3_session)
+
+    signer = auth.get_signer()
+    assert signer.service == 'es'
+    assert auth.get_signer() is signer
+
+    # the credentials are refreshed
+    credentials = ReadOnlyCredentials('access-key-2', 'secret-key-2', 'token')
+    new_signer = auth.get_signer()
+    assert new_signer is not signer
+    assert auth.get_signer() is new_signer
+
+
+def test_boto3_clients_are_shared():
+    client = transport.get_boto3_client('lambda')
+    assert transport.get_boto3_client('lambda') is client
+    assert client.meta.config.max_pool_connections == transport.BOTO3_MAX_POOL_CONNECTIONS
+
+    # keyed by service, region and config
+    assert transport.get_boto3_client('sqs') is not client
+    assert transport.get_boto3_client('lambda', region_name='eu-west-1') is not client
+    assert transport.get_boto3_client('lambda', max_pool_connections=5) is not client
+
+    # resources are kept apart from clients
+    resource = transport.get_boto3_resource('s3')
+    assert transport.get_boto3_client('s3') is not resource.meta.client
+
+
+def test_boto3_resources_are_per_thread():
+    resource = transport.get_boto3_resource('dynamodb')
+    assert transport.get_boto3_resource('dynamodb') is resource
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        other_resource = executor.submit(transport.get_boto3_resource, 'dynamodb').result()
+    assert other_resource is not resource
+    assert transport.get_boto3_resource('dynamodb') is resource
+
+
+def test_client_wrappers_share_boto3_objects():
+    assert RealDatingClient().boto3_client is RealDatingClient().boto3_client
+    s3_client = S3Client('bucket-1')
+    assert S3Client('bucket-2').boto_client is s3_client.boto_client
+
+    # the dynamo table resource is per thread
+    dynamo_client = DynamoClient('table-1')
+    table = dynamo_client.table
+    assert dynamo_client.table is table
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        other_table = executor.submit(lambda: dynamo_client.table).result()
+    assert other_table is not table
+    assert other_table.name == 'table-1'
@@ -4,9 +4,11 @@ from os import path
 from unittest import mock
 
 import moto
+import moto.core  # noqa: F401 registers moto's botocore hook before any boto3 session is built
 import pytest
 
 from app import clients, models
+from app.clients import transport
 from app.models.card.templates import CardTemplate
 
 from .dynamodb.table_schema import feed_table_schema, main_table_schema
@@ -16,6 +18,13 @@ grant_path = path.join(path.dirname(__file__), 'fixtures', 'grant.jpg')
 tiny_path = path.join(path.dirname(__file__), 'fixtures', 'tiny.jpg')
 
 
+@pytest.fixture(autouse=True)
+def boto3_registry():
+    "Give each test its own boto3 clients, as tests patch and mock them"
+    yield
+    transport.clear_boto3_registry()
+
+
 @pytest.fixture
 def image_data():
     with open(tiny_path, 'rb') as fh:
@@ -57,7 +66,10 @@ def heic_dims():
 
 @pytest.fixture
 def appsync_client():
-    yield mock.Mock(clients.AppSyncClient(appsync_graphql_url='my-graphql-url'))
+    appsync_client = mock.Mock(clients.AppSyncClient(appsync_graphql_url='my-graphql-url'))
+    # the batch apis report no failures
+    appsync_client.configure_mock(**{'fire_notifications.return_value': [], 'send_mutations.return_value': []})
+    yield appsync_client
 
 
 @pytest.fixture
@@ -169,6 +181,12 @@ def s3_clients():
         }
 
 
+@pytest.fixture
+def sqs_fan_out_client():
+    with moto.mock_sqs():
+        yield clients.SQSClient(create_queue_name='fan-out-queue.fifo')
+
+
 @pytest.fixture
 def s3_uploads_client(s3_clients):
     yield s3_clients['uploads']
@@ -232,6 +250,13 @@ def comment_manager(dynamo_client, user_manager, appsync_client):
     )
 
 
+@pytest.fixture
+def fan_out_manager(appsync_client, dynamo_client, dynamo_feed_client):
+    yield models.FanOutManager(
+        {'appsync': appsync_client, 'dynamo': dynamo_client, 'dynamo_feed': dynamo_feed_client}
+    )
+
+
 @pytest.fixture
 def feed_manager(appsync_client, dynamo_client, dynamo_feed_client):
     yield models.FeedManager(
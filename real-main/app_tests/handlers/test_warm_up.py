@@ -0,0 +1,38 @@
+from unittest import mock
+
+from app.handlers import warm_up
+
+
+def test_warm_up_only_runs_in_lambda():
+    secrets_manager_client = mock.Mock()
+    assert warm_up.warm_up(secrets_manager_client, ['get_real_key_pair']) is None
+    assert secrets_manager_client.mock_calls == []
+
+
+def test_warm_up():
+    secrets_manager_client = mock.Mock(**{'prefetch.return_value': {}})
+    clients = {'cloudfront': mock.Mock(), 'cognito': mock.Mock()}
+    timings = warm_up.warm_up(secrets_manager_client, ['get_real_key_pair'], clients=clients, force=True)
+    assert secrets_manager_client.mock_calls == [mock.call.prefetch(['get_real_key_pair'])]
+    assert clients['cloudfront'].mock_calls == [mock.call.get_private_key(), mock.call.get_cloudfront_signer()]
+    assert clients['cognito'].mock_calls == [mock.call.get_private_key()]
+    assert set(timings) == {
+        'secrets',
+        'cloudfront_private_key',
+        'cloudfront_signer',
+        'cognito_private_key',
+        'total',
+    }
+    assert warm_up.timings == timings
+
+
+def test_warm_up_failures_are_logged_not_raised(caplog):
+    secrets_manager_client = mock.Mock(**{'prefetch.return_value': {'get_real_key_pair': Exception('nope')}})
+    clients = {'cognito': mock.Mock(**{'get_private_key.side_effect': Exception('bad key')})}
+    timings = warm_up.warm_up(secrets_manager_client, ['get_real_key_pair'], clients=clients, force=True)
+    assert set(timings) == {'secrets', 'cognito_private_key', 'total'}
+    warnings = [rec.getMessage() for rec in caplog.records if rec.levelname == 'WARNING']
+    assert warnings == [
+        'Warm-up unable to fetch secret with `get_real_key_pair`: nope',
+        'Warm-up step `cognito_private_key` failed: bad key',
+    ]
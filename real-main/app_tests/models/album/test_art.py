@@ -39,6 +39,11 @@ def test_generate_baisc_grid_success(cnt, size):
     assert image.size == size
 
 
+@pytest.mark.parametrize('cnt, size', [[4, (1920, 1080)], [9, (1280, 720)], [16, (960, 540)]])
+def test_get_cell_size(cnt, size):
+    assert art.get_cell_size(cnt) == size
+
+
 @pytest.mark.parametrize('cnt', [0, 1, 2, 3, 5, 6, 7, 8, 10, 11, 12, 13, 14, 15, 17, 18, 19, 20])
 def test_generate_zoomed_grid_failures(cnt):
     with pytest.raises(AssertionError):
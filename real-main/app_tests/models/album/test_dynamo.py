@@ -325,6 +325,99 @@ def test_set_and_clear_delete_at(album_dynamo, album_item, caplog):
     caplog.clear()
 
 
+def test_set_and_clear_art_update_at(album_dynamo, album_item, caplog):
+    album_id = album_item['albumId']
+    album_id_dne = str(uuid4())
+
+    # verify setting fails soft, and clearing is a no-op, for an album that doesn't exist
+    with caplog.at_level(logging.WARNING):
+        assert album_dynamo.set_art_update_at(album_id_dne, pendulum.now('utc')) is None
+    assert len(caplog.records) == 1
+    assert 'Failed to set art update GSI' in caplog.records[0].msg
+    assert album_id_dne in caplog.records[0].msg
+    assert album_dynamo.clear_art_update_at(album_id_dne, pendulum.now('utc').to_iso8601_string()) is None
+
+    # verify we can set it
+    update_at1 = pendulum.now('utc')
+    new_item = album_dynamo.set_art_update_at(album_id, update_at1)
+    assert album_dynamo.get_album(album_id) == new_item
+    assert new_item['gsiK2PartitionKey'] == 'albumArt'
+    assert pendulum.parse(new_item['gsiK2SortKey']) == update_at1
+
+    # verify setting it again pushes it back
+    update_at2 = update_at1 + pendulum.duration(seconds=1)
+    new_item = album_dynamo.set_art_update_at(album_id, update_at2)
+    assert pendulum.parse(new_item['gsiK2SortKey']) == update_at2
+
+    # verify it's not cleared for the update it was pushed back from
+    assert album_dynamo.clear_art_update_at(album_id, update_at1.to_iso8601_string()) is None
+    assert pendulum.parse(album_dynamo.get_album(album_id)['gsiK2SortKey']) == update_at2
+
+    # verify it's cleared for the update it's set to
+    new_item = album_dynamo.clear_art_update_at(album_id, update_at2.to_iso8601_string())
+    assert album_dynamo.get_album(album_id) == new_item
+    assert 'gsiK2PartitionKey' not in new_item
+    assert 'gsiK2SortKey' not in new_item
+
+
+def test_reschedule_art_update_after_failure(album_dynamo, album_item):
+    album_id = album_item['albumId']
+    update_at = pendulum.now('utc')
+    update_at_str = update_at.to_iso8601_string()
+    retry_at1 = update_at + pendulum.duration(minutes=1)
+    retry_at2 = update_at + pendulum.duration(minutes=2)
+
+    # verify it's a no-op for an album that doesn't exist or has no update scheduled
+    assert album_dynamo.reschedule_art_update_after_failure(str(uuid4()), update_at_str, retry_at1) is None
+    assert album_dynamo.reschedule_art_update_after_failure(album_id, update_at_str, retry_at1) is None
+
+    # verify it moves the update, counting the failure
+    album_dynamo.set_art_update_at(album_id, update_at)
+    new_item = album_dynamo.reschedule_art_update_after_failure(album_id, update_at_str, retry_at1)
+    assert album_dynamo.get_album(album_id) == new_item
+    assert pendulum.parse(new_item['gsiK2SortKey']) == retry_at1
+    assert new_item['artUpdateFailureCount'] == 1
+    new_item = album_dynamo.reschedule_art_update_after_failure(
+        album_id, retry_at1.to_iso8601_string(), retry_at2
+    )
+    assert pendulum.parse(new_item['gsiK2SortKey']) == retry_at2
+    assert new_item['artUpdateFailureCount'] == 2
+
+    # verify it's not moved from an update it has since been moved from
+    assert album_dynamo.reschedule_art_update_after_failure(album_id, update_at_str, retry_at1) is None
+
+    # verify the count of failures is reset when the update is set again, or cleared
+    new_item = album_dynamo.set_art_update_at(album_id, update_at)
+    assert 'artUpdateFailureCount' not in new_item
+    album_dynamo.reschedule_art_update_after_failure(album_id, update_at_str, retry_at1)
+    new_item = album_dynamo.clear_art_update_at(album_id, retry_at1.to_iso8601_string())
+    assert 'artUpdateFailureCount' not in new_item
+
+
+def test_generate_art_update_keys(album_dynamo):
+    # test generate empty set
+    cutoff1 = pendulum.now('utc')
+    assert list(album_dynamo.generate_art_update_keys(cutoff1)) == []
+
+    # add two albums to the index
+    album_item1 = album_dynamo.add_album(str(uuid4()), str(uuid4()), 'album name')
+    album_item1 = album_dynamo.set_art_update_at(album_item1['albumId'], pendulum.now('utc'))
+    cutoff2 = pendulum.now('utc')
+    album_item2 = album_dynamo.add_album(str(uuid4()), str(uuid4()), 'album name')
+    album_item2 = album_dynamo.set_art_update_at(album_item2['albumId'], pendulum.now('utc'))
+    cutoff3 = pendulum.now('utc')
+
+    # test generation at different cutoffs
+    assert list(album_dynamo.generate_art_update_keys(cutoff1)) == []
+    assert list(album_dynamo.generate_art_update_keys(cutoff2)) == [
+        {k: album_item1[k] for k in ('partitionKey', 'sortKey', 'gsiK2SortKey')},
+    ]
+    assert list(album_dynamo.generate_art_update_keys(cutoff3)) == [
+        {k: album_item1[k] for k in ('partitionKey', 'sortKey', 'gsiK2SortKey')},
+        {k: album_item2[k] for k in ('partitionKey', 'sortKey', 'gsiK2SortKey')},
+    ]
+
+
 def test_generate_keys_to_delete(album_dynamo):
     # test generate empty set
     cutoff1 = pendulum.now('utc')
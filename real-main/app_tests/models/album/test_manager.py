@@ -1,9 +1,12 @@
+import logging
+from unittest.mock import Mock, patch
 from uuid import uuid4
 
 import pendulum
 import pytest
 
 from app.models.album.exceptions import AlbumException
+from app.models.post.enums import PostType
 
 
 @pytest.fixture
@@ -110,3 +113,118 @@ def test_garbage_collect(album_manager, user):
     assert album2.refresh_item().item is None
     assert album3.refresh_item().item is None
     assert album4.refresh_item().item is None
+
+
+def test_update_scheduled_art(album_manager, post_manager, user, image_data_b64):
+    # add two albums, one with a post, and one that is deleted after its update is scheduled
+    album1 = album_manager.add_album(user.id, str(uuid4()), 'album name')
+    album2 = album_manager.add_album(user.id, str(uuid4()), 'album name')
+    album3 = album_manager.add_album(user.id, str(uuid4()), 'album name')
+    post = post_manager.add_post(
+        user, str(uuid4()), PostType.IMAGE, image_input={'imageData': image_data_b64}, album_id=album1.id
+    )
+    assert post.item['albumId'] == album1.id
+
+    # schedule updates of the art of all three, one in the future
+    now = pendulum.now('utc')
+    album_manager.dynamo.set_art_update_at(album1.id, now)
+    album_manager.dynamo.set_art_update_at(album2.id, now + pendulum.duration(minutes=1))
+    album_manager.dynamo.set_art_update_at(album3.id, now)
+    album3.delete()
+
+    # update those that are due, verify
+    assert album_manager.update_scheduled_art(now=now + pendulum.duration(seconds=1)) == 1
+    album1.refresh_item()
+    assert album1.item['artHash']
+    assert 'gsiK2PartitionKey' not in album1.item
+    assert 'artHash' not in album2.refresh_item().item
+    assert 'gsiK2PartitionKey' in album2.item
+
+    # nothing else due
+    assert album_manager.update_scheduled_art(now=now + pendulum.duration(seconds=1)) == 0
+
+    # schedule another update of album1, its art hash hasn't changed so S3 isn't touched
+    album_manager.dynamo.set_art_update_at(album1.id, now)
+    s3_client_mock = Mock()
+    with patch.dict(album_manager.clients, {'s3_uploads': s3_client_mock}):
+        assert album_manager.update_scheduled_art(now=now + pendulum.duration(seconds=1)) == 1
+    assert s3_client_mock.mock_calls == []
+    assert 'gsiK2PartitionKey' not in album1.refresh_item().item
+
+
+def test_update_scheduled_art_failure(album_manager, album, caplog):
+    album_manager.art_update_max_attempts = 3
+    now = pendulum.now('utc')
+    album_manager.dynamo.set_art_update_at(album.id, now)
+
+    # a failed update is logged, and rescheduled after the retry delay
+    with patch('app.models.album.model.Album.update_art_if_needed', side_effect=Exception('nope')):
+        with caplog.at_level(logging.ERROR):
+            assert album_manager.update_scheduled_art(now=now + pendulum.duration(seconds=1)) == 0
+    assert len(caplog.records) == 1
+    assert 'Failed to update art' in caplog.records[0].msg
+    assert album.id in caplog.records[0].msg
+    retry_at = now + pendulum.duration(seconds=1) + album_manager.art_update_retry_delay
+    assert album.refresh_item().item['gsiK2SortKey'] == retry_at.to_iso8601_string()
+    assert album.item['artUpdateFailureCount'] == 1
+
+    # so it's not retried until then
+    with patch('app.models.album.model.Album.update_art_if_needed') as update_art_mock:
+        assert album_manager.update_scheduled_art(now=retry_at) == 0
+    assert update_art_mock.mock_calls == []
+
+    # fails again, the delay doubles
+    with patch('app.models.album.model.Album.update_art_if_needed', side_effect=Exception('nope')):
+        assert album_manager.update_scheduled_art(now=retry_at + pendulum.duration(seconds=1)) == 0
+    retry_at += pendulum.duration(seconds=1) + album_manager.art_update_retry_delay * 2
+    assert album.refresh_item().item['gsiK2SortKey'] == retry_at.to_iso8601_string()
+    assert album.item['artUpdateFailureCount'] == 2
+
+    # succeeds on the retry, which clears the count of failures
+    assert album_manager.update_scheduled_art(now=retry_at + pendulum.duration(seconds=1)) == 1
+    assert 'gsiK2PartitionKey' not in album.refresh_item().item
+    assert 'artUpdateFailureCount' not in album.item
+
+
+def test_update_scheduled_art_gives_up(album_manager, album, caplog):
+    album_manager.art_update_max_attempts = 2
+    now = pendulum.now('utc')
+    album_manager.dynamo.set_art_update_at(album.id, now)
+
+    with patch('app.models.album.model.Album.update_art_if_needed', side_effect=Exception('nope')):
+        assert album_manager.update_scheduled_art(now=now + pendulum.duration(minutes=1)) == 0
+        assert album.refresh_item().item['artUpdateFailureCount'] == 1
+        caplog.clear()
+        with caplog.at_level(logging.ERROR):
+            assert album_manager.update_scheduled_art(now=now + pendulum.duration(minutes=5)) == 0
+    assert len(caplog.records) == 1
+    assert 'giving up after 2 attempts' in caplog.records[0].msg
+    assert album.id in caplog.records[0].msg
+
+    # the album is no longer scheduled
+    assert 'gsiK2PartitionKey' not in album.refresh_item().item
+    assert 'artUpdateFailureCount' not in album.item
+    assert list(album_manager.dynamo.generate_art_update_keys(now + pendulum.duration(hours=1))) == []
+
+
+def test_update_scheduled_art_stops_before_deadline(album_manager, user, caplog):
+    album1 = album_manager.add_album(user.id, str(uuid4()), 'album name')
+    album2 = album_manager.add_album(user.id, str(uuid4()), 'album name')
+    now = pendulum.now('utc')
+    album_manager.dynamo.set_art_update_at(album1.id, now)
+    album_manager.dynamo.set_art_update_at(album2.id, now + pendulum.duration(seconds=1))
+
+    # the lambda runs low on time after the first update
+    margin_ms = album_manager.art_update_time_margin_ms
+    context = Mock(**{'get_remaining_time_in_millis.side_effect': [margin_ms + 1, margin_ms - 1]})
+    with caplog.at_level(logging.WARNING):
+        assert album_manager.update_scheduled_art(now=now + pendulum.duration(seconds=2), context=context) == 1
+    assert len(caplog.records) == 1
+    assert 'Ran low on time' in caplog.records[0].msg
+    assert 'gsiK2PartitionKey' not in album1.refresh_item().item
+    assert 'gsiK2PartitionKey' in album2.refresh_item().item
+
+    # the rest are picked up by the next run
+    context = Mock(**{'get_remaining_time_in_millis.return_value': margin_ms + 1})
+    assert album_manager.update_scheduled_art(now=now + pendulum.duration(seconds=2), context=context) == 1
+    assert 'gsiK2PartitionKey' not in album2.refresh_item().item
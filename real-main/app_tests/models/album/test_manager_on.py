@@ -1,4 +1,4 @@
-from unittest.mock import call, patch
+from unittest.mock import patch
 from uuid import uuid4
 
 import pendulum
@@ -93,18 +93,25 @@ def test_on_album_add_edit_sync_delete_at(album_manager, user, album):
     assert 'gsiK1SortKey' in album.item
 
 
-def test_on_post_album_change_update_art_if_needed(album_manager, user, album):
+def test_on_album_posts_last_updated_at_change_schedule_art_update(album_manager, user, album):
     # check for a new album
-    with patch.object(album_manager, 'init_album') as init_album_mock:
-        album_manager.on_album_posts_last_updated_at_change_update_art_if_needed(album.id, new_item=album.item)
-    assert init_album_mock.mock_calls == [call(album.item), call().update_art_if_needed()]
-
-    # check for a changed album
-    with patch.object(album_manager, 'init_album') as init_album_mock:
-        album_manager.on_album_posts_last_updated_at_change_update_art_if_needed(
-            album.id, new_item=album.item, old_item={'un': 'used'}
-        )
-    assert init_album_mock.mock_calls == [call(album.item), call().update_art_if_needed()]
+    before = pendulum.now('utc')
+    album_manager.on_album_posts_last_updated_at_change_schedule_art_update(album.id, new_item=album.item)
+    album.refresh_item()
+    assert album.item['gsiK2PartitionKey'] == 'albumArt'
+    update_at = pendulum.parse(album.item['gsiK2SortKey'])
+    assert update_at >= before + album_manager.art_update_delay
+    assert update_at <= pendulum.now('utc') + album_manager.art_update_delay
+
+    # check for a changed album, the update is pushed back
+    album_manager.on_album_posts_last_updated_at_change_schedule_art_update(
+        album.id, new_item=album.item, old_item={'un': 'used'}
+    )
+    album.refresh_item()
+    assert pendulum.parse(album.item['gsiK2SortKey']) >= update_at
+
+    # check the art wasn't touched
+    assert 'artHash' not in album.item
 
 
 def test_on_post_album_change_update_counts_and_timestamps(album_manager, user, album1, album2, post):
@@ -1,9 +1,9 @@
-import io
 import logging
 import uuid
 from os import path
 from unittest.mock import Mock, patch
 
+import PIL.Image
 import pytest
 
 from app.models.album.exceptions import AlbumException
@@ -97,7 +97,7 @@ def test_get_art_image_path(album):
 
 def test_get_art_image_url(album):
     image_url = 'https://the-image.com'
-    album.cloudfront_client.configure_mock(**{'generate_presigned_url.return_value': image_url})
+    album.cloudfront_client.configure_mock(**{'generate_presigned_readonly_url.return_value': image_url})
 
     # should get placeholder image when album has no artHash
     assert 'artHash' not in album.item
@@ -146,32 +146,52 @@ def test_save_art_images(album):
         assert not album.s3_uploads_client.exists(path)
 
     # save an image as the art
-    with open(grant_horz_path, 'rb') as fh:
-        image_data = fh.read()
-    album.save_art_images(art_hash, io.BytesIO(image_data))
+    image = PIL.Image.open(grant_horz_path)
+    album.save_art_images(art_hash, image)
 
     # check all sizes are in S3
     for size in image_size.JPEGS:
         path = album.get_art_image_path(size, art_hash)
         assert album.s3_uploads_client.exists(path)
 
-    # check the value of the native image
+    # check the native image is the image, re-encoded
     native_path = album.get_art_image_path(image_size.NATIVE, art_hash)
-    assert album.s3_uploads_client.get_object_data_stream(native_path).read() == image_data
+    native_image = PIL.Image.open(album.s3_uploads_client.get_object_data_stream(native_path))
+    assert native_image.format == 'JPEG'
+    assert native_image.size == image.size
 
     # save an new image as the art
-    with open(grant_vert_path, 'rb') as fh:
-        image_data = fh.read()
-    album.save_art_images(art_hash, io.BytesIO(image_data))
+    image = PIL.Image.open(grant_vert_path)
+    album.save_art_images(art_hash, image)
 
     # check all sizes are in S3
     for size in image_size.JPEGS:
         path = album.get_art_image_path(size, art_hash)
         assert album.s3_uploads_client.exists(path)
 
-    # check the value of the native image
+    # check the native image is the new image
     native_path = album.get_art_image_path(image_size.NATIVE, art_hash)
-    assert album.s3_uploads_client.get_object_data_stream(native_path).read() == image_data
+    native_image = PIL.Image.open(album.s3_uploads_client.get_object_data_stream(native_path))
+    assert native_image.size == image.size
+
+
+def test_save_art_images_thumbnails(album):
+    art_hash = 'the hash'
+    image = PIL.Image.new('RGB', (4000, 3000), (255, 0, 0))
+    album.save_art_images(art_hash, image)
+    assert image.size == (4000, 3000)
+
+    # each size is shrunk to fit, keeping the aspect ratio
+    expected_sizes = {
+        image_size.NATIVE: (4000, 3000),
+        image_size.K4: (2880, 2160),
+        image_size.P1080: (1440, 1080),
+        image_size.P480: (640, 480),
+        image_size.P64: (85, 64),
+    }
+    for size, expected_size in expected_sizes.items():
+        path = album.get_art_image_path(size, art_hash)
+        assert PIL.Image.open(album.s3_uploads_client.get_object_data_stream(path)).size == expected_size
 
 
 def test_increment_rank_count(album, caplog):
@@ -1,3 +1,4 @@
+from unittest.mock import call
 from uuid import uuid4
 
 import pytest
@@ -58,3 +59,21 @@ def test_trigger_notification(card_appsync, user, card, appsync_client):
             'action': card.item['action'],
         }
     }
+
+
+def test_trigger_notifications(card_appsync, minimal_card, maximal_card, appsync_client, caplog):
+    appsync_client.reset_mock()
+    inputs = [card.get_notification_input('card-notif-type') for card in (minimal_card, maximal_card)]
+    card_appsync.trigger_notifications(inputs)
+    assert appsync_client.mock_calls == [
+        call.send_mutations(
+            'triggerCardNotification', 'CardNotificationInput', card_appsync.card_selection_set, inputs
+        )
+    ]
+    assert inputs[1]['subTitle'] == 'max'
+
+    # failures are logged
+    appsync_client.send_mutations.return_value = [(inputs[0], Exception('nope'))]
+    card_appsync.trigger_notifications(inputs)
+    assert len(caplog.records) == 1
+    assert minimal_card.id in caplog.records[0].msg and 'nope' in caplog.records[0].msg
@@ -147,46 +147,64 @@ def test_on_post_view_count_change_updates_cards(card_manager, post, template):
 
 
 def test_on_card_add_sends_gql_notification(card_manager, card, user):
-    with patch.object(card_manager, 'appsync') as appsync_mock:
+    with patch.object(card_manager.appsync, 'trigger_notifications') as trigger_notifications_mock:
         card_manager.on_card_add(card.id, card.item)
-    assert appsync_mock.mock_calls == [
-        call.trigger_notification(
-            CardNotificationType.ADDED,
-            user.id,
-            card.id,
-            card.item['title'],
-            card.item['action'],
-            sub_title=card.item.get('subTitle'),
+        assert trigger_notifications_mock.mock_calls == []
+        assert card_manager.flush_notifications() == 1
+    assert trigger_notifications_mock.mock_calls == [
+        call(
+            [
+                {
+                    'userId': user.id,
+                    'type': CardNotificationType.ADDED,
+                    'cardId': card.id,
+                    'title': card.item['title'],
+                    'subTitle': card.item.get('subTitle'),
+                    'action': card.item['action'],
+                }
+            ]
         )
     ]
 
 
 def test_on_card_edit_sends_gql_notification(card_manager, card, user):
-    with patch.object(card_manager, 'appsync') as appsync_mock:
+    with patch.object(card_manager.appsync, 'trigger_notifications') as trigger_notifications_mock:
         card_manager.on_card_edit(card.id, old_item={'unused': True}, new_item=card.item)
-    assert appsync_mock.mock_calls == [
-        call.trigger_notification(
-            CardNotificationType.EDITED,
-            user.id,
-            card.id,
-            card.item['title'],
-            card.item['action'],
-            sub_title=card.item.get('subTitle'),
+        assert trigger_notifications_mock.mock_calls == []
+        assert card_manager.flush_notifications() == 1
+    assert trigger_notifications_mock.mock_calls == [
+        call(
+            [
+                {
+                    'userId': user.id,
+                    'type': CardNotificationType.EDITED,
+                    'cardId': card.id,
+                    'title': card.item['title'],
+                    'subTitle': card.item.get('subTitle'),
+                    'action': card.item['action'],
+                }
+            ]
         )
     ]
 
 
 def test_on_card_delete_sends_gql_notification(card_manager, card, user):
-    with patch.object(card_manager, 'appsync') as appsync_mock:
+    with patch.object(card_manager.appsync, 'trigger_notifications') as trigger_notifications_mock:
         card_manager.on_card_delete(card.id, card.item)
-    assert appsync_mock.mock_calls == [
-        call.trigger_notification(
-            CardNotificationType.DELETED,
-            user.id,
-            card.id,
-            card.item['title'],
-            card.item['action'],
-            sub_title=card.item.get('subTitle'),
+        assert trigger_notifications_mock.mock_calls == []
+        assert card_manager.flush_notifications() == 1
+    assert trigger_notifications_mock.mock_calls == [
+        call(
+            [
+                {
+                    'userId': user.id,
+                    'type': CardNotificationType.DELETED,
+                    'cardId': card.id,
+                    'title': card.item['title'],
+                    'subTitle': card.item.get('subTitle'),
+                    'action': card.item['action'],
+                }
+            ]
         )
     ]
 
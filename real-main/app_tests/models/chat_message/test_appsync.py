@@ -90,6 +90,27 @@ def test_trigger_notification_blocking_relationship(
     assert appsync_client.send.call_args.args[1]['input']['authorEncoded'] is None
 
 
+def test_trigger_notifications(chat_message_appsync, message, user1, user2, appsync_client, caplog):
+    appsync_client.reset_mock()
+    chat_message_appsync.trigger_notifications('ntype', [user1.id, user2.id], message)
+    assert len(appsync_client.mock_calls) == 1
+    field_name, input_type, selection_set, inputs = appsync_client.send_mutations.call_args.args
+    assert field_name == 'triggerChatMessageNotification'
+    assert input_type == 'ChatMessageNotificationInput'
+    assert selection_set == chat_message_appsync.message_selection_set
+    assert [(i['userId'], i['messageId'], i['type']) for i in inputs] == [
+        (user1.id, 'mid', 'ntype'),
+        (user2.id, 'mid', 'ntype'),
+    ]
+    assert inputs[1] == chat_message_appsync.get_input('ntype', user2.id, message)
+
+    # failures are logged, and don't stop the other notifications
+    appsync_client.send_mutations.return_value = [(inputs[0], Exception('nope'))]
+    chat_message_appsync.trigger_notifications('ntype', [user1.id, user2.id], message)
+    assert len(caplog.records) == 1
+    assert user1.id in caplog.records[0].msg and 'nope' in caplog.records[0].msg
+
+
 def test_trigger_notification_system_message(
     chat_message_appsync, chat_manager, chat_message_manager, user1, appsync_client
 ):
@@ -98,11 +119,13 @@ def test_trigger_notification_system_message(
     # adding a system message triggers the notifcations automatically
     message = chat_message_manager.add_system_message_group_name_edited(group_chat.id, user1, 'cname')
     assert len(appsync_client.mock_calls) == 1
-    assert len(appsync_client.send.call_args.kwargs) == 0
-    assert len(appsync_client.send.call_args.args) == 2
-    mutation, variables = appsync_client.send.call_args.args
-    assert 'triggerChatMessageNotification' in str(mutation)
-    assert list(variables.keys()) == ['input']
+    assert len(appsync_client.send_mutations.call_args.kwargs) == 0
+    field_name, input_type, selection_set, inputs = appsync_client.send_mutations.call_args.args
+    assert field_name == 'triggerChatMessageNotification'
+    assert input_type == 'ChatMessageNotificationInput'
+    assert selection_set == chat_message_appsync.message_selection_set
+    assert len(inputs) == 1
+    variables = {'input': inputs[0]}
     assert len(variables['input']) == 10
     assert variables['input']['userId'] == user1.id
     assert variables['input']['messageId'] == message.id
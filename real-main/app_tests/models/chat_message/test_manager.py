@@ -52,19 +52,17 @@ def test_add_system_message(chat_message_manager, chat, appsync_client, user2, u
     assert message.item['textTags'] == []
 
     # check the chat message notifications were triggered correctly
-    assert len(appsync_client.send.call_args_list) == 2
-    assert len(appsync_client.send.call_args_list[0].args) == 2
-    variables = appsync_client.send.call_args_list[0].args[1]
-    assert variables['input']['userId'] == user2.id
-    assert variables['input']['messageId'] == message.id
-    assert variables['input']['authorUserId'] is None
-    assert variables['input']['type'] == 'ADDED'
-    assert len(appsync_client.send.call_args_list[1].args) == 2
-    variables = appsync_client.send.call_args_list[1].args[1]
-    assert variables['input']['userId'] == user3.id
-    assert variables['input']['messageId'] == message.id
-    assert variables['input']['authorUserId'] is None
-    assert variables['input']['type'] == 'ADDED'
+    assert len(appsync_client.send_mutations.call_args_list) == 1
+    inputs = appsync_client.send_mutations.call_args.args[3]
+    assert len(inputs) == 2
+    assert inputs[0]['userId'] == user2.id
+    assert inputs[0]['messageId'] == message.id
+    assert inputs[0]['authorUserId'] is None
+    assert inputs[0]['type'] == 'ADDED'
+    assert inputs[1]['userId'] == user3.id
+    assert inputs[1]['messageId'] == message.id
+    assert inputs[1]['authorUserId'] is None
+    assert inputs[1]['type'] == 'ADDED'
 
 
 def test_add_system_message_group_created(chat_message_manager, chat, user):
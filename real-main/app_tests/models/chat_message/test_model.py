@@ -120,7 +120,7 @@ def test_get_author_encoded(chat_message_manager, user1, user2, user3, chat, blo
 def test_trigger_notifications_direct(message, chat, user1, user2, appsync_client):
     message.appsync = mock.Mock()
     message.trigger_notifications('ntype')
-    assert message.appsync.mock_calls == [mock.call.trigger_notification('ntype', user2.id, message)]
+    assert message.appsync.mock_calls == [mock.call.trigger_notifications('ntype', [user2.id], message)]
 
 
 def test_trigger_notifications_user_ids(message, chat, user1, user2, user3, appsync_client):
@@ -129,8 +129,7 @@ def test_trigger_notifications_user_ids(message, chat, user1, user2, user3, apps
     message.appsync = mock.Mock()
     message.trigger_notifications('ntype', user_ids=[user2.id, user3.id])
     assert message.appsync.mock_calls == [
-        mock.call.trigger_notification('ntype', user2.id, message),
-        mock.call.trigger_notification('ntype', user3.id, message),
+        mock.call.trigger_notifications('ntype', [user2.id, user3.id], message),
     ]
 
 
@@ -146,14 +145,14 @@ def test_trigger_notifications_group(chat_manager, chat_message_manager, user1,
     message.appsync = mock.Mock()
     message.trigger_notifications('ntype')
     assert message.appsync.mock_calls == [
-        mock.call.trigger_notification('ntype', user1.id, message),
-        mock.call.trigger_notification('ntype', user3.id, message),
+        mock.call.trigger_notifications('ntype', [user1.id, user3.id], message),
     ]
 
     # add system message, notifications are triggered automatically
     appsync_client.reset_mock()
     message = chat_message_manager.add_system_message_group_name_edited(group_chat.id, user3, 'cname')
-    assert len(appsync_client.send.mock_calls) == 3  # one for each member of the group chat
+    assert len(appsync_client.send_mutations.mock_calls) == 1
+    assert len(appsync_client.send_mutations.call_args.args[3]) == 3  # one for each member of the group chat
 
 
 def test_cant_flag_chat_message_of_chat_we_are_not_in(chat, message, user1, user2, user3):
@@ -0,0 +1,295 @@
+import json
+from unittest.mock import patch
+
+import pendulum
+import pytest
+
+from app import models
+from app.models.fan_out.enums import FanOutJobType
+from app.models.post.enums import PostStatus
+from app.utils import GqlNotificationType
+
+
+@pytest.fixture
+def post_item(fan_out_manager):
+    post_item = fan_out_manager.post_manager.dynamo.add_pending_post('pbuid', 'pid', 'ptype', text='t')
+    yield fan_out_manager.post_manager.dynamo.set_post_status(post_item, PostStatus.COMPLETED)
+
+
+@pytest.fixture
+def follower_user_ids(fan_out_manager):
+    user_ids = ['fuid1', 'fuid2', 'fuid3']
+    for user_id in user_ids:
+        fan_out_manager.follower_manager.dynamo.add_following(user_id, 'pbuid', 'FOLLOWING')
+    fan_out_manager.follower_manager.dynamo.add_following('fuid4', 'pbuid', 'REQUESTED')
+    yield user_ids
+
+
+@pytest.fixture
+def queued_fan_out_manager(appsync_client, dynamo_client, dynamo_feed_client, sqs_fan_out_client):
+    yield models.FanOutManager(
+        {
+            'appsync': appsync_client,
+            'dynamo': dynamo_client,
+            'dynamo_feed': dynamo_feed_client,
+            'sqs_fan_out': sqs_fan_out_client,
+        }
+    )
+
+
+def receive_jobs(sqs_client):
+    "Receive jobs as the fan-out worker does, return them with the message group each was sent in"
+    resp = sqs_client.boto3_client.receive_message(
+        QueueUrl=sqs_client.queue_url, MaxNumberOfMessages=10, AttributeNames=['MessageGroupId']
+    )
+    messages = resp.get('Messages', [])
+    for message in messages:
+        sqs_client.boto3_client.delete_message(
+            QueueUrl=sqs_client.queue_url, ReceiptHandle=message['ReceiptHandle']
+        )
+    return [(json.loads(message['Body']), message['Attributes']['MessageGroupId']) for message in messages]
+
+
+def test_enqueue_unrecognized_job_type(fan_out_manager):
+    with pytest.raises(AssertionError, match='Unrecognized'):
+        fan_out_manager.enqueue('not-a-job-type', postId='pid')
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 500])
+def test_feed_add_post(fan_out_manager, post_item, follower_user_ids, page_size):
+    fan_out_manager.page_size = page_size
+    fan_out_manager.feed_manager.appsync_client.reset_mock()
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    fan_out_manager.feed_manager.flush_feed_changed_notifications()
+
+    # the poster and all their followers have the post in their feed, and were notified of that
+    feed_user_ids = ['pbuid', *follower_user_ids, 'fuid4']
+    for user_id in feed_user_ids:
+        assert [item['postId'] for item in fan_out_manager.feed_manager.dynamo.generate_items(user_id)] == ['pid']
+    assert len(fan_out_manager.feed_manager.appsync_client.mock_calls) == 1
+    notifications = fan_out_manager.feed_manager.appsync_client.fire_notifications.call_args.args[0]
+    assert sorted(n['userId'] for n in notifications) == sorted(feed_user_ids)
+    assert set(n['type'] for n in notifications) == {GqlNotificationType.USER_FEED_CHANGED}
+
+
+def test_feed_add_post_post_no_longer_completed(fan_out_manager, post_item, follower_user_ids):
+    fan_out_manager.post_manager.dynamo.set_post_status(post_item, PostStatus.ARCHIVED)
+    fan_out_manager.feed_manager.appsync_client.reset_mock()
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    for user_id in ['pbuid', *follower_user_ids]:
+        assert list(fan_out_manager.feed_manager.dynamo.generate_items(user_id)) == []
+    assert fan_out_manager.feed_manager.appsync_client.mock_calls == []
+
+
+@pytest.mark.parametrize('page_size', [1, 500])
+def test_feed_delete_post(fan_out_manager, post_item, follower_user_ids, page_size):
+    fan_out_manager.page_size = page_size
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    assert len(list(fan_out_manager.feed_manager.dynamo.generate_keys_by_post('pid'))) == 5
+
+    # while the post is still completed, nothing is deleted
+    fan_out_manager.enqueue(FanOutJobType.FEED_DELETE_POST, postId='pid', postedByUserId='pbuid')
+    assert len(list(fan_out_manager.feed_manager.dynamo.generate_keys_by_post('pid'))) == 5
+
+    # archive the post, delete it from all feeds
+    fan_out_manager.post_manager.dynamo.set_post_status(post_item, PostStatus.ARCHIVED)
+    fan_out_manager.feed_manager.appsync_client.reset_mock()
+    fan_out_manager.enqueue(FanOutJobType.FEED_DELETE_POST, postId='pid', postedByUserId='pbuid')
+    fan_out_manager.feed_manager.feed_changed_notifications.recently_sent.clear()
+    fan_out_manager.feed_manager.flush_feed_changed_notifications()
+    assert list(fan_out_manager.feed_manager.dynamo.generate_keys_by_post('pid')) == []
+    assert len(fan_out_manager.feed_manager.appsync_client.fire_notifications.call_args.args[0]) == 5
+
+
+@pytest.mark.parametrize('page_size', [1, 500])
+def test_feed_update_post(fan_out_manager, post_item, follower_user_ids, page_size):
+    fan_out_manager.page_size = page_size
+    fan_out_manager.feed_manager.denormalize_items = True
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    feed_items = list(fan_out_manager.feed_manager.dynamo.generate_items('fuid1'))
+    assert [(i['postId'], i['textPreview']) for i in feed_items] == [('pid', 't')]
+
+    # edit the post's text, verify it is updated in all feeds
+    fan_out_manager.post_manager.dynamo.set(post_item['postId'], text='new text')
+    fan_out_manager.enqueue(FanOutJobType.FEED_UPDATE_POST, postId='pid', postedByUserId='pbuid')
+    for user_id in ['pbuid', *follower_user_ids, 'fuid4']:
+        feed_items = list(fan_out_manager.feed_manager.dynamo.generate_items(user_id))
+        assert [(i['postId'], i['textPreview']) for i in feed_items] == [('pid', 'new text')]
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 500])
+def test_feed_update_user_posts(fan_out_manager, post_item, follower_user_ids, page_size):
+    fan_out_manager.page_size = page_size
+    feed_manager = fan_out_manager.feed_manager
+    feed_manager.denormalize_items = True
+    feed_manager.user_manager.dynamo.add_user('pbuid', 'pbuname')
+    post_dynamo = fan_out_manager.post_manager.dynamo
+    other_post_item = post_dynamo.add_pending_post('pbuid', 'pid2', 'ptype', text='t2')
+    post_dynamo.set_post_status(other_post_item, PostStatus.COMPLETED)
+    post_dynamo.add_pending_post('pbuid', 'pid3', 'ptype', text='t3')
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid2', postedByUserId='pbuid')
+
+    # change the username, verify it is updated in all feed items of all the user's completed posts
+    feed_manager.user_manager.dynamo.update_user_username('pbuid', 'newuname', 'pbuname')
+    with patch.object(fan_out_manager, 'enqueue', wraps=fan_out_manager.enqueue) as enqueue_mock:
+        fan_out_manager.enqueue(FanOutJobType.FEED_UPDATE_USER_POSTS, postedByUserId='pbuid')
+    assert sorted(c.kwargs['postId'] for c in enqueue_mock.call_args_list if c.kwargs.get('postId')) == [
+        'pid',
+        'pid2',
+    ]
+    for user_id in ['pbuid', *follower_user_ids, 'fuid4']:
+        feed_items = list(feed_manager.dynamo.generate_items(user_id))
+        assert sorted((i['postId'], i['postedByUsername']) for i in feed_items) == [
+            ('pid', 'newuname'),
+            ('pid2', 'newuname'),
+        ]
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 500])
+def test_feed_trim(fan_out_manager, page_size):
+    fan_out_manager.page_size = page_size
+    feed_manager = fan_out_manager.feed_manager
+    for user_id in ['uid1', 'uid2', 'uid3']:
+        feed_manager.user_manager.dynamo.add_user(user_id, user_id)
+    posted_at = pendulum.now('utc')
+    for i in range(3):
+        post_item = {
+            'postId': f'pid{i}',
+            'postedByUserId': 'pbuid',
+            'postedAt': (posted_at + pendulum.duration(seconds=i)).to_iso8601_string(),
+        }
+        feed_manager.dynamo.add_post_to_feeds(['uid1', 'uid2'], post_item)
+
+    # all feeds are trimmed, however many pages the users are spread across
+    feed_manager.max_item_count = 2
+    fan_out_manager.enqueue(FanOutJobType.FEED_TRIM)
+    for user_id in ['uid1', 'uid2']:
+        feed_items = list(feed_manager.dynamo.generate_items(user_id))
+        assert [item['postId'] for item in feed_items] == ['pid1', 'pid2']
+    assert list(feed_manager.dynamo.generate_items('uid3')) == []
+
+
+@pytest.mark.parametrize('page_size', [1, 500])
+def test_first_story_set_and_delete(fan_out_manager, post_item, follower_user_ids, page_size, dynamo_client):
+    fan_out_manager.page_size = page_size
+    first_story_dynamo = fan_out_manager.follower_manager.first_story_dynamo
+    expires_at = pendulum.now('utc') + pendulum.duration(hours=1)
+    post_item = fan_out_manager.post_manager.dynamo.set_expires_at(post_item, expires_at)
+
+    # set, only followers that are following get the first story
+    kwargs = {'postId': 'pid', 'postedByUserId': 'pbuid', 'followingOnly': True}
+    fan_out_manager.enqueue(FanOutJobType.FIRST_STORY_SET, expiresAt=post_item['expiresAt'], **kwargs)
+    for user_id in follower_user_ids:
+        assert dynamo_client.get_item(first_story_dynamo.key('pbuid', user_id))['postId'] == 'pid'
+    assert dynamo_client.get_item(first_story_dynamo.key('pbuid', 'fuid4')) is None
+
+    # delete
+    fan_out_manager.enqueue(FanOutJobType.FIRST_STORY_DELETE, **kwargs)
+    for user_id in follower_user_ids:
+        assert dynamo_client.get_item(first_story_dynamo.key('pbuid', user_id)) is None
+
+
+def test_queued_job(queued_fan_out_manager, post_item, follower_user_ids, sqs_fan_out_client):
+    fan_out_manager = queued_fan_out_manager
+    fan_out_manager.page_size = 2
+    feed_dynamo = fan_out_manager.feed_manager.dynamo
+
+    # enqueueing sends the job to the queue, in the poster's message group, nothing is processed yet
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    assert list(feed_dynamo.generate_keys_by_post('pid')) == []
+    jobs = receive_jobs(sqs_fan_out_client)
+    assert len(jobs) == 1
+    job, group_id = jobs[0]
+    assert group_id == 'pbuid'
+    assert job == {
+        'jobType': FanOutJobType.FEED_ADD_POST,
+        'args': {'postId': 'pid', 'postedByUserId': 'pbuid'},
+        'cursor': None,
+        'pageNumber': 0,
+        'jobId': job['jobId'],
+    }
+
+    # the job is split up front, each page queued up with its items in a message group of its own
+    fan_out_manager.on_job(job)
+    assert list(feed_dynamo.generate_keys_by_post('pid')) == []
+    page_jobs = sorted(receive_jobs(sqs_fan_out_client), key=lambda job_and_group: job_and_group[1])
+    assert [group_id for _, group_id in page_jobs] == ['pbuid/0', 'pbuid/1']
+    assert [page_job['pageNumber'] for page_job, _ in page_jobs] == [0, 1]
+    assert sorted(user_id for page_job, _ in page_jobs for user_id in page_job['items']) == [
+        'fuid1',
+        'fuid2',
+        'fuid3',
+        'fuid4',
+    ]
+    assert all(page_job['jobId'] == job['jobId'] for page_job, _ in page_jobs)
+
+    # the pages are independent of each other, the poster's own feed goes with the first
+    fan_out_manager.feed_manager.appsync_client.reset_mock()
+    fan_out_manager.on_job(page_jobs[1][0])
+    assert len(list(feed_dynamo.generate_keys_by_post('pid'))) == 2
+    fan_out_manager.on_job(page_jobs[0][0])
+    assert len(list(feed_dynamo.generate_keys_by_post('pid'))) == 5
+    assert receive_jobs(sqs_fan_out_client) == []
+
+
+def test_queued_job_split_over_invocations(
+    queued_fan_out_manager, post_item, follower_user_ids, sqs_fan_out_client
+):
+    fan_out_manager = queued_fan_out_manager
+    fan_out_manager.page_size = 1
+    fan_out_manager.split_page_count = 3
+    fan_out_manager.enqueue(FanOutJobType.FEED_ADD_POST, postId='pid', postedByUserId='pbuid')
+    job = receive_jobs(sqs_fan_out_client)[0][0]
+
+    # split up to three pages, then the rest of the job is queued up to be split in the poster's group
+    fan_out_manager.on_job(job)
+    jobs = sorted(receive_jobs(sqs_fan_out_client), key=lambda job_and_group: job_and_group[1])
+    assert [group_id for _, group_id in jobs] == ['pbuid', 'pbuid/0', 'pbuid/1', 'pbuid/2']
+    next_job = jobs[0][0]
+    assert next_job['cursor']
+    assert next_job['pageNumber'] == 3
+
+    # the rest of the pages
+    with patch.object(sqs_fan_out_client, 'send_message', wraps=sqs_fan_out_client.send_message) as send_mock:
+        fan_out_manager.on_job(next_job)
+    jobs = receive_jobs(sqs_fan_out_client)
+    assert [group_id for _, group_id in jobs] == ['pbuid/3']
+
+    # splitting again, as when retried, queues up the same pages with the same deduplication ids,
+    # so the queue drops them
+    with patch.object(sqs_fan_out_client, 'send_message') as retry_send_mock:
+        fan_out_manager.on_job(next_job)
+    assert retry_send_mock.call_args_list == send_mock.call_args_list
+    assert send_mock.call_args.kwargs['deduplication_id'] == f'{job["jobId"]}/3/items'
+
+
+def test_queued_job_page_fails(queued_fan_out_manager, post_item, follower_user_ids, sqs_fan_out_client):
+    fan_out_manager = queued_fan_out_manager
+    job = {
+        'jobType': FanOutJobType.FEED_ADD_POST,
+        'args': {'postId': 'pid', 'postedByUserId': 'pbuid'},
+        'jobId': 'jid',
+        'pageNumber': 1,
+        'items': ['fuid1', 'fuid2'],
+    }
+
+    # the page fails, to be retried by the queue
+    feed_dynamo = fan_out_manager.feed_manager.dynamo
+    with patch.object(feed_dynamo, 'add_post_to_feeds', side_effect=Exception('boom')):
+        with pytest.raises(Exception, match='boom'):
+            fan_out_manager.on_job(job)
+
+    # the retry goes through, without touching any other page
+    fan_out_manager.on_job(job)
+    assert sorted(key['feedUserId'] for key in feed_dynamo.generate_keys_by_post('pid')) == ['fuid1', 'fuid2']
+    assert receive_jobs(sqs_fan_out_client) == []
+
+
+def test_queued_job_without_user(queued_fan_out_manager, sqs_fan_out_client):
+    # jobs that are not about a user's posts each have a message group of their job type
+    queued_fan_out_manager.enqueue(FanOutJobType.FEED_TRIM)
+    jobs = receive_jobs(sqs_fan_out_client)
+    assert [(job['jobType'], job['args'], group_id) for job, group_id in jobs] == [
+        (FanOutJobType.FEED_TRIM, {}, FanOutJobType.FEED_TRIM)
+    ]
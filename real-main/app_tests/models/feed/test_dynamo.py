@@ -239,3 +239,108 @@ def test_generate_keys_by_posted_by_user(feed_dynamo):
         {'postId': pid2, 'feedUserId': feed_user_id}
     ]
     assert list(feed_dynamo.generate_keys_by_posted_by_user(feed_user_id, str(uuid4()))) == []
+
+
+def test_generate_recent_items(feed_dynamo):
+    feed_user_id = str(uuid4())
+    posted_at = pendulum.now('utc')
+    post_items = [
+        {
+            'postId': str(uuid4()),
+            'postedByUserId': str(uuid4()),
+            'postedAt': (posted_at + pendulum.duration(seconds=i)).to_iso8601_string(),
+        }
+        for i in range(3)
+    ]
+    assert list(feed_dynamo.generate_recent_items(feed_user_id)) == []
+
+    # add some posts to the feed, and some bait to another feed
+    feed_dynamo.add_posts_to_feed(feed_user_id, iter(post_items))
+    feed_dynamo.add_posts_to_feed(str(uuid4()), iter(post_items))
+
+    # newest first, over pages of any size
+    for page_size in (None, 1, 2):
+        items = feed_dynamo.generate_recent_items(feed_user_id, page_size=page_size)
+        assert [item['postId'] for item in items] == [post_items[i]['postId'] for i in (2, 1, 0)]
+
+    # restricted to those posted at or before a point in time
+    items = feed_dynamo.generate_recent_items(feed_user_id, posted_at_or_before=post_items[1]['postedAt'])
+    assert [item['postId'] for item in items] == [post_items[i]['postId'] for i in (1, 0)]
+    items = feed_dynamo.generate_recent_items(feed_user_id, posted_at_or_before=post_items[0]['postedAt'])
+    assert [item['postId'] for item in items] == [post_items[0]['postId']]
+
+
+def test_trim(feed_dynamo):
+    feed_user_id, other_feed_user_id = str(uuid4()), str(uuid4())
+    posted_at = pendulum.now('utc')
+    post_items = [
+        {
+            'postId': str(uuid4()),
+            'postedByUserId': str(uuid4()),
+            'postedAt': (posted_at + pendulum.duration(seconds=i)).to_iso8601_string(),
+        }
+        for i in range(4)
+    ]
+    feed_dynamo.add_posts_to_feed(feed_user_id, iter(post_items))
+    feed_dynamo.add_posts_to_feed(other_feed_user_id, iter(post_items))
+
+    # trim to more than we have, then to exactly what we have, no-ops
+    assert feed_dynamo.trim(feed_user_id, 5) == 0
+    assert feed_dynamo.trim(feed_user_id, 4) == 0
+    assert len(list(feed_dynamo.generate_items(feed_user_id))) == 4
+
+    # trim down, verify the oldest items were removed and the other feed was left alone
+    assert feed_dynamo.trim(feed_user_id, 2) == 2
+    assert [i['postId'] for i in feed_dynamo.generate_items(feed_user_id)] == [
+        post_items[2]['postId'],
+        post_items[3]['postId'],
+    ]
+    assert len(list(feed_dynamo.generate_items(other_feed_user_id))) == 4
+
+    # trim down to nothing
+    assert feed_dynamo.trim(feed_user_id, 0) == 2
+    assert list(feed_dynamo.generate_items(feed_user_id)) == []
+
+
+def test_has_more_items_than(feed_dynamo):
+    feed_user_id = str(uuid4())
+    assert feed_dynamo.has_more_items_than(feed_user_id, 0) is False
+
+    posted_at = pendulum.now('utc').to_iso8601_string()
+    post_items = [
+        {'postId': str(uuid4()), 'postedByUserId': str(uuid4()), 'postedAt': posted_at} for _ in range(3)
+    ]
+    feed_dynamo.add_posts_to_feed(feed_user_id, iter(post_items))
+    assert feed_dynamo.has_more_items_than(feed_user_id, 0) is True
+    assert feed_dynamo.has_more_items_than(feed_user_id, 2) is True
+    assert feed_dynamo.has_more_items_than(feed_user_id, 3) is False
+    assert feed_dynamo.has_more_items_than(feed_user_id, 1000) is False
+
+
+def test_item_with_summary(feed_dynamo):
+    post_item = {'postId': 'pid', 'postedAt': 'pat', 'postedByUserId': 'pbuid'}
+    summary = {'postType': 'TEXT_ONLY', 'textPreview': 't', 'imageHeight': None, 'notASummaryAttr': 'x'}
+    assert feed_dynamo.item('fuid', post_item, summary=summary) == {
+        'feedUserId': 'fuid',
+        'postId': 'pid',
+        'postedAt': 'pat',
+        'postedByUserId': 'pbuid',
+        'postType': 'TEXT_ONLY',
+        'textPreview': 't',
+    }
+
+
+def test_set_summary(feed_dynamo):
+    post_item = {'postId': 'pid', 'postedAt': 'pat', 'postedByUserId': 'pbuid'}
+    feed_dynamo.add_post_to_feeds(
+        ['fuid1', 'fuid2'], post_item, summary={'postType': 'IMAGE', 'textPreview': 't'}
+    )
+
+    # set the summary, including for an item that is not in the feed
+    keys = [{'postId': 'pid', 'feedUserId': uid} for uid in ('fuid1', 'fuid2', 'fuid3')]
+    feed_dynamo.set_summary(keys, {'postType': 'IMAGE', 'imageHeight': 4, 'textPreview': None})
+    for user_id in ('fuid1', 'fuid2'):
+        assert list(feed_dynamo.generate_items(user_id)) == [
+            {'feedUserId': user_id, **post_item, 'postType': 'IMAGE', 'imageHeight': 4}
+        ]
+    assert list(feed_dynamo.generate_items('fuid3')) == []
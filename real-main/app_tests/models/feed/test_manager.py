@@ -1,8 +1,11 @@
+from unittest.mock import call, patch
 from uuid import uuid4
 
 import pendulum
 import pytest
 
+from app import models
+from app.models.fan_out.enums import FanOutJobType
 from app.models.post.enums import PostType
 
 
@@ -13,6 +16,21 @@ def user(user_manager, cognito_client):
     yield user_manager.create_cognito_only_user(user_id, username)
 
 
+@pytest.fixture
+def denormalized_feed_manager(appsync_client, cloudfront_client, dynamo_client, dynamo_feed_client):
+    cloudfront_client.configure_mock(**{'generate_presigned_readonly_url.return_value': 'https://signed-url'})
+    feed_manager = models.FeedManager(
+        {
+            'appsync': appsync_client,
+            'cloudfront': cloudfront_client,
+            'dynamo': dynamo_client,
+            'dynamo_feed': dynamo_feed_client,
+        }
+    )
+    feed_manager.denormalize_items = True
+    yield feed_manager
+
+
 def test_add_users_posts_to_feed(feed_manager, post_manager, user, cognito_client):
     feed_user_id = str(uuid4())
 
@@ -33,47 +51,328 @@ def test_add_users_posts_to_feed(feed_manager, post_manager, user, cognito_clien
     )
 
 
-def test_add_post_to_followers_feeds(feed_manager, user_manager):
+def test_add_users_posts_to_feed_is_bounded(feed_manager, post_manager, user):
+    feed_user_id = str(uuid4())
+    feed_manager.backfill_post_count = 2
+    feed_manager.max_item_count = 3
+
+    # user has three posts
+    posted_at = pendulum.now('utc')
+    post_ids = [str(uuid4()) for _ in range(3)]
+    for i, post_id in enumerate(post_ids):
+        post_manager.add_post(
+            user, post_id, PostType.TEXT_ONLY, text='t', now=posted_at + pendulum.duration(seconds=i)
+        )
+
+    # only the most recent posts are backfilled, and only the projected attributes make it in
+    feed_manager.add_users_posts_to_feed(feed_user_id, user.id)
+    feed_items = list(feed_manager.dynamo.generate_items(feed_user_id))
+    assert [i['postId'] for i in feed_items] == post_ids[1:]
+    assert sorted(feed_items[0].keys()) == ['feedUserId', 'postId', 'postedAt', 'postedByUserId']
+
+    # add some more items to the feed, backfill again and verify the feed was trimmed
+    other_post_item = {
+        'postId': str(uuid4()),
+        'postedByUserId': str(uuid4()),
+        'postedAt': posted_at.to_iso8601_string(),
+    }
+    feed_manager.dynamo.add_post_to_feeds([feed_user_id], other_post_item)
+    assert len(list(feed_manager.dynamo.generate_items(feed_user_id))) == 3
+    feed_manager.backfill_post_count = 3
+    feed_manager.add_users_posts_to_feed(feed_user_id, user.id)
+    assert [i['postId'] for i in feed_manager.dynamo.generate_items(feed_user_id)] == post_ids
+
+
+def test_trim_feed(feed_manager):
+    posted_at = pendulum.now('utc')
+    for i in range(3):
+        post_item = {
+            'postId': str(uuid4()),
+            'postedByUserId': str(uuid4()),
+            'postedAt': (posted_at + pendulum.duration(seconds=i)).to_iso8601_string(),
+        }
+        feed_manager.dynamo.add_post_to_feeds(['uid1'], post_item)
+
+    # feeds that are not over the limit are not touched
+    feed_manager.max_item_count = 3
+    with patch.object(feed_manager.dynamo, 'trim') as trim_mock:
+        assert feed_manager.trim_feed('uid1') == 0
+    assert trim_mock.mock_calls == []
+
+    feed_manager.max_item_count = 2
+    assert feed_manager.trim_feed('uid1') == 1
+    assert len(list(feed_manager.dynamo.generate_items('uid1'))) == 2
+    assert feed_manager.trim_feed('uid1') == 0
+
+
+def test_trim_feeds(feed_manager):
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        feed_manager.trim_feeds()
+    assert fan_out_manager_mock.mock_calls == [call.enqueue(FanOutJobType.FEED_TRIM)]
+
+
+def test_is_fanned_out(feed_manager, user):
+    assert feed_manager.is_fanned_out(user.id) is True
+    assert feed_manager.is_fanned_out(str(uuid4())) is True
+
+    # push the user over the limit
+    feed_manager.fan_out_max_follower_count = 1
+    feed_manager.user_manager.dynamo.increment_follower_count(user.id)
+    assert feed_manager.is_fanned_out(user.id) is True
+    feed_manager.user_manager.dynamo.increment_follower_count(user.id)
+    assert feed_manager.is_fanned_out(user.id) is False
+
+
+def test_get_feed(feed_manager, user_manager):
+    feed_manager.fan_out_max_follower_count = 1
     our_user = user_manager.init_user({'userId': 'ouid', 'privacyStatus': 'PUBLIC'})
-    their_user = user_manager.init_user({'userId': 'tuid', 'privacyStatus': 'PUBLIC'})
-    another_user = user_manager.init_user({'userId': 'auid', 'privacyStatus': 'PUBLIC'})
-
-    # check feeds are empty
-    assert list(feed_manager.dynamo.generate_items(our_user.id)) == []
-    assert list(feed_manager.dynamo.generate_items(their_user.id)) == []
-    assert list(feed_manager.dynamo.generate_items(another_user.id)) == []
-
-    # add a post to all our followers (none) and us
-    posted_at = pendulum.now('utc').to_iso8601_string()
-    post_id_1 = str(uuid4())
-    post_item = {
-        'postId': post_id_1,
-        'postedByUserId': our_user.id,
-        'postedAt': posted_at,
+    other_user = user_manager.init_user({'userId': 'tuid', 'privacyStatus': 'PUBLIC'})
+    celeb_user = user_manager.init_user({'userId': 'cuid', 'privacyStatus': 'PUBLIC'})
+    for user in (our_user, other_user, celeb_user):
+        user_manager.dynamo.add_user(user.id, user.id)
+    user_manager.dynamo.increment_follower_count(celeb_user.id)
+    user_manager.dynamo.increment_follower_count(celeb_user.id)
+
+    # empty feed
+    assert feed_manager.get_feed(our_user.id) == {'items': [], 'nextToken': None}
+
+    # we follow both of them
+    feed_manager.follower_manager.dynamo.add_following(our_user.id, other_user.id, 'FOLLOWING')
+    feed_manager.follower_manager.dynamo.add_following(our_user.id, celeb_user.id, 'FOLLOWING')
+    feed_manager.fan_in_user_ids_cache.clear()
+
+    # other user's posts are fanned out to our feed, celeb's posts are not
+    posted_at = pendulum.now('utc')
+    post_items = []
+    for i, user_id in enumerate(['tuid', 'cuid', 'tuid', 'cuid']):
+        post_item = feed_manager.post_manager.dynamo.add_pending_post(
+            user_id, f'pid{i}', PostType.TEXT_ONLY, text='t', posted_at=posted_at + pendulum.duration(seconds=i)
+        )
+        post_item = feed_manager.post_manager.dynamo.set_post_status(post_item, 'COMPLETED')
+        if user_id == 'tuid':
+            feed_manager.dynamo.add_post_to_feeds([our_user.id], post_item)
+        post_items.append(post_item)
+    assert [i['postId'] for i in feed_manager.dynamo.generate_items(our_user.id)] == ['pid0', 'pid2']
+
+    # all posts are in our feed, newest first
+    assert feed_manager.get_feed(our_user.id) == {'items': ['pid3', 'pid2', 'pid1', 'pid0'], 'nextToken': None}
+    assert feed_manager.get_feed(other_user.id) == {'items': [], 'nextToken': None}
+
+    # page through it
+    feed = feed_manager.get_feed(our_user.id, limit=3)
+    assert feed['items'] == ['pid3', 'pid2', 'pid1']
+    assert feed['nextToken']
+    feed = feed_manager.get_feed(our_user.id, limit=3, next_token=feed['nextToken'])
+    assert feed == {'items': ['pid0'], 'nextToken': None}
+
+    # posts already in the materialized feed are not duplicated
+    feed_manager.dynamo.add_post_to_feeds([our_user.id], post_items[3])
+    feed_manager.fan_in_posts_cache.clear()
+    assert feed_manager.get_feed(our_user.id) == {'items': ['pid3', 'pid2', 'pid1', 'pid0'], 'nextToken': None}
+
+
+def test_page_after_cursor(feed_manager):
+    items = [
+        {'postId': post_id, 'postedAt': posted_at}
+        for post_id, posted_at in (('pid5', 't3'), ('pid2', 't2'), ('pid4', 't2'), ('pid3', 't2'), ('pid1', 't1'))
+    ]
+    assert feed_manager.page_after_cursor(iter([]), 2) == []
+
+    # all items sharing the postedAt of the last item are read before the page is cut
+    generated = []
+    page = feed_manager.page_after_cursor((generated.append(item) or item for item in items), 2)
+    assert [item['postId'] for item in page] == ['pid5', 'pid4']
+    assert len(generated) == 5
+
+    # the cursor splits items that share its postedAt by postId
+    page = feed_manager.page_after_cursor(iter(items), 2, cursor=('t2', 'pid4'))
+    assert [item['postId'] for item in page] == ['pid3', 'pid2']
+    page = feed_manager.page_after_cursor(iter(items), 2, cursor=('t2', 'pid2'))
+    assert [item['postId'] for item in page] == ['pid1']
+    page = feed_manager.page_after_cursor(iter(items), 10, cursor=('t2', ''))
+    assert [item['postId'] for item in page] == ['pid1']
+
+
+def test_get_feed_shared_posted_at(feed_manager, user_manager):
+    feed_manager.fan_out_max_follower_count = 1
+    our_user = user_manager.init_user({'userId': 'ouid', 'privacyStatus': 'PUBLIC'})
+    for user_id in ('ouid', 'tuid', 'cuid'):
+        user_manager.dynamo.add_user(user_id, user_id)
+    for user_id in ('tuid', 'cuid'):
+        feed_manager.follower_manager.dynamo.add_following(our_user.id, user_id, 'FOLLOWING')
+    user_manager.dynamo.increment_follower_count('cuid')
+    user_manager.dynamo.increment_follower_count('cuid')
+
+    # all posts, both fanned out and merged in on read, share the same postedAt
+    posted_at = pendulum.now('utc')
+    for i, user_id in enumerate(['tuid', 'cuid', 'tuid', 'cuid', 'tuid', 'cuid', 'tuid']):
+        post_item = feed_manager.post_manager.dynamo.add_pending_post(
+            user_id, f'pid{i}', PostType.TEXT_ONLY, text='t', posted_at=posted_at
+        )
+        post_item = feed_manager.post_manager.dynamo.set_post_status(post_item, 'COMPLETED')
+        if user_id == 'tuid':
+            feed_manager.dynamo.add_post_to_feeds([our_user.id], post_item)
+
+    # paging through the feed sees each post exactly once, ordered by postId
+    for limit in (1, 2, 3):
+        post_ids, next_token = [], None
+        while True:
+            feed = feed_manager.get_feed(our_user.id, limit=limit, next_token=next_token)
+            post_ids.extend(feed['items'])
+            if not (next_token := feed['nextToken']):
+                break
+        assert post_ids == [f'pid{i}' for i in (6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_get_feed_pages_fan_in_posts_past_the_cached_ones(feed_manager, user_manager):
+    feed_manager.fan_out_max_follower_count = 0
+    feed_manager.fan_in_post_count = 2
+    our_user = user_manager.init_user({'userId': 'ouid', 'privacyStatus': 'PUBLIC'})
+    for user_id in ('ouid', 'cuid'):
+        user_manager.dynamo.add_user(user_id, user_id)
+    feed_manager.follower_manager.dynamo.add_following(our_user.id, 'cuid', 'FOLLOWING')
+    user_manager.dynamo.increment_follower_count('cuid')
+
+    posted_at = pendulum.now('utc')
+    for i in range(5):
+        post_item = feed_manager.post_manager.dynamo.add_pending_post(
+            'cuid', f'pid{i}', PostType.TEXT_ONLY, text='t', posted_at=posted_at + pendulum.duration(seconds=i)
+        )
+        feed_manager.post_manager.dynamo.set_post_status(post_item, 'COMPLETED')
+
+    # the first page is served from the cached posts
+    feed = feed_manager.get_feed(our_user.id, limit=1)
+    assert feed['items'] == ['pid4']
+    assert [item['postId'] for item in feed_manager.fan_in_posts_cache.get('cuid')] == ['pid4', 'pid3']
+
+    # later pages query from their cursor, past the cached posts
+    feed = feed_manager.get_feed(our_user.id, limit=3, next_token=feed['nextToken'])
+    assert feed['items'] == ['pid3', 'pid2', 'pid1']
+    feed = feed_manager.get_feed(our_user.id, limit=3, next_token=feed['nextToken'])
+    assert feed == {'items': ['pid0'], 'nextToken': None}
+
+    # as does a first page bigger than the cached posts
+    assert feed_manager.get_feed(our_user.id, limit=10)['items'] == ['pid4', 'pid3', 'pid2', 'pid1', 'pid0']
+
+
+def test_get_post_summary(denormalized_feed_manager):
+    feed_manager = denormalized_feed_manager
+    feed_manager.text_preview_length = 4
+    feed_manager.user_manager.dynamo.add_user('pbuid', 'pbuname')
+    feed_manager.user_manager.dynamo.set_user_photo_post_id('pbuid', 'ppid')
+
+    post_item = feed_manager.post_manager.dynamo.add_pending_post(
+        'pbuid', 'pid1', PostType.TEXT_ONLY, text='t1234'
+    )
+    assert feed_manager.get_post_summary(post_item) == {
+        'postType': PostType.TEXT_ONLY,
+        'textPreview': 't123',
+        'imageHeight': None,
+        'imageWidth': None,
+        'imageColors': None,
+        'postedByUsername': 'pbuname',
+        'postedByPhotoPostId': 'ppid',
     }
-    assert feed_manager.add_post_to_followers_feeds(our_user.id, post_item) == ['ouid']
-
-    # check feeds
-    assert [i['postId'] for i in feed_manager.dynamo.generate_items(our_user.id)] == [post_id_1]
-    assert list(feed_manager.dynamo.generate_items(their_user.id)) == []
-    assert list(feed_manager.dynamo.generate_items(another_user.id)) == []
-
-    # they follow us
-    feed_manager.follower_manager.dynamo.add_following(their_user.id, our_user.id, 'FOLLOWING')
-
-    # add a post to all our followers and us
-    posted_at = pendulum.now('utc').to_iso8601_string()
-    post_id_2 = str(uuid4())
-    post_item = {
-        'postId': post_id_2,
-        'postedByUserId': our_user.id,
-        'postedAt': posted_at,
+
+    post_item = feed_manager.post_manager.dynamo.add_pending_post('pbuid', 'pid2', PostType.IMAGE)
+    feed_manager.post_manager.image_dynamo.set_height_and_width('pid2', 40, 30)
+    feed_manager.post_manager.image_dynamo.set_colors('pid2', [(1, 2, 3)])
+    assert feed_manager.get_post_summary(post_item, user_item={}) == {
+        'postType': PostType.IMAGE,
+        'textPreview': None,
+        'imageHeight': 40,
+        'imageWidth': 30,
+        'imageColors': [{'r': 1, 'g': 2, 'b': 3}],
+        'postedByUsername': None,
+        'postedByPhotoPostId': None,
     }
-    assert feed_manager.add_post_to_followers_feeds(our_user.id, post_item) == ['ouid', 'tuid']
 
-    # check feeds
-    assert sorted([i['postId'] for i in feed_manager.dynamo.generate_items(our_user.id)]) == sorted(
-        [post_id_1, post_id_2]
+
+def test_get_feed_entries(denormalized_feed_manager):
+    feed_manager = denormalized_feed_manager
+    feed_manager.user_manager.dynamo.add_user('pbuid', 'pbuname')
+    feed_manager.user_manager.dynamo.set_user_photo_post_id('pbuid', 'ppid')
+    posted_at = pendulum.now('utc')
+    for i, post_type in enumerate([PostType.TEXT_ONLY, PostType.IMAGE]):
+        post_item = feed_manager.post_manager.dynamo.add_pending_post(
+            'pbuid', f'pid{i}', post_type, text='t', posted_at=posted_at + pendulum.duration(seconds=i)
+        )
+        feed_manager.post_manager.dynamo.set_post_status(post_item, 'COMPLETED')
+    feed_manager.post_manager.image_dynamo.set_height_and_width('pid1', 40, 30)
+
+    # backfill the feed, verify the summaries made it in
+    feed_manager.add_users_posts_to_feed('fuid', 'pbuid')
+    feed_items = list(feed_manager.dynamo.generate_items('fuid'))
+    assert [(i['postType'], i['postedByUsername']) for i in feed_items] == [
+        (PostType.TEXT_ONLY, 'pbuname'),
+        (PostType.IMAGE, 'pbuname'),
+    ]
+
+    # render the feed from the feed items alone
+    with patch.object(feed_manager.post_manager.dynamo, 'batch_get_posts') as batch_get_posts_mock:
+        feed = feed_manager.get_feed_entries('fuid')
+    assert batch_get_posts_mock.mock_calls == []
+    assert feed['nextToken'] is None
+    assert [entry['postId'] for entry in feed['items']] == ['pid1', 'pid0']
+    image_entry, text_entry = feed['items']
+    assert text_entry['textPreview'] == 't'
+    assert text_entry['image'] is None
+    assert image_entry['image']['url'] == 'https://signed-url'
+    assert (image_entry['image']['height'], image_entry['image']['width']) == (40, 30)
+    assert image_entry['postedByUsername'] == 'pbuname'
+    assert image_entry['postedByPhoto']['url64p'] == 'https://signed-url'
+
+
+def test_get_feed_entries_without_summaries(denormalized_feed_manager):
+    # items written before items were denormalized are summarized on read
+    feed_manager = denormalized_feed_manager
+    feed_manager.user_manager.dynamo.add_user('pbuid1', 'pbuname1')
+    feed_manager.user_manager.dynamo.add_user('pbuid2', 'pbuname2')
+    posted_at = pendulum.now('utc')
+    post_item_1 = feed_manager.post_manager.dynamo.add_pending_post(
+        'pbuid1', 'pid1', PostType.TEXT_ONLY, text='t', posted_at=posted_at
+    )
+    post_item_2 = feed_manager.post_manager.dynamo.add_pending_post(
+        'pbuid2', 'pid2', PostType.IMAGE, posted_at=posted_at + pendulum.duration(seconds=1)
     )
-    assert [i['postId'] for i in feed_manager.dynamo.generate_items(their_user.id)] == [post_id_2]
-    assert list(feed_manager.dynamo.generate_items(another_user.id)) == []
+    feed_manager.post_manager.image_dynamo.set_height_and_width('pid2', 40, 30)
+    feed_manager.dynamo.add_post_to_feeds(['fuid'], post_item_1)
+    feed_manager.dynamo.add_post_to_feeds(['fuid'], post_item_2)
+
+    # the posts, their images and their authors are read in batches, not one by one
+    with patch.object(feed_manager.post_manager.dynamo, 'get_post') as get_post_mock:
+        with patch.object(feed_manager.post_manager.image_dynamo, 'get') as get_image_mock:
+            with patch.object(feed_manager.user_manager.dynamo, 'get_user') as get_user_mock:
+                feed = feed_manager.get_feed_entries('fuid')
+    assert get_post_mock.mock_calls == []
+    assert get_image_mock.mock_calls == []
+    assert get_user_mock.mock_calls == []
+    assert feed['nextToken'] is None
+    image_entry, text_entry = feed['items']
+    assert text_entry == {
+        'postId': 'pid1',
+        'postedAt': post_item_1['postedAt'],
+        'postedByUserId': 'pbuid1',
+        'postType': PostType.TEXT_ONLY,
+        'textPreview': 't',
+        'postedByUsername': 'pbuname1',
+        'image': None,
+        'postedByPhoto': None,
+    }
+    assert (image_entry['postId'], image_entry['postType'], image_entry['postedByUsername']) == (
+        'pid2',
+        PostType.IMAGE,
+        'pbuname2',
+    )
+    assert (image_entry['image']['height'], image_entry['image']['width']) == (40, 30)
+
+
+def test_get_feed_entries_post_gone(denormalized_feed_manager):
+    # an item whose post no longer exists is rendered from what is stored on it
+    feed_manager = denormalized_feed_manager
+    post_item = {'postId': 'pid', 'postedByUserId': 'pbuid', 'postedAt': pendulum.now('utc').to_iso8601_string()}
+    feed_manager.dynamo.add_post_to_feeds(['fuid'], post_item)
+    feed = feed_manager.get_feed_entries('fuid')
+    assert [(entry['postId'], entry['postType'], entry['image']) for entry in feed['items']] == [
+        ('pid', None, None)
+    ]
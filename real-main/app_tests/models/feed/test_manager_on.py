@@ -3,6 +3,7 @@ from uuid import uuid4
 
 import pytest
 
+from app.models.fan_out.enums import FanOutJobType
 from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus, PostType
 from app.utils import GqlNotificationType
@@ -34,10 +35,11 @@ def test_on_user_follow_status_change_sync_feed_starts_following(feed_manager, f
         with patch.object(feed_manager, 'dynamo') as dynamo_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
                 feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
+                feed_manager.flush_feed_changed_notifications()
     assert add_users_posts_to_feed_mock.mock_calls == [call(user1.id, user2.id)]
     assert dynamo_mock.mock_calls == []
-    assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user1.id, GqlNotificationType.USER_FEED_CHANGED),
+    assert appsync_client_mock.fire_notifications.call_args_list == [
+        call([{'userId': user1.id, 'type': GqlNotificationType.USER_FEED_CHANGED}]),
     ]
 
 
@@ -48,25 +50,39 @@ def test_on_user_follow_status_change_sync_feed_stops_following(feed_manager, fo
         with patch.object(feed_manager, 'dynamo') as dynamo_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
                 feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
+                feed_manager.flush_feed_changed_notifications()
     assert add_users_posts_to_feed_mock.mock_calls == []
     assert dynamo_mock.mock_calls == [call.delete_by_post_owner(user1.id, user2.id)]
-    assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user1.id, GqlNotificationType.USER_FEED_CHANGED),
+    assert appsync_client_mock.fire_notifications.call_args_list == [
+        call([{'userId': user1.id, 'type': GqlNotificationType.USER_FEED_CHANGED}]),
     ]
 
 
 def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
     assert post.item['postStatus'] == PostStatus.COMPLETED
-    user_ids = [str(uuid4()), str(uuid4())]
-    with patch.object(feed_manager, 'add_post_to_followers_feeds', return_value=user_ids) as add_post_mock:
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
         with patch.object(feed_manager, 'dynamo') as dynamo_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
                 feed_manager.on_post_status_change_sync_feed(post.id, new_item=post.item)
-    assert add_post_mock.mock_calls == [call(post.user_id, post.item)]
+                feed_manager.flush_feed_changed_notifications()
+    assert fan_out_manager_mock.mock_calls == [
+        call.enqueue(FanOutJobType.FEED_ADD_POST, postId=post.id, postedByUserId=post.user_id)
+    ]
     assert dynamo_mock.mock_calls == []
-    assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+    assert appsync_client_mock.mock_calls == []
+
+
+def test_on_post_status_change_sync_feed_post_completed_not_fanned_out(feed_manager, post):
+    with patch.object(feed_manager, 'is_fanned_out', return_value=False):
+        with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+            with patch.object(feed_manager, 'dynamo') as dynamo_mock:
+                with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+                    feed_manager.on_post_status_change_sync_feed(post.id, new_item=post.item)
+                    feed_manager.flush_feed_changed_notifications()
+    assert fan_out_manager_mock.mock_calls == []
+    assert dynamo_mock.mock_calls == [call.add_post_to_feeds([post.user_id], post.item, summary=None)]
+    assert appsync_client_mock.fire_notifications.call_args_list == [
+        call([{'userId': post.user_id, 'type': GqlNotificationType.USER_FEED_CHANGED}]),
     ]
 
 
@@ -77,14 +93,126 @@ def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
 def test_on_post_status_change_sync_feed_post_uncompleted(feed_manager, post, status):
     old_item = {**post.item, 'postStatus': 'COMPLETED'}
     new_item = {**post.item, 'postStatus': status}
-    user_ids = [str(uuid4()), str(uuid4())]
-    with patch.object(feed_manager, 'add_post_to_followers_feeds') as add_post_mock:
-        with patch.object(feed_manager, 'dynamo', **{'delete_by_post.return_value': user_ids}) as dynamo_mock:
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
                 feed_manager.on_post_status_change_sync_feed(post.id, new_item=new_item, old_item=old_item)
-    assert add_post_mock.mock_calls == []
-    assert dynamo_mock.mock_calls == [call.delete_by_post(post.id)]
-    assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+                feed_manager.flush_feed_changed_notifications()
+    assert fan_out_manager_mock.mock_calls == [
+        call.enqueue(FanOutJobType.FEED_DELETE_POST, postId=post.id, postedByUserId=post.user_id)
+    ]
+    assert dynamo_mock.mock_calls == []
+    assert appsync_client_mock.mock_calls == []
+
+
+def test_on_post_status_change_sync_feed_post_deleted(feed_manager, post):
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        feed_manager.on_post_status_change_sync_feed(post.id, old_item=post.item)
+    assert fan_out_manager_mock.mock_calls == [
+        call.enqueue(FanOutJobType.FEED_DELETE_POST, postId=post.id, postedByUserId=post.user_id)
     ]
+
+
+@pytest.mark.parametrize(
+    'old_status, new_status',
+    [
+        (None, PostStatus.PENDING),
+        (PostStatus.PENDING, PostStatus.PROCESSING),
+        (PostStatus.PROCESSING, PostStatus.ERROR),
+        (PostStatus.ERROR, PostStatus.DELETING),
+        (PostStatus.PENDING, None),
+    ],
+)
+def test_on_post_status_change_sync_feed_post_never_completed(feed_manager, post, old_status, new_status):
+    # a post that wasn't completed isn't in any feed, so there's nothing to remove it from
+    old_item = {**post.item, 'postStatus': old_status} if old_status else None
+    new_item = {**post.item, 'postStatus': new_status} if new_status else None
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
+            feed_manager.on_post_status_change_sync_feed(post.id, new_item=new_item, old_item=old_item)
+    assert fan_out_manager_mock.mock_calls == []
+    assert dynamo_mock.mock_calls == []
+
+
+def test_on_post_text_change_sync_feed_summaries(feed_manager, post):
+    # nothing happens unless feed items are denormalized
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        feed_manager.on_post_text_change_sync_feed_summaries(post.id, new_item=post.item)
+    assert fan_out_manager_mock.mock_calls == []
+
+    feed_manager.denormalize_items = True
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        feed_manager.on_post_text_change_sync_feed_summaries(post.id, new_item=post.item)
+        feed_manager.on_post_image_change_sync_feed_summaries(post.id, new_item={})
+        feed_manager.on_post_text_change_sync_feed_summaries(
+            post.id, new_item={**post.item, 'postStatus': PostStatus.ARCHIVED}
+        )
+    assert fan_out_manager_mock.mock_calls == [
+        call.enqueue(FanOutJobType.FEED_UPDATE_POST, postId=post.id, postedByUserId=post.user_id),
+        call.enqueue(FanOutJobType.FEED_UPDATE_POST, postId=post.id, postedByUserId=post.user_id),
+    ]
+
+
+def test_on_user_change_sync_feed_summaries(feed_manager, user1):
+    # nothing happens unless feed items are denormalized
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        feed_manager.on_user_change_sync_feed_summaries(user1.id, new_item=user1.item)
+    assert fan_out_manager_mock.mock_calls == []
+
+    # a single job pages through the user's posts
+    feed_manager.denormalize_items = True
+    with patch.object(feed_manager, 'fan_out_manager') as fan_out_manager_mock:
+        feed_manager.on_user_change_sync_feed_summaries(user1.id, new_item=user1.item)
+    assert fan_out_manager_mock.mock_calls == [
+        call.enqueue(FanOutJobType.FEED_UPDATE_USER_POSTS, postedByUserId=user1.id)
+    ]
+
+
+def test_feed_changed_notifications_are_coalesced(feed_manager):
+    with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+        # duplicates within a batch are sent once
+        feed_manager.notify_feed_changed('uid1')
+        feed_manager.notify_feed_changed('uid2')
+        feed_manager.notify_feed_changed('uid1')
+        assert appsync_client_mock.mock_calls == []
+        assert feed_manager.flush_feed_changed_notifications() == 2
+        assert appsync_client_mock.fire_notifications.call_args_list == [
+            call(
+                [
+                    {'userId': 'uid1', 'type': GqlNotificationType.USER_FEED_CHANGED},
+                    {'userId': 'uid2', 'type': GqlNotificationType.USER_FEED_CHANGED},
+                ]
+            ),
+        ]
+
+        # a user that was just sent one is not sent another yet
+        appsync_client_mock.reset_mock()
+        feed_manager.notify_feed_changed('uid2')
+        feed_manager.notify_feed_changed('uid3')
+        assert feed_manager.flush_feed_changed_notifications() == 1
+        assert appsync_client_mock.fire_notifications.call_args_list == [
+            call([{'userId': 'uid3', 'type': GqlNotificationType.USER_FEED_CHANGED}]),
+        ]
+
+        # once the interval has passed, the one held back is sent
+        appsync_client_mock.reset_mock()
+        feed_manager.feed_changed_notifications.recently_sent.clear()
+        feed_manager.notify_feed_changed('uid2')
+        assert feed_manager.flush_feed_changed_notifications() == 1
+        assert appsync_client_mock.fire_notifications.call_args_list == [
+            call([{'userId': 'uid2', 'type': GqlNotificationType.USER_FEED_CHANGED}]),
+        ]
+        assert feed_manager.flush_feed_changed_notifications() == 0
+
+
+def test_feed_changed_notification_failures_are_logged(feed_manager, caplog):
+    with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+        appsync_client_mock.fire_notifications.return_value = [
+            ({'userId': 'uid1', 'type': GqlNotificationType.USER_FEED_CHANGED}, Exception('nope'))
+        ]
+        feed_manager.notify_feed_changed('uid1')
+        feed_manager.notify_feed_changed('uid2')
+        assert feed_manager.flush_feed_changed_notifications() == 2
+    assert len(appsync_client_mock.mock_calls) == 1
+    assert len(caplog.records) == 1
+    assert 'uid1' in caplog.records[0].msg and 'nope' in caplog.records[0].msg
@@ -0,0 +1,95 @@
+import hashlib
+import io
+from os import path
+
+import PIL.Image
+import pytest
+
+from app.models.post.cached_image import CachedImage
+from app.models.post.exceptions import PostException
+from app.utils import image_size
+
+fixtures_dir = path.join(path.dirname(__file__), '..', '..', 'fixtures')
+big_jpeg_path = path.join(fixtures_dir, 'big-blank.jpg')
+rotated_jpeg_path = path.join(fixtures_dir, 'grant-rotated.jpg')
+
+
+def jpeg_cached_image(file_path):
+    cached_image = CachedImage('pid', source=lambda: None, content_type='image/jpeg')
+    with open(file_path, 'rb') as fh:
+        return cached_image.set_data(fh)
+
+
+def test_size_read_from_header():
+    cached_image = jpeg_cached_image(big_jpeg_path)
+    assert cached_image.size == (4000, 2000)
+    assert cached_image._image is None
+
+
+def test_size_of_rotated_image():
+    cached_image = jpeg_cached_image(rotated_jpeg_path)
+    assert cached_image.size == (320, 240)
+    assert cached_image.readonly_image.size == (320, 240)
+
+
+def test_get_image_draft_decodes_at_reduced_scale():
+    cached_image = jpeg_cached_image(big_jpeg_path)
+    image = cached_image.get_image(max_dimensions=image_size.P480.max_dimensions)
+    # jpeg draft mode reduces by powers of two, down to no smaller than the requested box
+    assert image.size == (1000, 500)
+    assert cached_image._image is None
+
+    # without a box, the full size image is decoded and cached
+    image = cached_image.get_image()
+    assert image.size == (4000, 2000)
+    assert cached_image._image is image
+    assert cached_image.get_image(max_dimensions=image_size.P480.max_dimensions) is image
+
+
+def test_get_image_of_rotated_image():
+    cached_image = jpeg_cached_image(rotated_jpeg_path)
+    image = cached_image.get_image(max_dimensions=(100, 100))
+    assert image.size == (160, 120)
+
+
+def test_get_image_of_non_image_data():
+    cached_image = CachedImage('pid', source=lambda: None, content_type='image/jpeg')
+    cached_image.set_data(io.BytesIO(b'not an image'))
+    with pytest.raises(PostException, match='Unable to recognize file type'):
+        cached_image.get_image(max_dimensions=(100, 100))
+    with pytest.raises(PostException, match='Unable to recognize file type'):
+        assert cached_image.size
+
+
+def test_set_image_without_copy():
+    cached_image = CachedImage('pid', source=lambda: None, content_type='image/jpeg')
+    image = PIL.Image.new('RGB', (10, 10))
+    assert cached_image.set_image(image, copy=False).readonly_image is image
+    assert cached_image.set_image(image).readonly_image is not image
+    assert cached_image.is_synced is False
+
+
+def test_checksum(s3_uploads_client):
+    cached_image = CachedImage(
+        'pid', image_size=image_size.NATIVE, s3_client=s3_uploads_client, s3_path='a/b.jpg'
+    )
+    with open(big_jpeg_path, 'rb') as fh:
+        data = fh.read()
+    assert cached_image.set_data(io.BytesIO(data)).checksum is None
+
+    # written to s3, matches the etag s3 sets
+    cached_image.flush()
+    assert cached_image.checksum == hashlib.md5(data).hexdigest()
+    assert cached_image.checksum == s3_uploads_client.get_object_checksum('a/b.jpg')
+
+    # an image is encoded when written, the checksum is of what was written
+    cached_image.set_image(PIL.Image.new('RGB', (10, 10)))
+    assert cached_image.checksum is None
+    cached_image.flush()
+    assert cached_image.checksum == s3_uploads_client.get_object_checksum('a/b.jpg')
+
+    # read from s3
+    other_cached_image = CachedImage(
+        'pid', image_size=image_size.NATIVE, s3_client=s3_uploads_client, s3_path='a/b.jpg'
+    )
+    assert other_cached_image.refresh().checksum == cached_image.checksum
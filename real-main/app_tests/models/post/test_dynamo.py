@@ -36,6 +36,19 @@ def test_post_add_and_delete(post_dynamo):
     assert post_dynamo.get_post(post_id) is None
 
 
+def test_batch_get_posts(post_dynamo):
+    # nothing to get
+    assert post_dynamo.batch_get_posts([]) == []
+
+    # add two posts
+    post1 = post_dynamo.add_pending_post('uid', 'pid1', 'ptype', text='lore')
+    post2 = post_dynamo.add_pending_post('uid', 'pid2', 'ptype', text='ipsum')
+
+    # get them, along with one that doesn't exist and a duplicate
+    post_items = post_dynamo.batch_get_posts(['pid2', 'pid-dne', 'pid1', 'pid2'])
+    assert sorted(post_items, key=lambda item: item['postId']) == [post1, post2]
+
+
 def test_add_pending_post_sans_options(post_dynamo):
     user_id = 'pbuid'
     post_id = 'pid'
@@ -173,6 +186,72 @@ def test_generate_posts_by_user(post_dynamo):
     assert [p['postId'] for p in post_dynamo.generate_posts_by_user(user_id, completed=False)] == [post_id_2]
 
 
+def test_query_posts_by_user(post_dynamo):
+    assert post_dynamo.query_posts_by_user('uid') == {'items': [], 'nextToken': None}
+
+    posted_at = pendulum.now('utc')
+    for i in range(3):
+        post_item = post_dynamo.add_pending_post(
+            'uid', f'pid{i}', 'ptype', posted_at=posted_at + pendulum.duration(seconds=i)
+        )
+        if i != 1:
+            post_dynamo.set_post_status(post_item, PostStatus.COMPLETED)
+
+    # page through the completed posts, one at a time
+    kwargs = {
+        'completed': True,
+        'projection_expression': 'partitionKey, sortKey, gsiA2PartitionKey, gsiA2SortKey',
+    }
+    paginated = post_dynamo.query_posts_by_user('uid', limit=1, **kwargs)
+    assert [item['partitionKey'] for item in paginated['items']] == ['post/pid0']
+    paginated = post_dynamo.query_posts_by_user('uid', limit=1, next_token=paginated['nextToken'], **kwargs)
+    assert [item['partitionKey'] for item in paginated['items']] == ['post/pid2']
+
+    # all of them, in one page
+    paginated = post_dynamo.query_posts_by_user('uid')
+    assert [item['postId'] for item in paginated['items']] == ['pid0', 'pid2', 'pid1']
+    assert paginated['nextToken'] is None
+
+
+def test_generate_posts_by_user_newest_first(post_dynamo):
+    user_id = 'uid'
+    posted_at = pendulum.now('utc')
+    for post_id, offset in (('pid1', 0), ('pid2', 1), ('pid3', 2)):
+        post_item = post_dynamo.add_pending_post(
+            user_id, post_id, 'ptype', text='t', posted_at=posted_at + pendulum.duration(seconds=offset)
+        )
+        post_dynamo.set_post_status(post_item, PostStatus.COMPLETED)
+
+    post_ids = [p['postId'] for p in post_dynamo.generate_posts_by_user(user_id, completed=True)]
+    assert post_ids == ['pid1', 'pid2', 'pid3']
+    gen = post_dynamo.generate_posts_by_user(user_id, completed=True, newest_first=True)
+    assert [p['postId'] for p in gen] == ['pid3', 'pid2', 'pid1']
+
+
+def test_generate_posts_by_user_posted_at_or_before(post_dynamo):
+    user_id = 'uid'
+    posted_at = pendulum.now('utc')
+    post_items = []
+    for post_id, offset in (('pid1', 0), ('pid2', 1), ('pid3', 2)):
+        post_item = post_dynamo.add_pending_post(
+            user_id, post_id, 'ptype', text='t', posted_at=posted_at + pendulum.duration(seconds=offset)
+        )
+        post_items.append(post_dynamo.set_post_status(post_item, PostStatus.COMPLETED))
+
+    gen = post_dynamo.generate_posts_by_user(
+        user_id, completed=True, newest_first=True, posted_at_or_before=post_items[1]['postedAt']
+    )
+    assert [p['postId'] for p in gen] == ['pid2', 'pid1']
+    gen = post_dynamo.generate_posts_by_user(
+        user_id, completed=True, posted_at_or_before=post_items[0]['postedAt'], page_size=1
+    )
+    assert [p['postId'] for p in gen] == ['pid1']
+
+    # only completed posts have their postedAt in the sort key
+    with pytest.raises(AssertionError):
+        post_dynamo.generate_posts_by_user(user_id, posted_at_or_before=post_items[0]['postedAt'])
+
+
 def test_set_post_status(post_dynamo):
     post_id = 'my-post-id'
     user_id = 'my-user-id'
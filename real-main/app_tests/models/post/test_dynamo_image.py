@@ -141,3 +141,15 @@ def test_delete(post_image_dynamo):
     # delete it, verify
     post_image_dynamo.delete(post_id)
     assert post_image_dynamo.get(post_id) is None
+
+
+def test_batch_get(post_image_dynamo):
+    assert post_image_dynamo.batch_get([]) == {}
+
+    post_id_1, post_id_2 = str(uuid4()), str(uuid4())
+    item_1 = post_image_dynamo.set_height_and_width(post_id_1, 40, 30)
+    item_2 = post_image_dynamo.set_colors(post_id_2, [(1, 2, 3)])
+
+    # get them, along with one that doesn't exist and a duplicate
+    image_items = post_image_dynamo.batch_get([post_id_2, str(uuid4()), post_id_1, post_id_2])
+    assert image_items == {post_id_1: item_1, post_id_2: item_2}
@@ -0,0 +1,49 @@
+import pytest
+
+from app.models.post.keyword_index import KeywordIndex
+
+
+@pytest.fixture
+def keyword_index():
+    yield KeywordIndex(
+        [('bird', 5), ('Birds', 9), ('bingo', 1), ('bike', 5), ('cat', 3), ('catalog', 7), ('dog', 2)],
+        version='v1',
+    )
+
+
+def test_empty():
+    keyword_index = KeywordIndex([])
+    assert len(keyword_index) == 0
+    assert keyword_index.search('b') == []
+    assert keyword_index.search('bird') == []
+
+
+def test_search_ranks_by_popularity(keyword_index):
+    assert len(keyword_index) == 7
+    assert keyword_index.version == 'v1'
+    # short, precomputed, prefixes. Ties are broken alphabetically.
+    assert keyword_index.search('b') == ['Birds', 'bike', 'bird', 'bingo']
+    assert keyword_index.search('bi', limit=2) == ['Birds', 'bike']
+    assert keyword_index.search('ca') == ['catalog', 'cat']
+    # longer prefixes
+    assert keyword_index.search('bir') == ['Birds', 'bird']
+    assert keyword_index.search('bird') == ['Birds', 'bird']
+    assert keyword_index.search('birds') == ['Birds']
+    assert keyword_index.search('cat') == ['catalog', 'cat']
+    assert keyword_index.search('catalogs') == []
+
+
+def test_search_normalizes_prefix(keyword_index):
+    assert keyword_index.search(' BIR ') == ['Birds', 'bird']
+    assert keyword_index.search('D') == ['dog']
+    assert keyword_index.search('') == []
+    assert keyword_index.search('  ') == []
+    assert keyword_index.search('z') == []
+    assert keyword_index.search('zzz') == []
+
+
+def test_search_limit_beyond_precomputed(monkeypatch):
+    monkeypatch.setattr(KeywordIndex, 'precomputed_limit', 2)
+    keyword_index = KeywordIndex([(f'b{i}', i) for i in range(5)])
+    assert keyword_index.search('b', limit=2) == ['b4', 'b3']
+    assert keyword_index.search('b', limit=4) == ['b4', 'b3', 'b2', 'b1']
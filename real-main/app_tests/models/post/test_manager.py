@@ -1,3 +1,4 @@
+import json
 import logging
 import uuid
 from unittest.mock import call, patch
@@ -47,6 +48,19 @@ def test_get_post_dne(post_manager):
     assert post_manager.get_post('pid-dne') is None
 
 
+def test_get_posts(post_manager, user):
+    assert post_manager.get_posts([]) == []
+
+    # create some posts behind the scenes
+    post_manager.add_post(user, 'pid1', PostType.TEXT_ONLY, text='t')
+    post_manager.add_post(user, 'pid2', PostType.TEXT_ONLY, text='t')
+
+    # order is maintained, posts that don't exist are left out
+    posts = post_manager.get_posts(['pid2', 'pid-dne', 'pid1'])
+    assert [post.id for post in posts] == ['pid2', 'pid1']
+    assert posts[0].item == post_manager.get_post('pid2').item
+
+
 def test_add_post_errors(post_manager, user):
     # try to add a post without any content (no text or media)
     with pytest.raises(PostException, match='without text'):
@@ -593,27 +607,91 @@ def test_add_post_with_keywords_attribute(post_manager, user):
 
 def test_find_posts(post_manager, user):
     keywords = 'bird'
-    limit = 20
-    next_token = 0
     query = {
-        'from': next_token,
-        'size': limit,
-        'query': {
-            'bool': {
-                'should': [
-                    {'match_bool_prefix': {'keywords': {'query': keywords, 'boost': 2}}},
-                    {'match': {'keywords': {'query': keywords, 'boost': 2}}},
-                ],
-            }
-        },
+        'bool': {
+            'should': [
+                {'match_bool_prefix': {'keywords': {'query': keywords, 'boost': 2}}},
+                {'match': {'keywords': {'query': keywords, 'boost': 2}}},
+            ],
+        }
     }
 
     with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
-        post_manager.find_posts(keywords, limit, next_token)
-
+        elasticsearch_client_mock.paginated_search.return_value = {'hits': [], 'nextToken': None}
+        assert post_manager.find_posts(keywords, 20, 'token') == {'nextToken': None, 'items': []}
     assert elasticsearch_client_mock.mock_calls == [
-        call.query_posts(query),
-        call.query_posts().__getitem__('hits'),
-        call.query_posts().__getitem__().__getitem__('hits'),
-        call.query_posts().__getitem__().__getitem__().__iter__(),
+        call.paginated_search('posts', query, 'postId.keyword', 20, 'token'),
     ]
+
+    # results are ordered by trending score
+    post1 = post_manager.add_post(user, 'pid1', PostType.TEXT_ONLY, text='t')
+    post2 = post_manager.add_post(user, 'pid2', PostType.TEXT_ONLY, text='t')
+    post1.trending_increment_score()
+    post2.trending_increment_score(multiplier=2)
+    hits = [{'_source': {'postId': post1.id}}, {'_source': {'postId': post2.id}}]
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        elasticsearch_client_mock.paginated_search.return_value = {'hits': hits, 'nextToken': 'next'}
+        assert post_manager.find_posts(keywords, 2) == {'nextToken': 'next', 'items': [post2.id, post1.id]}
+
+
+def test_search_keywords_falls_back_to_elasticsearch(post_manager):
+    # no keyword snapshot has been exported
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        elasticsearch_client_mock.query_keywords.return_value = {
+            'hits': {'hits': [{'_source': {'keyword': 'bird'}}, {'_source': {'keyword': 'bird'}}]}
+        }
+        assert post_manager.search_keywords('bi') == ['bird']
+    assert len(elasticsearch_client_mock.query_keywords.mock_calls) == 1
+    assert post_manager.keyword_index is None
+
+
+def test_search_keywords_from_snapshot(post_manager, s3_uploads_client):
+    now = pendulum.now('utc')
+    body = json.dumps({'keywords': [['bird', 1], ['bike', 2]]}).encode()
+    s3_uploads_client.put_object(post_manager.keyword_snapshot_path, body, 'application/json')
+
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        assert post_manager.search_keywords('bi', now=now) == ['bike', 'bird']
+    assert elasticsearch_client_mock.mock_calls == []
+    keyword_index = post_manager.keyword_index
+    assert keyword_index.version == s3_uploads_client.get_object_checksum(post_manager.keyword_snapshot_path)
+
+    # a new snapshot isn't picked up until it's time to check again
+    body = json.dumps({'keywords': [['bird', 3], ['bike', 2]]}).encode()
+    s3_uploads_client.put_object(post_manager.keyword_snapshot_path, body, 'application/json')
+    assert post_manager.search_keywords('bi', now=now.add(seconds=1)) == ['bike', 'bird']
+    assert post_manager.keyword_index is keyword_index
+
+    later = now.add(seconds=post_manager.keyword_snapshot_check_interval)
+    assert post_manager.search_keywords('bi', now=later) == ['bird', 'bike']
+    assert post_manager.keyword_index is not keyword_index
+
+    # an unchanged snapshot isn't reloaded
+    keyword_index = post_manager.keyword_index
+    later = later.add(seconds=post_manager.keyword_snapshot_check_interval)
+    assert post_manager.search_keywords('bi', now=later) == ['bird', 'bike']
+    assert post_manager.keyword_index is keyword_index
+
+
+def test_export_keyword_snapshot(post_manager, s3_uploads_client):
+    pages = [
+        {
+            'aggregations': {
+                'keywords': {
+                    'buckets': [{'key': {'keyword': 'bike'}, 'doc_count': 2}],
+                    'after_key': {'keyword': 'bike'},
+                }
+            }
+        },
+        {'aggregations': {'keywords': {'buckets': [{'key': {'keyword': 'bird'}, 'doc_count': 1}]}}},
+    ]
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        elasticsearch_client_mock.search.side_effect = pages
+        assert post_manager.export_keyword_snapshot() == 2
+    assert len(elasticsearch_client_mock.search.mock_calls) == 2
+    index, body = elasticsearch_client_mock.search.call_args.args
+    assert index == 'keywords'
+    assert body['aggs']['keywords']['composite']['after'] == {'keyword': 'bike'}
+
+    fh = s3_uploads_client.get_object_data_stream(post_manager.keyword_snapshot_path)
+    assert json.loads(fh.read()) == {'keywords': [['bike', 2], ['bird', 1]]}
@@ -506,13 +506,43 @@ def test_on_post_view_add_delete_sync_viewed_by_counts(post_manager, post, caplo
 def test_on_post_delete(post_manager, post):
     with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
         post_manager.on_post_delete(post.id, post.refresh_item().item)
-    assert elasticsearch_client_mock.mock_calls == [call.delete_post(post.id)]
+    assert elasticsearch_client_mock.mock_calls == [call.queue_delete_post(post.id)]
+
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        post_manager.on_post_delete(post.id, {**post.item, 'keywords': ['k1', 'k2']})
+    assert elasticsearch_client_mock.mock_calls == [
+        call.queue_delete_post(post.id),
+        call.queue_delete_keyword(post.id, 'k1'),
+        call.queue_delete_keyword(post.id, 'k2'),
+    ]
 
 
 def test_sync_elasticsearch(post_manager, post):
     with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
         post_manager.sync_elasticsearch(post.id, {'keywords': ['spock']})
     assert elasticsearch_client_mock.mock_calls == [
-        call.put_post(post.id, ['spock']),
-        call.put_keyword(post.id, 'spock'),
+        call.queue_put_post(post.id, ['spock']),
+        call.queue_put_keyword(post.id, 'spock'),
+    ]
+
+
+def test_sync_elasticsearch_only_changed_keywords(post_manager, post):
+    old_item = {'keywords': ['spock', 'kirk', 'bones']}
+    new_item = {'keywords': ['kirk', 'uhura', 'spock']}
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        post_manager.sync_elasticsearch(post.id, new_item, old_item)
+    assert elasticsearch_client_mock.mock_calls == [
+        call.queue_put_post(post.id, ['kirk', 'uhura', 'spock']),
+        call.queue_delete_keyword(post.id, 'bones'),
+        call.queue_put_keyword(post.id, 'uhura'),
+    ]
+
+    # keywords removed
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        post_manager.sync_elasticsearch(post.id, {'keywords': None}, new_item)
+    assert elasticsearch_client_mock.mock_calls == [
+        call.queue_put_post(post.id, []),
+        call.queue_delete_keyword(post.id, 'kirk'),
+        call.queue_delete_keyword(post.id, 'uhura'),
+        call.queue_delete_keyword(post.id, 'spock'),
     ]
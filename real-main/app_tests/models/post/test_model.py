@@ -8,6 +8,7 @@ import pendulum
 import pytest
 
 from app.mixins.view.enums import ViewType
+from app.models.post import text_image
 from app.models.post.enums import PostStatus, PostType
 from app.models.post.exceptions import PostException
 from app.models.post.model import Post
@@ -24,11 +25,11 @@ heic_width = 4032
 heic_height = 3024
 
 grant_colors = [
-    {'r': 51, 'g': 58, 'b': 45},
-    {'r': 186, 'g': 206, 'b': 228},
-    {'r': 145, 'g': 154, 'b': 169},
-    {'r': 158, 'g': 180, 'b': 205},
-    {'r': 130, 'g': 123, 'b': 125},
+    {'r': 69, 'g': 71, 'b': 58},
+    {'r': 19, 'g': 17, 'b': 20},
+    {'r': 111, 'g': 125, 'b': 108},
+    {'r': 163, 'g': 176, 'b': 193},
+    {'r': 188, 'g': 214, 'b': 241},
 ]
 
 
@@ -152,14 +153,14 @@ def test_get_image_readonly_url(cloudfront_client, s3_uploads_client):
         'postStatus': PostStatus.PENDING,
     }
     expected_url = {}
-    cloudfront_client.configure_mock(**{'generate_presigned_url.return_value': expected_url})
+    cloudfront_client.configure_mock(**{'generate_presigned_readonly_url.return_value': expected_url})
 
     post = Post(item, cloudfront_client=cloudfront_client, s3_uploads_client=s3_uploads_client)
     url = post.get_image_readonly_url(image_size.NATIVE)
     assert url == expected_url
 
     expected_path = f'user-id/post/post-id/image/{image_size.NATIVE.filename}'
-    assert cloudfront_client.mock_calls == [mock.call.generate_presigned_url(expected_path, ['GET', 'HEAD'])]
+    assert cloudfront_client.mock_calls == [mock.call.generate_presigned_readonly_url(expected_path)]
 
 
 def test_get_hls_access_cookies(cloudfront_client, s3_uploads_client):
@@ -787,7 +788,7 @@ def test_set_colors(s3_uploads_client, pending_image_post):
     assert post.image_item['colors'] == grant_colors
 
 
-def test_set_colors_colortheif_fails(s3_uploads_client, pending_image_post, caplog):
+def test_set_colors_fails(s3_uploads_client, pending_image_post, caplog):
     post = pending_image_post
     assert 'colors' not in post.image_item
 
@@ -802,7 +803,7 @@ def test_set_colors_colortheif_fails(s3_uploads_client, pending_image_post, capl
 
     assert len(caplog.records) == 1
     assert caplog.records[0].levelname == 'WARNING'
-    assert 'ColorTheif' in caplog.records[0].msg
+    assert 'Unable to get palette' in caplog.records[0].msg
     assert f'`{post.id}`' in caplog.records[0].msg
 
 
@@ -884,3 +885,57 @@ def test_get_trending_multiplier(post):
     default = post.get_trending_multiplier()
     assert post.get_trending_multiplier(view_type=ViewType.THUMBNAIL) == default
     assert post.get_trending_multiplier(view_type=ViewType.FOCUS) == default * 2
+
+
+def test_text_image_rendered_once_and_saved(post_manager, user, s3_uploads_client):
+    post = post_manager.add_post(user, 'pid-text-1', PostType.TEXT_ONLY, text='shared #text')
+    post.generate_text_image = mock.Mock(wraps=post.generate_text_image)
+    image = post.k4_jpeg_cache.readonly_image
+    assert image.size == image_size.K4.max_dimensions
+    assert post.generate_text_image.mock_calls == [mock.call('shared #text', image_size.K4)]
+
+    # saved to s3 by a hash of the text
+    key = text_image.get_text_image_key('shared #text')
+    assert s3_uploads_client.exists(f'text-image/{key}/{image_size.K4.filename}')
+
+    # another post with the same text reads it from s3, rather than rendering it again
+    other_post = post_manager.add_post(user, 'pid-text-2', PostType.TEXT_ONLY, text='shared #text')
+    other_post.generate_text_image = mock.Mock(wraps=other_post.generate_text_image)
+    assert other_post.k4_jpeg_cache.readonly_image.size == image_size.K4.max_dimensions
+    assert other_post.generate_text_image.mock_calls == []
+
+
+def test_text_image_rendered_if_s3_read_fails(post_manager, user, s3_uploads_client, caplog):
+    post = post_manager.add_post(user, 'pid-text-1', PostType.TEXT_ONLY, text='shared #text')
+    post.generate_text_image = mock.Mock(wraps=post.generate_text_image)
+    key = text_image.get_text_image_key('shared #text')
+    path = f'text-image/{key}/{image_size.K4.filename}'
+
+    with mock.patch.object(
+        s3_uploads_client, 'get_object_data_stream', side_effect=Exception('connection reset')
+    ):
+        with caplog.at_level(logging.WARNING):
+            image = post.get_text_image('shared #text', image_size.K4)
+    assert image.size == image_size.K4.max_dimensions
+    assert post.generate_text_image.mock_calls == [mock.call('shared #text', image_size.K4)]
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == 'WARNING'
+    assert f'Unable to read text image of post `pid-text-1` from `{path}`' in caplog.records[0].msg
+    assert 'connection reset' in caplog.records[0].msg
+    # not saved, as whatever is in s3 is unknown
+    assert not s3_uploads_client.exists(path)
+
+
+def test_text_image_rendered_if_s3_data_not_an_image(post_manager, user, s3_uploads_client, caplog):
+    key = text_image.get_text_image_key('shared #text')
+    path = f'text-image/{key}/{image_size.K4.filename}'
+    s3_uploads_client.put_object(path, b'not an image', 'image/jpeg')
+    post = post_manager.add_post(user, 'pid-text-1', PostType.TEXT_ONLY, text='shared #text')
+    post.generate_text_image = mock.Mock(wraps=post.generate_text_image)
+
+    with caplog.at_level(logging.WARNING):
+        image = post.get_text_image('shared #text', image_size.K4)
+    assert image.size == image_size.K4.max_dimensions
+    assert post.generate_text_image.mock_calls == [mock.call('shared #text', image_size.K4)]
+    assert len(caplog.records) == 1
+    assert f'Unable to read text image of post `pid-text-1` from `{path}`' in caplog.records[0].msg
@@ -1,13 +1,15 @@
 import io
 import uuid
+import weakref
 from os import path
+from unittest import mock
 
 import PIL.Image
 import pytest
 
 from app.models.post.enums import PostStatus, PostType
 from app.models.post.exceptions import PostException
-from app.utils import image_size
+from app.utils import UploadPoolError, image_size
 
 grant_rotated_width = grant_height = 320
 grant_rotated_height = grant_width = 240
@@ -192,18 +194,77 @@ def test_build_image_thumbnails_content_type(s3_uploads_client, processing_image
     # check the height and width of the thumbnails to make sure the
     # thumbnailing process correctly accounted for the exif orientation header
 
+    def get_content_type(path):
+        return s3_uploads_client.boto_client.head_object(Bucket=s3_uploads_client.bucket_name, Key=path)[
+            'ContentType'
+        ]
+
     # check 4k content type
     path_4k = post.get_image_path(image_size.K4)
-    assert s3_uploads_client.bucket.Object(path_4k).content_type == 'image/jpeg'
+    assert get_content_type(path_4k) == 'image/jpeg'
 
     # check 1080p content type
     path_1080 = post.get_image_path(image_size.P1080)
-    assert s3_uploads_client.bucket.Object(path_1080).content_type == 'image/jpeg'
+    assert get_content_type(path_1080) == 'image/jpeg'
 
     # check 480p content type
     path_480 = post.get_image_path(image_size.P480)
-    assert s3_uploads_client.bucket.Object(path_480).content_type == 'image/jpeg'
+    assert get_content_type(path_480) == 'image/jpeg'
 
     # check 64p content type
     path_64 = post.get_image_path(image_size.P64)
-    assert s3_uploads_client.bucket.Object(path_64).content_type == 'image/jpeg'
+    assert get_content_type(path_64) == 'image/jpeg'
+
+
+def test_build_image_thumbnails_upload_failure(s3_uploads_client, processing_image_post):
+    post = processing_image_post
+    path = post.get_image_path(image_size.NATIVE)
+    s3_uploads_client.put_object(path, open(blank_path, 'rb'), 'image/jpeg')
+
+    # fail the upload of one thumbnail, the others should still make it to s3
+    path_480p = post.get_image_path(image_size.P480)
+    put_object = s3_uploads_client.put_object
+
+    def flaky_put_object(path, body, content_type):
+        if path == path_480p:
+            raise Exception('nope')
+        put_object(path, body, content_type)
+
+    with mock.patch.object(s3_uploads_client, 'put_object', flaky_put_object):
+        with pytest.raises(UploadPoolError, match='1 of 4 uploads failed, first error: nope'):
+            post.build_image_thumbnails()
+
+    assert s3_uploads_client.exists(post.get_image_path(image_size.K4))
+    assert s3_uploads_client.exists(post.get_image_path(image_size.P1080))
+    assert not s3_uploads_client.exists(path_480p)
+    assert s3_uploads_client.exists(post.get_image_path(image_size.P64))
+
+
+def test_build_image_thumbnails_frees_native_image_after_4k(s3_uploads_client, processing_image_post):
+    post = processing_image_post
+    path = post.get_image_path(image_size.NATIVE)
+    s3_uploads_client.put_object(path, open(blank_path, 'rb'), 'image/jpeg')
+
+    # keep only a weak reference to the decoded native image
+    native_refs = []
+    get_image = post.native_jpeg_cache.get_image
+
+    def tracked_get_image(*args, **kwargs):
+        image = get_image(*args, **kwargs)
+        native_refs.append(weakref.ref(image))
+        return image
+
+    # by the time the 1080p thumbnail is set, the native image should be gone
+    native_alive_at = {}
+    set_image = post.p1080_jpeg_cache.set_image
+
+    def tracked_set_image(image, **kwargs):
+        native_alive_at[image_size.P1080] = native_refs[0]() is not None
+        set_image(image, **kwargs)
+
+    with mock.patch.object(post.native_jpeg_cache, 'get_image', tracked_get_image):
+        with mock.patch.object(post.p1080_jpeg_cache, 'set_image', tracked_set_image):
+            post.build_image_thumbnails()
+
+    assert native_alive_at == {image_size.P1080: False}
+    assert s3_uploads_client.exists(post.get_image_path(image_size.P1080))
@@ -1,3 +1,5 @@
+import hashlib
+import logging
 import uuid
 from unittest import mock
 
@@ -62,6 +64,24 @@ def test_process_image_upload_exception_partway_thru_bad_heic_data(pending_post,
     assert pending_post.refresh_item().item['postStatus'] == PostStatus.PROCESSING
 
 
+def test_process_image_upload_verification_fails(pending_post, s3_uploads_client, grant_data):
+    post = pending_post
+    native_path = post.get_image_path(image_size.NATIVE)
+    s3_uploads_client.put_object(native_path, grant_data, 'image/jpeg')
+    post.post_verification_client = mock.Mock(**{'verify_image.side_effect': Exception('verification down')})
+
+    with pytest.raises(Exception, match='verification down'):
+        post.process_image_upload()
+    assert post.item['postStatus'] == PostStatus.PROCESSING
+    assert post.refresh_item().item['postStatus'] == PostStatus.PROCESSING
+    assert 'isVerified' not in post.item
+    assert 'checksum' not in post.item
+
+    # the stages that ran alongside verification still finished
+    for size in image_size.THUMBNAILS:
+        assert s3_uploads_client.exists(post.get_image_path(size))
+
+
 def test_process_image_upload_success_jpeg(pending_post, s3_uploads_client, grant_data):
     post = pending_post
     assert post.item['postStatus'] == PostStatus.PENDING
@@ -79,6 +99,7 @@ def test_process_image_upload_success_jpeg(pending_post, s3_uploads_client, gran
     post.set_is_verified = mock.Mock(wraps=post.set_is_verified)
     post.set_checksum = mock.Mock(wraps=post.set_checksum)
     post.complete = mock.Mock(wraps=post.complete)
+    s3_uploads_client.get_object_checksum = mock.Mock(wraps=s3_uploads_client.get_object_checksum)
 
     now = pendulum.now('utc')
     post.process_image_upload(now=now)
@@ -87,14 +108,18 @@ def test_process_image_upload_success_jpeg(pending_post, s3_uploads_client, gran
     assert post.native_jpeg_cache.flush.mock_calls == []
     assert post.build_image_thumbnails.mock_calls == [mock.call()]
     assert post.set_height_and_width.mock_calls == [mock.call()]
-    assert post.set_colors.mock_calls == [mock.call()]
-    assert post.set_is_verified.mock_calls == [mock.call()]
+    assert post.set_colors.mock_calls == [mock.call(colors=mock.ANY)]
+    assert post.set_is_verified.mock_calls == [mock.call(is_verified=True)]
     assert post.set_checksum.mock_calls == [mock.call()]
     assert post.complete.mock_calls == [mock.call(now=now)]
 
     assert post.item['postStatus'] == PostStatus.COMPLETED
     assert post.refresh_item().item['postStatus'] == PostStatus.COMPLETED
 
+    # the checksum was computed from the data read, rather than asked of s3
+    assert s3_uploads_client.get_object_checksum.mock_calls == []
+    assert post.item['checksum'] == hashlib.md5(grant_data).hexdigest()
+
 
 def test_process_image_upload_success_jpeg_with_crop(pending_post, s3_uploads_client, grant_data):
     post = pending_post
@@ -121,8 +146,8 @@ def test_process_image_upload_success_jpeg_with_crop(pending_post, s3_uploads_cl
     assert post.native_jpeg_cache.flush.mock_calls == [mock.call()]
     assert post.build_image_thumbnails.mock_calls == [mock.call()]
     assert post.set_height_and_width.mock_calls == [mock.call()]
-    assert post.set_colors.mock_calls == [mock.call()]
-    assert post.set_is_verified.mock_calls == [mock.call()]
+    assert post.set_colors.mock_calls == [mock.call(colors=mock.ANY)]
+    assert post.set_is_verified.mock_calls == [mock.call(is_verified=True)]
     assert post.set_checksum.mock_calls == [mock.call()]
     assert post.complete.mock_calls == [mock.call(now=now)]
 
@@ -157,8 +182,8 @@ def test_process_image_upload_success_heic_with_crop(pending_post, s3_uploads_cl
     assert post.native_jpeg_cache.flush.mock_calls == [mock.call()]
     assert post.build_image_thumbnails.mock_calls == [mock.call()]
     assert post.set_height_and_width.mock_calls == [mock.call()]
-    assert post.set_colors.mock_calls == [mock.call()]
-    assert post.set_is_verified.mock_calls == [mock.call()]
+    assert post.set_colors.mock_calls == [mock.call(colors=mock.ANY)]
+    assert post.set_is_verified.mock_calls == [mock.call(is_verified=True)]
     assert post.set_checksum.mock_calls == [mock.call()]
     assert post.complete.mock_calls == [mock.call(now=now)]
 
@@ -207,3 +232,79 @@ def test_process_image_upload_success_heic_with_noop_crop(pending_post, s3_uploa
 
     # check the heic image was _not_ deleted because the crop matched the image dimensions exactly
     assert s3_uploads_client.exists(native_path)
+
+
+def test_process_image_upload_duplicate_reuses_original(
+    post_manager, user, pending_post, s3_uploads_client, grant_data
+):
+    original = pending_post
+    s3_uploads_client.put_object(original.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    original.process_image_upload()
+    assert original.item['postStatus'] == PostStatus.COMPLETED
+
+    # a repost of the same image
+    post = post_manager.add_post(user, 'pid4', PostType.IMAGE)
+    s3_uploads_client.put_object(post.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    post.build_image_thumbnails = mock.Mock(wraps=post.build_image_thumbnails)
+    post.get_colors = mock.Mock(wraps=post.get_colors)
+    post.post_verification_client = mock.Mock(**{'verify_image.return_value': False})
+
+    post.process_image_upload()
+    assert post.item['postStatus'] == PostStatus.COMPLETED
+    assert post.item['originalPostId'] == original.id
+    assert post.item['checksum'] == original.item['checksum']
+
+    # nothing was decoded or asked of the verification service
+    assert post.build_image_thumbnails.mock_calls == []
+    assert post.get_colors.mock_calls == []
+    assert post.post_verification_client.mock_calls == []
+
+    # the original's results were reused
+    assert post.item['isVerified'] is True
+    assert post.refresh_image_item().image_item['colors'] == original.refresh_image_item().image_item['colors']
+    assert post.image_item['height'] == original.image_item['height']
+    assert post.image_item['width'] == original.image_item['width']
+    for size in image_size.THUMBNAILS:
+        original_data = s3_uploads_client.get_object_data_stream(original.get_image_path(size)).read()
+        assert s3_uploads_client.get_object_data_stream(post.get_image_path(size)).read() == original_data
+
+
+def test_process_image_upload_duplicate_verified_again_if_metadata_differs(
+    post_manager, user, pending_post, s3_uploads_client, grant_data
+):
+    original = pending_post
+    s3_uploads_client.put_object(original.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    original.process_image_upload()
+
+    post = post_manager.add_post(user, 'pid4', PostType.IMAGE, image_input={'takenInReal': True})
+    s3_uploads_client.put_object(post.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    post.build_image_thumbnails = mock.Mock(wraps=post.build_image_thumbnails)
+    post.post_verification_client = mock.Mock(**{'verify_image.return_value': False})
+
+    post.process_image_upload()
+    assert post.item['postStatus'] == PostStatus.COMPLETED
+    assert post.item['originalPostId'] == original.id
+    assert post.build_image_thumbnails.mock_calls == []
+    assert len(post.post_verification_client.mock_calls) == 1
+    assert post.item['isVerified'] is False
+
+
+def test_process_image_upload_duplicate_of_original_missing_thumbnails(
+    post_manager, user, pending_post, s3_uploads_client, grant_data, caplog
+):
+    original = pending_post
+    s3_uploads_client.put_object(original.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    original.process_image_upload()
+    s3_uploads_client.delete_object(original.get_image_path(image_size.P480))
+
+    # falls back to processing the image itself
+    post = post_manager.add_post(user, 'pid4', PostType.IMAGE)
+    s3_uploads_client.put_object(post.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    post.build_image_thumbnails = mock.Mock(wraps=post.build_image_thumbnails)
+    with caplog.at_level(logging.WARNING):
+        post.process_image_upload()
+    assert post.item['postStatus'] == PostStatus.COMPLETED
+    assert post.item['originalPostId'] == original.id
+    assert post.build_image_thumbnails.mock_calls == [mock.call()]
+    assert s3_uploads_client.exists(post.get_image_path(image_size.P480))
+    assert 'Unable to copy thumbnails' in caplog.records[0].msg
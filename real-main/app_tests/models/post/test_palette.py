@@ -0,0 +1,41 @@
+from os import path
+
+import PIL.Image
+import pytest
+
+from app.models.post import palette
+
+grant_path = path.join(path.dirname(__file__), '..', '..', 'fixtures', 'grant.jpg')
+
+
+def test_get_palette():
+    image = PIL.Image.open(grant_path)
+    colors = palette.get_palette(image, color_count=5)
+    assert colors == [(69, 71, 58), (19, 17, 20), (111, 125, 108), (163, 176, 193), (188, 214, 241)]
+
+
+def test_get_palette_most_common_first():
+    image = PIL.Image.new('RGB', (100, 100), (200, 0, 0))
+    image.paste((0, 0, 200), (0, 0, 100, 30))
+    image.paste((0, 200, 0), (0, 30, 100, 40))
+    assert palette.get_palette(image, color_count=5) == [(200, 0, 0), (0, 0, 200), (0, 200, 0)]
+
+
+def test_get_palette_ignores_white_and_transparent():
+    image = PIL.Image.new('RGBA', (100, 100), (255, 255, 255, 255))
+    image.paste((0, 0, 200, 255), (0, 0, 100, 10))
+    image.paste((200, 0, 0, 100), (0, 10, 100, 50))
+    assert palette.get_palette(image) == [(0, 0, 200)]
+
+
+def test_get_palette_all_white():
+    image = PIL.Image.new('RGB', (100, 100), (251, 252, 253))
+    with pytest.raises(ValueError, match='no pixels'):
+        palette.get_palette(image)
+
+
+def test_sample_pixels_of_big_image():
+    image = PIL.Image.new('RGB', (4000, 2000), (1, 2, 3))
+    pixels = palette.sample_pixels(image)
+    assert len(pixels) == 100 * 50 * 3
+    assert pixels[:6] == bytes([1, 2, 3, 1, 2, 3])
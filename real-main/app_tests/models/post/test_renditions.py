@@ -0,0 +1,44 @@
+import PIL.Image
+import pytest
+
+from app.models.post import renditions
+from app.models.post.exceptions import PostException
+from app.utils import image_size
+
+
+@pytest.mark.parametrize('size', [(4000, 2000), (2000, 4000), (4032, 3024), (1000, 1001), (3841, 1), (7, 9999)])
+@pytest.mark.parametrize('max_dimensions', [s.max_dimensions for s in image_size.THUMBNAILS])
+def test_fit_size_matches_pil_thumbnail(size, max_dimensions):
+    image = PIL.Image.new('RGB', size)
+    image.thumbnail(max_dimensions)
+    expected = None if image.size == size else image.size
+    assert renditions.fit_size(size, max_dimensions) == expected
+
+
+def test_fit_within():
+    image = PIL.Image.new('RGB', (200, 100))
+    assert renditions.fit_within(image, (400, 400)) is image
+    assert renditions.fit_within(image, (200, 100)) is image
+
+    shrunk = renditions.fit_within(image, (100, 100))
+    assert shrunk is not image
+    assert shrunk.size == (100, 50)
+    assert image.size == (200, 100)
+
+
+def test_build_renditions():
+    image = PIL.Image.new('RGB', (1000, 500))
+    built = list(renditions.build_renditions(image, image_size.THUMBNAILS))
+    assert [size for size, _ in built] == list(image_size.THUMBNAILS)
+    assert [rendition.size for _, rendition in built] == [(1000, 500), (1000, 500), (854, 427), (114, 57)]
+
+    # those that fit already are shared, not copied
+    assert built[0][1] is image
+    assert built[1][1] is image
+
+
+def test_build_renditions_failure():
+    image = PIL.Image.new('RGB', (1000, 500))
+    image.resize = None  # not callable
+    with pytest.raises(PostException, match='Unable to thumbnail image as jpeg for post `pid`'):
+        list(renditions.build_renditions(image, image_size.THUMBNAILS, post_id='pid'))
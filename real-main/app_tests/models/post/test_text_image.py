@@ -6,7 +6,14 @@ they're more just intended to ensure the alogirthm doesn't crash.
 """
 import pytest
 
-from app.models.post.text_image import generate_text_image, rectangle_wrap
+from app.models.post.text_image import (
+    TEXT_IMAGE_VERSION,
+    generate_text_image,
+    get_font,
+    get_text_image_key,
+    get_text_size,
+    rectangle_wrap,
+)
 
 dims_4k = (3840, 2160)
 dims_64p = (114, 64)
@@ -46,3 +53,35 @@ def test_rectangle_wrap():
     assert text == 'a b c\nd e'
     assert text_height == 22
     assert text_width == 48
+
+
+def test_rectangle_wrap_already_wide_enough():
+    text, text_width, text_height = rectangle_wrap(['a', 'b'], [15, 13], 2, 2, 10, 0.5)
+    assert text == 'a\nb'
+    assert text_width == 15
+    assert text_height == 22
+
+
+def test_rectangle_wrap_token_wider_than_others():
+    # the long token gets a line of its own, the rest are wrapped around it
+    raw_tokens = ['a', 'b', 'long', 'c', 'd']
+    token_widths = [10, 10, 100, 10, 10]
+    text, text_width, text_height = rectangle_wrap(raw_tokens, token_widths, 2, 2, 10, 16 / 9)
+    assert text == 'a b\nlong\nc d'
+    assert text_width == 100
+    assert text_height == 34
+
+
+def test_text_measurement_cached():
+    get_text_size.cache_clear()
+    generate_text_image('Fly high fly high', dims_64p)
+    info = get_text_size.cache_info()  # pylint: disable=no-value-for-parameter
+    # the repeated words, and the spacing probes of the font size retried after shrinking, were measured once
+    assert info.hits > 0
+    assert get_font(10) is get_font(10)
+
+
+def test_get_text_image_key():
+    assert get_text_image_key('hi') == get_text_image_key('hi')
+    assert get_text_image_key('hi') != get_text_image_key('hi ')
+    assert get_text_image_key('hi').startswith(f'v{TEXT_IMAGE_VERSION}/')
@@ -1,3 +1,4 @@
+import itertools
 import logging
 from uuid import uuid4
 
@@ -136,6 +137,61 @@ def test_get_user_by_username(user_dynamo):
     assert user_dynamo.get_user_by_username(username2)['userId'] == user_id2
 
 
+def test_generate_user_ids(user_dynamo):
+    assert list(user_dynamo.generate_user_ids()) == []
+
+    user_dynamo.add_user('uid1', 'uname1')
+    user_dynamo.add_user('uid2', 'uname2')
+    user_dynamo.client.add_item({'Item': {'partitionKey': 'user/uid1', 'sortKey': 'other'}})
+    assert sorted(user_dynamo.generate_user_ids()) == ['uid1', 'uid2']
+
+
+def test_scan_user_ids(user_dynamo):
+    assert user_dynamo.scan_user_ids() == {'items': [], 'nextToken': None}
+
+    user_dynamo.add_user('uid1', 'uname1')
+    user_dynamo.add_user('uid2', 'uname2')
+    user_dynamo.client.add_item({'Item': {'partitionKey': 'user/uid1', 'sortKey': 'other'}})
+    paginated = user_dynamo.scan_user_ids()
+    assert sorted(paginated['items']) == ['uid1', 'uid2']
+    assert paginated['nextToken'] is None
+
+    # page through one scanned item at a time
+    pages, next_token = [], None
+    while next_token or not pages:
+        paginated = user_dynamo.scan_user_ids(limit=1, next_token=next_token)
+        pages.append(paginated['items'])
+        next_token = paginated['nextToken']
+    assert all(len(page) <= 1 for page in pages)
+    assert sorted(itertools.chain.from_iterable(pages)) == ['uid1', 'uid2']
+
+
+def test_batch_get_users(user_dynamo):
+    assert user_dynamo.batch_get_users([]) == []
+
+    user_item_1 = user_dynamo.add_user('uid1', 'uname1')
+    user_item_2 = user_dynamo.add_user('uid2', 'uname2')
+
+    # get them, along with one that doesn't exist and a duplicate
+    user_items = user_dynamo.batch_get_users(['uid2', 'uid-dne', 'uid1', 'uid2'])
+    assert sorted(user_items, key=lambda item: item['userId']) == [user_item_1, user_item_2]
+
+
+def test_batch_get_follower_counts(user_dynamo):
+    assert user_dynamo.batch_get_follower_counts([]) == {}
+
+    # add two users, one with followers
+    user_id_1, user_id_2 = str(uuid4()), str(uuid4())
+    user_dynamo.add_user(user_id_1, str(uuid4())[:8])
+    user_dynamo.add_user(user_id_2, str(uuid4())[:8])
+    user_dynamo.increment_follower_count(user_id_2)
+    user_dynamo.increment_follower_count(user_id_2)
+
+    # duplicates and users that don't exist are handled
+    user_ids = [user_id_1, user_id_2, user_id_2, str(uuid4())]
+    assert user_dynamo.batch_get_follower_counts(user_ids) == {user_id_1: 0, user_id_2: 2}
+
+
 def test_delete_user(user_dynamo):
     user_id = 'my-user-id'
     username = 'my-USername'
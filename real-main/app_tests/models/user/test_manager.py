@@ -171,6 +171,17 @@ def test_username_tag_regex(user_manager):
     assert re.findall(reg, 'hi @._._ @4_. @A_A\n@B.4\r@333!?') == ['@._._', '@4_.', '@A_A', '@B.4', '@333']
 
 
+def test_search_users(user_manager):
+    hits = [{'_source': {'userId': 'uid1'}}, {'_source': {'userId': 'uid2'}}]
+    with mock.patch.object(user_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        elasticsearch_client_mock.paginated_search.return_value = {'hits': hits, 'nextToken': 'next'}
+        assert user_manager.search_users('spock', 2, 'token') == {'nextToken': 'next', 'items': ['uid1', 'uid2']}
+    assert len(elasticsearch_client_mock.paginated_search.mock_calls) == 1
+    index, query, tiebreaker, limit, next_token = elasticsearch_client_mock.paginated_search.call_args.args
+    assert (index, tiebreaker, limit, next_token) == ('users', 'userId.keyword', 2, 'token')
+    assert {'match': {'username': {'query': 'spock', 'boost': 2}}} in query['bool']['should']
+
+
 def test_clear_expired_subscriptions(user_manager, user1, user2, user3):
     sub_duration = pendulum.duration(months=1)
     ms = pendulum.duration(microseconds=1)
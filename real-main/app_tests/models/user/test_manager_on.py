@@ -104,7 +104,7 @@ def test_on_user_add_delete_user_deleted_subitem(user_manager, user):
 def test_on_user_delete_calls_elasticsearch(user_manager, user):
     with patch.object(user_manager, 'elasticsearch_client') as elasticsearch_client_mock:
         user_manager.on_user_delete(user.id, old_item=user.item)
-    assert elasticsearch_client_mock.mock_calls == [call.delete_user(user.id)]
+    assert elasticsearch_client_mock.mock_calls == [call.queue_delete_user(user.id)]
 
 
 def test_on_user_delete_calls_pinpoint(user_manager, user):
@@ -37,11 +37,11 @@ def system_message(chat_message_manager, chat):
 def test_sync_elasticsearch(user_manager, user):
     with patch.object(user_manager, 'elasticsearch_client') as elasticsearch_client_mock:
         user_manager.sync_elasticsearch(user.id, {'username': 'spock'}, 'garbage')
-    assert elasticsearch_client_mock.mock_calls == [call.put_user(user.id, 'spock', None)]
+    assert elasticsearch_client_mock.mock_calls == [call.queue_put_user(user.id, 'spock', None)]
 
     with patch.object(user_manager, 'elasticsearch_client') as elasticsearch_client_mock:
         user_manager.sync_elasticsearch(user.id, {'username': 'sp', 'fullName': 'fn'}, 'garbage')
-    assert elasticsearch_client_mock.mock_calls == [call.put_user(user.id, 'sp', 'fn')]
+    assert elasticsearch_client_mock.mock_calls == [call.queue_put_user(user.id, 'sp', 'fn')]
 
 
 @pytest.mark.parametrize(
@@ -76,6 +76,11 @@ def user_1_verified_phone_stream_updated(user_manager, cognito_client):
     yield user
 
 
+def test_shares_manager_clients(user, user_manager):
+    assert user.real_dating_client is user_manager.real_dating_client
+    assert user_manager.init_user(user.item).real_dating_client is user.real_dating_client
+
+
 def test_refresh(user):
     new_username = 'really good'
     assert user.item['username'] != new_username
@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+
+from app.utils import LazyProxy
+
+
+def test_target_created_on_first_attribute_access():
+    target = mock.Mock(foo='bar')
+    factory = mock.Mock(return_value=target)
+    proxy = LazyProxy(factory)
+    assert proxy.is_lazy_target_created is False
+    assert factory.mock_calls == []
+
+    assert proxy.foo == 'bar'
+    assert proxy.is_lazy_target_created is True
+    assert proxy.lazy_target is target
+
+    # only ever created once
+    assert proxy.foo == 'bar'
+    assert factory.call_count == 1
+
+
+def test_attribute_set_and_delete_pass_through():
+    target = mock.Mock()
+    proxy = LazyProxy(lambda: target)
+    proxy.foo = 42
+    assert target.foo == 42
+    del proxy.foo
+    with pytest.raises(AttributeError):
+        assert target.foo
+
+
+def test_factory_errors_are_not_cached():
+    factory = mock.Mock(side_effect=[Exception('nope'), mock.Mock(foo='bar')])
+    proxy = LazyProxy(factory)
+    with pytest.raises(Exception, match='nope'):
+        assert proxy.foo
+    assert proxy.is_lazy_target_created is False
+    assert proxy.foo == 'bar'
+
+
+def test_lazy_package_attributes():
+    from app import clients, models
+
+    assert clients.CloudFrontClient.__module__ == 'app.clients.cloudfront'
+    assert models.PostManager.__module__ == 'app.models.post.manager'
+    assert 'PostManager' in dir(models)
+    with pytest.raises(AttributeError):
+        assert models.NotAManager
@@ -0,0 +1,77 @@
+from unittest import mock
+
+import pytest
+
+from app.utils import NotificationCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def timer(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    yield FakeClock()
+
+
+@pytest.fixture
+def coalescer(clock):
+    yield NotificationCoalescer(mock.Mock(), 5, timer=clock.timer)
+
+
+def test_duplicates_sent_once(coalescer):
+    coalescer.add('uid1', 'nt')
+    coalescer.add('uid2', 'nt')
+    coalescer.add('uid1', 'nt')
+    assert coalescer.send_batch.mock_calls == []
+    assert coalescer.flush() == 2
+    assert coalescer.send_batch.mock_calls == [mock.call([('uid1', 'nt'), ('uid2', 'nt')])]
+    assert coalescer.flush() == 0
+
+
+def test_held_back_then_sent_once_interval_passes(coalescer, clock):
+    coalescer.add('uid1', 'nt')
+    assert coalescer.flush() == 1
+
+    # sent again within the interval, held back rather than dropped
+    coalescer.send_batch.reset_mock()
+    clock.now += 1
+    coalescer.add('uid1', 'nt')
+    coalescer.add('uid1', 'other-nt')
+    assert coalescer.flush() == 1
+    assert coalescer.send_batch.mock_calls == [mock.call([('uid1', 'other-nt')])]
+
+    clock.now += 3
+    coalescer.add('uid1', 'nt')
+    assert coalescer.flush() == 0
+
+    # once the interval has passed, the one held back goes out with the next flush, just once
+    coalescer.send_batch.reset_mock()
+    clock.now += 1
+    assert coalescer.flush() == 1
+    assert coalescer.send_batch.mock_calls == [mock.call([('uid1', 'nt')])]
+    assert coalescer.flush() == 0
+
+
+def test_held_back_left_pending_until_a_later_flush(coalescer, clock):
+    coalescer.add('uid1', 'nt')
+    assert coalescer.flush() == 1
+
+    # flushing doesn't wait for the one held back
+    coalescer.send_batch.reset_mock()
+    clock.now += 1
+    coalescer.add('uid1', 'nt')
+    assert coalescer.flush() == 0
+    assert clock.now == 101
+    assert coalescer.send_batch.mock_calls == []
+    assert list(coalescer.pending) == [('uid1', 'nt')]
+
+    # it goes out with whichever flush comes after the interval, along with anything new
+    clock.now += 60
+    coalescer.add('uid2', 'nt')
+    assert coalescer.flush() == 2
+    assert coalescer.send_batch.mock_calls == [mock.call([('uid1', 'nt'), ('uid2', 'nt')])]
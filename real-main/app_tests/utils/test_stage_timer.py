@@ -0,0 +1,76 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from app.utils.stage_timer import StageTimer
+
+
+def test_stages_recorded_in_order():
+    timer = StageTimer(timer=mock.Mock(side_effect=[0, 1, 1.5, 2, 2.25, 3]))
+    with timer.stage('first'):
+        pass
+    with timer.stage('second'):
+        pass
+    assert list(timer.stages) == ['first', 'second']
+    assert timer.stages['first']['ms'] == 500
+    assert timer.stages['second']['ms'] == 250
+    assert timer.total_ms == 750
+    assert timer.elapsed_ms == 3000
+    assert timer.summary().startswith('first: 500.0ms rss ')
+    assert ', second: 250.0ms rss ' in timer.summary()
+
+
+def test_memory_recorded():
+    timer = StageTimer()
+    with timer.stage('allocate'):
+        data = bytearray(1024 * 1024)
+        assert len(data) == 1024 * 1024
+    stage = timer.stages['allocate']
+    assert stage['rssMb'] > 0
+    assert stage['peakRssMb'] > 0
+
+
+def test_stage_recorded_on_exception():
+    timer = StageTimer()
+    with pytest.raises(ZeroDivisionError):
+        with timer.stage('failing'):
+            raise ZeroDivisionError()
+    assert 'failing' in timer.stages
+
+
+def test_run_concurrently():
+    # each stage waits on the other to have started, so would deadlock if run one at a time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def first():
+        barrier.wait()
+        return 1
+
+    def second():
+        barrier.wait()
+        return None
+
+    timer = StageTimer()
+    assert timer.run_concurrently({'first': first, 'second': second}) == {'first': 1, 'second': None}
+    assert set(timer.stages) == {'first', 'second'}
+    assert timer.elapsed_ms >= max(stage['ms'] for stage in timer.stages.values())
+
+
+def test_run_concurrently_raises_first_error_in_order():
+    finished = []
+
+    def fails(msg):
+        def func():
+            time.sleep(0.05 if msg == 'first' else 0)
+            raise ValueError(msg)
+
+        return func
+
+    timer = StageTimer()
+    with pytest.raises(ValueError, match='^first$'):
+        timer.run_concurrently({'a': fails('first'), 'b': fails('second'), 'c': lambda: finished.append('c')})
+    # all stages ran to completion
+    assert finished == ['c']
+    assert set(timer.stages) == {'a', 'b', 'c'}
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from app.utils import UploadPool, UploadPoolError
+
+
+def test_uploads_run_concurrently():
+    # each upload waits on all the others to have started, so would deadlock if run one at a time
+    barrier = threading.Barrier(3, timeout=5)
+    uploaded = []
+
+    def upload(name):
+        barrier.wait()
+        uploaded.append(name)
+
+    with UploadPool(max_workers=3) as upload_pool:
+        for name in ('a', 'b', 'c'):
+            upload_pool.submit(upload, name)
+    assert sorted(uploaded) == ['a', 'b', 'c']
+
+
+def test_failures_collected_after_all_uploads_finish():
+    uploaded = []
+
+    def upload(name):
+        if name in ('b', 'c'):
+            raise Exception(f'{name} failed')
+        uploaded.append(name)
+
+    with pytest.raises(UploadPoolError, match='2 of 4 uploads failed, first error: b failed') as error_info:
+        with UploadPool(max_workers=1) as upload_pool:
+            for name in ('a', 'b', 'c', 'd'):
+                upload_pool.submit(upload, name)
+    assert [str(err) for err in error_info.value.errors] == ['b failed', 'c failed']
+    assert uploaded == ['a', 'd']
+
+
+def test_exception_in_block_wins():
+    uploaded = []
+    with pytest.raises(ZeroDivisionError):
+        with UploadPool() as upload_pool:
+            upload_pool.submit(uploaded.append, 'a')
+            upload_pool.submit(lambda: 1 / 0)
+            raise ZeroDivisionError('from the block')
+    # still waited on
+    assert uploaded == ['a']
+
+
+def test_join_with_nothing_submitted():
+    upload_pool = UploadPool()
+    upload_pool.join()
+    assert upload_pool.futures == []
@@ -0,0 +1,6 @@
+"""
+Benchmarks of the backend, run locally against moto with in-memory stand-ins for the services moto
+doesn't cover (elasticsearch, appsync, the real dating lambdas, ...).
+
+Not part of the test suite. Run with `python -m benchmarks --help` from the `real-main` directory.
+"""
@@ -0,0 +1,110 @@
+"""
+Run the benchmarks and write the results as JSON, for tracking regressions over time.
+
+Ex: python -m benchmarks -n 20 -o results.json --compare previous-results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import pendulum
+
+from . import harness
+
+SUITES = ['images', 'imports', 'palette', 'resolvers', 'stream']
+
+# suites that don't need the mocked aws environment
+STANDALONE_SUITES = ['imports', 'palette']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Run the backend benchmarks')
+    parser.add_argument('suites', nargs='*', help=f'suites to run, of {", ".join(SUITES)}. Default all')
+    parser.add_argument('-n', dest='runs', type=int, default=10, help='timed runs of each benchmark')
+    parser.add_argument('-o', dest='output', help='path to write the JSON results to, default stdout')
+    parser.add_argument('--compare', help='path to earlier JSON results to compare median times against')
+    args = parser.parse_args()
+    for suite in args.suites:
+        if suite not in SUITES:
+            parser.error(f'Unknown suite `{suite}`')
+    return args
+
+
+def git_commit():
+    try:
+        return (
+            subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+            )
+            .stdout.decode()
+            .strip()
+        )
+    except Exception:
+        return None
+
+
+def run_suites(suites, runs):
+    results = {}
+    if 'imports' in suites:
+        from . import bench_imports
+
+        results['imports'] = bench_imports.run(runs)
+    if 'palette' in suites:
+        from . import bench_palette
+
+        results['palette'] = bench_palette.run(runs)
+    in_process_suites = [suite for suite in suites if suite not in STANDALONE_SUITES]
+    if in_process_suites:
+        from . import bench_images, bench_resolvers, bench_stream
+
+        modules = {'images': bench_images, 'resolvers': bench_resolvers, 'stream': bench_stream}
+        with harness.environment() as stand_ins:
+            for suite in in_process_suites:
+                results[suite] = modules[suite].run(stand_ins, runs)
+    return results
+
+
+def compare(results, earlier_results):
+    "Print the change in median time of each benchmark found in both sets of results"
+    for suite, benchmarks in results.items():
+        for name, summary in benchmarks.items():
+            earlier = earlier_results.get(suite, {}).get(name)
+            if not earlier:
+                continue
+            change = (summary['medianMs'] - earlier['medianMs']) / earlier['medianMs'] * 100
+            print(
+                f'{suite:>10} {name:<32} {earlier["medianMs"]:>10.2f} -> {summary["medianMs"]:>10.2f} ms'
+                f' ({change:+.1f}%)',
+                file=sys.stderr,
+            )
+
+
+def main():
+    args = parse_args()
+    suites = args.suites or SUITES
+    output = {
+        'startedAt': pendulum.now('utc').to_iso8601_string(),
+        'gitCommit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpuCount': os.cpu_count(),
+        'runs': args.runs,
+    }
+    output['results'] = run_suites(suites, args.runs)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            compare(output['results'], json.load(fh)['results'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(output, fh, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+The stages of the image pipeline, on the images in the test fixtures and on synthetic photos the size of
+those taken by phones: decoding native images from S3, building thumbnails, extracting colors, generating
+album art and rendering text images. Each stage reports wall time, CPU time, peak memory and bytes output.
+"""
+import io
+import itertools
+import os
+import uuid
+
+from . import harness
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app_tests', 'fixtures')
+FIXTURES = ['IMG_0265.HEIC', 'grant.jpg', 'tiny.jpg']
+
+# photo-like images of the sizes of 12 and 24 megapixel phone cameras
+SYNTHETIC_SIZES = {
+    'synthetic-12mp.jpg': (4032, 3024),
+    'synthetic-24mp.jpg': (6000, 4000),
+}
+
+SHORT_TEXT = 'lore ipsum'
+LONG_TEXT = ' '.join(itertools.repeat('the quick brown fox jumps over the lazy dog', 12))
+
+
+def synthetic_jpeg(size):
+    "Jpeg data of a photo-like image: smooth blotches of color, with some grain"
+    import PIL.Image
+
+    width, height = size
+    bands = [
+        # pylint: disable-next=not-callable
+        PIL.Image.effect_noise((width // 64, height // 64), 64).resize(size, resample=PIL.Image.BICUBIC)
+        for _ in range(3)
+    ]
+    grain = PIL.Image.effect_noise(size, 16).convert('RGB')
+    image = PIL.Image.blend(PIL.Image.merge('RGB', bands), grain, 0.1)
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=92)
+    return buf.getvalue()
+
+
+def discard(result):
+    "For the stages that output nothing, discard the result of the function that was timed"
+    return None
+
+
+def load_sources():
+    "The (content type, data) of each image to run the stages on, by name"
+    sources = {}
+    for name in FIXTURES:
+        with open(os.path.join(FIXTURES_PATH, name), 'rb') as fh:
+            content_type = 'image/heic' if name.endswith('.HEIC') else 'image/jpeg'
+            sources[name] = (content_type, fh.read())
+    for name, size in SYNTHETIC_SIZES.items():
+        sources[name] = ('image/jpeg', synthetic_jpeg(size))
+    return sources
+
+
+class Images:
+    """
+    Times the stages of processing each source image as a post, as the s3 lambda would, then album
+    art from the 1080p thumbnails of those posts and text images, with S3 mocked by moto.
+    """
+
+    # cells in the grids of album art
+    grid_counts = (4, 9, 16)
+
+    def __init__(self, stand_ins):
+        from app.handlers import cron, s3
+
+        self.post_manager = s3.post_manager
+        self.album_manager = cron.album_manager
+        self.s3_client = self.post_manager.clients['s3_uploads']
+        self.user_id = str(uuid.uuid4())
+
+    def init_post(self, post_id):
+        "A post, with nothing cached, of the image uploaded for `post_id`"
+        from app.models.post.enums import PostStatus, PostType
+
+        return self.post_manager.init_post(
+            {
+                'postId': post_id,
+                'postType': PostType.IMAGE,
+                'postStatus': PostStatus.PROCESSING,
+                'postedByUserId': self.user_id,
+            }
+        )
+
+    def object_bytes(self, paths):
+        return sum(
+            self.s3_client.boto_client.head_object(Bucket=self.s3_client.bucket_name, Key=path)['ContentLength']
+            for path in paths
+        )
+
+    def run_post_stages(self, name, content_type, data, runs):
+        "Time the stages of processing the source as a post, return the results and the post"
+        from app.utils import image_size
+
+        post_id = str(uuid.uuid4())
+        post = self.init_post(post_id)
+        results = {}
+
+        if content_type == 'image/heic':
+            self.s3_client.put_object(post.get_image_path(image_size.NATIVE_HEIC), data, content_type)
+            results['decode'] = harness.measure_resources(
+                lambda post: discard(post.native_heic_cache.readonly_image),
+                runs,
+                setup=lambda: self.init_post(post_id),
+            )
+
+            # the native jpeg is encoded from the HEIC
+            def encode_native(post):
+                post.native_jpeg_cache.set_image(post.native_heic_cache.readonly_image, copy=False)
+                post.native_jpeg_cache.flush()
+                return self.object_bytes([post.get_image_path(image_size.NATIVE)])
+
+            results['encodeNative'] = harness.measure_resources(
+                encode_native, runs, setup=lambda: self.init_post(post_id)
+            )
+        else:
+            self.s3_client.put_object(post.get_image_path(image_size.NATIVE), data, content_type)
+            results['decode'] = harness.measure_resources(
+                lambda post: discard(post.native_jpeg_cache.readonly_image),
+                runs,
+                setup=lambda: self.init_post(post_id),
+            )
+
+        results['decodeDraft'] = harness.measure_resources(
+            lambda post: discard(post.native_jpeg_cache.get_image(max_dimensions=image_size.K4.max_dimensions)),
+            runs,
+            setup=lambda: self.init_post(post_id),
+        )
+
+        def build_thumbnails(post):
+            post.build_image_thumbnails()
+            return self.object_bytes([post.get_image_path(size) for size in image_size.THUMBNAILS])
+
+        results['thumbnails'] = harness.measure_resources(
+            build_thumbnails, runs, setup=lambda: self.init_post(post_id)
+        )
+        # set_colors() is this plus a write to dynamo
+        results['colors'] = harness.measure_resources(
+            lambda post: discard(post.get_colors()), runs, setup=lambda: self.init_post(post_id)
+        )
+
+        size = post.native_jpeg_cache.size
+        for summary in results.values():
+            summary['size'] = '{}x{}'.format(*size)
+        return {f'{name}/{stage}': summary for stage, summary in results.items()}, post
+
+    def run_album_art_stages(self, posts, runs):
+        "Time generating album art from the 1080p thumbnails of the posts"
+        from app.models.album import art
+
+        thumbnails = [post.p1080_jpeg_cache.readonly_image for post in posts]
+        results = {}
+        for count in self.grid_counts:
+            images = list(itertools.islice(itertools.cycle(thumbnails), count))
+            results[f'albumArt/zoomedGrid{count}'] = harness.measure_resources(
+                lambda images=images: discard(art.generate_zoomed_grid(images)), runs
+            )
+            results[f'albumArt/basicGrid{count}'] = harness.measure_resources(
+                lambda images=images: discard(art.generate_basic_grid(images)), runs
+            )
+
+        album = self.album_manager.init_album({'albumId': str(uuid.uuid4()), 'ownedByUserId': self.user_id})
+        grid = art.generate_zoomed_grid(list(itertools.islice(itertools.cycle(thumbnails), 16)))
+
+        def save_art_images():
+            from app.utils import image_size
+
+            album.save_art_images('benchmarks', grid)
+            return self.object_bytes([album.get_art_image_path(size, 'benchmarks') for size in image_size.JPEGS])
+
+        results['albumArt/saveArtImages'] = harness.measure_resources(save_art_images, runs)
+        return results
+
+    def run_text_image_stages(self, runs):
+        """
+        Time rendering text images. Warm runs have the fonts and text measurements cached,
+        as a lambda container does after its first text post, cold runs start without them.
+        """
+        from app.models.post import text_image
+        from app.utils import image_size
+
+        def clear_caches():
+            text_image.get_font.cache_clear()
+            text_image.get_text_size.cache_clear()
+
+        results = {}
+        for text_name, text in (('short', SHORT_TEXT), ('long', LONG_TEXT)):
+            for size in (image_size.K4, image_size.P1080):
+
+                def render(text=text, size=size):
+                    text_image.generate_text_image(text, size.max_dimensions)
+
+                results[f'textImage/{text_name}{size.name}Warm'] = harness.measure_resources(render, runs)
+                results[f'textImage/{text_name}{size.name}Cold'] = harness.measure_resources(
+                    lambda _, render=render: render(), runs, setup=clear_caches
+                )
+        return results
+
+    def run(self, runs):
+        results, posts = {}, []
+        for name, (content_type, data) in load_sources().items():
+            post_results, post = self.run_post_stages(name, content_type, data, runs)
+            results.update(post_results)
+            posts.append(post)
+        results.update(self.run_album_art_stages(posts, runs))
+        results.update(self.run_text_image_stages(runs))
+        return results
+
+
+def run(stand_ins, runs):
+    return Images(stand_ins).run(runs)
@@ -0,0 +1,56 @@
+"""
+Cold start: the time for a fresh interpreter to import each handler module, which is what lambda does
+during a container's init phase.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from . import harness
+
+HANDLER_MODULES = [
+    'app.handlers.api',
+    'app.handlers.appsync.dispatch',
+    'app.handlers.cognito',
+    'app.handlers.cron',
+    'app.handlers.dynamo.handlers',
+    'app.handlers.fan_out',
+    'app.handlers.s3',
+]
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# run in the child interpreter, reports the import time and the number of modules it pulled in
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': len(sys.modules)}}))
+'''
+
+
+def time_import(module):
+    env = {**os.environ, **harness.ENV}
+    proc = subprocess.run(
+        [sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+        cwd=ROOT_PATH,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run(runs):
+    results = {}
+    for module in HANDLER_MODULES:
+        # the first import warms the os's file cache, as a lambda's deployment package would be
+        time_import(module)
+        timings = [time_import(module) for _ in range(runs)]
+        results[module] = harness.summarize(
+            [timing['seconds'] for timing in timings], {'modulesLoaded': timings[-1]['modules']}
+        )
+    return results
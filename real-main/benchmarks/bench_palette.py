@@ -0,0 +1,52 @@
+"""
+Palette extraction: ColorThief's pure-Python median cut against app.models.post.palette, on the images in
+the test fixtures. Both are given the image as post processing decodes it, at a reduced scale.
+"""
+import functools
+import glob
+import os
+
+from . import harness
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app_tests', 'fixtures')
+
+
+def load_fixtures():
+    "The jpeg and png fixtures, decoded as post processing does, by file name"
+    import PIL.Image
+
+    from app.models.post import palette
+
+    images = {}
+    for path in sorted(
+        glob.glob(os.path.join(FIXTURES_PATH, '*.jpg')) + glob.glob(os.path.join(FIXTURES_PATH, '*.png'))
+    ):
+        image = PIL.Image.open(path)
+        image.draft('RGB', palette.DECODE_DIMENSIONS)
+        image.load()
+        images[os.path.basename(path)] = image
+    return images
+
+
+def run(runs):
+    from app.models.post import palette
+
+    from .color_thief import ColorThiefFromImage
+
+    extractors = {
+        'colorThief': lambda image: ColorThiefFromImage(image).get_palette(color_count=5),
+        'palette': lambda image: palette.get_palette(image, color_count=5),
+    }
+    results = {}
+    for name, image in load_fixtures().items():
+        try:
+            palette.get_palette(image)
+        except ValueError:
+            continue  # all white, neither has a palette to find
+        for extractor_name, extract in extractors.items():
+            summary = harness.measure(functools.partial(extract, image), runs)
+            summary['size'] = '{}x{}'.format(*image.size)
+            results[f'{name}/{extractor_name}'] = summary
+        speedup = results[f'{name}/colorThief']['medianMs'] / results[f'{name}/palette']['medianMs']
+        results[f'{name}/palette']['speedup'] = round(speedup, 1)
+    return results
@@ -0,0 +1,87 @@
+"""
+Latency, and number of dynamo calls, of resolving representative AppSync fields through the lambda's
+top-level dispatch.
+"""
+import uuid
+
+from . import harness
+
+
+def gql_event(field, caller_user_id, arguments=None, source=None):
+    "An event as AppSync sends the lambda data source"
+    type_name, field_name = field.split('.')
+    return {
+        'info': {'parentTypeName': type_name, 'fieldName': field_name},
+        'arguments': arguments or {},
+        'source': source or {},
+        'identity': {'cognitoIdentityId': caller_user_id},
+        'request': {'headers': {'x-real-version': 'benchmarks'}},
+    }
+
+
+class Resolvers:
+    "Seeds the data the resolvers work on, then times them"
+
+    # posts seeded for views and search results
+    post_count = 20
+
+    # users returned as swiped right on
+    swiped_right_user_count = 5
+
+    def __init__(self, stand_ins):
+        from app.handlers.appsync import dispatch, handlers
+
+        self.stand_ins = stand_ins
+        self.dispatch = dispatch
+        self.user_manager = handlers.user_manager
+        self.post_manager = handlers.post_manager
+
+        self.caller = self.add_user()
+        self.user_manager.dynamo.update_subscription(self.caller.id, 'DIAMOND')
+        poster = self.add_user()
+        self.post_ids = [self.add_text_post(poster).id for _ in range(self.post_count)]
+        self.user_manager.dynamo.set_user_photo_post_id(poster.id, self.post_ids[0])
+        self.poster_item = self.user_manager.get_user(poster.id).item
+
+        stand_ins.swiped_right_user_ids = [self.add_user().id for _ in range(self.swiped_right_user_count)]
+        stand_ins.search_hits = [{'_source': {'postId': post_id}} for post_id in self.post_ids]
+
+    def add_user(self):
+        user_id = str(uuid.uuid4())
+        item = self.user_manager.dynamo.add_user(user_id, f'bench{user_id[:8]}', email=f'{user_id}@real.app')
+        return self.user_manager.init_user(item)
+
+    def add_text_post(self, user):
+        return self.post_manager.add_post(user, str(uuid.uuid4()), 'TEXT_ONLY', text='benchmark #text post')
+
+    def resolve(self, field, arguments=None, source=None):
+        resp = self.dispatch(gql_event(field, self.caller.id, arguments, source), None)
+        if 'error' in resp:
+            raise Exception(f'Resolving `{field}` failed: {resp["error"]}')
+        return resp['data']
+
+    def run(self, runs):
+        return {
+            'Mutation.addPost': harness.measure(
+                lambda post_id: self.resolve(
+                    'Mutation.addPost', {'postId': post_id, 'postType': 'TEXT_ONLY', 'text': 'hello #world'}
+                ),
+                runs,
+                setup=lambda: str(uuid.uuid4()),
+            ),
+            'Mutation.reportPostViews': harness.measure(
+                lambda: self.resolve('Mutation.reportPostViews', {'postIds': self.post_ids}), runs
+            ),
+            'Mutation.followUser': harness.measure(
+                lambda user: self.resolve('Mutation.followUser', {'userId': user.id}), runs, setup=self.add_user
+            ),
+            'Query.findPosts': harness.measure(
+                lambda: self.resolve('Query.findPosts', {'keywords': 'text', 'limit': 20}), runs
+            ),
+            'Query.swipedRightUsers': harness.measure(lambda: self.resolve('Query.swipedRightUsers'), runs),
+            'User.photo': harness.measure(lambda: self.resolve('User.photo', source=self.poster_item), runs),
+        }
+
+
+def run(stand_ins, runs):
+    return Resolvers(stand_ins).run(runs)
@@ -0,0 +1,106 @@
+"""
+Throughput of the dynamo stream handler's `process_records` on synthetic batches, built from the
+items of seeded users and posts.
+"""
+import uuid
+
+from boto3.dynamodb.types import TypeSerializer
+
+from . import harness
+
+serializer = TypeSerializer()
+
+
+def stream_record(event_name, old_item=None, new_item=None):
+    "A record as the dynamo stream sends it"
+    item = new_item or old_item
+    dynamodb = {
+        'Keys': {key: serializer.serialize(item[key]) for key in ('partitionKey', 'sortKey')},
+    }
+    if old_item:
+        dynamodb['OldImage'] = {k: serializer.serialize(v) for k, v in old_item.items()}
+    if new_item:
+        dynamodb['NewImage'] = {k: serializer.serialize(v) for k, v in new_item.items()}
+    return {'eventName': event_name, 'dynamodb': dynamodb}
+
+
+class Stream:
+    """
+    Times processing batches of the stream records of freshly seeded users and their posts. Each run
+    gets its own users and posts, as the handlers of INSERT records aren't idempotent.
+    """
+
+    # a batch's worth of records, at the default batch size of the lambda's event source mapping:
+    # an INSERT per user and per post, and a MODIFY per user
+    user_count = 20
+    posts_per_user = 3
+
+    def __init__(self, stand_ins):
+        from app.handlers.dynamo import handlers
+
+        self.process_records = handlers.process_records
+        self.user_manager = handlers.user_manager
+        self.post_manager = handlers.post_manager
+
+    def seed(self):
+        "Add users with posts, return their items"
+        user_items, post_items = [], []
+        for _ in range(self.user_count):
+            user_id = str(uuid.uuid4())
+            item = self.user_manager.dynamo.add_user(user_id, f'bench{user_id[:8]}', email=f'{user_id}@real.app')
+            user = self.user_manager.init_user(item)
+            for _ in range(self.posts_per_user):
+                post = self.post_manager.add_post(user, str(uuid.uuid4()), 'TEXT_ONLY', text='stream #benchmark')
+                post_items.append(post.item)
+            user_items.append(self.user_manager.get_user(user_id).item)
+        return user_items, post_items
+
+    def user_inserts(self):
+        user_items, _ = self.seed()
+        return [stream_record('INSERT', new_item=item) for item in user_items]
+
+    def post_inserts(self):
+        _, post_items = self.seed()
+        return [stream_record('INSERT', new_item=item) for item in post_items]
+
+    def user_modifies(self):
+        user_items, _ = self.seed()
+        return [
+            stream_record('MODIFY', old_item=item, new_item={**item, 'followerCount': 1}) for item in user_items
+        ]
+
+    def mixed(self):
+        user_items, post_items = self.seed()
+        return (
+            [stream_record('INSERT', new_item=item) for item in user_items]
+            + [stream_record('INSERT', new_item=item) for item in post_items]
+            + [
+                stream_record('MODIFY', old_item=item, new_item={**item, 'followerCount': 1})
+                for item in user_items
+            ]
+        )
+
+    def run(self, runs):
+        batches = {
+            'userInserts': self.user_inserts,
+            'postInserts': self.post_inserts,
+            'userModifies': self.user_modifies,
+            'mixed': self.mixed,
+        }
+        results, record_counts = {}, []
+
+        def process(records):
+            record_counts.append(len(records))
+            self.process_records({'Records': records}, None)
+
+        for name, make_records in batches.items():
+            record_counts.clear()
+            summary = harness.measure(process, runs, setup=make_records)
+            summary['records'] = record_counts[-1]
+            summary['recordsPerSecond'] = round(record_counts[-1] / summary['medianMs'] * 1000, 1)
+            results[name] = summary
+        return results
+
+
+def run(stand_ins, runs):
+    return Stream(stand_ins).run(runs)
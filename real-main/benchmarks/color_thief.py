@@ -0,0 +1,10 @@
+"""
+ColorThief, fed an already decoded image rather than a file, as the baseline bench_palette compares
+app.models.post.palette against.
+"""
+import colorthief
+
+
+class ColorThiefFromImage(colorthief.ColorThief):
+    def __init__(self, image):
+        self.image = image
@@ -0,0 +1,263 @@
+"""
+Shared plumbing for the benchmarks: the environment the app is run in, the stand-in clients, and
+timing, memory measurement and dynamo call counting.
+"""
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import time
+from unittest import mock
+
+# the app reads its config from the environment at import, so this needs to be set before that
+ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'benchmarks',
+    'AWS_SECRET_ACCESS_KEY': 'benchmarks',
+    'AWS_XRAY_SDK_ENABLED': 'false',
+    'DYNAMO_TABLE': 'benchmarks-main',
+    'DYNAMO_FEED_TABLE': 'benchmarks-feed',
+    'S3_UPLOADS_BUCKET': 'benchmarks-uploads',
+    'S3_PLACEHOLDER_PHOTOS_BUCKET': 'benchmarks-placeholder-photos',
+    'CLOUDFRONT_UPLOADS_DOMAIN': 'uploads.benchmarks.real.app',
+    'CLOUDFRONT_FRONTEND_RESOURCES_DOMAIN': 'resources.benchmarks.real.app',
+}
+os.environ.update(ENV)
+
+import moto  # noqa: E402 isort:skip
+import moto.core  # noqa: E402,F401 isort:skip
+
+from app import clients as app_clients  # noqa: E402 isort:skip
+from app.clients import transport  # noqa: E402 isort:skip
+
+
+def summarize(durations, extra=None):
+    "Summary stats, in ms, of a list of durations in seconds"
+    ms = sorted(duration * 1000 for duration in durations)
+    summary = {
+        'runs': len(ms),
+        'minMs': round(ms[0], 3),
+        'medianMs': round(statistics.median(ms), 3),
+        'p95Ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        'maxMs': round(ms[-1], 3),
+    }
+    summary.update(extra or {})
+    return summary
+
+
+def measure(func, runs, setup=None, warmup_runs=1):
+    """
+    Time `runs` calls of `func`, after `warmup_runs` untimed ones. If given, `setup` is called
+    (untimed) before each call and its return value is passed to `func`. Returns the summary,
+    including the mean number of dynamo calls made by each timed run.
+    """
+    for _ in range(warmup_runs):
+        if setup:
+            func(setup())
+        else:
+            func()
+    durations, dynamo_calls = [], 0
+    for _ in range(runs):
+        arg = setup() if setup else None
+        dynamo_call_counter.reset()
+        start = time.perf_counter()
+        if setup:
+            func(arg)
+        else:
+            func()
+        durations.append(time.perf_counter() - start)
+        dynamo_calls += dynamo_call_counter.count
+    return summarize(durations, {'dynamoCalls': round(dynamo_calls / runs, 2)})
+
+
+def get_peak_rss_mb():
+    "High-water mark of this process's resident memory, in MB, or None if unavailable"
+    try:
+        with open('/proc/self/status', encoding='utf-8') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def measure_peak_rss_mb(func, setup=None):
+    """
+    Run `func` once in a forked child process and return the high-water mark of the child's resident memory,
+    in MB, or None if that can't be measured here. The child starts with a copy of this process, so the
+    figure includes what this process had resident when forked, but none of what earlier work here
+    peaked at.
+    """
+    if not hasattr(os, 'fork') or get_peak_rss_mb() is None:
+        return None
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # the child: report the peak, or nothing if the run failed, and exit without running any cleanup
+        os.close(read_fd)
+        peak_rss_mb = None
+        try:
+            if setup:
+                func(setup())
+            else:
+                func()
+            peak_rss_mb = get_peak_rss_mb()
+        finally:
+            os.write(write_fd, json.dumps(peak_rss_mb).encode())
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as fh:
+        data = fh.read()
+    os.waitpid(pid, 0)
+    return json.loads(data) if data else None
+
+
+def measure_resources(func, runs, setup=None, warmup_runs=1):
+    """
+    Like measure(), for CPU and memory hungry work such as image processing. Along with the wall time,
+    records the median CPU time (of all threads), the absolute peak resident memory of a run in a process
+    of its own, and what the last run of `func` returned, as the number of bytes it output.
+    """
+    # measured first, so the fork copies as little as possible of what the runs below leave resident
+    peak_rss_mb = measure_peak_rss_mb(func, setup=setup)
+    for _ in range(warmup_runs):
+        if setup:
+            func(setup())
+        else:
+            func()
+    durations, cpu_durations = [], []
+    output_bytes = None
+    for _ in range(runs):
+        arg = setup() if setup else None
+        start, cpu_start = time.perf_counter(), time.process_time()
+        if setup:
+            output_bytes = func(arg)
+        else:
+            output_bytes = func()
+        durations.append(time.perf_counter() - start)
+        cpu_durations.append(time.process_time() - cpu_start)
+    return summarize(
+        durations,
+        {
+            'cpuMedianMs': round(statistics.median(cpu_durations) * 1000, 3),
+            'peakMemoryMb': peak_rss_mb,
+            'outputBytes': output_bytes,
+        },
+    )
+
+
+class DynamoCallCounter:
+    "Counts calls made to the dynamo api, by all clients built from the shared boto3 session"
+
+    def __init__(self):
+        self.count = 0
+        self.registered = False
+
+    def __call__(self, **kwargs):
+        self.count += 1
+
+    def register(self):
+        if not self.registered:
+            transport.get_boto3_session().events.register('before-call.dynamodb', self)
+            self.registered = True
+
+    def reset(self):
+        self.count = 0
+
+
+dynamo_call_counter = DynamoCallCounter()
+
+
+def generate_cloudfront_key_pair():
+    "A fresh key pair, in the format it's stored in secrets manager"
+    from cryptography.hazmat import backends
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(65537, 2048, backend=backends.default_backend())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()
+    )
+    return {'keyId': 'BENCHMARKKEYID', 'privateKey': '\n'.join(pem.decode().strip().splitlines()[1:-1])}
+
+
+def payload(value):
+    "A stand-in lambda invoke response"
+    return {'Payload': io.BytesIO(json.dumps(value).encode())}
+
+
+class StandIns:
+    "In-memory stand-ins for the clients of services that moto doesn't cover"
+
+    def __init__(self):
+        key_pair = generate_cloudfront_key_pair()
+        self.cloudfront = app_clients.CloudFrontClient(lambda: key_pair, ENV['CLOUDFRONT_UPLOADS_DOMAIN'])
+        self.appsync = mock.Mock(
+            app_clients.AppSyncClient(appsync_graphql_url='https://appsync.benchmarks.real.app/graphql'),
+            **{'fire_notifications.return_value': [], 'send_mutations.return_value': []},
+        )
+        self.elasticsearch = mock.Mock(
+            app_clients.ElasticSearchClient(domain='elasticsearch.benchmarks.real.app'),
+            **{'flush.return_value': []},
+        )
+        self.real_dating = mock.Mock(app_clients.RealDatingClient())
+        self.swiped_right_user_ids = []
+        self.real_dating.swiped_right_users.side_effect = lambda user_id: payload(self.swiped_right_user_ids)
+        self.real_dating.get_user_matches_count.side_effect = lambda user_id: payload(0)
+        self.post_verification = mock.Mock(**{'verify_image.return_value': True})
+        self.search_hits = []
+        self.elasticsearch.paginated_search.side_effect = lambda *args, **kwargs: {
+            'hits': self.search_hits,
+            'nextToken': None,
+        }
+
+    @contextlib.contextmanager
+    def patch(self):
+        "Have the app's handlers build the stand-ins in place of the real clients"
+        patches = {
+            'AmplitudeClient': mock.Mock(),
+            'AppleClient': mock.Mock(),
+            'AppStoreClient': mock.Mock(),
+            'AppSyncClient': self.appsync,
+            'CloudFrontClient': self.cloudfront,
+            'CognitoClient': mock.Mock(),
+            'ElasticSearchClient': self.elasticsearch,
+            'FacebookClient': mock.Mock(),
+            'GoogleClient': mock.Mock(),
+            'PinpointClient': mock.Mock(),
+            'PostVerificationClient': self.post_verification,
+            'RealDatingClient': self.real_dating,
+            'SecretsManagerClient': mock.Mock(),
+            'SQSClient': mock.Mock(),
+        }
+        with contextlib.ExitStack() as stack:
+            for name, stand_in in patches.items():
+                stack.enter_context(mock.patch.object(app_clients, name, lambda *args, _s=stand_in, **kw: _s))
+            yield self
+
+
+@contextlib.contextmanager
+def environment():
+    """
+    Mock the AWS services with moto, create the table and buckets the app uses, and patch in the
+    stand-in clients. Yields the stand-ins.
+    """
+    from app_tests.dynamodb.table_schema import feed_table_schema, main_table_schema
+
+    # the handlers log every record and resolution, which would dominate what's measured
+    logger = logging.getLogger()
+    logger.addHandler(logging.NullHandler())
+
+    with moto.mock_dynamodb2(), moto.mock_s3():
+        transport.clear_boto3_registry()
+        dynamo_call_counter.registered = False
+        dynamo_call_counter.register()
+        app_clients.DynamoClient(ENV['DYNAMO_TABLE'], create_table_schema=main_table_schema)
+        app_clients.DynamoClient(ENV['DYNAMO_FEED_TABLE'], create_table_schema=feed_table_schema)
+        app_clients.S3Client(ENV['S3_UPLOADS_BUCKET'], create_bucket=True)
+        app_clients.S3Client(ENV['S3_PLACEHOLDER_PHOTOS_BUCKET'], create_bucket=True)
+        with StandIns().patch() as stand_ins:
+            yield stand_ins
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Profile the time it takes to import a module, as a lambda does on cold start, and list the
+imported modules that took the most time.
+
+Uses the interpreter's own -X importtime instrumentation, run in a fresh subprocess so
+nothing is already imported.
+
+Ex: ./bin/profile_imports.py app.handlers.appsync.handlers -n 30
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# https://stackoverflow.com/questions/16981921
+SCRIPT_PATH = os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+ROOT_PATH = os.path.dirname(os.path.dirname(SCRIPT_PATH))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Profile the import time of a module')
+    parser.add_argument('module', help='dotted path of the module to import, ex: app.handlers.cron')
+    parser.add_argument('-n', dest='count', type=int, default=20, help='number of modules to list')
+    parser.add_argument(
+        '-s', dest='sort_by_self', action='store_true', help='sort by self time rather than cumulative time'
+    )
+    return parser.parse_args()
+
+
+def profile(module):
+    "Return a list of (self microseconds, cumulative microseconds, module name) tuples"
+    env = {'AWS_DEFAULT_REGION': 'us-east-1', **os.environ}
+    cmd = [sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    proc = subprocess.run(cmd, cwd=ROOT_PATH, env=env, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:') :].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def main():
+    args = parse_args()
+    rows = profile(args.module)
+    total_us = sum(self_us for self_us, _, _ in rows)
+    print(f'Imported {len(rows)} modules in {total_us / 1000:.1f} ms')
+    print(f'{"self ms":>10} {"cumul. ms":>10}  module')
+    rows.sort(key=lambda row: row[0] if args.sort_by_self else row[1], reverse=True)
+    for self_us, cumulative_us, name in rows[: args.count]:
+        print(f'{self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}  {name}')
+
+
+if __name__ == '__main__':
+    main()